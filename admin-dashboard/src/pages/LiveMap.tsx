@@ -942,6 +942,19 @@ export default function AdminLiveMap() {
     setDeviationAlerts(new Map());
   }
 
+  // Positions are fanned out per map tile; tell the server which tiles we can see
+  function subscribeViewport() {
+    const ws = wsRef.current;
+    const bounds = mapRef.current?.getBounds();
+    if (!ws || ws.readyState !== WebSocket.OPEN || !bounds) return;
+    const sw = bounds.getSouthWest();
+    const ne = bounds.getNorthEast();
+    ws.send(JSON.stringify({
+      type: "subscribe_viewport",
+      bounds: { south: sw.lat(), west: sw.lng(), north: ne.lat(), east: ne.lng() },
+    }));
+  }
+
   function connect() {
     if (wsRef.current?.readyState === WebSocket.OPEN) return;
     const token = localStorage.getItem("access");
@@ -954,7 +967,7 @@ export default function AdminLiveMap() {
     const ws = new WebSocket(url);
     wsRef.current = ws;
     setWsStatus("connecting");
-    ws.onopen = () => { console.log("[AdminLiveMap] connected"); setWsStatus("connected"); };
+    ws.onopen = () => { console.log("[AdminLiveMap] connected"); setWsStatus("connected"); subscribeViewport(); };
     ws.onmessage = (ev) => {
       try {
         const msg = JSON.parse(ev.data);
@@ -964,7 +977,10 @@ export default function AdminLiveMap() {
         }
 
         const { handleDriverUpdate: hdu } = handlersRef.current;
-        if ((msg.type === "DRIVER_LOCATION_UPDATED" || msg.type === "driver_location_update" || msg.type === "location_update") && msg.data) safeHandleDriverUpdate(msg.data);
+        if (msg.type === "DRIVER_LOCATIONS_BATCH" && Array.isArray(msg.data)) msg.data.forEach(safeHandleDriverUpdate);
+        else if (msg.type === "RIDER_LOCATIONS_BATCH" && Array.isArray(msg.data)) msg.data.forEach(safeHandleRiderUpdate);
+        else if (msg.type === "VIEWPORT_TOO_LARGE") console.warn("[AdminLiveMap] zoom in to see live positions", msg.data);
+        else if ((msg.type === "DRIVER_LOCATION_UPDATED" || msg.type === "driver_location_update" || msg.type === "location_update") && msg.data) safeHandleDriverUpdate(msg.data);
         else if ((msg.type === "RIDER_LOCATION_UPDATED" || msg.type === "rider_location_update" || msg.type === "location_updated") && msg.data) safeHandleRiderUpdate(msg.data);
         else if (msg.type === "ROUTE_DEVIATION" && msg.data) handleDeviationAlert(msg.data);
         else if (msg.type === "RIDE_CREATED" && msg.data) {
@@ -1950,8 +1966,9 @@ export default function AdminLiveMap() {
                 mapRef.current = m;
                 mapReadyRef.current = true;
                 flushPending();
+                subscribeViewport();
               }}
-              onIdle={cullMarkers}
+              onIdle={() => { cullMarkers(); subscribeViewport(); }}
               onBoundsChanged={cullMarkers}
               center={DEFAULT_CENTER}
               zoom={12}
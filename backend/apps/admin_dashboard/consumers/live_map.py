@@ -1,8 +1,12 @@
+import asyncio
 import json
 import logging
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from apps.admin_dashboard.tiles import tile_group, tiles_for_bounds
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +19,24 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
     Registered at: ws/admin/live-map/
 
     Auth: must be an admin (role=ADMIN or is_superuser or is_staff).
-    On connect: sends snapshot of all active drivers.
+    On connect: sends a snapshot of all active drivers and riders as
+    DRIVER_LOCATIONS_BATCH / RIDER_LOCATIONS_BATCH frames.
     Listens for: driver_location_update, rider_location_update, admin_generic_event.
+
+    Viewport: the client sends {"type": "subscribe_viewport", "bounds":
+    {"south", "west", "north", "east"}} and the socket joins only the tile
+    groups covering it (apps/admin_dashboard/tiles.py). Position updates are
+    coalesced per driver/rider and sent every LIVE_MAP_FRAME_INTERVAL as one
+    DRIVER_LOCATIONS_BATCH / RIDER_LOCATIONS_BATCH frame.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tiles = set()
+        self.pending_drivers = {}
+        self.pending_riders = {}
+        self.flush_task = None
+
     @database_sync_to_async
     def _is_admin_user(self, user) -> bool:
         """Check admin role safely in a thread (DB may be hit for is_admin property)."""
@@ -29,10 +47,17 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def _get_initial_snapshot(self):
-        """Return active driver and rider data for the initial map load."""
+        """
+        Return active driver and rider data for the initial map load.
+
+        Built from a fixed number of reads whatever the fleet size: drivers,
+        active rides and captured payments (one query each) plus one Redis
+        pipeline per position source.
+        """
         try:
-            drivers_data = self._fetch_drivers_data()
-            riders_data = self._fetch_riders_data()
+            rides = self._fetch_active_rides()
+            drivers_data = self._fetch_drivers_data(rides)
+            riders_data = self._fetch_riders_data(rides)
             return drivers_data, riders_data
         except Exception as e:
             logger.error(
@@ -40,18 +65,55 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
             )
             return [], []
 
-    def _fetch_drivers_data(self):
-        from apps.drivers.models import Driver
+    def _fetch_active_rides(self):
         from apps.rides.models import Ride
 
-        drivers_data = []
-        drivers = Driver.objects.filter(
-            status__in=["ONLINE", "BUSY", "OFFLINE"],
-        ).select_related("user")
+        return list(
+            Ride.objects.filter(
+                status__in=[
+                    Ride.Status.SEARCHING,
+                    Ride.Status.OFFERED,
+                    Ride.Status.ASSIGNED,
+                    Ride.Status.ARRIVED,
+                    Ride.Status.ONGOING,
+                ]
+            )
+            .select_related("rider")
+            .order_by("-updated_at")
+        )
 
+    def _fetch_drivers_data(self, rides):
+        from apps.drivers.models import Driver
+        from apps.drivers.redis import get_driver_last_points
+        from apps.payments.models import Payment
+
+        drivers = list(
+            Driver.objects.filter(
+                status__in=["ONLINE", "BUSY", "OFFLINE"],
+            ).select_related("user")
+        )
+
+        # Most recently updated ride per driver
+        ride_by_driver = {}
+        for ride in rides:
+            if ride.driver_id:
+                ride_by_driver.setdefault(ride.driver_id, ride)
+
+        captured = set()
+        if ride_by_driver:
+            captured = set(
+                Payment.objects.filter(
+                    ride_id__in=[r.id for r in ride_by_driver.values()],
+                    status=Payment.Status.CAPTURED,
+                ).values_list("ride_id", flat=True)
+            )
+
+        last_points = get_driver_last_points(d.id for d in drivers)
+
+        drivers_data = []
         for d in drivers:
-            ride = self._get_active_ride_for_driver(d.id)
-            lat, lng = self._get_driver_location(d, ride)
+            ride = ride_by_driver.get(d.id)
+            lat, lng = self._get_driver_location(d, ride, last_points.get(d.id))
 
             if lat is None or lng is None:
                 continue
@@ -61,32 +123,13 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
 
             data = self._format_driver_basic_data(d, lat, lng)
             if ride:
-                data["ride"] = self._format_ride_snapshot(ride)
+                data["ride"] = self._format_ride_snapshot(ride, ride.id in captured)
 
             drivers_data.append(data)
         return drivers_data
 
-    def _get_active_ride_for_driver(self, driver_id):
-        from apps.rides.models import Ride
-        return (
-            Ride.objects.filter(
-                driver_id=driver_id,
-                status__in=[
-                    Ride.Status.SEARCHING,
-                    Ride.Status.OFFERED,
-                    Ride.Status.ASSIGNED,
-                    Ride.Status.ARRIVED,
-                    Ride.Status.ONGOING,
-                ],
-            )
-            .order_by("-updated_at")
-            .first()
-        )
-
-    def _get_driver_location(self, driver, ride):
-        from apps.drivers.redis import get_driver_last_point
+    def _get_driver_location(self, driver, ride, redis_loc):
         lat, lng = driver.last_lat, driver.last_lng
-        redis_loc = get_driver_last_point(driver.id)
         if redis_loc:
             lat, lng = redis_loc
         elif (lat is None or lng is None) and ride:
@@ -111,16 +154,13 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
             "ts": int(driver.updated_at.timestamp()) if driver.updated_at else 0,
         }
 
-    def _format_ride_snapshot(self, ride):
+    def _format_ride_snapshot(self, ride, captured):
         from apps.payments.models import Payment
-        payment = Payment.objects.filter(
-            ride_id=ride.id, status=Payment.Status.CAPTURED
-        ).first()
 
         return {
             "id": ride.id,
             "status": ride.status,
-            "payment_status": payment.status if payment else None,
+            "payment_status": Payment.Status.CAPTURED if captured else None,
             "base_fare": str(ride.base_fare),
             "final_fare": str(ride.final_fare) if ride.final_fare else None,
             "pickup": {
@@ -140,26 +180,17 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
             "vehicle_type": ride.vehicle_type,
         }
 
-    def _fetch_riders_data(self):
+    def _fetch_riders_data(self, rides):
         import time
 
-        from apps.drivers.redis_rider import get_rider_last_point
-        from apps.rides.models import Ride
+        from apps.drivers.redis_rider import get_rider_last_points
 
-        riders_data = []
-        active_rides = Ride.objects.filter(
-            status__in=[
-                Ride.Status.SEARCHING,
-                Ride.Status.OFFERED,
-                Ride.Status.ASSIGNED,
-                Ride.Status.ARRIVED,
-                Ride.Status.ONGOING,
-            ]
-        ).select_related("rider")
+        last_points = get_rider_last_points({r.rider_id for r in rides})
 
+        riders_data = []
         curr_ts = int(time.time())
-        for r in active_rides:
-            loc = get_rider_last_point(r.rider_id)
+        for r in rides:
+            loc = last_points.get(r.rider_id)
             lat = loc[0] if loc else float(r.pickup_lat)
             lng = loc[1] if loc else float(r.pickup_lng)
 
@@ -189,6 +220,17 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
             )
         return riders_data
 
+    async def _send_snapshot(self, frame_type, items):
+        """Send snapshot items as compact batch frames of LIVE_MAP_SNAPSHOT_CHUNK_SIZE."""
+        chunk = getattr(settings, "LIVE_MAP_SNAPSHOT_CHUNK_SIZE", 500)
+        for i in range(0, len(items), chunk):
+            await self.send(
+                text_data=json.dumps(
+                    {"type": frame_type, "data": items[i : i + chunk]},
+                    separators=(",", ":"),
+                )
+            )
+
     async def connect(self):
         user = self.scope.get("user")
 
@@ -205,34 +247,93 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
 
         await self.channel_layer.group_add(GROUP_NAME, self.channel_name)
         await self.accept()
+        self.flush_task = asyncio.create_task(self._flush_loop())
 
         logger.info(f"[AdminLiveMap] ✅ Admin {user.id} connected")
 
         # Send initial snapshot of active drivers and riders
         drivers_data, riders_data = await self._get_initial_snapshot()
 
-        for data in drivers_data:
+        await self._send_snapshot("DRIVER_LOCATIONS_BATCH", drivers_data)
+        await self._send_snapshot("RIDER_LOCATIONS_BATCH", riders_data)
+
+    async def disconnect(self, close_code):
+        if self.flush_task:
+            self.flush_task.cancel()
+        await self.channel_layer.group_discard(GROUP_NAME, self.channel_name)
+        await self._switch_tiles(set())
+
+    # ── Viewport subscription ────────────────────────────────────────────────
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            msg = json.loads(text_data or "{}")
+        except ValueError:
+            return
+        if msg.get("type") == "subscribe_viewport":
+            await self._subscribe_viewport(msg.get("bounds") or {})
+
+    async def _subscribe_viewport(self, bounds):
+        max_tiles = getattr(settings, "LIVE_MAP_MAX_TILES", 400)
+        try:
+            tiles = tiles_for_bounds(
+                bounds["south"], bounds["west"], bounds["north"], bounds["east"],
+                max_tiles=max_tiles,
+            )
+        except (KeyError, TypeError, ValueError):
             await self.send(
                 text_data=json.dumps(
-                    {
-                        "type": "DRIVER_LOCATION_UPDATED",
-                        "data": data,
-                    }
+                    {"type": "ERROR", "data": {"message": "Invalid viewport bounds"}}
                 )
             )
+            return
 
-        for data in riders_data:
+        if tiles is None:
             await self.send(
                 text_data=json.dumps(
-                    {
-                        "type": "RIDER_LOCATION_UPDATED",
-                        "data": data,
-                    }
+                    {"type": "VIEWPORT_TOO_LARGE", "data": {"max_tiles": max_tiles}}
                 )
             )
+            return
 
-    async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(GROUP_NAME, self.channel_name)
+        await self._switch_tiles(tiles)
+
+    async def _switch_tiles(self, tiles):
+        leaving, joining = self.tiles - tiles, tiles - self.tiles
+        await asyncio.gather(
+            *(
+                self.channel_layer.group_discard(tile_group(t), self.channel_name)
+                for t in leaving
+            ),
+            *(
+                self.channel_layer.group_add(tile_group(t), self.channel_name)
+                for t in joining
+            ),
+        )
+        self.tiles = tiles
+
+    # ── Batched position frames ──────────────────────────────────────────────
+
+    async def _flush_loop(self):
+        interval = getattr(settings, "LIVE_MAP_FRAME_INTERVAL", 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._flush_frames()
+            except Exception as e:
+                logger.error(f"[AdminLiveMap] Frame flush failed: {e}")
+
+    async def _flush_frames(self):
+        if self.pending_drivers:
+            batch, self.pending_drivers = list(self.pending_drivers.values()), {}
+            await self.send(
+                text_data=json.dumps({"type": "DRIVER_LOCATIONS_BATCH", "data": batch})
+            )
+        if self.pending_riders:
+            batch, self.pending_riders = list(self.pending_riders.values()), {}
+            await self.send(
+                text_data=json.dumps({"type": "RIDER_LOCATIONS_BATCH", "data": batch})
+            )
 
     # ── Group event handlers ─────────────────────────────────────────────────
     # These must be lowercase for Channels to route them correctly.
@@ -247,15 +348,8 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
             data = {k: v for k, v in event.items() if k != "type"}
 
         if "driver_id" in data:
-            # logger.debug(f"[AdminLiveMap] Forwarding move for Driver {data['driver_id']} to ({data.get('lat')}, {data.get('lng')})")
-            await self.send(
-                text_data=json.dumps(
-                    {
-                        "type": "DRIVER_LOCATION_UPDATED",
-                        "data": data,
-                    }
-                )
-            )
+            # Latest update per driver wins; sent with the next frame
+            self.pending_drivers[data["driver_id"]] = data
 
     # Alias for simulators
     async def driver_location_update(self, event):
@@ -272,15 +366,7 @@ class AdminLiveMapConsumer(AsyncWebsocketConsumer):
             data = {k: v for k, v in event.items() if k != "type"}
 
         if "rider_id" in data:
-            # logger.debug(f"[AdminLiveMap] Forwarding move for Rider {data['rider_id']}")
-            await self.send(
-                text_data=json.dumps(
-                    {
-                        "type": "RIDER_LOCATION_UPDATED",
-                        "data": data,
-                    }
-                )
-            )
+            self.pending_riders[data["rider_id"]] = data
 
     # Alias for simulators
     async def rider_location_update(self, event):
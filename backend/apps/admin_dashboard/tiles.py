@@ -0,0 +1,53 @@
+# apps/admin_dashboard/tiles.py
+"""
+Tile addressing for the admin live map.
+
+Per-ping positions (drivers and riders) are published to the group of the
+tile they fall in, not to admin_live_map. An admin socket joins only the
+tiles covering its viewport, so what it receives scales with the visible
+area instead of the fleet. Low-volume events (status changes, ride events,
+offline markers, alerts) stay on admin_live_map.
+
+Tiles are a plain lat/lng grid of settings.LIVE_MAP_TILE_DEG degrees.
+"""
+
+import math
+
+from django.conf import settings
+
+TILE_GROUP_PREFIX = "admin_live_map.tile"
+
+
+def _tile_deg():
+    return getattr(settings, "LIVE_MAP_TILE_DEG", 0.05)
+
+
+def tile_of(lat, lng):
+    size = _tile_deg()
+    return math.floor(float(lat) / size), math.floor(float(lng) / size)
+
+
+def tile_group(tile):
+    row, col = tile
+    return f"{TILE_GROUP_PREFIX}.{row}.{col}"
+
+
+def tile_group_for(lat, lng):
+    return tile_group(tile_of(lat, lng))
+
+
+def tiles_for_bounds(south, west, north, east, max_tiles):
+    """
+    Tiles covering a viewport, or None when there would be more than
+    max_tiles (the client should zoom in). Viewports crossing the
+    antimeridian are not supported.
+    """
+    south, north = sorted((float(south), float(north)))
+    west, east = sorted((float(west), float(east)))
+    row0, col0 = tile_of(south, west)
+    row1, col1 = tile_of(north, east)
+    if (row1 - row0 + 1) * (col1 - col0 + 1) > max_tiles:
+        return None
+    return {
+        (row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)
+    }
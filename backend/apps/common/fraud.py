@@ -141,32 +141,21 @@ def detect_coordinated_abuse(driver, ride) -> bool:
 # ─── 5. GPS VELOCITY GUARD (SPOOFING DETECTION) ─────────────────────────────
 
 
-def validate_gps_velocity(driver_id, new_lat, new_lng):
+def gps_velocity_verdict(driver_id, last_data, new_lat, new_lng, now):
     """
-    Detects GPS Spoofing/Teleportation by calculating speed between pings.
-    If speed > 150km/h, it is physically impossible in city traffic.
+    Pure velocity decision over the driver's stored meta hash.
+    Returns (is_valid, store_point). Shared by the sync HTTP path and the
+    async location socket, which read/write Redis in their own way.
     """
-    import time
-
     from geopy.distance import geodesic
 
-    from apps.drivers.redis import redis_client
-
-    meta_key = f"driver:{driver_id}:meta"
-    last_data = redis_client.hgetall(meta_key)
-
     if not last_data or "lat" not in last_data or "lng" not in last_data:
         # First ping, just store and return
-        redis_client.hset(
-            meta_key,
-            mapping={"lat": new_lat, "lng": new_lng, "last_seen": int(time.time())},
-        )
-        return True
+        return True, True
 
     last_lat = float(last_data["lat"])
     last_lng = float(last_data["lng"])
     last_time = int(last_data["last_seen"])
-    now = int(time.time())
 
     time_diff = now - last_time
     # 🚨 RESILIENCE FIX: If last ping was > 5 mins ago, reset velocity tracking.
@@ -175,13 +164,10 @@ def validate_gps_velocity(driver_id, new_lat, new_lng):
         logger.info(
             f"[SPOOF] Resetting velocity tracking for Driver {driver_id} (Stale data: {time_diff}s)"
         )
-        redis_client.hset(
-            meta_key, mapping={"lat": new_lat, "lng": new_lng, "last_seen": now}
-        )
-        return True
+        return True, True
 
     if time_diff < MIN_PING_INTERVAL:
-        return True  # Too frequent pings, skip velocity check to avoid noise
+        return True, False  # Too frequent pings, skip velocity check to avoid noise
 
     # Calculate distance in km
     dist_km = geodesic((last_lat, last_lng), (new_lat, new_lng)).km
@@ -194,15 +180,37 @@ def validate_gps_velocity(driver_id, new_lat, new_lng):
             f"[SPOOF] GPS Teleportation detected for Driver {driver_id}! "
             f"Speed: {speed_kmh:.1f} km/h, Distance: {dist_km:.2f} km in {time_diff}s"
         )
-        # Record fraud signal for the session
-        redis_client.hincrby(f"driver:{driver_id}:fraud", "spoof_count", 1)
-        return False
+        return False, False
 
-    # Update last valid position
-    redis_client.hset(
-        meta_key, mapping={"lat": new_lat, "lng": new_lng, "last_seen": now}
+    return True, True
+
+
+def validate_gps_velocity(driver_id, new_lat, new_lng):
+    """
+    Detects GPS Spoofing/Teleportation by calculating speed between pings.
+    If speed > 150km/h, it is physically impossible in city traffic.
+    """
+    import time
+
+    from apps.drivers.redis import redis_client
+
+    meta_key = f"driver:{driver_id}:meta"
+    last_data = redis_client.hgetall(meta_key)
+    now = int(time.time())
+
+    is_valid, store_point = gps_velocity_verdict(
+        driver_id, last_data, new_lat, new_lng, now
     )
-    return True
+
+    if not is_valid:
+        # Record fraud signal for the session
+        redis_client.hincrby(f"driver:{driver_id}:fraud", "spoof_count", 1)
+    elif store_point:
+        # Update last valid position
+        redis_client.hset(
+            meta_key, mapping={"lat": new_lat, "lng": new_lng, "last_seen": now}
+        )
+    return is_valid
 
 
 # ─── 5. COMPOSITE ENTRY POINT ────────────────────────────────────────────────
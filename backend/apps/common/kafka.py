@@ -0,0 +1,189 @@
+# apps/common/kafka.py
+"""
+Shared Kafka producer.
+
+publish() never blocks its caller: the event goes into a bounded
+in-process buffer (KAFKA_PUBLISH_BUFFER) and one background thread per
+process hands it to a single KafkaProducer tuned for throughput
+(linger-based batching, compression). When the buffer is full the event is
+dropped and counted, so a slow or absent broker shows up in the metrics
+rather than in request latency.
+
+Events with a registered schema are encoded as a compact JSON array,
+
+    [schema_id, field_1, field_2, ...]
+
+instead of repeating every key in every message; anything else is compact
+JSON. decode() reads both, so consumers need no coordinated cut-over.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+
+from apps.common.metrics import (
+    KAFKA_PRODUCER_BATCH_BYTES,
+    KAFKA_PUBLISH_BUFFERED,
+    KAFKA_PUBLISH_FAILURES,
+    KAFKA_PUBLISHED,
+    KAFKA_SEND_LATENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMAS = {}  # schema_id -> field names
+_SCHEMA_IDS = {}  # field names -> schema_id
+
+PRODUCER_METRICS_INTERVAL = 10  # seconds between batch-size samples
+
+
+def register_schema(schema_id: int, fields):
+    """Declare the field order of an event encoded as [schema_id, *values]."""
+    fields = tuple(fields)
+    if _SCHEMAS.get(schema_id, fields) != fields:
+        raise ValueError(f"Kafka schema {schema_id} is already registered")
+    _SCHEMAS[schema_id] = fields
+    _SCHEMA_IDS[fields] = schema_id
+
+
+def encode(value) -> bytes:
+    schema_id = _SCHEMA_IDS.get(tuple(value)) if isinstance(value, dict) else None
+    if schema_id is not None:
+        value = [schema_id, *value.values()]
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def decode(raw: bytes):
+    value = json.loads(raw.decode("utf-8"))
+    if isinstance(value, list) and value and value[0] in _SCHEMAS:
+        return dict(zip(_SCHEMAS[value[0]], value[1:]))
+    return value
+
+
+def _encode_key(key) -> bytes:
+    return str(key).encode("utf-8")
+
+
+class _Publisher:
+    """The process's buffer, sender thread and producer. Re-created after fork."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.buffer = queue.Queue(maxsize=getattr(settings, "KAFKA_PUBLISH_BUFFER", 10000))
+        self.producer = None
+        self.thread = threading.Thread(
+            target=self._run, name="kafka-publisher", daemon=True
+        )
+        self.thread.start()
+
+    def _get_producer(self):
+        if self.producer is None:
+            from kafka import KafkaProducer
+
+            self.producer = KafkaProducer(
+                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+                value_serializer=encode,
+                key_serializer=_encode_key,
+                acks=1,
+                retries=3,
+                request_timeout_ms=5000,
+                linger_ms=getattr(settings, "KAFKA_PRODUCER_LINGER_MS", 20),
+                batch_size=getattr(settings, "KAFKA_PRODUCER_BATCH_SIZE", 65536),
+                compression_type=getattr(settings, "KAFKA_PRODUCER_COMPRESSION", "gzip"),
+                # Only this thread ever waits on a full producer buffer
+                max_block_ms=getattr(settings, "KAFKA_PRODUCER_MAX_BLOCK_MS", 5000),
+            )
+        return self.producer
+
+    def _run(self):
+        sampled_at = time.monotonic()
+        while True:
+            topic, key, value, enqueued_at = self.buffer.get()
+            try:
+                self._send(topic, key, value, enqueued_at)
+            finally:
+                self.buffer.task_done()
+                KAFKA_PUBLISH_BUFFERED.set(self.buffer.qsize())
+
+            if time.monotonic() - sampled_at >= PRODUCER_METRICS_INTERVAL:
+                sampled_at = time.monotonic()
+                self._sample_producer_metrics()
+
+    def _send(self, topic, key, value, enqueued_at):
+        try:
+            future = self._get_producer().send(topic, key=key, value=value)
+        except Exception as e:
+            KAFKA_PUBLISH_FAILURES.labels(topic=topic, reason="send_error").inc()
+            logger.error(f"[Kafka] Send to {topic} failed: {e}")
+            return
+
+        def delivered(_):
+            KAFKA_PUBLISHED.labels(topic=topic).inc()
+            KAFKA_SEND_LATENCY.labels(topic=topic).observe(
+                time.monotonic() - enqueued_at
+            )
+
+        def failed(exc):
+            KAFKA_PUBLISH_FAILURES.labels(topic=topic, reason="delivery_error").inc()
+            logger.error(f"[Kafka] Delivery to {topic} failed: {exc}")
+
+        future.add_callback(delivered)
+        future.add_errback(failed)
+
+    def _sample_producer_metrics(self):
+        try:
+            producer_metrics = self.producer.metrics().get("producer-metrics", {})
+            batch_size = producer_metrics.get("batch-size-avg")
+            if batch_size == batch_size and batch_size is not None:  # not NaN
+                KAFKA_PRODUCER_BATCH_BYTES.set(batch_size)
+        except Exception as e:
+            logger.debug(f"[Kafka] Producer metrics unavailable: {e}")
+
+    def flush(self, timeout):
+        deadline = time.monotonic() + timeout
+        while self.buffer.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.producer is not None:
+            self.producer.flush(timeout=max(0.0, deadline - time.monotonic()))
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def _get_publisher():
+    global _publisher
+    publisher = _publisher
+    if publisher is None or publisher.pid != os.getpid():
+        with _publisher_lock:
+            if _publisher is None or _publisher.pid != os.getpid():
+                # A forked worker inherits the parent's queue but not its thread
+                _publisher = _Publisher()
+            publisher = _publisher
+    return publisher
+
+
+def publish(topic, value, *, key=None) -> bool:
+    """
+    Queue an event for `topic`. Returns False (and counts the drop) when the
+    buffer is full; never waits on the broker.
+    """
+    publisher = _get_publisher()
+    try:
+        publisher.buffer.put_nowait((topic, key, value, time.monotonic()))
+    except queue.Full:
+        KAFKA_PUBLISH_FAILURES.labels(topic=topic, reason="buffer_full").inc()
+        logger.warning(f"[Kafka] Publish buffer full; dropped event for {topic}")
+        return False
+    return True
+
+
+def flush(timeout=10.0):
+    """Wait up to `timeout` seconds for buffered events to reach the broker."""
+    if _publisher is not None and _publisher.pid == os.getpid():
+        _publisher.flush(timeout)
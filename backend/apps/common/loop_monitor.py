@@ -0,0 +1,44 @@
+# apps/common/loop_monitor.py
+"""
+Event-loop lag probe for the ASGI process.
+
+A single task per loop sleeps LOOP_LAG_INTERVAL seconds and records how late
+it woke up. Anything that blocks the loop — a sync Redis call, a CPU-heavy
+snap, an ORM query outside database_sync_to_async — shows up here as lag
+across every socket served by that process.
+"""
+
+import asyncio
+import logging
+
+from django.conf import settings
+
+from apps.common.metrics import EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+_monitors = {}  # loop -> task
+
+
+async def _watch(interval):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG.observe(lag)
+        if lag > getattr(settings, "LOOP_LAG_WARN_SECONDS", 0.25):
+            logger.warning(f"[LoopMonitor] Event loop lagged {lag * 1000:.0f}ms")
+
+
+def ensure_loop_monitor():
+    """Start the lag probe on the running loop (idempotent)."""
+    loop = asyncio.get_running_loop()
+    task = _monitors.get(loop)
+    if task is None or task.done():
+        # Drop entries for loops that have since closed
+        for old in [old for old in _monitors if old.is_closed()]:
+            del _monitors[old]
+        interval = getattr(settings, "LOOP_LAG_INTERVAL", 0.5)
+        _monitors[loop] = loop.create_task(_watch(interval))
+    return _monitors[loop]
@@ -17,6 +17,70 @@ RIDE_MATCH_LATENCY = Histogram(
     "Time taken to find a driver",
     buckets=[0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0],
 )
+RIDE_TIME_TO_OFFER = Histogram(
+    "uber_ride_time_to_offer_seconds",
+    "Time from ride request to its first offer, by match retries before it (5 = 5 or more)",
+    ["attempt"],
+    buckets=[1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0],
+)
+RIDE_RETRY_UNITS = Counter(
+    "uber_ride_retry_units_total",
+    "Retry matching units (one dispatch cell each) published",
+)
+
+SURGE_CACHE_LOOKUPS = Counter(
+    "uber_surge_cache_lookups_total",
+    "Surge multiplier lookups served from the in-process grid (hit) or Redis (miss)",
+    ["result"],
+)
+FARE_QUOTE_TOKENS = Counter(
+    "uber_fare_quote_tokens_total",
+    "Quote tokens presented at ride creation",
+    ["result"],  # used | expired | invalid | mismatch
+)
+
+# 📨 Ride Event Consumer Metrics
+RIDE_EVENTS_CONSUMED = Counter(
+    "uber_ride_events_consumed_total",
+    "Ride events handled by the ride event consumer",
+    ["outcome"],  # processed | dlq
+)
+RIDE_EVENTS_LAG = Gauge(
+    "uber_ride_events_consumer_lag",
+    "Ride events behind the partition high watermark after the last commit",
+    ["partition"],
+)
+RIDE_EVENTS_BATCH_SECONDS = Histogram(
+    "uber_ride_events_batch_seconds",
+    "Time to process and commit one polled batch of ride events",
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+)
+
+# 📤 Kafka Producer Metrics (apps/common/kafka.py)
+KAFKA_PUBLISHED = Counter(
+    "uber_kafka_published_total",
+    "Events acknowledged by the broker",
+    ["topic"],
+)
+KAFKA_PUBLISH_FAILURES = Counter(
+    "uber_kafka_publish_failures_total",
+    "Events that never reached the broker",
+    ["topic", "reason"],  # buffer_full | send_error | delivery_error
+)
+KAFKA_SEND_LATENCY = Histogram(
+    "uber_kafka_send_latency_seconds",
+    "Time from publish() to broker acknowledgement",
+    ["topic"],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+)
+KAFKA_PUBLISH_BUFFERED = Gauge(
+    "uber_kafka_publish_buffered",
+    "Events waiting in this process's publish buffer",
+)
+KAFKA_PRODUCER_BATCH_BYTES = Gauge(
+    "uber_kafka_producer_batch_size_avg_bytes",
+    "Average size of the record batches the producer sends",
+)
 
 # 💸 Payment Metrics
 PAYOUT_INITIATED = Counter(
@@ -25,6 +89,15 @@ PAYOUT_INITIATED = Counter(
 PAYOUT_FAILED = Counter(
     "uber_payout_failed_total", "Total failed driver payouts", ["reason"]
 )
+WEBHOOK_APPLY_DELAY = Histogram(
+    "uber_webhook_apply_delay_seconds",
+    "Time from webhook receipt to its application to payments and the ledger",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+WALLET_BALANCE_DRIFT = Counter(
+    "uber_wallet_balance_drift_total",
+    "Wallet balance snapshots found out of line with the ledger and repaired",
+)
 
 # 🌐 Infrastructure Metrics
 REDIS_ERROR_COUNTER = Counter(
@@ -33,6 +106,22 @@ REDIS_ERROR_COUNTER = Counter(
 WS_CONCURRENT_RIDE_TRACKERS = Gauge(
     "uber_ws_active_trackers", "Active ride tracking websockets"
 )
+WS_DRIVER_LOCATION_SOCKETS = Gauge(
+    "uber_ws_driver_location_sockets", "Connected driver location websockets"
+)
+DRIVER_POSITION_FLUSH_LAG = Gauge(
+    "uber_driver_position_flush_lag_seconds",
+    "Age of the oldest driver position persisted by the last write-behind flush",
+)
+DRIVER_POSITIONS_FLUSHED = Counter(
+    "uber_driver_positions_flushed_total",
+    "Driver positions persisted to Postgres by the write-behind flusher",
+)
+EVENT_LOOP_LAG = Histogram(
+    "uber_asgi_event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wakeup and when it actually ran",
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0],
+)
 
 # 🚗 Supply Metrics
 DRIVERS_ONLINE = Gauge(
@@ -1,9 +1,37 @@
 # apps/common/redis.py
 
+import asyncio
+import weakref
+
 import redis
+import redis.asyncio as aioredis
 from django.conf import settings
 
 redis_client = redis.Redis.from_url(
     settings.REDIS_URL,
     decode_responses=True,
 )
+
+# One pooled asyncio client per event loop: redis.asyncio connections are
+# bound to the loop that opened them.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis_client():
+    """
+    Pooled asyncio Redis client for the running loop (ASGI consumers).
+    The pool is bounded and blocking, so a burst of pings queues for a
+    connection instead of opening thousands of sockets.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=getattr(settings, "REDIS_ASYNC_MAX_CONNECTIONS", 100),
+            timeout=getattr(settings, "REDIS_ASYNC_POOL_TIMEOUT", 5),
+        )
+        client = aioredis.Redis(connection_pool=pool)
+        _async_clients[loop] = client
+    return client
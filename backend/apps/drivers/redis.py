@@ -12,6 +12,14 @@ redis_client = redis.Redis.from_url(
 
 DRIVER_TTL = 60  # seconds — must be > mobile GPS ping interval (typically 10-15s)
 DRIVER_GEO_KEY = "drivers:geo"
+# Latest position per driver not yet flushed to Postgres (write-behind,
+# see apps.drivers.services.positions): {driver_id: "lat,lng,ts"}
+DIRTY_POSITIONS_KEY = "drivers:positions:dirty"
+
+
+def mark_position_dirty(client, driver_id, lat, lng, now):
+    """HSET the driver's latest position for the next Postgres flush."""
+    client.hset(DIRTY_POSITIONS_KEY, str(driver_id), f"{float(lat)},{float(lng)},{int(now)}")
 
 
 def update_driver_location(driver_id: int, lat: float, lng: float):
@@ -45,6 +53,60 @@ def update_driver_location(driver_id: int, lat: float, lng: float):
         now,
     )
 
+    mark_position_dirty(redis_client, driver_id, lat, lng, now)
+
+
+# ───────────────────────────────────────────────
+# PIPELINED PING I/O (async location socket)
+# ───────────────────────────────────────────────
+# The socket reads everything a ping needs in one pipeline, decides in
+# Python, then queues every write onto a second pipeline. The queue_*
+# helpers work on sync and asyncio pipelines alike.
+
+
+async def read_ping_state(client, driver_id: int, *, with_last_point=False):
+    """One round trip → (velocity meta hash, last accumulated point or None)."""
+    pipe = client.pipeline(transaction=False)
+    pipe.hgetall(f"driver:{driver_id}:meta")
+    if with_last_point:
+        pipe.hgetall(f"driver:{driver_id}:last_point")
+    results = await pipe.execute()
+
+    last_point = None
+    if with_last_point and results[1]:
+        last_point = float(results[1]["lat"]), float(results[1]["lng"])
+    return results[0], last_point
+
+
+def queue_driver_location(pipe, driver_id: int, lat: float, lng: float, meta, now):
+    """
+    Queue what update_driver_location writes, given the already-read meta
+    hash. Returns False (and queues the spoof counter) for a spoofed ping.
+    """
+    from apps.common.fraud import gps_velocity_verdict
+
+    is_valid, store_point = gps_velocity_verdict(driver_id, meta, lat, lng, now)
+    if not is_valid:
+        pipe.hincrby(f"driver:{driver_id}:fraud", "spoof_count", 1)
+        return False
+
+    if store_point:
+        pipe.hset(
+            f"driver:{driver_id}:meta",
+            mapping={"lat": lat, "lng": lng, "last_seen": now},
+        )
+    pipe.execute_command("GEOADD", DRIVER_GEO_KEY, float(lng), float(lat), str(driver_id))
+    pipe.setex(f"driver:{driver_id}:last_seen", DRIVER_TTL, now)
+    mark_position_dirty(pipe, driver_id, lat, lng, now)
+    return True
+
+
+def queue_driver_last_point(pipe, driver_id, lat, lng):
+    pipe.hset(
+        f"driver:{driver_id}:last_point",
+        mapping={"lat": float(lat), "lng": float(lng)},
+    )
+
 
 # ───────────────────────────────────────────────
 # DISTANCE ACCUMULATION SUPPORT
@@ -58,6 +120,19 @@ def get_driver_last_point(driver_id):
     return float(data["lat"]), float(data["lng"])
 
 
+def get_driver_last_points(driver_ids):
+    """{driver_id: (lat, lng)} for every driver with a last point, in one round trip."""
+    driver_ids = list(driver_ids)
+    pipe = redis_client.pipeline(transaction=False)
+    for driver_id in driver_ids:
+        pipe.hmget(f"driver:{driver_id}:last_point", "lat", "lng")
+    return {
+        driver_id: (float(lat), float(lng))
+        for driver_id, (lat, lng) in zip(driver_ids, pipe.execute())
+        if lat is not None and lng is not None
+    }
+
+
 def set_driver_last_point(driver_id, lat, lng):
     redis_client.hset(
         f"driver:{driver_id}:last_point",
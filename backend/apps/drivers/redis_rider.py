@@ -59,6 +59,19 @@ def get_rider_last_point(rider_id):
     return float(data["lat"]), float(data["lng"])
 
 
+def get_rider_last_points(rider_ids):
+    """{rider_id: (lat, lng)} for every rider with a last point, in one round trip."""
+    rider_ids = list(rider_ids)
+    pipe = redis_client.pipeline(transaction=False)
+    for rider_id in rider_ids:
+        pipe.hmget(f"rider:{rider_id}:last_point", "lat", "lng")
+    return {
+        rider_id: (float(lat), float(lng))
+        for rider_id, (lat, lng) in zip(rider_ids, pipe.execute())
+        if lat is not None and lng is not None
+    }
+
+
 def set_rider_last_point(rider_id, lat, lng):
     redis_client.hset(
         f"rider:{rider_id}:last_point",
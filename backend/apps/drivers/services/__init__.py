@@ -4,10 +4,12 @@ from .geo import (
     add_driver_to_geo,
     get_nearby_driver_ids,
     remove_driver_from_geo,
+    search_available_drivers,
 )
 
 __all__ = [
     "add_driver_to_geo",
     "get_nearby_driver_ids",
     "remove_driver_from_geo",
+    "search_available_drivers",
 ]
@@ -15,37 +15,72 @@ def remove_driver_from_geo(*, driver_id):
     redis_client.zrem(GEO_KEY, str(driver_id))
 
 
-def get_nearby_driver_ids(*, lat, lng, radius_km=5, limit=5):
-    logger.info(f"Checking nearby drivers at ({lat}, {lng}) radius={radius_km}km")
-
-    # 1. Debug: Check total count in GEO_KEY
-    total_count = redis_client.zcard(GEO_KEY)
-    logger.info(f"Total drivers in Redis ({GEO_KEY}): {total_count}")
-
-    # 2. Search
-    results = redis_client.geosearch(
-        GEO_KEY,
-        longitude=lng,
-        latitude=lat,
-        radius=radius_km,
-        unit="km",
-        count=limit,
+# Over-fetch from the index so filtering out ghosts/locked drivers still
+# leaves `limit` results in the common case.
+SEARCH_OVERFETCH = 4
+
+# One atomic pass: GEOSEARCH nearest-first, prune members whose heartbeat
+# expired, optionally skip drivers holding an offer lock, stop at `limit`.
+# Returns a flat [id, dist_km, id, dist_km, ...] list.
+# NOTE: touches per-driver keys not passed in KEYS — fine on a single Redis
+# node (our deployment), not on Redis Cluster.
+LUA_AVAILABLE_DRIVERS = """
+local hits = redis.call('GEOSEARCH', KEYS[1], 'FROMLONLAT', ARGV[1], ARGV[2],
+    'BYRADIUS', ARGV[3], 'km', 'ASC', 'COUNT', ARGV[5], 'WITHDIST')
+local limit = tonumber(ARGV[4])
+local skip_locked = ARGV[6] == '1'
+local out = {}
+for _, hit in ipairs(hits) do
+    local id = hit[1]
+    if redis.call('EXISTS', 'driver:' .. id .. ':last_seen') == 0 then
+        redis.call('ZREM', KEYS[1], id)
+    elseif not (skip_locked and redis.call('EXISTS', 'driver_lock:' .. id) == 1) then
+        out[#out + 1] = id
+        out[#out + 1] = hit[2]
+        if #out >= limit * 2 then
+            break
+        end
+    end
+end
+return out
+"""
+
+
+def search_available_drivers(*, lat, lng, radius_km=5, limit=5, skip_locked=True):
+    """
+    Nearby drivers with a live heartbeat, nearest first, in one round trip.
+    Returns [(driver_id, distance_km), ...]. Ghost members (expired
+    heartbeat) are removed from the geo index as a side effect.
+    """
+    raw = redis_client.register_script(LUA_AVAILABLE_DRIVERS)(
+        keys=[GEO_KEY],
+        args=[
+            lng,
+            lat,
+            radius_km,
+            limit,
+            limit * SEARCH_OVERFETCH,
+            1 if skip_locked else 0,
+        ],
     )
-
-    driver_ids = [int(x) for x in results]
-    logger.info(f"Candidates from GEO search: {driver_ids}")
-
-    # 3. Filter by Heartbeat (TTL)
-    valid_ids = []
-    for d_id in driver_ids:
-        if redis_client.exists(f"driver:{d_id}:last_seen"):
-            valid_ids.append(d_id)
-        else:
-            logger.info(f"Driver {d_id} heartbeat expired. Removing from GEO.")
-            remove_driver_from_geo(driver_id=d_id)
-
-    logger.info(f"Found valid nearby driver IDs (active heartbeats): {valid_ids}")
-    return valid_ids
+    return [(int(raw[i]), float(raw[i + 1])) for i in range(0, len(raw), 2)]
+
+
+def get_nearby_driver_ids(*, lat, lng, radius_km=5, limit=5, skip_locked=False):
+    driver_ids = [
+        d_id
+        for d_id, _ in search_available_drivers(
+            lat=lat,
+            lng=lng,
+            radius_km=radius_km,
+            limit=limit,
+            skip_locked=skip_locked,
+        )
+    ]
+    logger.debug(
+        f"Nearby drivers at ({lat}, {lng}) radius={radius_km}km: {driver_ids}"
+    )
+    return driver_ids
 
 
 # --------------------
@@ -0,0 +1,158 @@
+# apps/drivers/services/state.py
+"""
+Redis-resident driver state (read model for matching).
+
+Candidate ranking needs status, level, score, trust score and suspension for
+every driver the geo search returns. Reading those from Postgres meant two
+queries and a row-lock scan per matching attempt. They are mirrored into one
+hash per driver instead:
+
+    driver:{id}:state -> {status, level, score, trust_score, is_suspended}
+
+Writers: post_save signals on Driver / DriverStats (apps.drivers.signals)
+and the few bulk `.update()` paths that bypass signals. Readers get a
+read-through fallback: ids with no (or a partial) hash are loaded from
+Postgres in one query and backfilled, so a Redis flush only costs a warm-up.
+
+Postgres stays the authority — matching re-checks the single chosen driver
+under select_for_update before committing an offer.
+"""
+
+import logging
+from typing import NamedTuple
+
+from apps.drivers.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+DRIVER_STATE_TTL = 86400  # safety net against drift; refreshed on every write
+MIN_TRUST_SCORE = 60.0
+
+DRIVER_FIELDS = ("status", "level")
+STATS_FIELDS = ("score", "trust_score", "is_suspended")
+STATE_FIELDS = DRIVER_FIELDS + STATS_FIELDS
+
+
+class DriverState(NamedTuple):
+    id: int
+    status: str
+    level: str
+    score: float
+    trust_score: float
+    is_suspended: bool
+
+    @property
+    def is_eligible(self) -> bool:
+        from apps.drivers.models import Driver
+
+        return (
+            self.status == Driver.Status.ONLINE
+            and self.trust_score >= MIN_TRUST_SCORE
+            and not self.is_suspended
+        )
+
+
+def state_key(driver_id) -> str:
+    return f"driver:{driver_id}:state"
+
+
+def _encode(fields: dict) -> dict:
+    encoded = {}
+    for name, value in fields.items():
+        if name == "is_suspended":
+            value = int(bool(value))
+        elif name in ("score", "trust_score"):
+            value = float(value or 0.0)
+        encoded[name] = value
+    return encoded
+
+
+def _decode(driver_id: int, data: dict):
+    if not data or any(name not in data for name in STATE_FIELDS):
+        return None
+    return DriverState(
+        id=int(driver_id),
+        status=data["status"],
+        level=data["level"],
+        score=float(data["score"]),
+        trust_score=float(data["trust_score"]),
+        is_suspended=data["is_suspended"] == "1",
+    )
+
+
+# ─── WRITES ──────────────────────────────────────────────────────────────────
+
+
+def update_driver_state(driver_id, **fields):
+    """HSET a subset of STATE_FIELDS. A partial hash reads as a miss."""
+    key = state_key(driver_id)
+    pipe = redis_client.pipeline()
+    pipe.hset(key, mapping=_encode(fields))
+    pipe.expire(key, DRIVER_STATE_TTL)
+    pipe.execute()
+
+
+def delete_driver_state(driver_id):
+    redis_client.delete(state_key(driver_id))
+
+
+def _load_from_db(driver_ids) -> dict:
+    from apps.drivers.models import Driver
+
+    rows = Driver.objects.filter(id__in=driver_ids).values(
+        "id",
+        "status",
+        "level",
+        "user__driverstats__score",
+        "user__driverstats__trust_score",
+        "user__driverstats__is_suspended",
+    )
+    # A driver without stats can't pass the trust gate — mirror that as 0.
+    return {
+        row["id"]: {
+            "status": row["status"],
+            "level": row["level"],
+            "score": row["user__driverstats__score"],
+            "trust_score": row["user__driverstats__trust_score"],
+            "is_suspended": row["user__driverstats__is_suspended"],
+        }
+        for row in rows
+    }
+
+
+# ─── READS ───────────────────────────────────────────────────────────────────
+
+
+def get_driver_states(driver_ids) -> dict:
+    """
+    {driver_id: DriverState} for the given ids (unknown ids are omitted).
+    One pipelined round trip when warm; misses are backfilled from Postgres.
+    """
+    driver_ids = [int(d_id) for d_id in driver_ids]
+    if not driver_ids:
+        return {}
+
+    pipe = redis_client.pipeline()
+    for d_id in driver_ids:
+        pipe.hgetall(state_key(d_id))
+
+    states, missing = {}, []
+    for d_id, data in zip(driver_ids, pipe.execute()):
+        state = _decode(d_id, data)
+        if state is None:
+            missing.append(d_id)
+        else:
+            states[d_id] = state
+
+    if missing:
+        loaded = _load_from_db(missing)
+        pipe = redis_client.pipeline()
+        for d_id, fields in loaded.items():
+            encoded = _encode(fields)
+            pipe.hset(state_key(d_id), mapping=encoded)
+            pipe.expire(state_key(d_id), DRIVER_STATE_TTL)
+            states[d_id] = _decode(d_id, {k: str(v) for k, v in encoded.items()})
+        pipe.execute()
+        logger.debug(f"Driver state backfilled from DB for {sorted(loaded)}")
+
+    return states
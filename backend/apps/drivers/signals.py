@@ -0,0 +1,64 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.drivers.models import Driver, DriverStats
+from apps.drivers.services.state import (
+    DRIVER_FIELDS,
+    STATS_FIELDS,
+    delete_driver_state,
+    update_driver_state,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _touches(update_fields, fields) -> bool:
+    return update_fields is None or bool(set(update_fields) & set(fields))
+
+
+def _after_commit(driver_id, write):
+    def _run():
+        try:
+            write()
+        except Exception as e:
+            # Read model only: matching falls back to Postgres on a miss
+            logger.warning(f"Driver state sync failed for {driver_id}: {e}")
+
+    transaction.on_commit(_run)
+
+
+@receiver(post_save, sender=Driver)
+def sync_driver_state(sender, instance, update_fields=None, **kwargs):
+    # Location pings save last_lat/last_lng only — nothing to mirror
+    if not _touches(update_fields, DRIVER_FIELDS):
+        return
+
+    driver_id = instance.id
+    fields = {name: getattr(instance, name) for name in DRIVER_FIELDS}
+    _after_commit(driver_id, lambda: update_driver_state(driver_id, **fields))
+
+
+@receiver(post_save, sender=DriverStats)
+def sync_driver_stats_state(sender, instance, update_fields=None, **kwargs):
+    if not _touches(update_fields, STATS_FIELDS):
+        return
+
+    driver_id = (
+        Driver.objects.filter(user_id=instance.driver_id)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if driver_id is None:
+        return
+
+    fields = {name: getattr(instance, name) for name in STATS_FIELDS}
+    _after_commit(driver_id, lambda: update_driver_state(driver_id, **fields))
+
+
+@receiver(post_delete, sender=Driver)
+def drop_driver_state(sender, instance, **kwargs):
+    driver_id = instance.id
+    _after_commit(driver_id, lambda: delete_driver_state(driver_id))
@@ -246,3 +246,15 @@ def prune_ghost_driver_sessions():
         )
 
     return f"Pruned {pruned_count} ghost driver sessions."
+
+
+@shared_task
+def flush_driver_positions():
+    """
+    Write-behind: persist the latest Redis position of every driver that
+    pinged since the last run, in bulk. Runs every
+    DRIVER_POSITION_FLUSH_INTERVAL seconds.
+    """
+    from apps.drivers.services.positions import flush_driver_positions as flush
+
+    return flush()
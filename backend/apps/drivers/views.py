@@ -163,10 +163,10 @@ class UpdateLocationView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Save driver location
+        # Redis is the live position; Postgres is written behind in bulk
+        # (apps.drivers.tasks.flush_driver_positions)
         driver.last_lat = lat
         driver.last_lng = lng
-        driver.save(update_fields=["last_lat", "last_lng"])
 
         # ── Update Redis Geo ──
         from apps.drivers.redis import update_driver_location
@@ -179,20 +179,13 @@ class UpdateLocationView(APIView):
         channel_layer = get_channel_layer()
 
         # -------------------------------------------------
-        # Fetch Active Ride Info
+        # Fetch Active Ride Info (Redis snapshot, no per-ping query)
         # -------------------------------------------------
-        active_ride = (
-            Ride.objects.filter(
-                driver=driver,
-                status__in=[
-                    Ride.Status.ASSIGNED,
-                    Ride.Status.ARRIVED,
-                    Ride.Status.ONGOING,
-                ],
-            )
-            .select_related("rider")
-            .first()
-        )
+        from apps.rides.services.active_ride import get_active_ride_snapshot
+
+        active_ride = get_active_ride_snapshot(driver.id)
+        if active_ride and active_ride.status == Ride.Status.OFFERED:
+            active_ride = None
 
         ride_data = None
         deviation_alert = False
@@ -209,7 +202,7 @@ class UpdateLocationView(APIView):
                 "pickup_address": active_ride.pickup_address,
                 "drop_address": active_ride.drop_address,
                 "polyline": active_ride.planned_route_polyline,
-                "rider_name": f"{active_ride.rider.first_name} {active_ride.rider.last_name}",
+                "rider_name": active_ride.rider_name,
                 "vehicle_type": active_ride.vehicle_type,
             }
 
@@ -226,10 +219,12 @@ class UpdateLocationView(APIView):
                 deviation_alert = is_deviated
 
         # -------------------------------------------------
-        # 1️⃣ Admin Live Map Broadcast
+        # 1️⃣ Admin Live Map Broadcast (admins viewing this tile)
         # -------------------------------------------------
+        from apps.admin_dashboard.tiles import tile_group_for
+
         async_to_sync(channel_layer.group_send)(
-            "admin_live_map",
+            tile_group_for(lat, lng),
             {
                 "type": "driver_location_update",
                 "data": {
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+FIELD_BY_TYPE = {
+    "CREDIT": "credits",
+    "DEBIT": "debits",
+    "HOLD": "holds",
+    "RELEASE": "releases",
+}
+
+
+def backfill_wallet_balances(apps, schema_editor):
+    LedgerEntry = apps.get_model("payments", "LedgerEntry")
+    WalletBalance = apps.get_model("payments", "WalletBalance")
+
+    balances = {}
+    totals = (
+        LedgerEntry.objects.order_by()
+        .values("user_id", "entry_type")
+        .annotate(total=Sum("amount"))
+    )
+    for row in totals.iterator():
+        balance = balances.setdefault(
+            row["user_id"], WalletBalance(user_id=row["user_id"])
+        )
+        setattr(balance, FIELD_BY_TYPE[row["entry_type"]], row["total"] or Decimal("0.00"))
+
+    WalletBalance.objects.bulk_create(balances.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0012_alter_ledgerentry_reason_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletBalance",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="wallet_balance",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("credits", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("debits", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("holds", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("releases", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_wallet_balances, migrations.RunPython.noop),
+    ]
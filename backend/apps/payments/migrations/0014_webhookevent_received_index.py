@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_applied_events(apps, schema_editor):
+    # Until now webhooks were applied inside the request and left RECEIVED;
+    # the applier must not replay them.
+    WebhookEvent = apps.get_model("payments", "WebhookEvent")
+    WebhookEvent.objects.filter(status="RECEIVED").update(
+        status="PROCESSED", processed_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0013_walletbalance"),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_applied_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="webhookevent",
+            index=models.Index(
+                condition=models.Q(status="RECEIVED"),
+                fields=["id"],
+                name="webhook_event_received",
+            ),
+        ),
+    ]
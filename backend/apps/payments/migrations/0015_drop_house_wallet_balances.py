@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def drop_house_balances(apps, schema_editor):
+    # House accounts are summed from the ledger on read from now on
+    WalletBalance = apps.get_model("payments", "WalletBalance")
+    house = {
+        getattr(settings, "PLATFORM_USER_ID", 1),
+        *getattr(settings, "LEDGER_HOUSE_ACCOUNT_IDS", ()),
+    }
+    WalletBalance.objects.filter(user_id__in=house).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0014_webhookevent_received_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_house_balances, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,9 @@
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Q
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from django_prometheus.models import ExportModelOperationsMixin
 
 
@@ -168,6 +169,85 @@ class LedgerEntry(ExportModelOperationsMixin("ledger_entry"), models.Model):
     class Meta:
         ordering = ["created_at"]
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # The entry and its WalletBalance increment commit together, whichever
+        # code path writes the entry.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            WalletBalance.apply(self)
+
+
+class WalletBalance(models.Model):
+    """
+    MATERIALIZED LEDGER TOTALS — one row per user.
+    Incremented in the same transaction as every LedgerEntry insert, so
+    balance reads are a single-row lookup instead of SUMs over the ledger.
+    apps.payments.tasks.verify_wallet_balances proves it against the ledger.
+
+    House accounts (the platform account, which every settlement and payout
+    fee credits) get no row: one shared row would serialize every
+    settlement on its lock. Their balances are summed from the ledger on
+    read (services/wallet.py).
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="wallet_balance",
+    )
+
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    holds = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    releases = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    FIELD_BY_TYPE = {
+        LedgerEntry.Type.CREDIT: "credits",
+        LedgerEntry.Type.DEBIT: "debits",
+        LedgerEntry.Type.HOLD: "holds",
+        LedgerEntry.Type.RELEASE: "releases",
+    }
+
+    @property
+    def wallet(self):
+        return self.credits - self.debits
+
+    @property
+    def held(self):
+        return self.holds - self.releases
+
+    @staticmethod
+    def house_account_ids() -> set:
+        return {
+            getattr(settings, "PLATFORM_USER_ID", 1),
+            *getattr(settings, "LEDGER_HOUSE_ACCOUNT_IDS", ()),
+        }
+
+    @classmethod
+    def apply(cls, entry):
+        if entry.user_id in cls.house_account_ids():
+            return
+        field = cls.FIELD_BY_TYPE[entry.entry_type]
+        amount = Decimal(entry.amount)
+        increment = {field: F(field) + amount, "updated_at": timezone.now()}
+        # Row-level increment: concurrent writers for one user serialize on
+        # the balance row, never on a read-modify-write in Python.
+        if cls.objects.filter(user_id=entry.user_id).update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=entry.user_id, **{field: amount})
+        except IntegrityError:
+            # Another writer created the row first
+            cls.objects.filter(user_id=entry.user_id).update(**increment)
+
 
 class Payout(models.Model):
     class Status(models.TextChoices):
@@ -249,8 +329,20 @@ class WebhookEvent(models.Model):
 
     error = models.TextField(blank=True, default="")
 
+    # Failed applies are retried with backoff until WEBHOOK_APPLY_MAX_ATTEMPTS
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ["-received_at"]
+        indexes = [
+            # The applier's queue: RECEIVED events in arrival order
+            models.Index(
+                fields=["id"],
+                condition=Q(status="RECEIVED"),
+                name="webhook_event_received",
+            ),
+        ]
 
 
 class DriverEarnings(models.Model):
@@ -64,3 +64,21 @@ def get_payout_status(*, gateway_payout_id=None, reference_id=None):
         return items[0] if items else None
 
     raise ValueError("Either gateway_payout_id or reference_id must be provided")
+
+
+@circuit_breaker(
+    service_name="razorpay_payouts", failure_threshold=5, recovery_timeout=120
+)
+def list_payouts(*, since, skip=0):
+    """
+    One page of payouts created at or after `since` (unix seconds).
+    """
+    return client.get(
+        "/payouts",
+        params={
+            "account_number": settings.RAZORPAY_ACCOUNT_NUMBER,
+            "from": since,
+            "count": 100,
+            "skip": skip,
+        },
+    )
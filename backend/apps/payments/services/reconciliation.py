@@ -1,7 +1,12 @@
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
 from apps.payments.models import Payout
@@ -12,6 +17,125 @@ from apps.payments.services.payout_gateway import get_payout_status
 
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_KEY = "recon:checkpoint:{}"
+CHECKPOINT_TTL = 86400
+LIST_PAGE_SIZE = 100  # Razorpay's maximum `count` per list call
+
+# prefetched() result for objects a listing did not cover
+NOT_LISTED = object()
+
+
+class RateLimiter:
+    """
+    Spaces gateway calls at least 1/rate seconds apart across all the
+    threads sharing it. rate <= 0 disables the limit.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def get_rate_limiter():
+    return RateLimiter(getattr(settings, "RECONCILE_RATE_PER_SEC", 20))
+
+
+def list_since(fetch_page, *, since, limiter):
+    """
+    Pages through a gateway collection created at or after `since` (unix
+    seconds); fetch_page(since, skip) returns one {"items": [...]} page.
+    Returns (items, complete). complete is False if a page failed or
+    RECONCILE_LIST_MAX_PAGES cut the listing short, in which case callers
+    fetch whatever the listing missed one by one.
+    """
+    items = []
+    for page in range(getattr(settings, "RECONCILE_LIST_MAX_PAGES", 100)):
+        limiter.acquire()
+        try:
+            batch = fetch_page(since, page * LIST_PAGE_SIZE).get("items", [])
+        except Exception as e:
+            logger.warning(f"[Recon] Listing since {since} failed at page {page}: {e}")
+            return items, False
+        items.extend(batch)
+        if len(batch) < LIST_PAGE_SIZE:
+            return items, True
+    return items, False
+
+
+def run_reconciliation(name, queryset, *, fetch, apply, prefetched=None, limiter=None):
+    """
+    Reconciles every object of `queryset` against the gateway.
+
+    fetch(obj) runs on RECONCILE_WORKERS threads under the shared rate limit
+    and must not touch the database; apply(obj, data) runs on the calling
+    thread, in id order. prefetched(obj) may answer from a listing instead
+    of a call (return NOT_LISTED to fall back to fetch).
+
+    The run stops once RECONCILE_TIME_BUDGET seconds have passed and stores
+    the last id it got through, so the next run resumes after it instead of
+    starting over; a run that reaches the end clears the checkpoint.
+
+    Returns (applied, failed): applied counts apply() calls returning True,
+    failed lists (obj, exc) for fetch or apply errors.
+    """
+    workers = getattr(settings, "RECONCILE_WORKERS", 8)
+    deadline = time.monotonic() + getattr(settings, "RECONCILE_TIME_BUDGET", 600)
+    limiter = limiter or get_rate_limiter()
+    checkpoint_key = CHECKPOINT_KEY.format(name)
+    last_id = cache.get(checkpoint_key) or 0
+    if last_id:
+        logger.info(f"[Recon] {name} resuming after id {last_id}")
+
+    def lookup(obj):
+        if prefetched is not None:
+            data = prefetched(obj)
+            if data is not NOT_LISTED:
+                return data, None
+        limiter.acquire()
+        try:
+            return fetch(obj), None
+        except Exception as e:
+            return None, e
+
+    applied, failed = 0, []
+    chunk_size = workers * 4
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"recon-{name}") as executor:
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id).order_by("id")[:chunk_size])
+
+            for obj, (data, error) in zip(chunk, executor.map(lookup, chunk)):
+                if error is None:
+                    try:
+                        applied += bool(apply(obj, data))
+                    except Exception as e:
+                        error = e
+                if error is not None:
+                    logger.warning(f"[Recon] {name} {obj.id} failed: {error}")
+                    failed.append((obj, error))
+
+            if len(chunk) < chunk_size:
+                cache.delete(checkpoint_key)
+                break
+
+            last_id = chunk[-1].id
+            if time.monotonic() >= deadline:
+                cache.set(checkpoint_key, last_id, timeout=CHECKPOINT_TTL)
+                logger.warning(f"[Recon] {name} out of time; will resume after id {last_id}")
+                break
+
+    return applied, failed
+
 
 @shared_task(bind=True, max_retries=5)
 def reconcile_payout_status_task(self, payout_id):
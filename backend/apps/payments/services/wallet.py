@@ -1,12 +1,27 @@
 from decimal import Decimal
 
+from django.db import transaction
 from django.db.models import Sum
 
-from apps.payments.models import LedgerEntry
+from apps.payments.models import LedgerEntry, WalletBalance
 
 ZERO = Decimal("0.00")
 
 
+def _get_snapshot(user):
+    """
+    Materialized ledger totals for the user (one primary-key lookup).
+    Users without any ledger entry have no row, i.e. all totals are zero.
+    House accounts are not materialized and are summed from the ledger.
+    """
+    user_id = getattr(user, "pk", user)
+    if user_id in WalletBalance.house_account_ids():
+        return WalletBalance(user_id=user_id, **_ledger_totals([user_id])[user_id])
+    return WalletBalance.objects.filter(user_id=user_id).first() or WalletBalance(
+        user_id=user_id
+    )
+
+
 def get_wallet_balance(user) -> Decimal:
     """
     Total wallet balance:
@@ -14,23 +29,7 @@ def get_wallet_balance(user) -> Decimal:
     (HOLD does NOT reduce wallet balance)
     """
 
-    total_credits = (
-        LedgerEntry.objects.filter(
-            user=user,
-            entry_type=LedgerEntry.Type.CREDIT,
-        ).aggregate(total=Sum("amount"))["total"]
-        or ZERO
-    )
-
-    total_debits = (
-        LedgerEntry.objects.filter(
-            user=user,
-            entry_type=LedgerEntry.Type.DEBIT,
-        ).aggregate(total=Sum("amount"))["total"]
-        or ZERO
-    )
-
-    return total_credits - total_debits
+    return _get_snapshot(user).wallet
 
 
 def get_held_balance(user) -> Decimal:
@@ -39,23 +38,7 @@ def get_held_balance(user) -> Decimal:
     HOLD - RELEASE
     """
 
-    total_holds = (
-        LedgerEntry.objects.filter(
-            user=user,
-            entry_type=LedgerEntry.Type.HOLD,
-        ).aggregate(total=Sum("amount"))["total"]
-        or ZERO
-    )
-
-    total_releases = (
-        LedgerEntry.objects.filter(
-            user=user,
-            entry_type=LedgerEntry.Type.RELEASE,
-        ).aggregate(total=Sum("amount"))["total"]
-        or ZERO
-    )
-
-    return total_holds - total_releases
+    return _get_snapshot(user).held
 
 
 def get_available_balance(user) -> Decimal:
@@ -64,7 +47,92 @@ def get_available_balance(user) -> Decimal:
     wallet_balance - held_balance
     """
 
-    return get_wallet_balance(user) - get_held_balance(user)
+    snapshot = _get_snapshot(user)
+    return snapshot.wallet - snapshot.held
+
+
+def _ledger_totals(user_ids) -> dict:
+    """Raw ledger SUMs per user, keyed like the WalletBalance fields."""
+    totals = {
+        user_id: dict.fromkeys(WalletBalance.FIELD_BY_TYPE.values(), ZERO)
+        for user_id in user_ids
+    }
+    rows = (
+        LedgerEntry.objects.filter(user_id__in=user_ids)
+        .order_by()
+        .values("user_id", "entry_type")
+        .annotate(total=Sum("amount"))
+    )
+    for row in rows:
+        field = WalletBalance.FIELD_BY_TYPE[row["entry_type"]]
+        totals[row["user_id"]][field] = row["total"] or ZERO
+    return totals
+
+
+def _snapshot_totals(balance) -> dict:
+    return {field: getattr(balance, field) for field in WalletBalance.FIELD_BY_TYPE.values()}
+
+
+def repair_wallet_balance(user_id) -> bool:
+    """
+    Re-checks one user's snapshot under its row lock and rewrites it from the
+    ledger if it drifted. Returns True when a repair was needed.
+
+    Ledger writers block on the same row, so entries committed before the
+    lock are in the SUMs and later ones increment the repaired row.
+    """
+    if user_id in WalletBalance.house_account_ids():
+        return False
+
+    with transaction.atomic():
+        balance, _ = WalletBalance.objects.select_for_update().get_or_create(
+            user_id=user_id
+        )
+        expected = _ledger_totals([user_id])[user_id]
+        if _snapshot_totals(balance) == expected:
+            return False
+
+        for field, value in expected.items():
+            setattr(balance, field, value)
+        balance.save()
+        return True
+
+
+def verify_wallet_balances(chunk_size=500) -> list:
+    """
+    Proves every WalletBalance against the raw ledger, chunk by chunk.
+    Mismatches (including ledger users with no snapshot) are re-checked under
+    lock, since a write in flight between the two reads looks like drift,
+    and repaired. Returns the user ids that actually drifted. House accounts
+    have no snapshot to prove.
+    """
+    house = WalletBalance.house_account_ids()
+    suspects = []
+    last_user_id = 0
+    while True:
+        balances = list(
+            WalletBalance.objects.filter(user_id__gt=last_user_id)
+            .exclude(user_id__in=house)
+            .order_by("user_id")[:chunk_size]
+        )
+        if not balances:
+            break
+        last_user_id = balances[-1].user_id
+
+        expected = _ledger_totals([b.user_id for b in balances])
+        suspects.extend(
+            b.user_id for b in balances if _snapshot_totals(b) != expected[b.user_id]
+        )
+
+    suspects.extend(
+        LedgerEntry.objects.exclude(user_id__in=WalletBalance.objects.values("user_id"))
+        .exclude(user_id__in=house)
+        .order_by()
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+
+    return [user_id for user_id in suspects if repair_wallet_balance(user_id)]
 
 
 def debit_rider_wallet(user, amount: Decimal):
@@ -1,6 +1,33 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.common.metrics import WEBHOOK_APPLY_DELAY
+from apps.payments.models import LedgerEntry, Payment, Payout, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+# Set by ingest when it enqueues the applier, cleared by the applier before
+# each drain; at most one applier task is queued per burst.
+APPLY_KICK_KEY = "webhooks:apply:kick"
+APPLY_LOCK_KEY = "webhooks:apply:lock"
+APPLY_LOCK_TTL = 300
+
+
+def max_apply_attempts() -> int:
+    return int(getattr(settings, "WEBHOOK_APPLY_MAX_ATTEMPTS", 8))
 
-from apps.payments.models import WebhookEvent
+
+def apply_retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next try of an event that failed `attempts` times."""
+    base = float(getattr(settings, "WEBHOOK_APPLY_RETRY_SECONDS", 30))
+    return timedelta(seconds=base * 2 ** (attempts - 1))
 
 
 def register_webhook_event(
@@ -31,3 +58,169 @@ def register_webhook_event(
     except IntegrityError:
         # Duplicate webhook → replay
         return False
+
+
+def schedule_webhook_apply():
+    """Enqueue the applier unless one is already queued."""
+    if cache.add(APPLY_KICK_KEY, "1", timeout=60):
+        from apps.payments.tasks import apply_webhook_events
+
+        apply_webhook_events.delay()
+
+
+def apply_pending_webhook_events(*, batch_size=100) -> int:
+    """
+    Applies due RECEIVED events in arrival (id) order, one transaction per
+    batch.
+
+    Each event's side effects and its status change commit together, so an
+    event is applied exactly once. A failing event is rolled back in its own
+    savepoint without holding back the rest of the batch, and stays RECEIVED
+    to be retried with backoff (the gateway already has its 200 and will not
+    redeliver). It is marked FAILED only after WEBHOOK_APPLY_MAX_ATTEMPTS.
+    Returns the number of events handled.
+    """
+    handled = 0
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            events = list(
+                WebhookEvent.objects.select_for_update()
+                .filter(status="RECEIVED")
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .order_by("id")[:batch_size]
+            )
+            for event in events:
+                event.attempts += 1
+                try:
+                    with transaction.atomic():
+                        event.status = _apply_event(event)
+                        event.error = ""
+                except Exception as e:
+                    logger.exception(
+                        f"[Webhook] Applying {event.event_id} failed "
+                        f"(attempt {event.attempts})"
+                    )
+                    event.error = str(e)
+                    if event.attempts < max_apply_attempts():
+                        event.next_attempt_at = now + apply_retry_delay(event.attempts)
+                        continue
+                    event.status = "FAILED"
+                event.processed_at = timezone.now()
+                WEBHOOK_APPLY_DELAY.observe(
+                    (event.processed_at - event.received_at).total_seconds()
+                )
+
+            WebhookEvent.objects.bulk_update(
+                events,
+                ["status", "error", "processed_at", "attempts", "next_attempt_at"],
+            )
+
+        handled += len(events)
+        if len(events) < batch_size:
+            return handled
+
+
+def _apply_event(event) -> str:
+    if "payout" in event.payload.get("payload", {}):
+        return _apply_payout_event(event.payload)
+    return _apply_payment_event(event.payload)
+
+
+def _apply_payment_event(data) -> str:
+    payment_entity = data["payload"]["payment"]["entity"]
+    order_id = payment_entity["order_id"]
+    payment_id = payment_entity["id"]
+    amount = Decimal(payment_entity["amount"]) / Decimal("100")
+
+    payment = (
+        Payment.objects.select_for_update()
+        .filter(gateway_order_id=order_id)
+        .first()
+    )
+
+    if not payment or payment.status == Payment.Status.CAPTURED:
+        return "IGNORED"
+
+    payment.status = Payment.Status.CAPTURED
+    payment.gateway_payment_id = payment_id
+    payment.save(update_fields=["status", "gateway_payment_id"])
+
+    LedgerEntry.objects.create(
+        user=payment.user,
+        ride_id=payment.ride_id,
+        amount=amount,
+        entry_type=LedgerEntry.Type.DEBIT,
+        reference=f"payment:{payment.id}",
+        reason=LedgerEntry.Reason.PAYMENT,
+    )
+
+    # Ensure Driver Gets Paid if Webhook wins the race condition
+    try:
+        with transaction.atomic():
+            from apps.payments.services.payout import settle_driver_payout
+            from apps.rides.models import Ride
+
+            ride = Ride.objects.select_for_update().get(id=payment.ride_id)
+            settle_driver_payout(ride=ride, payment=payment)
+    except Exception:
+        # Note: We don't fail the webhook if payout errors; retry payout separately.
+        pass
+
+    if payment.ride_id:
+        try:
+            from apps.rides.models import Ride as RideModel
+
+            _ride = RideModel.objects.get(id=payment.ride_id)
+            if _ride.driver:
+                from apps.notifications.models import Notification
+
+                transaction.on_commit(
+                    lambda: Notification.objects.create(
+                        user=_ride.driver.user,
+                        channel="push",
+                        type="RIDE_PAYMENT_RECEIVED",
+                        payload={
+                            "title": "Payment received",
+                            "body": f"Rider paid ₹{payment.amount} for ride #{payment.ride_id}.",
+                            "data": {"ride_id": str(payment.ride_id)},
+                        },
+                    )
+                )
+        except Exception:
+            pass
+
+    from apps.notifications.models import Notification
+
+    transaction.on_commit(
+        lambda: Notification.objects.create(
+            user=payment.user,
+            channel="email",
+            type="PAYMENT_CONFIRMED",
+            payload={
+                "subject": f"Payment Successful - Ride #{payment.ride_id}",
+                "body": f"Hi {payment.user.first_name}, your payment of ₹{payment.amount} was successful. Trans ID: {payment.gateway_payment_id}",
+                "html": f"<h2>Payment Successful ✅</h2><p>Your payment of <strong>₹{payment.amount}</strong> has been received for ride #{payment.ride_id}.</p><p>Transaction ID: {payment.gateway_payment_id}</p>",
+            },
+        )
+    )
+    return "PROCESSED"
+
+
+def _apply_payout_event(data) -> str:
+    from apps.payments.services.payout import mark_payout_failed, mark_payout_success
+
+    entity = data["payload"]["payout"]["entity"]
+    status = entity["status"]
+
+    payout = Payout.objects.select_for_update().filter(reference=entity["reference_id"]).first()
+    if not payout:
+        return "IGNORED"
+
+    if status == "processed":
+        mark_payout_success(payout=payout)
+    elif status in {"failed", "reversed"}:
+        mark_payout_failed(payout=payout)
+    else:
+        return "IGNORED"
+    return "PROCESSED"
@@ -18,19 +18,49 @@ logger = logging.getLogger(__name__)
 MIN_PAYOUT_AMOUNT = Decimal("500.00")
 
 
-@shared_task
-def trigger_scheduled_payouts():
+def _payable_driver_ids():
     """
-    Orchestrator: Finds eligible drivers and queues individual payouts.
-    Scheduled: Daily @ 3 AM
+    Eligible drivers for the scheduled run, in one query: not blocked, no
+    fraud-flagged rides, no scheduled payout yet today, and an available
+    balance (from the WalletBalance snapshot) of at least MIN_PAYOUT_AMOUNT.
     """
+    from django.db.models import Exists, F, OuterRef
+    from django.utils import timezone
+
     from apps.rides.models import Ride
 
-    # 1. Find active drivers
-    active_drivers = Driver.objects.exclude(status=Driver.Status.BLOCKED).only(
-        "id", "user"
+    balance = "user__wallet_balance__"
+    today_str = timezone.now().date().isoformat()
+    return (
+        Driver.objects.exclude(status=Driver.Status.BLOCKED)
+        .annotate(
+            available=F(f"{balance}credits")
+            - F(f"{balance}debits")
+            - F(f"{balance}holds")
+            + F(f"{balance}releases"),
+            fraud_flagged=Exists(
+                Ride.objects.filter(driver=OuterRef("pk"), is_fraud_flagged=True)
+            ),
+            paid_today=Exists(
+                Payout.objects.filter(
+                    driver=OuterRef("user_id"),
+                    reference__startswith="payout:scheduled:",
+                    reference__endswith=f":{today_str}",
+                )
+            ),
+        )
+        .filter(available__gte=MIN_PAYOUT_AMOUNT, fraud_flagged=False, paid_today=False)
+        .order_by("id")
+        .values_list("id", flat=True)
     )
 
+
+@shared_task
+def trigger_scheduled_payouts():
+    """
+    Orchestrator: Finds eligible drivers and queues their payouts in batches.
+    Scheduled: Daily @ 3 AM
+    """
     # ── BACKPRESSURE GUARD ──
     if not CeleryQueueGuard.can_enqueue():
         logger.warning(
@@ -38,101 +68,142 @@ def trigger_scheduled_payouts():
         )
         return "Shedding load due to backpressure"
 
+    batch_size = getattr(settings, "PAYOUT_DISPATCH_BATCH_SIZE", 100)
     count = 0
-    for driver in active_drivers:
-        # 🚨 FRAUD ENFORCEMENT: Block automated payout if driver has flagged rides
-        if Ride.objects.filter(driver=driver, is_fraud_flagged=True).exists():
-            continue
-
-        # Optimization: Pre-check balance to reduce queue noise
-        if get_available_balance(driver.user) >= MIN_PAYOUT_AMOUNT:
-            process_driver_payout.delay(driver.id)
-            count += 1
+    batch = []
+    for driver_id in _payable_driver_ids().iterator(chunk_size=2000):
+        batch.append(driver_id)
+        if len(batch) >= batch_size:
+            process_driver_payout_batch.delay(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        process_driver_payout_batch.delay(batch)
+        count += len(batch)
 
     return f"Triggered payouts for {count} drivers"
 
 
-@shared_task(bind=True)
-@idempotent_task(ttl=3600)
-def process_driver_payout(self, driver_id):
+def _pay_out_driver(driver_id):
     """
-    Worker: Safely processes a single driver's payout.
+    Pays out one driver's full available balance. Every check is repeated
+    under the driver's row lock; the orchestrator's query only pre-filters.
     """
-    try:
-        with transaction.atomic():
-            # 1. Lock the driver row
-            driver = Driver.objects.select_for_update().get(id=driver_id)
-            user = driver.user
+    with transaction.atomic():
+        # 1. Lock the driver row
+        driver = Driver.objects.select_for_update().select_related("user").get(
+            id=driver_id
+        )
+        user = driver.user
 
-            # 2. Re-check Balance (Source of Truth)
-            balance = get_available_balance(user)
+        # 2. Re-check eligibility: the driver may have been blocked or
+        # flagged since the orchestrator's query (or a retry's dispatch)
+        from apps.rides.models import Ride
 
-            if balance < MIN_PAYOUT_AMOUNT:
-                return f"Skipped: Balance {balance} < threshold"
+        if driver.status == Driver.Status.BLOCKED:
+            return "Skipped: Driver is blocked"
+        if Ride.objects.filter(driver=driver, is_fraud_flagged=True).exists():
+            return "Skipped: Driver has fraud-flagged rides"
 
-            # 3. Check for Existing Scheduled Payout Today (Prevent Duplicates)
-            from django.utils import timezone
+        # 3. Re-check Balance (Source of Truth)
+        balance = get_available_balance(user)
 
-            today_str = timezone.now().date().isoformat()
-            payout_reference = f"payout:scheduled:{driver.user.id}:{today_str}"
+        if balance < MIN_PAYOUT_AMOUNT:
+            return f"Skipped: Balance {balance} < threshold"
 
-            if Payout.objects.filter(reference=payout_reference).exists():
-                return f"Skipped: Scheduled payout already exists ({payout_reference})"
+        # 4. Check for Existing Scheduled Payout Today (Prevent Duplicates)
+        from django.utils import timezone
 
-            # 4. Create Payout & Hold Funds
-            # This creates Payout(REQUESTED) and Ledger(HOLD)
-            payout = request_driver_payout(
-                driver=user,  # PASS USER INSTANCE
-                amount=balance,
-                reference=payout_reference,  # Deterministic Key
-            )
+        today_str = timezone.now().date().isoformat()
+        payout_reference = f"payout:scheduled:{driver.user.id}:{today_str}"
+
+        if Payout.objects.filter(reference=payout_reference).exists():
+            return f"Skipped: Scheduled payout already exists ({payout_reference})"
+
+        # 5. Create Payout & Hold Funds
+        # This creates Payout(REQUESTED) and Ledger(HOLD)
+        payout = request_driver_payout(
+            driver=user,  # PASS USER INSTANCE
+            amount=balance,
+            reference=payout_reference,  # Deterministic Key
+        )
 
-            # 4. Initiate Gateway Transfer
-            # Ensure Payout is in PROCESSING state before calling gateway?
-            # request_driver_payout sets it to REQUESTED.
-            # We should probably update to PROCESSING here or inside a service.
+        # 6. Initiate Gateway Transfer
+        # Ensure Payout is in PROCESSING state before calling gateway?
+        # request_driver_payout sets it to REQUESTED.
+        # We should probably update to PROCESSING here or inside a service.
 
-            payout.status = Payout.Status.PROCESSING
-            payout.save(update_fields=["status"])
+        payout.status = Payout.Status.PROCESSING
+        payout.save(update_fields=["status"])
 
-            try:
-                # Call Gateway
-                gateway_response = create_driver_payout(payout=payout)
+        try:
+            # Call Gateway
+            gateway_response = create_driver_payout(payout=payout)
 
-                # Update with gateway ID
-                payout.gateway_payout_id = gateway_response.get("id")
-                payout.save(update_fields=["gateway_payout_id"])
-                return f"Payout {payout.reference} initiated for {balance}"
+            # Update with gateway ID
+            payout.gateway_payout_id = gateway_response.get("id")
+            payout.save(update_fields=["gateway_payout_id"])
+            return f"Payout {payout.reference} initiated for {balance}"
 
-            except Exception as e:
-                # 🛑 FAILURE: Gateway rejected request (e.g. invalid bank details)
-                # We catch this so the Payout Record persists as FAILED > Audit Trail
+        except Exception as e:
+            # 🛑 FAILURE: Gateway rejected request (e.g. invalid bank details)
+            # We catch this so the Payout Record persists as FAILED > Audit Trail
 
-                payout.status = Payout.Status.FAILED
-                payout.failure_reason = str(e)
-                payout.save(update_fields=["status", "failure_reason"])
+            payout.status = Payout.Status.FAILED
+            payout.failure_reason = str(e)
+            payout.save(update_fields=["status", "failure_reason"])
 
-                # IMPORTANT: Release the HOLD since payout failed immediately
-                from apps.payments.models import LedgerEntry
-                from apps.payments.services import ledger as ledger_service
+            # IMPORTANT: Release the HOLD since payout failed immediately
+            from apps.payments.models import LedgerEntry
+            from apps.payments.services import ledger as ledger_service
 
-                ledger_service.release_hold(
-                    user=user,
-                    amount=balance,
-                    reference=f"release:{payout.reference}",
-                    reason=LedgerEntry.Reason.DRIVER_PAYOUT,
-                )
+            ledger_service.release_hold(
+                user=user,
+                amount=balance,
+                reference=f"release:{payout.reference}",
+                reason=LedgerEntry.Reason.DRIVER_PAYOUT,
+            )
 
-                # 📢 FIRE ALERT: Automated payout drop requires Operations attention
-                from apps.notifications.services.alerts import send_critical_alert
+            # 📢 FIRE ALERT: Automated payout drop requires Operations attention
+            from apps.notifications.services.alerts import send_critical_alert
 
-                send_critical_alert(
-                    title=f"Failed Driver Payout: {payout.driver.first_name}",
-                    message=f"Gateway failed processing payout {payout.reference} for {balance}.\nError: {e}",
-                    level="ERROR",
-                )
+            send_critical_alert(
+                title=f"Failed Driver Payout: {payout.driver.first_name}",
+                message=f"Gateway failed processing payout {payout.reference} for {balance}.\nError: {e}",
+                level="ERROR",
+            )
 
-                return f"Payout Failed: {e!s}"
+            return f"Payout Failed: {e!s}"
+
+
+@shared_task
+@idempotent_task(ttl=3600)
+def process_driver_payout_batch(driver_ids):
+    """
+    Worker: Pays out a batch of drivers one after another. A driver whose
+    payout raises is handed to process_driver_payout, which owns the retry
+    policy, so one bad account never blocks or replays the batch.
+    """
+    deferred = 0
+    for driver_id in driver_ids:
+        try:
+            _pay_out_driver(driver_id)
+        except Exception as e:
+            logger.warning(f"[Payout] Driver {driver_id} deferred to retry: {e}")
+            process_driver_payout.delay(driver_id)
+            deferred += 1
+
+    return f"Processed {len(driver_ids)} payouts ({deferred} deferred to retry)"
+
+
+@shared_task(bind=True)
+@idempotent_task(ttl=3600)
+def process_driver_payout(self, driver_id):
+    """
+    Worker: Safely processes a single driver's payout.
+    """
+    try:
+        return _pay_out_driver(driver_id)
 
     except Exception as e:
         # ── RETRY STRATEGY WITH JITTER ──
@@ -236,14 +307,24 @@ def reconcile_processing_payouts():
     """
     SLA Task: Reconciles payouts stuck in PROCESSING status.
     Called when a webhook is missed or delayed.
+
+    Gateway lookups run concurrently under a rate limit; large backlogs are
+    resolved from one paged listing instead (see services/reconciliation.py).
     """
     from datetime import timedelta
 
+    from django.db.models import Min
     from django.utils import timezone
 
     from apps.payments.models import Payout
+    from apps.payments.services import payout_gateway
     from apps.payments.services.payout import mark_payout_failed, mark_payout_success
-    from apps.payments.services.payout_gateway import get_payout_status
+    from apps.payments.services.reconciliation import (
+        NOT_LISTED,
+        get_rate_limiter,
+        list_since,
+        run_reconciliation,
+    )
 
     # Payouts older than 15 mins but within 2 days
     cutoff_start = timezone.now() - timedelta(days=2)
@@ -255,37 +336,63 @@ def reconcile_processing_payouts():
         updated_at__lte=cutoff_end,
     )
 
-    reconciled_count = 0
-    for payout in processing_payouts:
-        try:
-            status_data = get_payout_status(
-                gateway_payout_id=payout.gateway_payout_id,
-                reference_id=payout.reference,
-            )
+    limiter = get_rate_limiter()
+    listed = None
+    if processing_payouts.count() >= getattr(settings, "RECONCILE_LIST_MIN_ITEMS", 100):
+        oldest = processing_payouts.aggregate(oldest=Min("created_at"))["oldest"]
+        items, _ = list_since(
+            lambda since, skip: payout_gateway.list_payouts(since=since, skip=skip),
+            since=int(oldest.timestamp()) - 60,  # gateway clock skew
+            limiter=limiter,
+        )
+        listed = {item.get("reference_id"): item for item in items}
 
-            if not status_data:
-                continue
+    def prefetched(payout):
+        return listed.get(payout.reference, NOT_LISTED)
 
-            pg_status = status_data.get("status")
+    def fetch(payout):
+        return payout_gateway.get_payout_status(
+            gateway_payout_id=payout.gateway_payout_id,
+            reference_id=payout.reference,
+        )
 
-            if pg_status == "processed":
-                mark_payout_success(payout=payout)
-                reconciled_count += 1
-            elif pg_status == "failed" or pg_status == "cancelled":
-                payout.failure_reason = status_data.get(
-                    "failure_reason", "Reconciled Failure"
-                )
-                mark_payout_failed(payout=payout)
-                reconciled_count += 1
+    def apply(payout, status_data):
+        if not status_data:
+            return False
 
-        except Exception as e:
-            from apps.notifications.services.alerts import send_critical_alert
+        pg_status = status_data.get("status")
 
-            send_critical_alert(
-                title=f"Payout Reconciliation Error: {payout.id}",
-                message=f"Failed to reconcile payout {payout.id}: {e!s}",
-                level="ERROR",
+        if pg_status == "processed":
+            mark_payout_success(payout=payout)
+            return True
+        if pg_status == "failed" or pg_status == "cancelled":
+            payout.failure_reason = status_data.get(
+                "failure_reason", "Reconciled Failure"
             )
+            mark_payout_failed(payout=payout)
+            return True
+        return False
+
+    reconciled_count, failed = run_reconciliation(
+        "payouts",
+        processing_payouts,
+        fetch=fetch,
+        apply=apply,
+        prefetched=prefetched if listed is not None else None,
+        limiter=limiter,
+    )
+
+    if failed:
+        from apps.notifications.services.alerts import send_critical_alert
+
+        send_critical_alert(
+            title=f"Payout Reconciliation Errors: {len(failed)}",
+            message="\n".join(
+                f"Failed to reconcile payout {payout.id}: {e!s}"
+                for payout, e in failed[:20]
+            ),
+            level="ERROR",
+        )
 
     return f"Reconciled {reconciled_count} processing payouts."
 
@@ -297,13 +404,24 @@ def reconcile_pending_payments():
     SLA Task: Syncs missing Razorpay payments.
     Fixes the edge-case where Rider pays on Razorpay exactly as their phone
     runs out of battery, so 'VerifyPaymentView' is never hit by the App.
+
+    Order lookups run concurrently under a rate limit; large backlogs are
+    resolved from one paged payments listing instead.
     """
     try:
         from datetime import timedelta
+
+        from django.db.models import Min
         from django.utils import timezone
 
         from apps.payments.models import Payment
         from apps.payments.services.payout import settle_driver_payout
+        from apps.payments.services.reconciliation import (
+            NOT_LISTED,
+            get_rate_limiter,
+            list_since,
+            run_reconciliation,
+        )
         from apps.payments.views import razorpay_client
         from apps.rides.models import Ride
 
@@ -319,45 +437,73 @@ def reconcile_pending_payments():
             created_at__lte=cutoff_end,
         ).exclude(gateway_order_id__isnull=True)
 
-        fixed_count = 0
-        for payment in pending:
-            try:
-                order_data = razorpay_client.order.payments(payment.gateway_order_id)
-                items = order_data.get("items", [])
+        limiter = get_rate_limiter()
+        prefetched = None
+        if pending.count() >= getattr(settings, "RECONCILE_LIST_MIN_ITEMS", 100):
+            oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+            # Every payment of an order is created after the order, so this
+            # one listing sees all of them, with their current status.
+            items, complete = list_since(
+                lambda since, skip: razorpay_client.payment.all(
+                    {"from": since, "count": 100, "skip": skip}
+                ),
+                since=int(oldest.timestamp()) - 60,  # gateway clock skew
+                limiter=limiter,
+            )
+            captured = {
+                i.get("order_id"): i for i in items if i.get("status") == "captured"
+            }
 
-                captured_pg = next(
-                    (i for i in items if i.get("status") == "captured"), None
-                )
+            def prefetched(payment):
+                if payment.gateway_order_id in captured:
+                    return captured[payment.gateway_order_id]
+                # A complete listing without a capture means there is none
+                return None if complete else NOT_LISTED
+
+        def fetch(payment):
+            order_data = razorpay_client.order.payments(payment.gateway_order_id)
+            items = order_data.get("items", [])
+
+            return next((i for i in items if i.get("status") == "captured"), None)
+
+        def apply(payment, captured_pg):
+            if not captured_pg:
+                return False
 
-                if captured_pg:
-                    with transaction.atomic():
-                        # Double-lock to prevent race with user reconnecting
-                        p_lock = Payment.objects.select_for_update().get(id=payment.id)
-                        if p_lock.status == Payment.Status.CAPTURED:
-                            continue
+            with transaction.atomic():
+                # Double-lock to prevent race with user reconnecting
+                p_lock = Payment.objects.select_for_update().get(id=payment.id)
+                if p_lock.status == Payment.Status.CAPTURED:
+                    return False
 
-                        p_lock.gateway_payment_id = captured_pg["id"]
-                        p_lock.status = Payment.Status.CAPTURED
-                        p_lock.save()
+                p_lock.gateway_payment_id = captured_pg["id"]
+                p_lock.status = Payment.Status.CAPTURED
+                p_lock.save()
 
-                        from apps.payments.models import LedgerEntry
+                from apps.payments.models import LedgerEntry
 
-                        LedgerEntry.objects.create(
-                            user=p_lock.user,
-                            ride_id=p_lock.ride_id,
-                            amount=p_lock.amount,
-                            entry_type=LedgerEntry.Type.DEBIT,
-                            reason=LedgerEntry.Reason.PAYMENT,
-                            reference=f"payment_recon:{p_lock.gateway_payment_id}",
-                        )
+                LedgerEntry.objects.create(
+                    user=p_lock.user,
+                    ride_id=p_lock.ride_id,
+                    amount=p_lock.amount,
+                    entry_type=LedgerEntry.Type.DEBIT,
+                    reason=LedgerEntry.Reason.PAYMENT,
+                    reference=f"payment_recon:{p_lock.gateway_payment_id}",
+                )
 
-                        ride_lock = Ride.objects.select_for_update().get(id=p_lock.ride_id)
-                        settle_driver_payout(ride=ride_lock, payment=p_lock)
+                ride_lock = Ride.objects.select_for_update().get(id=p_lock.ride_id)
+                settle_driver_payout(ride=ride_lock, payment=p_lock)
 
-                    fixed_count += 1
+            return True
 
-            except Exception:
-                pass  # Keep scanning the rest
+        fixed_count, _ = run_reconciliation(
+            "payments",
+            pending,
+            fetch=fetch,
+            apply=apply,
+            prefetched=prefetched,
+            limiter=limiter,
+        )
 
         return f"Reconciled {fixed_count} dropped payments automatically."
     except Exception as e:
@@ -459,3 +605,67 @@ def audit_platform_ledger():
     except Exception as e:
         logger.error(f"Audit failure: {e}")
         return str(e)
+
+
+@shared_task
+def apply_webhook_events():
+    """
+    Applies received gateway webhooks (apps/payments/webhooks.py) in arrival
+    order, a batch per transaction. Enqueued by ingest; beat runs it every
+    minute as a backstop.
+    """
+    from django.core.cache import cache
+
+    from apps.payments.services.webhooks import (
+        APPLY_KICK_KEY,
+        APPLY_LOCK_KEY,
+        APPLY_LOCK_TTL,
+        apply_pending_webhook_events,
+    )
+
+    # One applier at a time keeps events in order
+    if not cache.add(APPLY_LOCK_KEY, "1", timeout=APPLY_LOCK_TTL):
+        return "Webhook applier already running"
+
+    handled = 0
+    try:
+        while True:
+            # Events ingested after this point enqueue (or re-flag) a new run
+            cache.delete(APPLY_KICK_KEY)
+            handled += apply_pending_webhook_events(
+                batch_size=getattr(settings, "WEBHOOK_APPLY_BATCH_SIZE", 100)
+            )
+            if not cache.get(APPLY_KICK_KEY):
+                break
+    finally:
+        cache.delete(APPLY_LOCK_KEY)
+
+    return f"Applied {handled} webhook events"
+
+
+@shared_task
+@idempotent_task(ttl=3600)
+def verify_wallet_balances():
+    """
+    Proves the materialized WalletBalance rows against the raw ledger and
+    repairs any that drifted. Runs nightly off-peak.
+    """
+    from apps.common.metrics import WALLET_BALANCE_DRIFT
+    from apps.notifications.services.alerts import send_critical_alert
+    from apps.payments.services import wallet
+
+    drifted = wallet.verify_wallet_balances(
+        chunk_size=getattr(settings, "WALLET_VERIFY_CHUNK_SIZE", 500)
+    )
+    if not drifted:
+        return "Wallet balances match the ledger."
+
+    WALLET_BALANCE_DRIFT.inc(len(drifted))
+    msg = f"Wallet balance drift repaired for {len(drifted)} users: {drifted[:20]}"
+    logger.critical(msg)
+    send_critical_alert(
+        title="CRITICAL: Wallet Balance Drift",
+        message=msg,
+        level="CRITICAL",
+    )
+    return msg
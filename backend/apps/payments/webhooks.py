@@ -1,22 +1,28 @@
+"""
+Gateway webhook ingest.
+
+The views only verify, record and acknowledge: the event is stored as a
+RECEIVED WebhookEvent (a single insert, deduplicated by event id) and the
+applier task (apps.payments.tasks.apply_webhook_events) applies it to
+payments, payouts and the ledger in arrival order. Response time does not
+depend on ledger row locks, so gateway retry bursts stay cheap.
+"""
+
 import hashlib
 import hmac
 import json
-from decimal import Decimal
 
 from django.conf import settings
-from django.db import transaction
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
 from apps.common.idempotency import idempotent_webhook
-from apps.payments.models import LedgerEntry, Payment, Payout
-from apps.payments.services.payout import (
-    mark_payout_failed,
-    mark_payout_success,
-)
 from apps.payments.services.razorpay import verify_razorpay_payout_webhook
-from apps.payments.services.webhooks import register_webhook_event
+from apps.payments.services.webhooks import (
+    register_webhook_event,
+    schedule_webhook_apply,
+)
 
 
 import logging
@@ -83,89 +89,18 @@ def razorpay_webhook(request):
         logger.info(f"WEBHOOK_SKIP: Unhandled event_type={event_type}")
         return HttpResponse(status=200)
 
+    entity = data.get("payload", {}).get("payment", {}).get("entity", {})
+    if not all([event_id, entity.get("order_id"), entity.get("id"), entity.get("amount")]):
+        return HttpResponse(status=400)
+
     # 🔒 IDENTITY GATE
-    if not register_webhook_event(
+    if register_webhook_event(
         provider="razorpay",
         event_id=event_id,
         event_type=event_type,
         raw_body=body,
     ):
-        return HttpResponse(status=200)
-
-    payment_entity = data["payload"]["payment"]["entity"]
-    order_id = payment_entity["order_id"]
-    payment_id = payment_entity["id"]
-    amount = Decimal(payment_entity["amount"]) / Decimal("100")
-
-    with transaction.atomic():
-        payment = (
-            Payment.objects.select_for_update()
-            .filter(gateway_order_id=order_id)
-            .first()
-        )
-
-        if not payment or payment.status == Payment.Status.CAPTURED:
-            return HttpResponse(status=200)
-
-        payment.status = Payment.Status.CAPTURED
-        payment.gateway_payment_id = payment_id
-        payment.save(update_fields=["status", "gateway_payment_id"])
-
-        LedgerEntry.objects.create(
-            user=payment.user,
-            ride_id=payment.ride_id,
-            amount=amount,
-            entry_type=LedgerEntry.Type.DEBIT,
-            reference=f"payment:{payment.id}",
-            reason=LedgerEntry.Reason.PAYMENT,
-        )
-
-        # Ensure Driver Gets Paid if Webhook wins the race condition
-        try:
-            from apps.payments.services.payout import settle_driver_payout
-            from apps.rides.models import Ride
-
-            ride = Ride.objects.select_for_update().get(id=payment.ride_id)
-            settle_driver_payout(ride=ride, payment=payment)
-        except Exception:
-            # Note: We don't fail the webhook if payout errors; retry payout separately.
-            pass
-
-        if payment.ride_id:
-            try:
-                from apps.rides.models import Ride as RideModel
-                _ride = RideModel.objects.get(id=payment.ride_id)
-                if _ride.driver:
-                    from apps.notifications.models import Notification
-                    transaction.on_commit(
-                        lambda: Notification.objects.create(
-                            user=_ride.driver.user,
-                            channel="push",
-                            type="RIDE_PAYMENT_RECEIVED",
-                            payload={
-                                "title": "Payment received",
-                                "body": f"Rider paid ₹{payment.amount} for ride #{payment.ride_id}.",
-                                "data": {"ride_id": str(payment.ride_id)},
-                            },
-                        )
-                    )
-            except Exception:
-                pass
-
-        from apps.notifications.models import Notification
-
-        transaction.on_commit(
-            lambda: Notification.objects.create(
-                user=payment.user,
-                channel="email",
-                type="PAYMENT_CONFIRMED",
-                payload={
-                    "subject": f"Payment Successful - Ride #{payment.ride_id}",
-                    "body": f"Hi {payment.user.first_name}, your payment of ₹{payment.amount} was successful. Trans ID: {payment.gateway_payment_id}",
-                    "html": f"<h2>Payment Successful ✅</h2><p>Your payment of <strong>₹{payment.amount}</strong> has been received for ride #{payment.ride_id}.</p><p>Transaction ID: {payment.gateway_payment_id}</p>",
-                },
-            )
-        )
+        schedule_webhook_apply()
 
     return HttpResponse(status=200)
 
@@ -205,22 +140,12 @@ def payout_webhook(request):
         return HttpResponse(status=400)
 
     # 🔒 IDENTITY GATE
-    if not register_webhook_event(
+    if register_webhook_event(
         provider="razorpay",
         event_id=event_id,
         event_type=event_type,
         raw_body=body,
     ):
-        return HttpResponse(status=200)
-
-    payout = Payout.objects.filter(reference=reference).first()
-    if not payout:
-        return HttpResponse(status=200)
-
-    with transaction.atomic():
-        if status == "processed":
-            mark_payout_success(payout=payout)
-        elif status in {"failed", "reversed"}:
-            mark_payout_failed(payout=payout)
+        schedule_webhook_apply()
 
     return HttpResponse(status=200)
@@ -7,7 +7,8 @@ from django.db import transaction
 from apps.drivers.models import Driver
 from apps.drivers.services import remove_driver_from_geo
 from apps.rides.models import Ride
-from apps.rides.tasks import driver_accept_timeout
+from apps.rides.services.active_ride import notify_driver_ride_event
+from apps.rides.services.timers import ACCEPT_TIMEOUT, schedule_timer
 
 logger = logging.getLogger(__name__)
 channel_layer = get_channel_layer()
@@ -69,11 +70,14 @@ def handle_ride_searching(event: dict):
             )
 
             transaction.on_commit(
-                lambda r=ride.id, d=driver.id: driver_accept_timeout.apply_async(
-                    args=[r, d],
-                    countdown=30,
+                lambda r=ride.id, d=driver.id: schedule_timer(
+                    ACCEPT_TIMEOUT, r, d, delay=30
                 )
             )
 
+            transaction.on_commit(
+                lambda r=ride, d=driver.id: notify_driver_ride_event(d, r.id, r.status)
+            )
+
             logger.info(f"Ride {ride.id} offered to driver {driver.id}")
             return
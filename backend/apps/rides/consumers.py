@@ -5,6 +5,7 @@ from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.db import models
 
+from apps.admin_dashboard.tiles import tile_group_for
 from apps.rides.models import Ride
 
 logger = logging.getLogger(__name__)
@@ -158,9 +159,9 @@ class RideConsumer(AsyncJsonWebsocketConsumer):
             lat = payload.get("lat")
             lng = payload.get("lng")
             if lat is not None and lng is not None:
-                # Broadcast to admin live map
+                # Broadcast to admins viewing this tile of the live map
                 await self.channel_layer.group_send(
-                    "admin_live_map",
+                    tile_group_for(lat, lng),
                     {
                         "type": "rider_location_updated",
                         "data": {
@@ -13,6 +13,7 @@ from django.core.validators import MinValueValidator
 from django.db import models
 
 CACHE_KEY = "fare_config_{vehicle_type}"
+ACTIVE_CACHE_KEY = "fare_config_active"
 CACHE_TTL = 60  # seconds
 
 
@@ -119,7 +120,9 @@ class FareConfig(models.Model):
     def save(self, *args, **kwargs):
         """Bust cache on every save so new values are picked up within 1 request."""
         super().save(*args, **kwargs)
-        cache.delete(CACHE_KEY.format(vehicle_type=self.vehicle_type))
+        cache.delete_many(
+            [CACHE_KEY.format(vehicle_type=self.vehicle_type), ACTIVE_CACHE_KEY]
+        )
 
     # ── CLASS METHODS ────────────────────────────────────────────────────
 
@@ -149,6 +152,18 @@ class FareConfig(models.Model):
         cache.set(cache_key, config, CACHE_TTL)
         return config
 
+    @classmethod
+    def get_active(cls) -> list:
+        """
+        Every active FareConfig, in vehicle_type order: one snapshot for
+        pricing all vehicle types at once. Cached like get_for().
+        """
+        configs = cache.get(ACTIVE_CACHE_KEY)
+        if configs is None:
+            configs = list(cls.objects.filter(is_active=True))
+            cache.set(ACTIVE_CACHE_KEY, configs, CACHE_TTL)
+        return configs
+
     @classmethod
     def _default(cls, vehicle_type: str) -> "FareConfig":
         """Returns an unsaved default config object (fallback only)."""
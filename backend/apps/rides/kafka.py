@@ -1,64 +1,38 @@
 # apps/rides/kafka.py
 
-import json
-import logging
+from django.db.models import F
 
-from django.conf import settings
-from kafka import KafkaProducer
+from apps.common.kafka import publish, register_schema
+from apps.rides.models import Ride
 
-logger = logging.getLogger(__name__)
-
-_producer = None
 TOPIC = "ride_events"
 
-
-def get_producer():
-    global _producer
-    if _producer is None:
-        try:
-            _producer = KafkaProducer(
-                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-                key_serializer=lambda k: str(k).encode("utf-8"),
-                acks=1,  # Change from 'all' for faster matching latency
-                retries=3,
-                request_timeout_ms=5000,
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Kafka Producer: {e}")
-            return None
-    return _producer
+# [1, "RIDE_SEARCHING", ride_id, [driver_ids], attempt] on the wire
+RIDE_SEARCHING_SCHEMA = 1
+register_schema(RIDE_SEARCHING_SCHEMA, ("event", "ride_id", "driver_ids", "attempt"))
 
 
 def _publish_event(*, ride, driver_ids):
     if not driver_ids:
         return
 
-    producer = get_producer()
-    if not producer:
-        logger.warning(f"Kafka producer unavailable. Skipping event for ride {ride.id}")
-        return
-
-    ride.search_attempt += 1
-    ride.save(update_fields=["search_attempt"])
-
     event = {
         "event": "RIDE_SEARCHING",
         "ride_id": ride.id,
         "driver_ids": driver_ids,
-        "attempt": ride.search_attempt,
+        "attempt": ride.search_attempt + 1,
     }
 
-    try:
-        # ASYNCHRONOUS SEND (Production Grade)
-        # We do NOT call flush() here to prevent blocking the HTTP worker thread.
-        producer.send(
-            TOPIC,
-            key=ride.id,
-            value=event,
-        )
-    except Exception as e:
-        logger.error(f"Kafka send failed for ride {ride.id}: {e}")
+    # Buffered and sent in the background (apps/common/kafka.py); keyed by
+    # ride so every event of a ride lands on one partition, in order.
+    if not publish(TOPIC, event, key=ride.id):
+        # Dropped: no consumer will see this attempt, so it is not counted
+        return
+
+    # In-place increment: this runs from on_commit with an instance loaded
+    # earlier, which must not overwrite concurrent updates to the row
+    Ride.objects.filter(pk=ride.pk).update(search_attempt=F("search_attempt") + 1)
+    ride.search_attempt += 1
 
 
 def publish_ride_match_event(*, ride, driver_ids):
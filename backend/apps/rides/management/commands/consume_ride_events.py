@@ -1,11 +1,12 @@
-import json
 import logging
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from kafka import KafkaConsumer
 
-from apps.rides.services.matching import handle_ride_searching
+from apps.common.kafka import decode
+from apps.rides.consumer import handle_ride_searching
+from apps.rides.kafka import TOPIC
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +16,9 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         consumer = KafkaConsumer(
-            "ride_events",
+            TOPIC,
             bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-            value_deserializer=lambda v: json.loads(v.decode("utf-8")),
+            value_deserializer=decode,
             group_id="ride-matching",
             auto_offset_reset="latest",
         )
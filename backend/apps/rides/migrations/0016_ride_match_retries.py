@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rides', '0015_alter_ride_cancelled_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ride',
+            name='match_retries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
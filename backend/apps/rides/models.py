@@ -72,6 +72,8 @@ class Ride(ExportModelOperationsMixin("ride"), models.Model):
     )
 
     search_attempt = models.PositiveIntegerField(default=0)
+    # Re-match passes after the first; widens the search radius
+    match_retries = models.PositiveIntegerField(default=0)
 
     # --------------------
     # Actual tracking
@@ -206,6 +208,13 @@ class Ride(ExportModelOperationsMixin("ride"), models.Model):
     def __str__(self):
         return f"Ride #{self.id} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Baseline for the changed-fields ride broadcast (apps/rides/signals.py)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def transition_to(self, new_status, **extra_fields):
         """
         Server-Authoritative State Machine.
@@ -0,0 +1,120 @@
+# apps/rides/services/active_ride.py
+"""
+"Which ride is this driver on?" without a Ride query per location ping.
+
+  - The driver location socket keeps the Ride in connection state and also
+    joins driver_{id}_rides, so the lifecycle events published there refresh
+    it. Postgres is only read on (re)connect and once per lifecycle event.
+  - The HTTP location path has no connection state; it reads a Redis
+    snapshot instead (cache-aside over Postgres, "no ride" cached too):
+
+        driver:{id}:active_ride -> JSON ActiveRide | "-"
+
+Both are invalidated from the same place: notify_driver_ride_event() for
+status changes, and forget_active_ride() next to the matching offer push.
+Anything that moves a ride onto or off a driver must go through one of them.
+"""
+
+import json
+import logging
+from typing import NamedTuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.common.redis import redis_client
+from apps.rides.models import Ride
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_RIDE_KEY = "driver:{}:active_ride"
+# Bounds a snapshot written from a read that raced an invalidation
+ACTIVE_RIDE_TTL = 300
+NO_RIDE = "-"
+
+ACTIVE_RIDE_STATUSES = (
+    Ride.Status.OFFERED,
+    Ride.Status.ASSIGNED,
+    Ride.Status.ARRIVED,
+    Ride.Status.ONGOING,
+)
+
+
+class ActiveRide(NamedTuple):
+    id: int
+    status: str
+    pickup_lat: float
+    pickup_lng: float
+    drop_lat: float
+    drop_lng: float
+    pickup_address: str
+    drop_address: str
+    planned_route_polyline: str
+    rider_name: str
+    vehicle_type: str
+
+    @classmethod
+    def from_ride(cls, ride):
+        return cls(
+            id=ride.id,
+            status=ride.status,
+            pickup_lat=float(ride.pickup_lat),
+            pickup_lng=float(ride.pickup_lng),
+            drop_lat=float(ride.drop_lat),
+            drop_lng=float(ride.drop_lng),
+            pickup_address=ride.pickup_address,
+            drop_address=ride.drop_address,
+            planned_route_polyline=ride.planned_route_polyline,
+            rider_name=f"{ride.rider.first_name} {ride.rider.last_name}",
+            vehicle_type=ride.vehicle_type,
+        )
+
+
+def load_active_ride(driver_id):
+    """The authoritative lookup (one query) — reconnects and cache misses only."""
+    return (
+        Ride.objects.filter(driver_id=driver_id, status__in=ACTIVE_RIDE_STATUSES)
+        .select_related("rider")
+        .first()
+    )
+
+
+def get_active_ride_snapshot(driver_id):
+    """ActiveRide for the driver, or None. Redis first, Postgres on a miss."""
+    key = ACTIVE_RIDE_KEY.format(driver_id)
+    raw = redis_client.get(key)
+    if raw is not None:
+        return None if raw == NO_RIDE else ActiveRide(**json.loads(raw))
+
+    ride = load_active_ride(driver_id)
+    snapshot = ActiveRide.from_ride(ride) if ride else None
+    redis_client.set(
+        key,
+        json.dumps(snapshot._asdict()) if snapshot else NO_RIDE,
+        ex=ACTIVE_RIDE_TTL,
+    )
+    return snapshot
+
+
+def forget_active_ride(driver_id):
+    try:
+        redis_client.delete(ACTIVE_RIDE_KEY.format(driver_id))
+    except Exception as e:
+        # ACTIVE_RIDE_TTL still bounds how long a stale ride can be served
+        logger.warning(f"Active ride invalidation failed for Driver {driver_id}: {e}")
+
+
+def notify_driver_ride_event(driver_id, ride_id, status):
+    """
+    A ride moved for this driver outside update_ride_status / matching:
+    drop the HTTP snapshot and tell the driver's sockets.
+    """
+    forget_active_ride(driver_id)
+    async_to_sync(get_channel_layer().group_send)(
+        f"driver_{driver_id}_rides",
+        {
+            "type": "ride_status_update",
+            "ride_id": ride_id,
+            "status": status,
+        },
+    )
@@ -23,8 +23,18 @@ def cancel_ride(*, ride: Ride, by: str):
         elif ride.status == Ride.Status.ARRIVED:
             fee = CANCEL_FEE_ARRIVED
 
+    # An open parallel offer round: OFFERED, but to no driver yet
+    offer_round = ride.status == Ride.Status.OFFERED and ride.driver_id is None
+
     ride.cancel(by=by)
 
+    if offer_round:
+        from .offers import close_offer_round
+
+        transaction.on_commit(
+            lambda: close_offer_round(ride.id, Ride.Status.CANCELLED)
+        )
+
     # 🚨 CRITICAL: Release the driver if there was one
     if ride.driver:
         from apps.drivers.models import Driver
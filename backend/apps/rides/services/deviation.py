@@ -1,9 +1,10 @@
 import math
 
-import polyline
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
+from apps.tracking.route_index import get_route_index
+
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """Calculate the great circle distance between two points on the earth."""
@@ -18,31 +19,6 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
-def point_to_segment_distance(pt, s1, s2):
-    """
-    Minimum distance from point pt to line segment (s1, s2).
-    pt, s1, s2 are (lat, lng) tuples.
-    """
-    px, py = pt
-    x1, y1 = s1
-    x2, y2 = s2
-
-    dx, dy = x2 - x1, y2 - y1
-    if dx == 0 and dy == 0:
-        return haversine_distance(px, py, x1, y1)
-
-    t = ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)
-
-    if t < 0:
-        return haversine_distance(px, py, x1, y1)
-    if t > 1:
-        return haversine_distance(px, py, x2, y2)
-
-    closest_lat = x1 + t * dx
-    closest_lng = y1 + t * dy
-    return haversine_distance(px, py, closest_lat, closest_lng)
-
-
 def check_route_deviation(driver, ride, current_lat, current_lng, threshold_m=None):
     """
     Checks if the driver has strayed too far from the planned polyline.
@@ -57,17 +33,12 @@ def check_route_deviation(driver, ride, current_lat, current_lng, threshold_m=No
         return False, 0
 
     try:
-        points = polyline.decode(ride.planned_route_polyline)
-        if not points:
+        # Decoded + indexed once per route, shared with the location socket
+        route = get_route_index(ride.planned_route_polyline)
+        if not route.points:
             return False, 0
 
-        # Find minimum distance to any segment of the polyline
-        min_dist = float("inf")
-        for i in range(len(points) - 1):
-            dist = point_to_segment_distance(
-                (current_lat, current_lng), points[i], points[i + 1]
-            )
-            min_dist = min(min_dist, dist)
+        min_dist = route.snap(current_lat, current_lng).distance_m
 
         is_deviated = min_dist > threshold_m
 
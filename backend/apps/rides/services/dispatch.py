@@ -0,0 +1,412 @@
+# apps/rides/services/dispatch.py
+"""
+Batch Dispatch Engine.
+
+The per-ride path (matching.find_driver_and_offer_ride) offers each ride to
+the first eligible driver the moment it is created. At peak, two nearby
+rides race for the same driver and the fleet-wide pickup distance is far
+from optimal.
+
+In batch mode, SEARCHING rides are pooled per dispatch cell for a short
+window and assigned together in one optimization pass:
+
+  0. request_matching()     — called from request threads after commit;
+     hands the ride to the dedicated dispatch worker queue.
+  1. submit_for_matching()  — routes a ride to the per-ride path or to the
+     batch pool depending on settings.RIDE_DISPATCH_MODE.
+  2. enqueue_ride()         — ZADD into dispatch:pending:{cell}. The first
+     ride of a window schedules dispatch_cell_batch for that cell.
+  3. dispatch_batch()       — locks the rides, loads candidates once for the
+     whole batch (geo index + driver-state read model, no Postgres), builds a
+     (ride x driver) cost matrix over pickup distance, driver level and score,
+     and solves the min-cost assignment. Only assigned drivers are row-locked.
+
+Rides no attempt could place get a MATCH_RETRY timer (services/timers.py).
+Due retries are grouped per cell into retry units by dispatch_retries() and
+matched concurrently, one task per unit; every retry widens the ride's
+search radius (search_radius_km).
+"""
+
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from apps.common.metrics import RIDE_MATCH_ATTEMPTS, RIDE_RETRY_UNITS
+from apps.drivers.redis import DRIVER_GEO_KEY, redis_client
+from apps.drivers.services.geo import LUA_AVAILABLE_DRIVERS, SEARCH_OVERFETCH
+from apps.rides.models import Ride
+from apps.rides.services.timers import schedule_match_retry
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_QUEUE = "dispatch"
+
+MODE_SINGLE = "single"
+MODE_BATCH = "batch"
+
+DISPATCH_CELL_PRECISION = 1  # ~11km cells: wide enough to pool competing rides
+SEARCH_RADIUS_KM = 10.0
+CANDIDATES_PER_RIDE = 20
+
+# Cost weights, expressed in "km-equivalents" so they add to pickup distance.
+LEVEL_PENALTY_KM = 0.5  # per level below PRO
+SCORE_PENALTY_KM = 1.0  # at score 0 (linear down to 0 at score 100)
+UNREACHABLE = 1e6  # rejected or out-of-range pairs
+
+
+def dispatch_mode() -> str:
+    return getattr(settings, "RIDE_DISPATCH_MODE", MODE_SINGLE)
+
+
+def dispatch_window() -> float:
+    return float(getattr(settings, "RIDE_DISPATCH_WINDOW_SECONDS", 2.0))
+
+
+def search_radius_km(retries: int) -> float:
+    """
+    Pickup search radius after a ride's Nth match retry (Ride.match_retries):
+    SEARCH_RADIUS_KM first, widened by RIDE_SEARCH_RADIUS_STEP_KM per retry
+    up to RIDE_SEARCH_RADIUS_MAX_KM.
+    """
+    step = getattr(settings, "RIDE_SEARCH_RADIUS_STEP_KM", 2.5)
+    cap = getattr(settings, "RIDE_SEARCH_RADIUS_MAX_KM", 20.0)
+    return min(SEARCH_RADIUS_KM + step * retries, max(cap, SEARCH_RADIUS_KM))
+
+
+def dispatch_cell_id(lat: float, lng: float) -> str:
+    return (
+        f"{round(lat, DISPATCH_CELL_PRECISION)}:{round(lng, DISPATCH_CELL_PRECISION)}"
+    )
+
+
+def _pending_key(cell_id: str) -> str:
+    return f"dispatch:pending:{cell_id}"
+
+
+def _window_key(cell_id: str) -> str:
+    return f"dispatch:window:{cell_id}"
+
+
+# ─── 1. ENTRY POINTS ─────────────────────────────────────────────────────────
+
+
+def request_matching(ride_id: int):
+    """
+    Hand a committed ride to the dispatch worker. Runs in on_commit hooks on
+    HTTP request threads, so it must never run the matching pipeline itself —
+    except when the broker is unreachable, where matching inline beats
+    leaving the ride without a single attempt.
+    """
+    from apps.rides.tasks import match_ride
+
+    try:
+        match_ride.apply_async((ride_id,), queue=DISPATCH_QUEUE)
+    except Exception:
+        logger.exception(
+            f"[Dispatch] Could not enqueue ride {ride_id}; matching inline"
+        )
+        submit_for_matching(ride_id)
+
+
+def submit_for_matching(ride_id: int):
+    """Route a SEARCHING ride to the configured matching strategy."""
+    if dispatch_mode() != MODE_BATCH:
+        from apps.rides.services import matching
+
+        matching.find_driver_and_offer_ride(ride_id)
+        return
+
+    ride = Ride.objects.filter(id=ride_id, status=Ride.Status.SEARCHING).first()
+    if ride:
+        enqueue_ride(ride)
+
+
+# ─── 2. BATCH POOL ───────────────────────────────────────────────────────────
+
+
+def enqueue_ride(ride):
+    """
+    Add a ride to its cell's pending pool. The first ride of a window
+    schedules the batch run; later arrivals just join the pool.
+    """
+    from apps.rides.tasks import dispatch_cell_batch
+
+    cell_id = dispatch_cell_id(ride.pickup_lat, ride.pickup_lng)
+    window = dispatch_window()
+
+    redis_client.zadd(_pending_key(cell_id), {str(ride.id): time.time()})
+
+    # Safety TTL so a crashed worker can't wedge the cell shut forever
+    if redis_client.set(_window_key(cell_id), 1, nx=True, ex=int(window * 5) + 1):
+        dispatch_cell_batch.apply_async((cell_id,), countdown=window)
+
+
+def drain_cell(cell_id: str) -> list:
+    """Atomically take every pending ride id for a cell (oldest first)."""
+    pipe = redis_client.pipeline()
+    pipe.delete(_window_key(cell_id))
+    pipe.zrange(_pending_key(cell_id), 0, -1)
+    pipe.delete(_pending_key(cell_id))
+    _, ride_ids, _ = pipe.execute()
+    return [int(r) for r in ride_ids]
+
+
+def dispatch_cell(cell_id: str) -> int:
+    ride_ids = drain_cell(cell_id)
+    if not ride_ids:
+        return 0
+    return dispatch_batch(ride_ids)
+
+
+# ─── 3. ASSIGNMENT SOLVER ────────────────────────────────────────────────────
+
+
+def solve_assignment(cost):
+    """
+    Min-cost bipartite assignment (Hungarian / Kuhn-Munkres, potentials form).
+
+    cost is a rows x cols matrix (list of lists). Returns sorted (row, col)
+    pairs; when the matrix is rectangular, the smaller side is fully matched.
+    O(n^2 * m) — fine for the tens of rides a dispatch window collects.
+    """
+    if not cost or not cost[0]:
+        return []
+
+    transposed = len(cost) > len(cost[0])
+    if transposed:
+        cost = [list(col) for col in zip(*cost)]
+
+    n, m = len(cost), len(cost[0])
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)  # owner[j] = row assigned to column j (1-based)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = [math.inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = owner[j0], math.inf, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = row[j - 1] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j], way[j] = cur, j0
+                if minv[j] < delta:
+                    delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    pairs = [(owner[j] - 1, j - 1) for j in range(1, m + 1) if owner[j]]
+    if transposed:
+        pairs = [(c, r) for r, c in pairs]
+    return sorted(pairs)
+
+
+def pair_cost(distance_km: float, level: str, score: float) -> float:
+    from apps.rides.services.matching import LEVEL_PRIORITY
+
+    level_gap = 4 - LEVEL_PRIORITY.get(level, 1)
+    score_gap = 1.0 - min(max(score or 0.0, 0.0), 100.0) / 100.0
+    return distance_km + LEVEL_PENALTY_KM * level_gap + SCORE_PENALTY_KM * score_gap
+
+
+def build_cost_matrix(rides, drivers, distances):
+    """
+    rides:     ordered list of Ride
+    drivers:   ordered list of eligible DriverState (Redis read model)
+    distances: {ride_id: {driver_id: pickup_km}} from the geo index
+    """
+    matrix = []
+    for ride in rides:
+        rejected = set(ride.rejected_driver_ids or [])
+        reachable = distances.get(ride.id, {})
+        row = []
+        for driver in drivers:
+            km = reachable.get(driver.id)
+            if km is None or driver.id in rejected:
+                row.append(UNREACHABLE)
+            else:
+                row.append(pair_cost(km, driver.level, driver.score))
+        matrix.append(row)
+    return matrix
+
+
+# ─── 4. BATCH RUN ────────────────────────────────────────────────────────────
+
+
+def _pickup_distances(rides):
+    """
+    {ride_id: {driver_id: km}} for drivers with a live heartbeat and no
+    outstanding offer lock — one pipelined round trip for the whole batch.
+    """
+    search = redis_client.register_script(LUA_AVAILABLE_DRIVERS)
+    pipe = redis_client.pipeline()
+    for ride in rides:
+        search(
+            keys=[DRIVER_GEO_KEY],
+            args=[
+                ride.pickup_lng,
+                ride.pickup_lat,
+                search_radius_km(ride.match_retries),
+                CANDIDATES_PER_RIDE,
+                CANDIDATES_PER_RIDE * SEARCH_OVERFETCH,
+                1,
+            ],
+            client=pipe,
+        )
+    results = pipe.execute()
+
+    return {
+        ride.id: {int(raw[i]): float(raw[i + 1]) for i in range(0, len(raw), 2)}
+        for ride, raw in zip(rides, results)
+    }
+
+
+def dispatch_batch(ride_ids) -> int:
+    """
+    Assign a batch of SEARCHING rides in one pass. Returns the number of
+    rides offered. Unmatched rides stay SEARCHING with a MATCH_RETRY timer.
+    """
+    from apps.drivers.services.geo import (
+        lock_driver_for_offer,
+        unlock_driver_from_offer,
+    )
+    from apps.drivers.services.state import get_driver_states
+    from apps.rides.services.matching import _lock_chosen_driver, _offer_ride_to_driver
+
+    start_time = time.time()
+    offered = set()
+
+    with transaction.atomic():
+        rides = list(
+            Ride.objects.select_for_update(skip_locked=True)
+            .select_related("rider")
+            .filter(id__in=ride_ids, status=Ride.Status.SEARCHING)
+            .order_by("created_at")
+        )
+        if not rides:
+            return 0
+
+        for ride in rides:
+            RIDE_MATCH_ATTEMPTS.labels(
+                city=ride.city, vehicle_type=ride.vehicle_type
+            ).inc()
+
+        distances = _pickup_distances(rides)
+        candidate_ids = sorted({d for hits in distances.values() for d in hits})
+        states = get_driver_states(candidate_ids)
+        drivers = [
+            states[d] for d in candidate_ids if d in states and states[d].is_eligible
+        ]
+
+        matrix = build_cost_matrix(rides, drivers, distances)
+        for r_idx, d_idx in solve_assignment(matrix):
+            if matrix[r_idx][d_idx] >= UNREACHABLE:
+                continue
+
+            ride, state = rides[r_idx], drivers[d_idx]
+            if not lock_driver_for_offer(driver_id=state.id):
+                continue
+            driver = _lock_chosen_driver(state.id)
+            if not driver:
+                unlock_driver_from_offer(driver_id=state.id)
+                continue
+
+            ride_candidates = list(distances.get(ride.id, {}))
+            _offer_ride_to_driver(
+                ride, driver, ride_candidates, ride_candidates, start_time
+            )
+            offered.add(ride.id)
+
+        schedule_match_retry(*(r.id for r in rides if r.id not in offered))
+
+    logger.info(
+        f"[Dispatch] Batch of {len(rides)} rides: {len(offered)} offered "
+        f"against {len(drivers)} drivers in {time.time() - start_time:.3f}s"
+    )
+    return len(offered)
+
+
+# ─── 5. RETRIES ──────────────────────────────────────────────────────────────
+
+
+def dispatch_retries(ride_ids, on_published=None) -> int:
+    """
+    Split due match retries into independent units — one dispatch cell,
+    at most RIDE_RETRY_UNIT_SIZE rides, oldest ride first — and publish each
+    as its own task on the dispatch queue. Units run concurrently, bounded
+    by the dispatch workers' concurrency; units holding the oldest rides
+    are published first. on_published(unit) is called with each unit's ride
+    ids as soon as it is out, so a failure part-way leaves only the
+    unpublished rides pending. Returns the number of units published.
+    """
+    from apps.rides.tasks import retry_matching_unit
+
+    unit_size = getattr(settings, "RIDE_RETRY_UNIT_SIZE", 25)
+    waiting = (
+        Ride.objects.filter(id__in=list(ride_ids), status=Ride.Status.SEARCHING)
+        .order_by("created_at")
+        .values_list("id", "pickup_lat", "pickup_lng")
+    )
+
+    cells = {}
+    for ride_id, lat, lng in waiting:
+        cells.setdefault(dispatch_cell_id(lat, lng), []).append(ride_id)
+
+    # Cells inherit insertion order from their oldest ride
+    units = [
+        ids[i : i + unit_size]
+        for ids in cells.values()
+        for i in range(0, len(ids), unit_size)
+    ]
+    for unit in units:
+        retry_matching_unit.apply_async((unit,), queue=DISPATCH_QUEUE)
+        RIDE_RETRY_UNITS.inc()
+        if on_published:
+            on_published(unit)
+    return len(units)
+
+
+def retry_unit(ride_ids) -> None:
+    """
+    Re-match one unit of waiting rides (same cell, oldest first). Each retry
+    bumps Ride.match_retries, which widens the search radius.
+    """
+    from apps.rides.services import matching
+
+    Ride.objects.filter(id__in=ride_ids, status=Ride.Status.SEARCHING).update(
+        match_retries=F("match_retries") + 1
+    )
+
+    if dispatch_mode() == MODE_BATCH:
+        dispatch_batch(ride_ids)
+        return
+
+    for ride_id in ride_ids:
+        try:
+            matching.find_driver_and_offer_ride(ride_id)
+        except Exception:
+            # One bad ride must not starve the rest of the unit
+            logger.exception(f"[Dispatch] Retry failed for ride {ride_id}")
+            schedule_match_retry(ride_id)
@@ -2,6 +2,10 @@
 """
 Fare ESTIMATION service (called at booking time, before the ride starts).
 Uses FareConfig from DB so estimates match actual final fare logic.
+
+estimate_fare() prices one vehicle type. quote_fares() prices every active
+vehicle type for a trip in one pass, sharing the route lookup, the surge
+read and one FareConfig snapshot.
 """
 
 import logging
@@ -15,6 +19,32 @@ from .surge import get_surge
 logger = logging.getLogger(__name__)
 
 
+def _trip_metrics(pickup, drop, distance_km, duration_min) -> tuple:
+    if distance_km is None or duration_min is None:
+        try:
+            distance_km, duration_min = get_distance_and_duration(pickup, drop)
+        except Exception as e:
+            logger.warning(f"Distance API failed ({e}), using fallback 5km / 15min")
+            distance_km = 5.0
+            duration_min = 15.0
+    return distance_km, duration_min
+
+
+def _price(config, km: Decimal, minutes: Decimal, surge: Decimal) -> Decimal:
+    # ── Distance charge (same formula as final_fare) ─────────────────
+    extra_km = max(Decimal("0"), km - config.base_distance_km)
+    distance_charge = extra_km * config.per_km_rate
+
+    # ── Duration component (for estimation only) ──────────────────────
+    # Not used in final fare (final fare uses waiting time, not duration)
+    duration_charge = minutes * config.per_min_rate
+
+    # ── Assemble ──────────────────────────────────────────────────────
+    fare = (config.base_fare + distance_charge + duration_charge) * surge
+
+    return max(fare, config.minimum_fare).quantize(Decimal("0.01"))
+
+
 def estimate_fare(
     pickup: tuple,
     drop: tuple,
@@ -30,39 +60,56 @@ def estimate_fare(
     so the estimate shown to riders is accurate.
     """
     config = FareConfig.get_for(vehicle_type)
-
-    if distance_km is None or duration_min is None:
-        try:
-            distance_km, duration_min = get_distance_and_duration(pickup, drop)
-        except Exception as e:
-            logger.warning(f"Distance API failed ({e}), using fallback 5km / 15min")
-            distance_km = 5.0
-            duration_min = 15.0
-
-    # ── Distance charge (same formula as final_fare) ─────────────────
-    actual_km = Decimal(str(distance_km))
-    base_km = config.base_distance_km
-    extra_km = max(Decimal("0"), actual_km - base_km)
-    distance_charge = extra_km * config.per_km_rate
-
-    # ── Duration component (for estimation only) ──────────────────────
-    # Not used in final fare (final fare uses waiting time, not duration)
-    duration_charge = Decimal(str(duration_min)) * config.per_min_rate
-
-    # ── Surge multiplier ──────────────────────────────────────────────
+    distance_km, duration_min = _trip_metrics(pickup, drop, distance_km, duration_min)
     surge = get_surge(pickup[0], pickup[1])
 
-    # ── Assemble ──────────────────────────────────────────────────────
-    fare = (config.base_fare + distance_charge + duration_charge) * Decimal(str(surge))
-
-    fare = max(fare, config.minimum_fare)
+    fare = _price(
+        config,
+        Decimal(str(distance_km)),
+        Decimal(str(duration_min)),
+        Decimal(str(surge)),
+    )
 
     return {
         "distance_km": round(distance_km, 2),
         "duration_min": round(duration_min, 1),
-        "estimated_fare": fare.quantize(Decimal("0.01")),
+        "estimated_fare": fare,
         "surge_multiplier": surge,
         # Fare breakdown for display:
         "base_fare": str(config.base_fare),
         "per_km_rate": str(config.per_km_rate),
     }
+
+
+def quote_fares(
+    pickup: tuple,
+    drop: tuple,
+    distance_km: float = None,
+    duration_min: float = None,
+) -> dict:
+    """
+    Prices every active vehicle type for one trip:
+
+        {"distance_km", "duration_min", "surge_multiplier",
+         "prices": {vehicle_type: Decimal fare}}
+
+    distance_km / duration_min are returned as routed (unrounded); each
+    price matches estimate_fare() for that vehicle type.
+    """
+    configs = FareConfig.get_active()
+    distance_km, duration_min = _trip_metrics(pickup, drop, distance_km, duration_min)
+    surge = get_surge(pickup[0], pickup[1])
+
+    km = Decimal(str(distance_km))
+    minutes = Decimal(str(duration_min))
+    multiplier = Decimal(str(surge))
+
+    return {
+        "distance_km": distance_km,
+        "duration_min": duration_min,
+        "surge_multiplier": surge,
+        "prices": {
+            config.vehicle_type: _price(config, km, minutes, multiplier)
+            for config in configs
+        },
+    }
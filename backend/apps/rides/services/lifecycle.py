@@ -10,7 +10,9 @@ from apps.common.ordering import SequenceFencer
 from apps.drivers.models import Driver
 from apps.rides.models import Ride
 
+from .active_ride import forget_active_ride
 from .otp import generate_and_attach_otp
+from .timers import ACCEPT_TIMEOUT, NO_SHOW, cancel_timer, schedule_timer
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +21,20 @@ def _handle_assigned(ride):
     """Logic for SEARCHING/OFFERED -> ASSIGNED."""
     otp = generate_and_attach_otp(ride)
     ride.save(update_fields=["otp_code", "otp_expires_at"])
+    driver_id = ride.driver_id
+    transaction.on_commit(lambda: cancel_timer(ACCEPT_TIMEOUT, ride.id, driver_id))
     logger.info(f"Ride {ride.id}: Driver assigned, OTP {otp} generated")
 
 
 def _handle_arrived(ride):
     """Logic for ASSIGNED -> ARRIVED."""
+    from apps.rides.tasks import WAIT_TIME_MINUTES
+
     ride.arrived_at = timezone.now()
     ride.save(update_fields=["arrived_at"])
+    transaction.on_commit(
+        lambda: schedule_timer(NO_SHOW, ride.id, delay=WAIT_TIME_MINUTES * 60)
+    )
     logger.info(f"Ride {ride.id}: Driver arrived")
 
 
@@ -40,6 +49,7 @@ def _handle_ongoing(ride):
         int((now - ride.arrived_at).total_seconds()) if ride.arrived_at else 0
     )
     ride.save(update_fields=["otp_verified_at", "start_time", "waiting_seconds"])
+    transaction.on_commit(lambda: cancel_timer(NO_SHOW, ride.id))
     logger.info(f"Ride {ride.id}: Started. wait={ride.waiting_seconds}s")
 
 
@@ -362,6 +372,7 @@ def _notify_rider_channel(channel_layer, ride):
 
 def _notify_driver_channel(channel_layer, ride):
     if ride.driver:
+        forget_active_ride(ride.driver.id)
         async_to_sync(channel_layer.group_send)(
             f"driver_{ride.driver.id}_rides",
             {
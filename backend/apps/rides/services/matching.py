@@ -9,64 +9,93 @@ from apps.common.metrics import (
     RIDE_MATCH_ATTEMPTS,
     RIDE_MATCH_LATENCY,
     RIDE_MATCH_SUCCESS,
+    RIDE_TIME_TO_OFFER,
 )
 from apps.drivers.models import Driver
 from apps.drivers.services.geo import get_nearby_driver_ids
+from apps.drivers.services.state import MIN_TRUST_SCORE, get_driver_states
 from apps.notifications.models import Notification
 from apps.rides.models import Ride
+from apps.rides.services.active_ride import forget_active_ride
+from apps.rides.services.dispatch import search_radius_km
 from apps.rides.services.lifecycle import update_ride_status
-from apps.rides.tasks import driver_accept_timeout
+from apps.rides.services.offers import offer_fanout, open_offer_round
+from apps.rides.services.timers import (
+    ACCEPT_TIMEOUT,
+    schedule_match_retry,
+    schedule_timer,
+)
 
 logger = logging.getLogger(__name__)
 channel_layer = get_channel_layer()
 
+DRIVER_ACCEPT_TIMEOUT = 60  # seconds a driver has to answer an offer
+AUTO_ASSIGN_REJECTIONS = 3  # rejections in a day after which rides are assigned
+
+
+LEVEL_PRIORITY = {
+    Driver.Level.PRO: 4,
+    Driver.Level.CONSISTENT: 3,
+    Driver.Level.ACTIVE: 2,
+    Driver.Level.NORMAL: 1,
+}
+
+
+def _lock_chosen_driver(driver_id):
+    """
+    Authoritative re-check of the one driver about to receive an offer: lock
+    the row and confirm eligibility in Postgres. None when the read model was
+    stale or a concurrent match holds the row (skipped, not waited on).
+    """
+    return (
+        Driver.objects.select_for_update(of=("self",), skip_locked=True)
+        .select_related("user")
+        .filter(
+            id=driver_id,
+            status=Driver.Status.ONLINE,
+            user__driverstats__trust_score__gte=MIN_TRUST_SCORE,
+            user__driverstats__is_suspended=False,
+        )
+        .first()
+    )
 
-def _get_sorted_candidates(ride, rejected_ids):
-    """Fetch nearby drivers and sort by Level, Score, and Proximity."""
-    LEVEL_PRIORITY = {
-        Driver.Level.PRO: 4,
-        Driver.Level.CONSISTENT: 3,
-        Driver.Level.ACTIVE: 2,
-        Driver.Level.NORMAL: 1,
-    }
 
+def _get_sorted_candidates(ride, rejected_ids):
+    """
+    Fetch nearby drivers and sort by Level, Score, and Proximity.
+    Eligibility and ranking fields come from the Redis driver-state read
+    model; returns DriverState records, not locked Driver rows.
+    """
+    # Heartbeat and offer-lock filtering happen server-side in one round trip
     candidate_ids = get_nearby_driver_ids(
         lat=ride.pickup_lat,
         lng=ride.pickup_lng,
-        radius_km=10.0,
+        radius_km=search_radius_km(ride.match_retries),
         limit=20,
+        skip_locked=True,
     )
 
     valid_ids = [cid for cid in candidate_ids if cid not in rejected_ids]
     if not valid_ids:
         return [], []
 
-    online_driver_ids = set(
-        Driver.objects.filter(
-            id__in=valid_ids, status=Driver.Status.ONLINE
-        ).values_list("id", flat=True)
-    )
-
-    db_candidates = (
-        Driver.objects.select_for_update(of=("self",), skip_locked=True)
-        .select_related("user", "stats")
-        .filter(
-            id__in=online_driver_ids,
-            stats__trust_score__gte=60.0,
-            stats__is_suspended=False,
-        )
-    )
+    states = get_driver_states(valid_ids)
+    eligible = [
+        states[d_id]
+        for d_id in valid_ids
+        if d_id in states and states[d_id].is_eligible
+    ]
 
     geo_order = {d_id: idx for idx, d_id in enumerate(valid_ids)}
 
     def sorting_key(d):
         return (
             -LEVEL_PRIORITY.get(d.level, 1),
-            -(getattr(d.stats, "score", 0.0) if hasattr(d, "stats") else 0.0),
+            -d.score,
             geo_order.get(d.id, 999),
         )
 
-    return sorted(db_candidates, key=sorting_key), candidate_ids
+    return sorted(eligible, key=sorting_key), candidate_ids
 
 
 def _notify_match_event(
@@ -91,6 +120,7 @@ def _notify_match_event(
 
 
 def _notify_driver_of_match(ride, driver, auto_assign, stats):
+    forget_active_ride(driver.id)
     async_to_sync(channel_layer.group_send)(
         f"driver_{driver.id}_rides",
         {
@@ -105,10 +135,12 @@ def _notify_driver_of_match(ride, driver, auto_assign, stats):
                 "pickup_address": ride.pickup_address or "",
                 "drop_address": ride.drop_address or "",
                 "fare_estimate": float(ride.base_fare),
-                "timeout": 60,
+                "timeout": DRIVER_ACCEPT_TIMEOUT,
                 "is_auto_assigned": auto_assign,
                 "rejection_count": stats.rejection_count_today,
-                "rejections_until_auto": max(0, 3 - stats.rejection_count_today),
+                "rejections_until_auto": max(
+                    0, AUTO_ASSIGN_REJECTIONS - stats.rejection_count_today
+                ),
                 "rider": {
                     "name": ride.rider.get_full_name() or ride.rider.username,
                     "rating": float(
@@ -210,15 +242,92 @@ def _publish_kafka_match_event(ride, valid_candidate_ids):
         logger.warning(f"Kafka stream error: {e}")
 
 
+def _offer_ride_to_driver(ride, driver, candidate_ids, valid_ids, start_time):
+    """
+    Offer (or auto-assign) a locked SEARCHING ride to an already-locked driver.
+    Shared by the per-ride path and the batch dispatcher; must run inside the
+    caller's transaction. Returns True when the ride was auto-assigned.
+    """
+    from apps.drivers.services.metrics import update_driver_metrics
+
+    stats = _driver_stats(driver)
+    auto_assign = stats.rejection_count_today >= AUTO_ASSIGN_REJECTIONS
+    update_driver_metrics(driver, "OFFERED")
+
+    # 1. Update status AND driver atomically via Lifecycle (Authority)
+    new_status = Ride.Status.ASSIGNED if auto_assign else Ride.Status.OFFERED
+    update_ride_status(ride, new_status, driver=driver)
+
+    if not auto_assign:
+        schedule_timer(ACCEPT_TIMEOUT, ride.id, driver.id, delay=DRIVER_ACCEPT_TIMEOUT)
+    else:
+        update_driver_metrics(driver, "ACCEPTED")
+
+    _observe_match(ride, start_time)
+
+    transaction.on_commit(
+        lambda: _notify_match_event(
+            ride, driver, auto_assign, candidate_ids, valid_ids, stats
+        )
+    )
+    return auto_assign
+
+
+def _offer_ride_to_drivers(ride, drivers, valid_ids, start_time):
+    """
+    Open a parallel offer round: every (locked) driver gets the offer and
+    the first accept wins (services/offers.py). Runs in the caller's
+    transaction like _offer_ride_to_driver.
+    """
+    from apps.drivers.services.metrics import update_driver_metrics
+
+    stats = {driver.id: _driver_stats(driver) for driver in drivers}
+    for driver in drivers:
+        update_driver_metrics(driver, "OFFERED")
+
+    update_ride_status(ride, Ride.Status.OFFERED)
+    open_offer_round(
+        ride.id, [driver.id for driver in drivers], timeout=DRIVER_ACCEPT_TIMEOUT
+    )
+    _observe_match(ride, start_time)
+
+    def notify():
+        for driver in drivers:
+            _notify_driver_of_match(ride, driver, False, stats[driver.id])
+            _send_match_push_notification(ride, driver, False)
+        _publish_kafka_match_event(ride, valid_ids)
+
+    transaction.on_commit(notify)
+
+
+def _driver_stats(driver):
+    from apps.drivers.models import DriverStats
+
+    stats, _ = DriverStats.objects.get_or_create(driver=driver.user)
+    stats.check_and_reset_daily_stats()
+    return stats
+
+
+def _observe_match(ride, start_time):
+    RIDE_MATCH_SUCCESS.labels(city=ride.city, vehicle_type=ride.vehicle_type).inc()
+    RIDE_MATCH_LATENCY.observe(time.time() - start_time)
+    if not ride.rejected_driver_ids and ride.created_at:
+        # First offer of the ride: nobody has rejected or timed out on it yet
+        RIDE_TIME_TO_OFFER.labels(attempt=str(min(ride.match_retries, 5))).observe(
+            time.time() - ride.created_at.timestamp()
+        )
+
+
 def find_driver_and_offer_ride(ride_id: int):
     """
     Matching Engine Entry Point.
     Refactored to minimize cognitive complexity.
     """
     start_time = time.time()
-    from apps.drivers.models import DriverStats
-    from apps.drivers.services.geo import is_driver_locked, lock_driver_for_offer
-    from apps.drivers.services.metrics import update_driver_metrics
+    from apps.drivers.services.geo import (
+        lock_driver_for_offer,
+        unlock_driver_from_offer,
+    )
 
     with transaction.atomic():
         ride = Ride.objects.select_for_update().filter(id=ride_id).first()
@@ -230,37 +339,44 @@ def find_driver_and_offer_ride(ride_id: int):
         rejected_ids = set(ride.rejected_driver_ids or [])
         sorted_candidates, candidate_ids = _get_sorted_candidates(ride, rejected_ids)
 
-        driver = next(
-            (d for d in sorted_candidates if not is_driver_locked(driver_id=d.id)), None
-        )
-
-        if not driver or not lock_driver_for_offer(driver_id=driver.id):
+        # Candidates arrive pre-filtered for offer locks; SET NX settles any
+        # race with a concurrent match since the search ran. Only drivers
+        # that win the lock are read (and row-locked) from Postgres.
+        fanout = offer_fanout()
+        drivers = []
+        for candidate in sorted_candidates:
+            if len(drivers) == fanout:
+                break
+            if not lock_driver_for_offer(driver_id=candidate.id):
+                continue
+            driver = _lock_chosen_driver(candidate.id)
+            if driver:
+                drivers.append(driver)
+                continue
+            unlock_driver_from_offer(driver_id=candidate.id)
+
+        if not drivers:
             logger.info(f"Ride {ride.id}: No eligible or available drivers.")
+            schedule_match_retry(ride.id)
             return
 
-        stats, _ = DriverStats.objects.get_or_create(driver=driver.user)
-        stats.check_and_reset_daily_stats()
-
-        auto_assign = stats.rejection_count_today >= 3
-        update_driver_metrics(driver, "OFFERED")
-
-        # 1. Update status AND driver atomically via Lifecycle (Authority)
-        new_status = Ride.Status.ASSIGNED if auto_assign else Ride.Status.OFFERED
-        update_ride_status(ride, new_status, driver=driver)
-
-        if not auto_assign:
-            driver_accept_timeout.apply_async((ride.id, driver.id), countdown=60)
-        else:
-            update_driver_metrics(driver, "ACCEPTED")
-
-        RIDE_MATCH_SUCCESS.labels(city=ride.city, vehicle_type=ride.vehicle_type).inc()
-        RIDE_MATCH_LATENCY.observe(time.time() - start_time)
-
         valid_ids = [d.id for d in sorted_candidates]
-        transaction.on_commit(
-            lambda: _notify_match_event(
-                ride, driver, auto_assign, candidate_ids, valid_ids, stats
+        driver, others = drivers[0], drivers[1:]
+        if others and (
+            _driver_stats(driver).rejection_count_today < AUTO_ASSIGN_REJECTIONS
+        ):
+            _offer_ride_to_drivers(ride, drivers, valid_ids, start_time)
+            logger.info(
+                f"Ride {ride.id} OFFERED to Drivers {[d.id for d in drivers]}"
             )
+            return
+
+        # One driver, or the best one is due an auto-assignment: the others
+        # never saw the offer
+        for other in others:
+            unlock_driver_from_offer(driver_id=other.id)
+        auto_assign = _offer_ride_to_driver(
+            ride, driver, candidate_ids, valid_ids, start_time
         )
 
     logger.info(
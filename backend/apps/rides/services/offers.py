@@ -0,0 +1,225 @@
+# apps/rides/services/offers.py
+"""
+Parallel offer rounds (settings.RIDE_OFFER_FANOUT > 1).
+
+The per-ride path offers a ride to one driver and waits up to
+DRIVER_ACCEPT_TIMEOUT before moving on to the next. With a fan-out of K,
+the top K ranked candidates that win their offer lock (lock_driver_for_offer)
+receive the same offer at once and the first accept wins. While the round
+is open the ride is OFFERED with no driver:
+
+    ride:{id}:offered -> set of driver ids still holding the offer
+    ride:{id}:winner  -> driver id whose accept claimed the ride (SET NX)
+
+claim_offer() settles the race in one Lua call, so losing drivers are
+turned away without queueing on the ride's row lock. The winner then
+assigns the ride under that lock (assign_claimed_ride), which re-checks the
+claim: a claim from a round that has since closed can never assign. The
+other drivers are released the moment the assignment commits: offer lock
+dropped, sockets told. The winner key outlives an assigned round (up to
+CLAIM_TTL), so an accept that arrives after the release is still told the
+ride was taken.
+
+One OFFER_ROUND timer per round replaces the per-driver accept timers.
+When it fires with nobody assigned, every driver still holding the offer
+counts as rejected and the ride goes back to matching. A round also closes
+early once every driver in it has declined.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.common.redis import redis_client
+from apps.rides.models import Ride
+from apps.rides.services.timers import OFFER_ROUND, cancel_timer, schedule_timer
+
+logger = logging.getLogger(__name__)
+
+OFFERED_KEY = "ride:{}:offered"
+WINNER_KEY = "ride:{}:winner"
+ROUND_KEY_GRACE = 60  # keys outlive the round timer, even a late-firing one
+CLAIM_TTL = 300  # a claim is dropped with the round; this only bounds a leak
+
+# claim_offer() results
+NOT_OFFERED = 0  # not part of an open round (or a single-driver offer)
+CLAIMED = 1
+TAKEN = 2  # another driver of the round got there first
+
+LUA_CLAIM = """
+local winner = redis.call('GET', KEYS[2])
+if winner then
+    if winner == ARGV[1] then return 1 end
+    return 2
+end
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 0 then return 0 end
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+# Remaining drivers after a decline, -1 when the decline is moot
+LUA_DECLINE = """
+if redis.call('EXISTS', KEYS[2]) == 1 then return -1 end
+if redis.call('SREM', KEYS[1], ARGV[1]) == 0 then return -1 end
+return redis.call('SCARD', KEYS[1])
+"""
+
+
+def offer_fanout() -> int:
+    return max(1, int(getattr(settings, "RIDE_OFFER_FANOUT", 1)))
+
+
+def _keys(ride_id):
+    return [OFFERED_KEY.format(ride_id), WINNER_KEY.format(ride_id)]
+
+
+def open_offer_round(ride_id, driver_ids, *, timeout):
+    """Record a new round and arm its timer. Runs in the matching transaction."""
+    offered, winner = _keys(ride_id)
+    pipe = redis_client.pipeline()
+    pipe.delete(offered, winner)
+    pipe.sadd(offered, *driver_ids)
+    pipe.expire(offered, timeout + ROUND_KEY_GRACE)
+    schedule_timer(OFFER_ROUND, ride_id, delay=timeout, client=pipe)
+    pipe.execute()
+
+
+def claim_offer(ride_id, driver_id) -> int:
+    """First accept of an open round wins: CLAIMED, TAKEN or NOT_OFFERED."""
+    claim = redis_client.register_script(LUA_CLAIM)
+    try:
+        return int(claim(keys=_keys(ride_id), args=[driver_id, CLAIM_TTL]))
+    except Exception as e:
+        # Single-driver offers still go through; a round cannot be won blind
+        logger.warning(f"[Offers] Could not claim ride {ride_id}: {e}")
+        return NOT_OFFERED
+
+
+def _close_round(ride_id, keep_winner=False):
+    """Drop the round's keys; returns the drivers that still held the offer."""
+    offered, winner = _keys(ride_id)
+    pipe = redis_client.pipeline()
+    pipe.smembers(offered)
+    pipe.delete(*([offered] if keep_winner else [offered, winner]))
+    members, _ = pipe.execute()
+    return sorted(int(m) for m in members)
+
+
+def release_drivers(ride_id, driver_ids, status):
+    """Free drivers whose offer is gone and tell their apps to drop it."""
+    from apps.drivers.services.geo import unlock_driver_from_offer
+    from apps.rides.services.active_ride import notify_driver_ride_event
+
+    for driver_id in driver_ids:
+        try:
+            unlock_driver_from_offer(driver_id=driver_id)
+        except Exception as e:
+            # The lock still expires on its own
+            logger.warning(f"[Offers] Could not unlock Driver {driver_id}: {e}")
+        notify_driver_ride_event(driver_id, ride_id, status)
+
+
+def close_offer_round(ride_id, status, keep=None):
+    """End a round the ride has left (assigned, cancelled) and release its drivers."""
+    cancel_timer(OFFER_ROUND, ride_id)
+    losers = [d for d in _close_round(ride_id, keep_winner=keep is not None) if d != keep]
+    release_drivers(ride_id, losers, status)
+
+
+def _lock_open_round(ride_id):
+    return (
+        Ride.objects.select_for_update()
+        .filter(id=ride_id, status=Ride.Status.OFFERED, driver__isnull=True)
+        .first()
+    )
+
+
+def assign_claimed_ride(ride_id, driver):
+    """
+    Row-lock a ride whose round this driver claimed and attach the driver.
+    None when the round closed in the meantime. The caller completes the
+    ASSIGNED transition in the same transaction.
+    """
+    ride = _lock_open_round(ride_id)
+    if ride is None or redis_client.get(WINNER_KEY.format(ride_id)) != str(driver.id):
+        return None
+
+    ride.driver = driver
+    transaction.on_commit(
+        lambda: close_offer_round(ride_id, Ride.Status.ASSIGNED, keep=driver.id)
+    )
+    return ride
+
+
+def _reopen(ride, driver_ids):
+    """Send a round's ride back to matching; its drivers count as rejected."""
+    from apps.rides.services.dispatch import request_matching
+
+    rejected = list(ride.rejected_driver_ids or [])
+    rejected += [d for d in driver_ids if d not in rejected]
+    ride.transition_to(Ride.Status.SEARCHING, rejected_driver_ids=rejected)
+
+    transaction.on_commit(lambda: cancel_timer(OFFER_ROUND, ride.id))
+    transaction.on_commit(
+        lambda: release_drivers(ride.id, driver_ids, Ride.Status.SEARCHING)
+    )
+    transaction.on_commit(lambda: request_matching(ride.id))
+
+
+def decline_offer(ride_id, driver) -> bool:
+    """
+    A driver of an open round rejects it. False when the driver holds no
+    offer of this ride's round (not offered, or the round is already won).
+    """
+    from apps.drivers.services.metrics import update_driver_metrics
+
+    decline = redis_client.register_script(LUA_DECLINE)
+    try:
+        remaining = int(decline(keys=_keys(ride_id), args=[driver.id]))
+    except Exception as e:
+        # The round timer still closes the round
+        logger.warning(f"[Offers] Could not decline ride {ride_id}: {e}")
+        return False
+    if remaining < 0:
+        return False
+
+    with transaction.atomic():
+        update_driver_metrics(driver, "REJECTED")
+        ride = _lock_open_round(ride_id)
+        if ride is None:
+            status = (
+                Ride.objects.filter(id=ride_id).values_list("status", flat=True).first()
+            )
+            transaction.on_commit(
+                lambda: release_drivers(ride_id, [driver.id], status)
+            )
+            return True
+
+        if remaining == 0:
+            # Nobody left to answer: no point waiting for the round timer
+            _reopen(ride, sorted({driver.id, *_close_round(ride_id)}))
+            return True
+
+        rejected = ride.rejected_driver_ids or []
+        if driver.id not in rejected:
+            rejected.append(driver.id)
+        ride.rejected_driver_ids = rejected
+        ride.save(update_fields=["rejected_driver_ids"])
+        transaction.on_commit(
+            lambda: release_drivers(ride_id, [driver.id], ride.status)
+        )
+    return True
+
+
+def expire_offer_round(ride_id):
+    """OFFER_ROUND timer: nobody accepted in time."""
+    with transaction.atomic():
+        ride = _lock_open_round(ride_id)
+        if ride is None:
+            # Assigned, cancelled or closed early
+            return
+        driver_ids = _close_round(ride_id)
+        _reopen(ride, driver_ids)
+
+    logger.info(f"Ride {ride_id}: offer round expired for drivers {driver_ids}")
@@ -0,0 +1,93 @@
+# apps/rides/services/quote.py
+"""
+Signed fare quotes.
+
+EstimateFareView returns a quote token covering what it priced: the route
+polyline, distance, duration, surge and the price of every vehicle type.
+CreateRideView takes the token back and books at those numbers instead of
+routing and pricing the trip a second time.
+
+Tokens are signed with SECRET_KEY (django.core.signing), so a client cannot
+edit them, and are honoured for FARE_QUOTE_TTL seconds, so an old surge or
+price is never booked. A token only applies to the rider and the pickup/drop
+it was issued for. Any token that cannot be used is ignored and the ride is
+priced as if none was sent.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+
+from apps.common.metrics import FARE_QUOTE_TOKENS
+
+logger = logging.getLogger(__name__)
+
+QUOTE_SALT = "apps.rides.fare-quote"
+COORD_PLACES = 6  # ~0.1 m; absorbs float round trips through JSON
+
+
+def quote_ttl() -> int:
+    return int(getattr(settings, "FARE_QUOTE_TTL", 120))
+
+
+def _point(point: tuple) -> list:
+    return [round(float(point[0]), COORD_PLACES), round(float(point[1]), COORD_PLACES)]
+
+
+def issue_quote_token(rider_id: int, pickup: tuple, drop: tuple, quote: dict, polyline: str) -> str:
+    """Sign a quote_fares() result and its route for one rider."""
+    return signing.dumps(
+        {
+            "rider": rider_id,
+            "pickup": _point(pickup),
+            "drop": _point(drop),
+            "distance_km": float(quote["distance_km"]),
+            "duration_min": float(quote["duration_min"]),
+            "surge_multiplier": float(quote["surge_multiplier"]),
+            "prices": {vehicle_type: str(fare) for vehicle_type, fare in quote["prices"].items()},
+            "polyline": polyline,
+        },
+        salt=QUOTE_SALT,
+        compress=True,
+    )
+
+
+def read_quote_token(token: str, rider_id: int, pickup: tuple, drop: tuple, vehicle_type: str):
+    """
+    The quoted fare for vehicle_type, shaped like estimate_fare() output plus
+    "polyline", or None when the token is expired, forged or for another trip.
+    """
+    if not isinstance(token, str):
+        # e.g. a JSON number; signing.loads() would raise TypeError on it
+        FARE_QUOTE_TOKENS.labels(result="invalid").inc()
+        return None
+
+    try:
+        payload = signing.loads(token, salt=QUOTE_SALT, max_age=quote_ttl())
+    except signing.SignatureExpired:
+        FARE_QUOTE_TOKENS.labels(result="expired").inc()
+        return None
+    except signing.BadSignature:
+        logger.warning(f"[Quote] Rejected a tampered quote token from rider {rider_id}")
+        FARE_QUOTE_TOKENS.labels(result="invalid").inc()
+        return None
+
+    if (
+        payload["rider"] != rider_id
+        or payload["pickup"] != _point(pickup)
+        or payload["drop"] != _point(drop)
+        or vehicle_type not in payload["prices"]
+    ):
+        FARE_QUOTE_TOKENS.labels(result="mismatch").inc()
+        return None
+
+    FARE_QUOTE_TOKENS.labels(result="used").inc()
+    return {
+        "distance_km": round(payload["distance_km"], 2),
+        "duration_min": round(payload["duration_min"], 1),
+        "estimated_fare": Decimal(payload["prices"][vehicle_type]),
+        "surge_multiplier": payload["surge_multiplier"],
+        "polyline": payload["polyline"],
+    }
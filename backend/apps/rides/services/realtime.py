@@ -27,13 +27,8 @@ def broadcast_ride_update(ride_id: int, *, event: str, data: dict):
     )
 
 
-def buffer_ride_progress(ride_id: int, lat: float, lng: float, delta_km: float):
-    """
-    Buffers ride distance and GPS path in Redis to avoid Postgres write floods.
-    Highly scalable: Handles 100k+ concurrent drivers by offloading IO to Redis.
-    """
-    pipe = redis_client.pipeline()
-
+def queue_ride_progress(pipe, ride_id: int, lat: float, lng: float, delta_km: float):
+    """Queue the buffer_ride_progress writes onto a (sync or asyncio) pipeline."""
     # 1. Accumulate distance (using INCRBYFLOAT for atomic summation)
     if delta_km > 0:
         pipe.incrbyfloat(RIDE_DIST_KEY.format(ride_id), delta_km)
@@ -45,6 +40,14 @@ def buffer_ride_progress(ride_id: int, lat: float, lng: float, delta_km: float):
     pipe.expire(RIDE_DIST_KEY.format(ride_id), 86400)
     pipe.expire(RIDE_PATH_KEY.format(ride_id), 86400)
 
+
+def buffer_ride_progress(ride_id: int, lat: float, lng: float, delta_km: float):
+    """
+    Buffers ride distance and GPS path in Redis to avoid Postgres write floods.
+    Highly scalable: Handles 100k+ concurrent drivers by offloading IO to Redis.
+    """
+    pipe = redis_client.pipeline()
+    queue_ride_progress(pipe, ride_id, lat, lng, delta_km)
     pipe.execute()
 
 
@@ -1,15 +1,103 @@
 # apps/rides/services/surge.py
+"""
+Surge multipliers as seen by fare calculation.
 
+Multipliers only change when surge_engine.recompute_surge_grid() runs, so
+each process keeps the whole grid in memory rather than asking Redis on
+every estimate. The recompute pass stores the grid (surge:grid) and
+publishes it on surge:updates. A listener thread per process swaps each
+published grid in as it arrives.
+
+A grid older than SURGE_CACHE_MAX_AGE seconds is reloaded from surge:grid
+on the next lookup. That covers a lost message or a dead listener, so a
+cached multiplier is never older than that bound. Lookups are counted in
+uber_surge_cache_lookups_total{result=hit|miss}.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from apps.common.metrics import SURGE_CACHE_LOOKUPS
 from apps.common.redis import redis_client
 
-from .surge_engine import cell_id_from_lat_lng
+from .surge_engine import (
+    SURGE_GRID_KEY,
+    SURGE_MIN,
+    SURGE_UPDATES_CHANNEL,
+    cell_id_from_lat_lng,
+)
+
+logger = logging.getLogger(__name__)
+
+LISTENER_RETRY_SECONDS = 5
+
+
+def cache_max_age() -> float:
+    return float(getattr(settings, "SURGE_CACHE_MAX_AGE", 30))
+
+
+class _SurgeCache:
+    """The process's grid and its listener thread. Re-created after fork."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.grid = None
+        self.loaded_at = 0.0
+        self.thread = threading.Thread(target=self._listen, name="surge-cache", daemon=True)
+        self.thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(SURGE_UPDATES_CHANNEL)
+                # Updates published before the subscription took are in the key
+                self.reload()
+                for message in pubsub.listen():
+                    self.store(json.loads(message["data"]))
+            except Exception as e:
+                logger.debug(f"[Surge] Update listener disconnected: {e}")
+            time.sleep(LISTENER_RETRY_SECONDS)
+
+    def store(self, grid):
+        self.grid, self.loaded_at = grid, time.monotonic()
+
+    def reload(self):
+        raw = redis_client.get(SURGE_GRID_KEY)
+        self.store(json.loads(raw) if raw else {})
+
+    def get(self, cell_id: str) -> float:
+        if self.grid is None or time.monotonic() - self.loaded_at > cache_max_age():
+            SURGE_CACHE_LOOKUPS.labels(result="miss").inc()
+            self.reload()
+        else:
+            SURGE_CACHE_LOOKUPS.labels(result="hit").inc()
+        return float(self.grid.get(cell_id, SURGE_MIN))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
 
-SURGE_TTL = 60  # seconds
+def _get_cache():
+    global _cache
+    cache = _cache
+    if cache is None or cache.pid != os.getpid():
+        with _cache_lock:
+            if _cache is None or _cache.pid != os.getpid():
+                # A forked worker inherits the parent's grid but not its listener
+                _cache = _SurgeCache()
+            cache = _cache
+    return cache
 
 
 def get_surge_multiplier(cell_id: str) -> float:
-    value = redis_client.get(f"geo:{cell_id}:surge")
-    return float(value) if value else 1.0
+    return _get_cache().get(cell_id)
 
 
 def get_surge(lat: float, lng: float) -> float:
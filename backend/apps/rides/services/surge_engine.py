@@ -1,41 +1,184 @@
 # apps/rides/services/surge_engine.py
+"""
+Surge pricing on a hexagonal grid.
+
+Positions are binned into pointy-top hexagons with an edge of
+settings.SURGE_HEX_EDGE_M metres, laid over a sinusoidal (equal-area)
+projection, so every cell covers the same ground and has six equidistant
+neighbours. Cell ids are axial coordinates, "{q}:{r}".
+
+Demand (ride requests) is counted in time buckets of SURGE_BUCKET_SECONDS:
+
+    surge:demand:{bucket} -> {cell_id: count}
+
+Recording a request is one pipelined HINCRBY; nothing is recomputed inline.
+Buckets expire once they leave the SURGE_WINDOW_SECONDS sliding window, so
+counts cannot drift. Requests are counted once, when they are made, and are
+never subtracted: a ride that times out or is cancelled leaves the window
+with its bucket.
+
+Supply is not counted by callers. snapshot_supply() runs every
+SURGE_SUPPLY_INTERVAL seconds (beat) and bins the members of the live driver
+geo index (drivers:geo) that have a heartbeat and are ONLINE into cells:
+
+    surge:supply -> JSON {cell_id: drivers}
+
+The scan runs server-side in chunks and returns only geohash scores, which
+are decoded here, so no per-driver round trips are needed.
+
+recompute_surge_grid() runs every SURGE_RECOMPUTE_INTERVAL seconds (beat).
+It reads the demand window and the supply snapshot in one round trip and
+weights each demand bucket by its age (half-life SURGE_HALF_LIFE_SECONDS).
+Each cell's counts are then blended with its six neighbours'
+(SURGE_NEIGHBOUR_WEIGHT) so adjacent cells cannot price far apart. The
+surging cells are stored as one grid and pushed to every process's cache
+(services/surge.py):
+
+    surge:grid -> JSON {cell_id: multiplier}, cells at 1.0 omitted
+    PUBLISH surge:updates <same JSON>
+
+Without a supply snapshot nothing is written, so the grid expires and prices
+fall back to 1.0 rather than surging on zero supply.
+"""
+
+import json
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
 
 from apps.common.redis import redis_client
+from apps.drivers.redis import DRIVER_GEO_KEY
+
+logger = logging.getLogger(__name__)
 
 SURGE_MIN = 1.0
 SURGE_MAX = 3.0
-SURGE_TTL = 60  # seconds
+SURGE_TTL = 60  # seconds; refreshed by every recompute pass
+
+SURGE_GRID_KEY = "surge:grid"
+SURGE_UPDATES_CHANNEL = "surge:updates"
+
+# Below this much (decayed, smoothed) demand a cell never surges
+SURGE_MIN_DEMAND = 1.0
+
+DEMAND = "demand"
+
+SUPPLY_KEY = "surge:supply"
+SUPPLY_TTL = 60  # seconds; a stalled snapshot job stops pricing, not fakes it
+SUPPLY_SCAN_CHUNK = 2000  # geo members per script call
+
+# Geohash scores of live, ONLINE members of drivers:geo in [start, stop].
+# A driver without a state hash yet counts: it is in the index and alive.
+LUA_LIVE_SUPPLY = """
+local members = redis.call('ZRANGE', KEYS[1], ARGV[1], ARGV[2], 'WITHSCORES')
+local out = {}
+for i = 1, #members, 2 do
+    local id = members[i]
+    if redis.call('EXISTS', 'driver:' .. id .. ':last_seen') == 1 then
+        local status = redis.call('HGET', 'driver:' .. id .. ':state', 'status')
+        if not status or status == ARGV[3] then
+            out[#out + 1] = members[i + 1]
+        end
+    end
+end
+return out
+"""
+
+M_PER_DEG = 111_320.0
+SQRT3 = math.sqrt(3)
+
+# Redis GEO scores are 52-bit geohashes: latitude bits at even positions,
+# longitude bits at odd ones, 26 bits each
+GEO_LAT_MAX = 85.05112878
+GEO_STEP = 1 << 26
+
+# Axial offsets of the six neighbours of a hex
+NEIGHBOURS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+
+
+def hex_edge_m() -> float:
+    return float(getattr(settings, "SURGE_HEX_EDGE_M", 500))
+
+
+def bucket_seconds() -> int:
+    return int(getattr(settings, "SURGE_BUCKET_SECONDS", 60))
+
+
+def window_seconds() -> int:
+    return int(getattr(settings, "SURGE_WINDOW_SECONDS", 900))
+
+
+def half_life_seconds() -> float:
+    return float(getattr(settings, "SURGE_HALF_LIFE_SECONDS", 300))
+
+
+def neighbour_weight() -> float:
+    return float(getattr(settings, "SURGE_NEIGHBOUR_WEIGHT", 0.5))
+
+
+# ----------------------------
+# GRID
+# ----------------------------
+
+
+def hex_from_lat_lng(lat: float, lng: float) -> tuple:
+    """Axial (q, r) of the hex containing the point."""
+    edge = hex_edge_m()
+    y = lat * M_PER_DEG
+    x = lng * M_PER_DEG * math.cos(math.radians(lat))
+    return _hex_round((SQRT3 / 3 * x - y / 3) / edge, (2 / 3 * y) / edge)
+
+
+def _hex_round(q: float, r: float) -> tuple:
+    # Round in cube coordinates (q + r + s = 0), fixing the component
+    # with the largest rounding error
+    s = -q - r
+    rq, rr, rs = round(q), round(r), round(s)
+    dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+    if dq > dr and dq > ds:
+        rq = -rr - rs
+    elif dr > ds:
+        rr = -rq - rs
+    return int(rq), int(rr)
 
 
 def cell_id_from_lat_lng(lat: float, lng: float) -> str:
-    return f"{round(lat, 2)}:{round(lng, 2)}"
+    q, r = hex_from_lat_lng(lat, lng)
+    return f"{q}:{r}"
 
 
-def _clamp(value: float) -> float:
-    return max(SURGE_MIN, min(SURGE_MAX, value))
+def _squash(bits: int) -> int:
+    # Keep the even bits of a 52-bit value, packed into its low 26 bits
+    bits &= 0x5555555555555555
+    bits = (bits | (bits >> 1)) & 0x3333333333333333
+    bits = (bits | (bits >> 2)) & 0x0F0F0F0F0F0F0F0F
+    bits = (bits | (bits >> 4)) & 0x00FF00FF00FF00FF
+    bits = (bits | (bits >> 8)) & 0x0000FFFF0000FFFF
+    return (bits | (bits >> 16)) & 0x00000000FFFFFFFF
 
 
-def recompute_surge(cell_id: str):
-    """
-    Recalculates the surge multiplier for a given geo-cell based on demand and supply metrics.
-    """
-    demand = int(redis_client.get(f"geo:{cell_id}:demand") or 0)
-    supply = int(redis_client.get(f"geo:{cell_id}:supply") or 0)
+def lat_lng_from_geo_score(score) -> tuple:
+    """Centre of the geohash cell a drivers:geo score encodes."""
+    bits = int(float(score))
+    lat = -GEO_LAT_MAX + (_squash(bits) + 0.5) * (2 * GEO_LAT_MAX / GEO_STEP)
+    lng = -180.0 + (_squash(bits >> 1) + 0.5) * (360.0 / GEO_STEP)
+    return lat, lng
 
-    if supply <= 0:
-        surge = SURGE_MAX
-    else:
-        surge = demand / supply
 
-    surge = _clamp(surge)
+def neighbour_cell_ids(cell_id: str) -> list:
+    q, r = map(int, cell_id.split(":"))
+    return [f"{q + dq}:{r + dr}" for dq, dr in NEIGHBOURS]
 
-    redis_client.setex(
-        f"geo:{cell_id}:surge",
-        SURGE_TTL,
-        surge,
-    )
 
-    return surge
+def surge_multiplier(demand: float, supply: float) -> float:
+    if demand < SURGE_MIN_DEMAND:
+        return SURGE_MIN
+    if supply <= 0:
+        return SURGE_MAX
+    return round(max(SURGE_MIN, min(SURGE_MAX, demand / supply)), 2)
 
 
 # ----------------------------
@@ -43,21 +186,116 @@ def recompute_surge(cell_id: str):
 # ----------------------------
 
 
+def _bucket_key(kind: str, bucket: int) -> str:
+    return f"surge:{kind}:{bucket}"
+
+
+def _record(kind: str, cell_id: str, amount: int):
+    size = bucket_seconds()
+    key = _bucket_key(kind, int(time.time() // size))
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hincrby(key, cell_id, amount)
+    pipe.expire(key, window_seconds() + size)
+    pipe.execute()
+
+
 def increment_demand(cell_id: str):
-    redis_client.incr(f"geo:{cell_id}:demand")
-    recompute_surge(cell_id)
+    _record(DEMAND, cell_id, 1)
+
+
+# ----------------------------
+# SUPPLY
+# ----------------------------
 
 
-def decrement_demand(cell_id: str):
-    redis_client.decr(f"geo:{cell_id}:demand")
-    recompute_surge(cell_id)
+def snapshot_supply() -> dict:
+    """Bin every live, ONLINE driver of the geo index into cells and store it."""
+    from apps.drivers.models import Driver
+
+    members = redis_client.zcard(DRIVER_GEO_KEY)
+    script = redis_client.register_script(LUA_LIVE_SUPPLY)
+    pipe = redis_client.pipeline(transaction=False)
+    for start in range(0, members, SUPPLY_SCAN_CHUNK):
+        script(
+            keys=[DRIVER_GEO_KEY],
+            args=[start, start + SUPPLY_SCAN_CHUNK - 1, Driver.Status.ONLINE.value],
+            client=pipe,
+        )
+    chunks = pipe.execute() if members else []
+
+    supply = Counter(
+        cell_id_from_lat_lng(*lat_lng_from_geo_score(score))
+        for chunk in chunks
+        for score in chunk
+    )
+    redis_client.set(SUPPLY_KEY, json.dumps(supply), ex=SUPPLY_TTL)
+    return supply
+
+
+# ----------------------------
+# RECOMPUTE
+# ----------------------------
+
+
+def _read_counts(now: float) -> tuple:
+    """
+    ({cell: demand} over the window, decayed by age; {cell: supply} from the
+    latest snapshot, or None without one).
+    """
+    size = bucket_seconds()
+    current = int(now // size)
+    buckets = range(current, current - math.ceil(window_seconds() / size), -1)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for bucket in buckets:
+        pipe.hgetall(_bucket_key(DEMAND, bucket))
+    pipe.get(SUPPLY_KEY)
+    *rows, raw_supply = pipe.execute()
+
+    half_life = half_life_seconds()
+    demand = defaultdict(float)
+    for bucket, row in zip(buckets, rows):
+        weight = 0.5 ** ((current - bucket) * size / half_life)
+        for cell_id, count in row.items():
+            demand[cell_id] += int(count) * weight
+    return demand, json.loads(raw_supply) if raw_supply else None
+
+
+def compute_surge_grid(demand: dict, supply: dict) -> dict:
+    """
+    Multipliers for every cell with activity and for its neighbours, from
+    neighbour-smoothed demand and supply.
+    """
+    weight = neighbour_weight()
+    cells = set()
+    for cell_id in {*demand, *supply}:
+        cells.add(cell_id)
+        cells.update(neighbour_cell_ids(cell_id))
 
+    multipliers = {}
+    for cell_id in cells:
+        around = neighbour_cell_ids(cell_id)
+        d = max(demand.get(cell_id, 0.0), 0.0) + weight * sum(
+            max(demand.get(n, 0.0), 0.0) for n in around
+        )
+        s = max(supply.get(cell_id, 0.0), 0.0) + weight * sum(
+            max(supply.get(n, 0.0), 0.0) for n in around
+        )
+        multipliers[cell_id] = surge_multiplier(d, s)
+    return multipliers
 
-def increment_supply(cell_id: str):
-    redis_client.incr(f"geo:{cell_id}:supply")
-    recompute_surge(cell_id)
 
+def recompute_surge_grid(now: float = None) -> dict:
+    """One pass over all active cells; returns {cell_id: multiplier}."""
+    demand, supply = _read_counts(time.time() if now is None else now)
+    if supply is None:
+        logger.warning("Surge: no supply snapshot, skipping recompute")
+        return {}
+    multipliers = compute_surge_grid(demand, supply)
 
-def decrement_supply(cell_id: str):
-    redis_client.decr(f"geo:{cell_id}:supply")
-    recompute_surge(cell_id)
+    grid = json.dumps({c: m for c, m in multipliers.items() if m != SURGE_MIN})
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(SURGE_GRID_KEY, grid, ex=SURGE_TTL)
+    pipe.publish(SURGE_UPDATES_CHANNEL, grid)
+    pipe.execute()
+    return multipliers
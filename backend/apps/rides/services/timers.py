@@ -0,0 +1,159 @@
+# apps/rides/services/timers.py
+"""
+Durable per-ride timers in one Redis sorted set.
+
+    rides:timers -> {"{kind}:{ride_id}[:{arg}]": due_ms}
+
+Arming a timer is one ZADD (re-arming the same timer just moves it) and
+cancelling one ZREM, so nothing waits in a Celery worker's memory as a
+countdown task and pending timers survive worker restarts.
+
+fire_due_timers() runs every settings.RIDE_TIMER_TICK seconds (beat). It
+claims due members atomically and publishes one ordinary task per timer
+(match retries: one per dispatch cell unit), so timers fire in parallel on
+the workers and only due timers are ever read. Claimed members are pushed
+RIDE_TIMER_LEASE seconds ahead rather than removed, and only dropped once
+their task is published: a tick that dies mid-way loses nothing, the
+timers fire again after the lease. Handlers re-check the ride under a row
+lock, so a repeated fire is a no-op.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+
+from apps.common.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+TIMERS_KEY = "rides:timers"
+
+ACCEPT_TIMEOUT = "accept"  # (ride_id, driver_id) -> driver_accept_timeout
+NO_SHOW = "no_show"  # (ride_id,) -> check_no_show
+MATCH_RETRY = "retry"  # (ride_id,) -> dispatch.dispatch_retries, per cell
+OFFER_ROUND = "offer"  # (ride_id,) -> offer_round_timeout (services/offers.py)
+
+# Claim due timers by moving them to the lease deadline
+LUA_CLAIM_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[3], member)
+end
+return due
+"""
+
+# Drop a fired timer unless it was re-armed since it was claimed
+LUA_ACK = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('ZREM', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def _member(kind, *args):
+    return ":".join([kind, *map(str, args)])
+
+
+def match_retry_delay() -> float:
+    return float(getattr(settings, "RIDE_MATCH_RETRY_SECONDS", 15))
+
+
+def schedule_timer(kind, *args, delay, nx=False, client=None):
+    """Arm (or move) a timer to fire `delay` seconds from now."""
+    due_ms = int((time.time() + delay) * 1000)
+    (client or redis_client).zadd(TIMERS_KEY, {_member(kind, *args): due_ms}, nx=nx)
+
+
+def schedule_match_retry(*ride_ids):
+    """Arm MATCH_RETRY for rides a match attempt could not place."""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for ride_id in ride_ids:
+            schedule_timer(MATCH_RETRY, ride_id, delay=match_retry_delay(), client=pipe)
+        pipe.execute()
+    except Exception as e:
+        # retry_matching_for_searching_rides re-arms it
+        logger.warning(f"[Timers] Could not arm match retry for {ride_ids}: {e}")
+
+
+def cancel_timer(kind, *args):
+    try:
+        redis_client.zrem(TIMERS_KEY, _member(kind, *args))
+    except Exception as e:
+        # A stale timer only costs one no-op task
+        logger.warning(f"[Timers] Could not cancel {_member(kind, *args)}: {e}")
+
+
+def _handlers():
+    from apps.rides.tasks import (
+        check_no_show,
+        driver_accept_timeout,
+        offer_round_timeout,
+    )
+
+    return {
+        ACCEPT_TIMEOUT: lambda ride_id, driver_id: driver_accept_timeout.apply_async(
+            (ride_id, driver_id)
+        ),
+        NO_SHOW: lambda ride_id: check_no_show.apply_async((ride_id,)),
+        OFFER_ROUND: lambda ride_id: offer_round_timeout.apply_async((ride_id,)),
+    }
+
+
+def fire_due_timers() -> int:
+    """Publish the task of every due timer. Returns the number fired."""
+    batch = getattr(settings, "RIDE_TIMER_BATCH", 500)
+    lease_ms = int(getattr(settings, "RIDE_TIMER_LEASE", 30) * 1000)
+    from apps.rides.services.dispatch import dispatch_retries
+
+    claim = redis_client.register_script(LUA_CLAIM_DUE)
+    ack = redis_client.register_script(LUA_ACK)
+    handlers = _handlers()
+
+    def ack_all(members, lease_until) -> int:
+        pipe = redis_client.pipeline(transaction=False)
+        for member in members:
+            ack(keys=[TIMERS_KEY], args=[member, lease_until], client=pipe)
+        pipe.execute()
+        return len(members)
+
+    fired = 0
+    while True:
+        now_ms = int(time.time() * 1000)
+        lease_until = str(now_ms + lease_ms)
+        members = claim(keys=[TIMERS_KEY], args=[now_ms, batch, lease_until])
+
+        done, retries = [], {}
+        for member in members:
+            kind, *args = member.split(":")
+            if kind == MATCH_RETRY:
+                retries[int(args[0])] = member
+                continue
+            try:
+                handlers[kind](*map(int, args))
+            except Exception as e:
+                # Left leased: fires again once the lease runs out
+                logger.error(f"[Timers] Could not fire {member}: {e}")
+                continue
+            done.append(member)
+
+        if retries:
+            # Each unit is acked as soon as it is published, so a failure
+            # part-way only leaves the unpublished retries leased
+            def published(ride_ids, retries=retries, lease_until=lease_until):
+                nonlocal fired
+                fired += ack_all([retries.pop(i) for i in ride_ids], lease_until)
+
+            try:
+                dispatch_retries(list(retries), on_published=published)
+                # Left over: rides no longer SEARCHING, nothing to retry
+                done.extend(retries.values())
+            except Exception as e:
+                logger.error(f"[Timers] Could not dispatch {len(retries)} retries: {e}")
+
+        fired += ack_all(done, lease_until)
+
+        if len(members) < batch:
+            return fired
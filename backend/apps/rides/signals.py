@@ -1,24 +1,152 @@
+"""
+Ride change broadcasts to ride_{id}.
+
+A lifecycle step saves the same ride several times (transition_to, the
+lifecycle handlers, complete_ride, matching). Instead of serializing and
+pushing on every save, saves are gathered per ride and one ride_update is
+sent after the transaction commits, carrying the new status plus only the
+client-visible fields that changed:
+
+    {"ride": {"id", "status", <changed fields>}, "changed": [...]}
+
+Changes are measured against the values the ride was loaded with
+(Ride.from_db); a freshly created ride is sent in full. Outside a
+transaction on_commit runs immediately, i.e. one broadcast per save.
+"""
+
+import threading
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.db import connections, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from .models import Ride
 from .serializers import RideDetailSerializer
 
+# Never worth a push on their own
+SILENT_FIELDS = {"updated_at"}
 
-@receiver(post_save, sender=Ride)
-def ride_update_signal(sender, instance, created, **kwargs):
-    channel_layer = get_channel_layer()
-    serializer = RideDetailSerializer(instance)
+_local = threading.local()
+
+
+class _PendingRide:
+    __slots__ = ("instance", "baseline", "created", "update_fields")
+
+    def __init__(self, instance, created):
+        self.instance = instance
+        self.baseline = dict(getattr(instance, "_loaded_values", {}))
+        self.created = created
+        # None once any save wrote every field
+        self.update_fields = set()
+
+
+def _pending(using):
+    pending = getattr(_local, "rides", None)
+    if pending is None:
+        pending = _local.rides = {}
+    if pending and not connections[using].run_on_commit:
+        # Left over from a rolled-back transaction: nothing will flush it
+        pending.clear()
+    return pending
+
+
+def _loaded(instance):
+    """Current values of the concrete fields that are loaded (never the deferred ones)."""
+    return {
+        f.attname: instance.__dict__[f.attname]
+        for f in instance._meta.concrete_fields
+        if f.attname in instance.__dict__
+    }
+
+
+def _changed_fields(entry):
+    current = _loaded(entry.instance)
+    candidates = current if entry.update_fields is None else entry.update_fields
+    return [
+        attname
+        for attname in candidates
+        if attname in current
+        and (attname not in entry.baseline or entry.baseline[attname] != current[attname])
+    ]
+
+
+def _serialize(instance, fields, names):
+    """RideDetailSerializer output restricted to the given fields."""
+    data = {}
+    for name in names:
+        field = fields[name]
+        attribute = field.get_attribute(instance)
+        data[name] = None if attribute is None else field.to_representation(attribute)
+    return data
+
+
+def _payload(entry):
+    instance = entry.instance
+    if entry.created:
+        return {"ride": RideDetailSerializer(instance).data, "changed": None}
+
+    fields = RideDetailSerializer(instance).fields
+    field_names = {f.attname: f.name for f in instance._meta.concrete_fields}
+    names = {
+        field_names[attname]
+        for attname in _changed_fields(entry)
+        if field_names[attname] in fields
+    }
+    if "planned_route_polyline" in names:
+        names.add("polyline")
+    if not names - SILENT_FIELDS:
+        return None
+
+    changed = sorted(names)
+    return {
+        "ride": _serialize(instance, fields, ["id", "status", *changed]),
+        "changed": changed,
+    }
+
+
+def _flush(ride_id):
+    entry = getattr(_local, "rides", {}).pop(ride_id, None)
+    if entry is None:
+        # Already sent by an earlier callback of the same transaction
+        return
+
+    payload = _payload(entry)
+    # Later saves on this instance diff against what was just broadcast
+    instance = entry.instance
+    instance._loaded_values = _loaded(instance)
+    if payload is None:
+        return
 
-    # Send update to ride group
     # The 'type' here matches the method name 'ride_update' in RideConsumer
-    async_to_sync(channel_layer.group_send)(
+    async_to_sync(get_channel_layer().group_send)(
         f"ride_{instance.id}",
         {
             "type": "ride_update",
             "event": "ride_update",  # This becomes message.type sent to client
-            "data": {"ride": serializer.data},
+            "data": payload,
         },
     )
+
+
+@receiver(post_save, sender=Ride)
+def ride_update_signal(
+    sender, instance, created, update_fields=None, using="default", **kwargs
+):
+    pending = _pending(using)
+    entry = pending.get(instance.id)
+    if entry is None:
+        entry = pending[instance.id] = _PendingRide(instance, created)
+    entry.instance = instance
+
+    if update_fields is None or entry.update_fields is None:
+        entry.update_fields = None
+    else:
+        entry.update_fields.update(
+            instance._meta.get_field(name).attname for name in update_fields
+        )
+
+    # Registered per save so a savepoint rollback cannot drop the only callback;
+    # the first one to run sends, the rest find nothing pending.
+    transaction.on_commit(lambda: _flush(instance.id), using=using)
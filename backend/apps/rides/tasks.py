@@ -11,12 +11,6 @@ from apps.drivers.services.geo import add_driver_to_geo
 from apps.drivers.services.metrics import update_driver_metrics
 from apps.rides.models import Ride
 from apps.rides.services.no_show import handle_no_show
-from apps.rides.services.surge_engine import (
-    cell_id_from_lat_lng,
-    decrement_demand,
-    increment_demand,
-    increment_supply,
-)
 
 WAIT_TIME_MINUTES = 5
 
@@ -26,7 +20,8 @@ WAIT_TIME_MINUTES = 5
 # ============================================================
 @shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3})
 def driver_accept_timeout(self, ride_id: int, driver_id: int):
-    from apps.rides.services.matching import find_driver_and_offer_ride
+    from apps.rides.services.active_ride import notify_driver_ride_event
+    from apps.rides.services.dispatch import request_matching
 
     with transaction.atomic():
         ride = (
@@ -43,10 +38,6 @@ def driver_accept_timeout(self, ride_id: int, driver_id: int):
             return
 
         driver = Driver.objects.select_for_update().get(id=driver_id)
-        cell_id = cell_id_from_lat_lng(
-            ride.pickup_lat,
-            ride.pickup_lng,
-        )
 
         ride.driver = None
         ride.transition_to(Ride.Status.SEARCHING)
@@ -61,9 +52,6 @@ def driver_accept_timeout(self, ride_id: int, driver_id: int):
             update_fields=["driver", "status", "rejected_driver_ids", "updated_at"]
         )
 
-        increment_demand(cell_id)
-        increment_supply(cell_id)
-
         driver.status = Driver.Status.ONLINE
         driver.save(update_fields=["status"])
 
@@ -74,7 +62,18 @@ def driver_accept_timeout(self, ride_id: int, driver_id: int):
                 lng=driver.last_lng,
             )
 
-        transaction.on_commit(lambda: find_driver_and_offer_ride(ride.id))
+        transaction.on_commit(lambda: request_matching(ride.id))
+        transaction.on_commit(
+            lambda: notify_driver_ride_event(driver_id, ride.id, ride.status)
+        )
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3})
+def offer_round_timeout(self, ride_id: int):
+    """Nobody in a parallel offer round accepted in time."""
+    from apps.rides.services.offers import expire_offer_round
+
+    expire_offer_round(ride_id)
 
 
 # ============================================================
@@ -94,30 +93,101 @@ def check_no_show(self, ride_id: int):
         if timezone.now() < ride.arrived_at + timedelta(minutes=WAIT_TIME_MINUTES):
             return
 
-        cell_id = cell_id_from_lat_lng(
-            ride.pickup_lat,
-            ride.pickup_lng,
-        )
-
         handle_no_show(ride=ride)
 
         if ride.driver:
             update_driver_metrics(ride.driver, "NO_SHOW")
 
-        decrement_demand(cell_id)
-        increment_supply(cell_id)
+
+@shared_task
+def recompute_surge_grid():
+    """Reprice every active surge cell (apps/rides/services/surge_engine.py)."""
+    from apps.rides.services import surge_engine
+
+    return f"Recomputed surge for {len(surge_engine.recompute_surge_grid())} cells"
+
+
+@shared_task
+def snapshot_surge_supply():
+    """Rebuild surge supply from the live driver geo index."""
+    from apps.rides.services import surge_engine
+
+    return f"Snapshot {sum(surge_engine.snapshot_supply().values())} drivers"
+
+
+@shared_task
+def fire_ride_timers():
+    """Publish every due accept-timeout / offer-round / no-show / match-retry timer."""
+    from apps.rides.services.timers import fire_due_timers
+
+    return fire_due_timers()
 
 
 @shared_task
 def retry_matching_for_searching_rides():
     """
-    Periodic task to pick up rides that are stuck in SEARCHING state.
+    Backstop for rides stuck in SEARCHING state.
+
+    Retries are driven by per-ride MATCH_RETRY timers armed whenever a match
+    attempt finds nobody; this only re-arms a timer for SEARCHING rides that
+    have none (e.g. after Redis lost its data). Rides with a pending timer
+    keep it.
+    """
+    from apps.common.redis import redis_client
+    from apps.rides.services.timers import (
+        MATCH_RETRY,
+        match_retry_delay,
+        schedule_timer,
+    )
+
+    pipe = redis_client.pipeline(transaction=False)
+    ride_ids = Ride.objects.filter(status=Ride.Status.SEARCHING).values_list(
+        "id", flat=True
+    )
+    for ride_id in ride_ids.iterator():
+        schedule_timer(
+            MATCH_RETRY, ride_id, delay=match_retry_delay(), nx=True, client=pipe
+        )
+    pipe.execute()
+
+
+@shared_task(
+    bind=True,
+    acks_late=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 3},
+)
+def match_ride(self, ride_id: int):
+    """
+    Dispatch-worker entry point for a freshly committed SEARCHING ride.
+    acks_late: a worker crash mid-match redelivers the ride instead of losing it.
+    """
+    from apps.rides.services.dispatch import submit_for_matching
+
+    submit_for_matching(ride_id)
+
+
+@shared_task(acks_late=True)
+def retry_matching_unit(ride_ids):
+    """
+    Re-match one retry unit: waiting rides of a single dispatch cell, oldest
+    first. Published by the timer tick; units run concurrently.
+    """
+    from apps.rides.services.dispatch import retry_unit
+
+    retry_unit(ride_ids)
+
+
+@shared_task
+def dispatch_cell_batch(cell_id: str):
+    """
+    Fired once per dispatch window: assigns every ride pooled in the cell
+    during the window in a single optimization pass.
     """
-    from apps.rides.services.matching import find_driver_and_offer_ride
+    from apps.rides.services.dispatch import dispatch_cell
 
-    searching_rides = Ride.objects.filter(status=Ride.Status.SEARCHING)
-    for ride in searching_rides:
-        find_driver_and_offer_ride(ride.id)
+    return dispatch_cell(cell_id)
 
 
 @shared_task
@@ -13,11 +13,21 @@ from apps.common.idempotency import idempotent_request
 from apps.drivers.models import Driver, DriverStats
 from apps.rides.models import Ride
 from apps.rides.serializers import RideDetailSerializer
+from apps.rides.services.active_ride import notify_driver_ride_event
 from apps.rides.services.cancellation import cancel_ride
 from apps.rides.services.distance import get_planned_route
-from apps.rides.services.fare import estimate_fare
-from apps.rides.services.matching import find_driver_and_offer_ride
+from apps.rides.services.fare import estimate_fare, quote_fares
+from apps.rides.services.dispatch import request_matching
+from apps.rides.services.offers import (
+    CLAIMED,
+    NOT_OFFERED,
+    TAKEN,
+    assign_claimed_ride,
+    claim_offer,
+    decline_offer,
+)
 from apps.rides.services.otp import verify_and_consume_otp
+from apps.rides.services.quote import issue_quote_token, read_quote_token
 from apps.rides.services.surge_engine import cell_id_from_lat_lng, increment_demand
 from apps.users.permissions import IsDriver, IsRider
 
@@ -49,31 +59,22 @@ class EstimateFareView(APIView):
             drop_lat = float(request.data["drop_lat"])
             drop_lng = float(request.data["drop_lng"])
 
-            # 1. Get distance/duration ONCE
-            from apps.rides.services.distance import get_distance_and_duration
-            try:
-                dist_km, dur_min = get_distance_and_duration((pickup_lat, pickup_lng), (drop_lat, drop_lng))
-            except:
-                dist_km, dur_min = 5.0, 15.0
-
-            # 2. Estimate for ALL active configs
-            from apps.rides.fare_models import FareConfig
-            all_configs = FareConfig.objects.filter(is_active=True)
-            
-            prices_map = {}
-            for config in all_configs:
-                data = estimate_fare(
-                    (pickup_lat, pickup_lng), (drop_lat, drop_lng),
-                    vehicle_type=config.type,
-                    distance_km=dist_km,
-                    duration_min=dur_min
-                )
-                prices_map[config.type] = float(data["estimated_fare"])
+            # Route once; its polyline is shown and its distance / duration priced
+            route = get_planned_route((pickup_lat, pickup_lng), (drop_lat, drop_lng))
+
+            # Price ALL active vehicle types in one pass (one surge read)
+            quote = quote_fares(
+                (pickup_lat, pickup_lng),
+                (drop_lat, drop_lng),
+                distance_km=route["distance_km"],
+                duration_min=route["duration_min"],
+            )
+            prices_map = {
+                vehicle_type: float(fare) for vehicle_type, fare in quote["prices"].items()
+            }
 
             # Use 'go' or first available as the primary one for polyline/discount preview
             primary_fare = prices_map.get("go", list(prices_map.values())[0] if prices_map else 0)
-            
-            route = get_planned_route((pickup_lat, pickup_lng), (drop_lat, drop_lng))
 
             # --- Support Promo Code ---
             promo_code = request.data.get("promo_code")
@@ -92,10 +93,18 @@ class EstimateFareView(APIView):
                     "discount_applied": float(discount),
                     "final_estimate": float(primary_fare) - float(discount),
                     "prices": prices_map, # New map for UI
-                    "distance_km": float(dist_km),
-                    "duration_min": float(dur_min),
-                    "surge_multiplier": float(estimate_fare((pickup_lat, pickup_lng), (drop_lat, drop_lng), distance_km=dist_km, duration_min=dur_min)["surge_multiplier"]),
+                    "distance_km": float(quote["distance_km"]),
+                    "duration_min": float(quote["duration_min"]),
+                    "surge_multiplier": float(quote["surge_multiplier"]),
                     "polyline": route["polyline"],
+                    # Sent back to CreateRideView to book at these prices
+                    "quote_token": issue_quote_token(
+                        request.user.id,
+                        (pickup_lat, pickup_lng),
+                        (drop_lat, drop_lng),
+                        quote,
+                        route["polyline"],
+                    ),
                 }
             )
         except Exception as e:
@@ -124,15 +133,19 @@ class CreateRideView(APIView):
                 return Response({"error": "Coordinates out of bounds"}, status=400)
 
             vehicle_type = request.data.get("vehicle_type", "go")
-            fare_data = estimate_fare(
-                (coords["pickup_lat"], coords["pickup_lng"]),
-                (coords["drop_lat"], coords["drop_lng"]),
-                vehicle_type,
-            )
-            route = get_planned_route(
-                (coords["pickup_lat"], coords["pickup_lng"]),
-                (coords["drop_lat"], coords["drop_lng"]),
+            pickup = (coords["pickup_lat"], coords["pickup_lng"])
+            drop = (coords["drop_lat"], coords["drop_lng"])
+
+            # A valid quote from EstimateFareView already has the route and price
+            quote_token = request.data.get("quote_token")
+            fare_data = quote_token and read_quote_token(
+                quote_token, request.user.id, pickup, drop, vehicle_type
             )
+            if fare_data:
+                route = {"polyline": fare_data["polyline"]}
+            else:
+                fare_data = estimate_fare(pickup, drop, vehicle_type)
+                route = get_planned_route(pickup, drop)
         except (KeyError, ValueError, TypeError) as e:
             logger.error(f"Ride creation input validation failed: {str(e)} | Data: {request.data}")
             return Response({"error": f"Invalid coordinates or missing fields: {e!s}"}, status=400)
@@ -146,7 +159,7 @@ class CreateRideView(APIView):
                 self._apply_promo(ride, request.data.get("promo_code"))
                 increment_demand(cell_id_from_lat_lng(coords["pickup_lat"], coords["pickup_lng"]))
                 self._broadcast_ride_created(ride)
-                transaction.on_commit(lambda: find_driver_and_offer_ride(ride.id))
+                transaction.on_commit(lambda: request_matching(ride.id))
 
             serializer = RideDetailSerializer(ride)
             return Response(serializer.data, status=201)
@@ -390,15 +403,28 @@ class AcceptRideView(APIView):
                 f"AcceptRideView: Ride {ride_id} current status={ride_exists.status}, driver_id={ride_exists.driver_id}"
             )
 
+        # Parallel offer rounds: only the first accept may go on to the row lock
+        driver = getattr(request.user, "driver", None)
+        claim = claim_offer(ride_id, driver.id) if driver else NOT_OFFERED
+        if claim == TAKEN:
+            return Response(
+                {"error": "Ride was accepted by another driver"}, status=409
+            )
+
         with transaction.atomic():
-            # Use filter().first() instead of get_object_or_404 to provide better error messages
-            ride = (
-                Ride.objects.select_for_update()
-                .filter(
-                    id=ride_id, driver__user=request.user, status=Ride.Status.OFFERED
+            if claim == CLAIMED:
+                ride = assign_claimed_ride(ride_id, driver)
+            else:
+                # Use filter().first() instead of get_object_or_404 to provide better error messages
+                ride = (
+                    Ride.objects.select_for_update()
+                    .filter(
+                        id=ride_id,
+                        driver__user=request.user,
+                        status=Ride.Status.OFFERED,
+                    )
+                    .first()
                 )
-                .first()
-            )
 
             if not ride:
                 # If we are here, it means the query above failed.
@@ -425,7 +451,7 @@ class AcceptRideView(APIView):
 
             from apps.rides.services.lifecycle import update_ride_status
 
-            update_ride_status(ride, Ride.Status.ASSIGNED)
+            update_ride_status(ride, Ride.Status.ASSIGNED, driver=driver)
 
             # Track accepted ride for metrics
             from apps.drivers.services.metrics import update_driver_metrics
@@ -457,6 +483,13 @@ class RejectRideView(APIView):
                 .first()
             )
 
+            driver = getattr(request.user, "driver", None)
+            if not ride and driver and decline_offer(ride_id, driver):
+                logger.info(
+                    f"RejectRideView: Driver {driver.id} declined offer round of ride {ride_id}"
+                )
+                return Response({"status": "REJECTED"})
+
             if not ride:
                 logger.warning(
                     f"RejectRideView: Ride {ride_id} not eligible for rejection by User {request.user.id}"
@@ -480,7 +513,10 @@ class RejectRideView(APIView):
                 update_fields=["driver", "status", "rejected_driver_ids", "updated_at"]
             )
 
-            transaction.on_commit(lambda: find_driver_and_offer_ride(ride.id))
+            transaction.on_commit(lambda: request_matching(ride.id))
+            transaction.on_commit(
+                lambda: notify_driver_ride_event(driver.id, ride.id, ride.status)
+            )
 
         logger.info(f"RejectRideView: Driver {driver.id} rejected ride {ride.id}")
         return Response({"status": "REJECTED"})
@@ -677,6 +713,9 @@ class MarkNoShowView(APIView):
             driver = ride.driver
             driver.status = Driver.Status.ONLINE
             driver.save(update_fields=["status"])
+            transaction.on_commit(
+                lambda: notify_driver_ride_event(driver.id, ride.id, ride.status)
+            )
 
         return Response({"status": ride.status})
 
@@ -745,6 +784,12 @@ class UpdateDestinationView(APIView):
                 ride.drop_lng = float(drop_lng)
                 # In a real app, we'd recalculate fare and route here
                 ride.save(update_fields=["drop_lat", "drop_lng", "updated_at"])
+                if ride.driver_id:
+                    transaction.on_commit(
+                        lambda: notify_driver_ride_event(
+                            ride.driver_id, ride.id, ride.status
+                        )
+                    )
 
             logger.info(f"Ride {ride.id} destination updated to ({drop_lat}, {drop_lng})")
             return Response({"status": "UPDATED", "drop_lat": ride.drop_lat, "drop_lng": ride.drop_lng})
@@ -9,26 +9,43 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 
 logger = logging.getLogger(__name__)
 
+from apps.admin_dashboard.tiles import tile_group_for
+from apps.common.loop_monitor import ensure_loop_monitor
+from apps.common.metrics import WS_DRIVER_LOCATION_SOCKETS
+from apps.common.redis import get_async_redis_client
 from apps.drivers.redis import (
-    get_driver_last_point,
-    redis_client,
-    set_driver_last_point,
-    update_driver_location,
+    queue_driver_last_point,
+    queue_driver_location,
+    read_ping_state,
 )
 from apps.rides.models import Ride
-from apps.rides.services.realtime import buffer_ride_progress
+from apps.rides.services.active_ride import ACTIVE_RIDE_STATUSES, load_active_ride
+from apps.rides.services.realtime import queue_ride_progress
 from apps.tracking.geo import (
+    DEVIATION_THRESHOLD_METERS,
     accumulate_distance,
-    decode_route,
     is_deviated,
-    snap_to_route,
 )
+from apps.tracking.route_index import get_route_index
 from apps.tracking.smoothing import smooth
 
 
+HEARTBEAT_TTL = 300
+
+
 class DriverLocationConsumer(AsyncWebsocketConsumer):
+    """
+    Driver GPS socket. All Redis I/O goes through the pooled asyncio client:
+    a location ping costs one read pipeline and one write pipeline, and
+    never parks a thread-pool worker.
+
+    The driver's current ride is held in connection state. The socket joins
+    driver_{id}_rides and re-reads Postgres only on connect and after a
+    lifecycle event there, so steady-state pings issue no SQL reads.
+    """
 
     async def connect(self):
+        ensure_loop_monitor()
         user = self.scope.get("user")
         if not await self._authenticate_driver(user):
             return
@@ -42,7 +59,10 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
 
         await self._enforce_single_session()
         await self._sync_driver_status_online()
+        await self.channel_layer.group_add(self.rides_group, self.channel_name)
         await self.accept()
+        self.counted = True
+        WS_DRIVER_LOCATION_SOCKETS.inc()
         logger.info(f"[LocationSocket] ✅ Connected: Driver {self.driver.id}")
         await self._broadcast_initial_location()
 
@@ -62,23 +82,34 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
         self.last_ping_ts = None
         self.last_deviation_alert_ts = 0
         self.last_admin_broadcast_ts = 0
+        self.route_hint = None  # (ride_id, last matched segment)
+        self.counted = False
+        self.redis = get_async_redis_client()
+        self.rides_group = f"driver_{driver.id}_rides"
+        self.active_ride = None
+        self.active_ride_stale = True  # load on first use
         return True
 
     async def _enforce_single_session(self):
         session_key = f"driver_socket:{self.driver.id}"
-        old_channel = redis_client.get(session_key)
+        old_channel = await self.redis.get(session_key)
         if old_channel and old_channel != self.channel_name:
             logger.info(f"[LocationSocket] Evicting old session {old_channel} for Driver {self.driver.id}")
             await self.channel_layer.send(old_channel, {"type": "force_disconnect", "reason": "new_login"})
-        redis_client.set(session_key, self.channel_name, ex=3600)
+        await self.redis.set(session_key, self.channel_name, ex=3600)
 
     async def _sync_driver_status_online(self):
-        redis_client.set(f"driver:{self.driver.id}:last_seen", int(time.time()), ex=300)
+        await self.redis.set(
+            f"driver:{self.driver.id}:last_seen", int(time.time()), ex=HEARTBEAT_TTL
+        )
         self.driver = await self._get_driver(self.scope.get("user"))
         if self.driver.status == "OFFLINE":
             def _sync():
                 from apps.drivers.models import Driver
+                from apps.drivers.services.state import update_driver_state
                 Driver.objects.filter(id=self.driver.id).update(status="ONLINE")
+                # .update() bypasses post_save — keep the read model in step
+                update_driver_state(self.driver.id, status="ONLINE")
             await database_sync_to_async(_sync)()
             self.driver.status = "ONLINE"
 
@@ -86,13 +117,18 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
         if self.driver.last_lat and self.driver.last_lng:
             ride = await self._get_active_ride()
             admin_data = self._build_broadcast_data(ride, float(self.driver.last_lat), float(self.driver.last_lng), {}, None)
-            await self.channel_layer.group_send("admin_live_map", {"type": "driver_location_updated", "data": admin_data})
+            await self.channel_layer.group_send(
+                tile_group_for(admin_data["lat"], admin_data["lng"]),
+                {"type": "driver_location_updated", "data": admin_data},
+            )
 
     async def receive(self, text_data):
         data = json.loads(text_data)
-        redis_client.set(f"driver:{self.driver.id}:last_seen", int(time.time()), ex=300)
 
         if data.get("type") == "ping":
+            await self.redis.set(
+                f"driver:{self.driver.id}:last_seen", int(time.time()), ex=HEARTBEAT_TTL
+            )
             await self.send(json.dumps({"type": "pong", "ts": int(time.time())}))
             return
 
@@ -104,14 +140,12 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
 
         from apps.tracking.services import LocationProcessor
         if LocationProcessor.filter_noisy_ping(accuracy_m):
-            await database_sync_to_async(update_driver_location)(self.driver.id, raw_lat, raw_lng)
+            await self._persist_location(raw_lat, raw_lng)
             return
 
         final_lat, final_lng = await LocationProcessor.get_snapped_coords(raw_lat, raw_lng, self.last_seq)
-        await self._persist_location(final_lat, final_lng)
-
         ride = await self._get_active_ride()
-        eta_min = await self._process_ride_location(ride, final_lat, final_lng) if ride else None
+        eta_min = await self._persist_location(final_lat, final_lng, ride)
 
         await self._broadcast_location(ride, final_lat, final_lng, data, eta_min)
         await self.send(json.dumps({"type": "location_sync", "lat": final_lat, "lng": final_lng, "eta": eta_min}))
@@ -122,30 +156,55 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
         self.last_seq = seq
         return True
 
-    async def _persist_location(self, lat, lng):
-        await database_sync_to_async(update_driver_location)(self.driver.id, lat, lng)
-        if self.last_seq % 10 == 0:
-            await self._update_driver_db(lat, lng)
+    async def _persist_location(self, lat, lng, ride=None):
+        """
+        Read pipeline (velocity meta, last accumulated point) → decide in
+        Python → write pipeline (heartbeat, GEO position, ride progress).
+        Postgres gets the position from the write-behind flusher.
+        Returns the ETA when a ride is active.
+        """
+        track_distance = ride is not None and ride.status == Ride.Status.ONGOING
+        meta, prev_point = await read_ping_state(
+            self.redis, self.driver.id, with_last_point=track_distance
+        )
+
+        now = int(time.time())
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(f"driver:{self.driver.id}:last_seen", now, ex=HEARTBEAT_TTL)
+        queue_driver_location(pipe, self.driver.id, lat, lng, meta, now)
+        eta_min = (
+            await self._process_ride_location(ride, lat, lng, pipe, prev_point)
+            if ride
+            else None
+        )
+        await pipe.execute()
+        return eta_min
 
-    async def _process_ride_location(self, ride, lat, lng):
+    async def _process_ride_location(self, ride, lat, lng, pipe, prev_point):
         from apps.tracking.services import LocationProcessor
         if ride.planned_route_polyline:
-            route = decode_route(ride.planned_route_polyline)
-            snapped, deviation_m = snap_to_route(lat, lng, route)
-            if not is_deviated(deviation_m):
-                lat, lng = smooth(self.prev_point, snapped)
+            route = get_route_index(ride.planned_route_polyline)
+            hint_ride, hint = self.route_hint or (None, None)
+            match = route.snap(
+                lat,
+                lng,
+                hint=hint if hint_ride == ride.id else None,
+                threshold_m=DEVIATION_THRESHOLD_METERS,
+            )
+            self.route_hint = (ride.id, match.segment)
+            if not is_deviated(match.distance_m):
+                lat, lng = smooth(self.prev_point, match.point)
             elif time.time() - self.last_deviation_alert_ts > 30:
-                await self._send_deviation_alert(ride, lat, lng, deviation_m)
+                await self._send_deviation_alert(ride, lat, lng, match.distance_m)
 
         if ride.status == Ride.Status.ONGOING:
             now_ts = time.time()
             elapsed = (now_ts - self.last_ping_ts) if self.last_ping_ts else 0
             self.last_ping_ts = now_ts
-            prev = await database_sync_to_async(get_driver_last_point)(self.driver.id)
-            delta_km = accumulate_distance(prev, (lat, lng))
+            delta_km = accumulate_distance(prev_point, (lat, lng))
             if not LocationProcessor.detect_fraud(ride, delta_km, elapsed):
-                buffer_ride_progress(ride.id, lat, lng, delta_km)
-                await database_sync_to_async(set_driver_last_point)(self.driver.id, lat, lng)
+                queue_ride_progress(pipe, ride.id, lat, lng, delta_km)
+                queue_driver_last_point(pipe, self.driver.id, lat, lng)
 
         return LocationProcessor.calculate_eta(ride, lat, lng)
 
@@ -155,15 +214,6 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
         if ride:
             await self._broadcast_to_rider(ride.id, lat, lng, data, eta_min)
 
-    async def _update_driver_db(self, lat, lng):
-        from django.utils import timezone
-
-        from apps.drivers.models import Driver
-
-        await database_sync_to_async(Driver.objects.filter(id=self.driver.id).update)(
-            last_lat=lat, last_lng=lng, updated_at=timezone.now()
-        )
-
     async def _send_deviation_alert(self, ride, lat, lng, deviation_m):
         self.last_deviation_alert_ts = time.time()
         await self.channel_layer.group_send(
@@ -205,8 +255,10 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
         now = time.time()
         if now - self.last_admin_broadcast_ts >= 1.0:
             self.last_admin_broadcast_ts = now
+            # Only admins viewing this tile receive it (see admin_dashboard.tiles)
             await self.channel_layer.group_send(
-                "admin_live_map", {"type": "driver_location_updated", "data": data}
+                tile_group_for(data["lat"], data["lng"]),
+                {"type": "driver_location_updated", "data": data},
             )
 
     async def _broadcast_to_rider(self, ride_id, lat, lng, data, eta_min):
@@ -238,13 +290,16 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, code):
         """Notify admin live map so the driver marker can be removed."""
         if hasattr(self, "driver"):
-            # ── Session Cleanup ──
-            from apps.drivers.redis import redis_client
+            if self.counted:
+                WS_DRIVER_LOCATION_SOCKETS.dec()
+                self.counted = False
+            await self.channel_layer.group_discard(self.rides_group, self.channel_name)
 
+            # ── Session Cleanup ──
             session_key = f"driver_socket:{self.driver.id}"
-            current_channel = redis_client.get(session_key)
+            current_channel = await self.redis.get(session_key)
             if current_channel == self.channel_name:
-                redis_client.delete(session_key)
+                await self.redis.delete(session_key)
 
             await self.channel_layer.group_send(
                 "admin_live_map",
@@ -274,18 +329,32 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
         except Exception:
             return None
 
-    @database_sync_to_async
-    def _get_active_ride(self):
-        return (
-            Ride.objects.filter(
-                driver=self.driver,
-                status__in=[
-                    Ride.Status.OFFERED,
-                    Ride.Status.ASSIGNED,
-                    Ride.Status.ARRIVED,
-                    Ride.Status.ONGOING,
-                ],
+    # ── Ride lifecycle events (driver_{id}_rides) ─────────────────────
+
+    async def ride_offer(self, event):
+        self._ride_changed(event.get("data", {}).get("ride_id"))
+
+    async def ride_assigned(self, event):
+        self._ride_changed(event.get("data", {}).get("ride_id"))
+
+    async def ride_cancelled(self, event):
+        self._ride_changed(event.get("data", {}).get("ride_id"), Ride.Status.CANCELLED)
+
+    async def ride_status_update(self, event):
+        self._ride_changed(event.get("ride_id"), event.get("status"))
+
+    def _ride_changed(self, ride_id, status=None):
+        if status and status not in ACTIVE_RIDE_STATUSES:
+            # Finished / released: drop it without a query
+            if self.active_ride and self.active_ride.id == ride_id:
+                self.active_ride = None
+            return
+        self.active_ride_stale = True
+
+    async def _get_active_ride(self):
+        if self.active_ride_stale:
+            self.active_ride = await database_sync_to_async(load_active_ride)(
+                self.driver.id
             )
-            .select_related("rider")
-            .first()
-        )
+            self.active_ride_stale = False
+        return self.active_ride
@@ -47,17 +47,20 @@ class DriverRidesConsumer(AsyncWebsocketConsumer):
         # Standardize with LocationSocket to prevent discovery gaps
         import time
 
-        from apps.drivers.redis import redis_client
+        from apps.common.redis import get_async_redis_client
 
         heartbeat_key = f"driver:{driver.id}:last_seen"
-        redis_client.set(heartbeat_key, int(time.time()), ex=300)
+        await get_async_redis_client().set(heartbeat_key, int(time.time()), ex=300)
 
         if driver.status == "OFFLINE":
 
             def _sync_status():
                 from apps.drivers.models import Driver
+                from apps.drivers.services.state import update_driver_state
 
                 Driver.objects.filter(id=driver.id).update(status="ONLINE")
+                # .update() bypasses post_save — keep the read model in step
+                update_driver_state(driver.id, status="ONLINE")
 
             await database_sync_to_async(_sync_status)()
             driver.status = "ONLINE"
@@ -6,6 +6,7 @@ import time
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from apps.admin_dashboard.tiles import tile_group_for
 from apps.drivers.redis_rider import get_rider_last_point, update_rider_location
 from apps.rides.models import Ride
 
@@ -147,7 +148,7 @@ class RiderTrackingConsumer(AsyncWebsocketConsumer):
 
                     if is_active:
                         await self.channel_layer.group_send(
-                            "admin_live_map",
+                            tile_group_for(lat, lng),
                             {
                                 "type": "rider_location_updated",
                                 "data": {
@@ -256,16 +257,21 @@ class RiderTrackingConsumer(AsyncWebsocketConsumer):
         data = event.get("data", {})
         ride_data = data.get("ride", {})
 
+        # Updates carry only the fields that changed; don't null out the rest
+        payload = {"status": ride_data.get("status")}
+        for key, source in (
+            ("otp_code", "otp_code"),
+            ("polyline", "planned_route_polyline"),
+            ("driver", "driver"),
+        ):
+            if source in ride_data:
+                payload[key] = ride_data[source]
+
         await self.send(
             text_data=json.dumps(
                 {
                     "type": "RIDE_STATUS_UPDATED",
-                    "payload": {
-                        "status": ride_data.get("status"),
-                        "otp_code": ride_data.get("otp_code"),
-                        "polyline": ride_data.get("planned_route_polyline"),
-                        "driver": ride_data.get("driver"),
-                    },
+                    "payload": payload,
                 }
             )
         )
@@ -27,52 +27,6 @@ def haversine_m(lat1, lng1, lat2, lng2):
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
-def p_to_segment_dist(p_lat, p_lng, a_lat, a_lng, b_lat, b_lng):
-    """
-    Returns the minimum distance from point P to line segment AB.
-    Uses projection. For simplicity at small scales, we treat as Cartesian.
-    """
-    # Convert to roughly consistent meters for vector math
-    # 1 deg lat is ~111km, 1 deg lng at 13 deg N is ~108km
-    px, py = p_lng * 108000, p_lat * 111000
-    ax, ay = a_lng * 108000, a_lat * 111000
-    bx, by = b_lng * 108000, b_lat * 111000
-
-    dx, dy = bx - ax, by - ay
-    if dx == 0 and dy == 0:
-        return haversine_m(p_lat, p_lng, a_lat, a_lng)
-
-    t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)
-    t = max(0, min(1, t))
-
-    snap_lat = a_lat + t * (b_lat - a_lat)
-    snap_lng = a_lng + t * (b_lng - a_lng)
-
-    return haversine_m(p_lat, p_lng, snap_lat, snap_lng), (snap_lat, snap_lng)
-
-
-def snap_to_route(lat, lng, route_points):
-    """
-    Finds the closest point on the polyline (checking segments) to the given coordinate.
-    """
-    if not route_points:
-        return (lat, lng), 0.0
-
-    min_dist = float("inf")
-    closest_point = (lat, lng)
-
-    for i in range(len(route_points) - 1):
-        a = route_points[i]
-        b = route_points[i + 1]
-        dist, snapped = p_to_segment_dist(lat, lng, a[0], a[1], b[0], b[1])
-
-        if dist < min_dist:
-            min_dist = dist
-            closest_point = snapped
-
-    return closest_point, min_dist
-
-
 def is_deviated(distance_m):
     return distance_m > DEVIATION_THRESHOLD_METERS
 
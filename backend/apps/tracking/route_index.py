@@ -0,0 +1,211 @@
+# apps/tracking/route_index.py
+"""
+Per-ride route artifact for map-matching.
+
+Rather than decoding the polyline and scanning every segment on every ping,
+a RouteIndex is built once per planned route and shared by every caller in
+the process (location socket, HTTP location path, deviation checks):
+
+  1. Projection   — points projected once to a local equirectangular plane
+     (metres), so per-ping math is plain 2D vector arithmetic.
+  2. Cumulative   — distance along the route at each vertex, so a snap also
+     yields progress / remaining distance.
+  3. Grid index   — uniform grid of GRID_CELL_M cells → segment ids whose
+     bounding box touches the cell. Nearest-segment search expands ring by
+     ring around the ping and stops once no unvisited cell can beat the best
+     match.
+
+snap() first searches outward from the last matched segment (hint) along
+the route; only when that misses the deviation threshold does it fall back
+to the grid. Either way the work per ping depends on local route density,
+not on route length.
+"""
+
+import math
+from functools import lru_cache
+from typing import NamedTuple
+
+import polyline
+
+M_PER_DEG_LAT = 111_320.0
+GRID_CELL_M = 250.0
+HINT_AHEAD_M = 500.0  # how far forward from the last segment to look first
+HINT_BEHIND_M = 100.0  # GPS jitter can place the driver slightly behind
+ROUTE_CACHE_SIZE = 512
+
+
+class Snap(NamedTuple):
+    point: tuple  # (lat, lng) on the route
+    distance_m: float  # ping → route
+    segment: int  # index of the matched segment (hint for the next ping)
+    along_m: float  # distance travelled along the route at the snap point
+
+
+class RouteIndex:
+    def __init__(self, points):
+        self.points = [(float(lat), float(lng)) for lat, lng in points]
+        n = len(self.points)
+
+        lat0 = sum(p[0] for p in self.points) / n if n else 0.0
+        self._lat0 = lat0
+        self._lng0 = self.points[0][1] if n else 0.0
+        self._kx = M_PER_DEG_LAT * math.cos(math.radians(lat0))
+
+        self.xy = [self._project(lat, lng) for lat, lng in self.points]
+
+        self.cumulative = [0.0] * n
+        for i in range(1, n):
+            (x1, y1), (x2, y2) = self.xy[i - 1], self.xy[i]
+            self.cumulative[i] = self.cumulative[i - 1] + math.hypot(
+                x2 - x1, y2 - y1
+            )
+
+        self.grid = {}
+        for seg in range(n - 1):
+            (x1, y1), (x2, y2) = self.xy[seg], self.xy[seg + 1]
+            x_cells = range(self._cell(min(x1, x2)), self._cell(max(x1, x2)) + 1)
+            y_cells = range(self._cell(min(y1, y2)), self._cell(max(y1, y2)) + 1)
+            for cx in x_cells:
+                for cy in y_cells:
+                    self.grid.setdefault((cx, cy), []).append(seg)
+
+        cells = list(self.grid) or [(0, 0)]
+        self._bounds = (
+            min(c[0] for c in cells),
+            max(c[0] for c in cells),
+            min(c[1] for c in cells),
+            max(c[1] for c in cells),
+        )
+
+    @classmethod
+    def from_polyline(cls, polyline_str):
+        return cls(polyline.decode(polyline_str))
+
+    @property
+    def length_m(self) -> float:
+        return self.cumulative[-1] if self.cumulative else 0.0
+
+    # ─── projection helpers ──────────────────────────────────────────────────
+
+    def _project(self, lat, lng):
+        return ((lng - self._lng0) * self._kx, (lat - self._lat0) * M_PER_DEG_LAT)
+
+    def _unproject(self, x, y):
+        return (self._lat0 + y / M_PER_DEG_LAT, self._lng0 + x / self._kx)
+
+    @staticmethod
+    def _cell(v):
+        return math.floor(v / GRID_CELL_M)
+
+    def _segment_dist(self, seg, px, py):
+        """(distance_m, t) from projected point to segment seg."""
+        (ax, ay), (bx, by) = self.xy[seg], self.xy[seg + 1]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        t = 0.0
+        if length_sq:
+            t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+        return math.hypot(px - (ax + t * dx), py - (ay + t * dy)), t
+
+    # ─── search ──────────────────────────────────────────────────────────────
+
+    def _hint_search(self, hint, px, py):
+        """Walk outward along the route from the last matched segment."""
+        best = (math.inf, hint, 0.0)
+        origin = self.cumulative[hint]
+
+        last_seg = len(self.points) - 2
+
+        seg = hint
+        while seg <= last_seg and self.cumulative[seg] - origin <= HINT_AHEAD_M:
+            d, t = self._segment_dist(seg, px, py)
+            if d < best[0]:
+                best = (d, seg, t)
+            seg += 1
+
+        seg = hint - 1
+        while seg >= 0 and origin - self.cumulative[seg + 1] <= HINT_BEHIND_M:
+            d, t = self._segment_dist(seg, px, py)
+            if d < best[0]:
+                best = (d, seg, t)
+            seg -= 1
+
+        return best
+
+    def _ring_cells(self, cx, cy, ring):
+        """Cells at Chebyshev distance `ring` from (cx, cy), clipped to the grid."""
+        min_x, max_x, min_y, max_y = self._bounds
+        if ring == 0:
+            yield cx, cy
+            return
+        x_lo, x_hi = max(cx - ring, min_x), min(cx + ring, max_x)
+        for gy in (cy - ring, cy + ring):
+            if min_y <= gy <= max_y:
+                for gx in range(x_lo, x_hi + 1):
+                    yield gx, gy
+        y_lo, y_hi = max(cy - ring + 1, min_y), min(cy + ring - 1, max_y)
+        for gx in (cx - ring, cx + ring):
+            if min_x <= gx <= max_x:
+                for gy in range(y_lo, y_hi + 1):
+                    yield gx, gy
+
+    def _grid_search(self, px, py):
+        """Exact nearest segment: expand rings of cells until none can win."""
+        best = (math.inf, 0, 0.0)
+        seen = set()
+        cx, cy = self._cell(px), self._cell(py)
+        min_x, max_x, min_y, max_y = self._bounds
+
+        # Pings outside the grid start at the first ring that reaches it
+        first_ring = max(min_x - cx, cx - max_x, min_y - cy, cy - max_y, 0)
+        last_ring = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy, 0)
+
+        for ring in range(first_ring, last_ring + 1):
+            # Every cell in this ring is at least (ring - 1) cells away
+            if best[0] <= (ring - 1) * GRID_CELL_M:
+                break
+            for cell in self._ring_cells(cx, cy, ring):
+                for seg in self.grid.get(cell, ()):
+                    if seg in seen:
+                        continue
+                    seen.add(seg)
+                    d, t = self._segment_dist(seg, px, py)
+                    if d < best[0]:
+                        best = (d, seg, t)
+        return best
+
+    def snap(self, lat, lng, hint=None, threshold_m=None) -> Snap:
+        """
+        Snap a ping to the route. With a hint (the previous Snap.segment),
+        a match within threshold_m near the hint is accepted without touching
+        the grid — this also keeps progress monotonic on routes that double
+        back on themselves.
+        """
+        if not self.points:
+            return Snap((lat, lng), 0.0, 0, 0.0)
+
+        px, py = self._project(lat, lng)
+        if len(self.points) == 1:
+            (ax, ay) = self.xy[0]
+            return Snap(self.points[0], math.hypot(px - ax, py - ay), 0, 0.0)
+
+        best = None
+        if hint is not None and 0 <= hint < len(self.points) - 1:
+            best = self._hint_search(hint, px, py)
+            if threshold_m is not None and best[0] > threshold_m:
+                best = None
+        if best is None:
+            best = self._grid_search(px, py)
+
+        dist, seg, t = best
+        (ax, ay), (bx, by) = self.xy[seg], self.xy[seg + 1]
+        point = self._unproject(ax + t * (bx - ax), ay + t * (by - ay))
+        seg_len = self.cumulative[seg + 1] - self.cumulative[seg]
+        along = self.cumulative[seg] + t * seg_len
+        return Snap(point, dist, seg, along)
+
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def get_route_index(polyline_str) -> RouteIndex:
+    """Decode + index a planned route once per process; keyed by the polyline."""
+    return RouteIndex.from_polyline(polyline_str)
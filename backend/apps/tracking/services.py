@@ -2,9 +2,7 @@ import logging
 
 from django.conf import settings
 
-from apps.drivers.redis import (
-    redis_client,
-)
+from apps.common.redis import get_async_redis_client
 from apps.rides.models import Ride
 from apps.tracking.geo import (
     snap_to_roads,
@@ -23,7 +21,7 @@ class LocationProcessor:
     @staticmethod
     async def get_snapped_coords(lat, lng, seq):
         snap_error_key = "google_roads_403_circuit_breaker"
-        if (seq % 10 == 0) and not redis_client.get(snap_error_key):
+        if (seq % 10 == 0) and not await get_async_redis_client().get(snap_error_key):
             try:
                 snapped = await snap_to_roads(
                     lat, lng, api_key=settings.GOOGLE_MAPS_API_KEY
@@ -29,19 +29,26 @@ class UpdateLocationView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        driver.save(update_fields=["last_lat", "last_lng"])
+        # Redis is the live position; Postgres is written behind in bulk
+        # (apps.drivers.tasks.flush_driver_positions)
+        from apps.drivers.redis import update_driver_location
 
-        # Broadcast to Admin Live Map
+        update_driver_location(driver.id, lat, lng)
+
+        # Broadcast to Admin Live Map (admins viewing this tile)
         from asgiref.sync import async_to_sync
         from channels.layers import get_channel_layer
 
+        from apps.admin_dashboard.tiles import tile_group_for
+
         channel_layer = get_channel_layer()
         async_to_sync(channel_layer.group_send)(
-            "admin_live_map",
+            tile_group_for(lat, lng),
             {
                 "type": "driver.location.update",
                 "data": {
                     "id": driver.id,
+                    "driver_id": driver.id,
                     "lat": driver.last_lat,
                     "lng": driver.last_lng,
                     "status": driver.status,
@@ -236,6 +236,8 @@ CELERY_QUEUES = (
     Queue("high", Exchange("high"), routing_key="high"),
     Queue("medium", Exchange("medium"), routing_key="medium"),
     Queue("low", Exchange("low"), routing_key="low"),
+    # Dedicated matching workers: ride creation never waits on this queue
+    Queue("dispatch", Exchange("dispatch"), routing_key="dispatch"),
 )
 
 CELERY_TASK_DEFAULT_QUEUE = "medium"
@@ -247,16 +249,60 @@ CELERY_TASK_ROUTES = {
     # HIGH PRIORITY (Blocking UX)
     "apps.payments.tasks.process_driver_payout": {"queue": "high"},
     "apps.payments.tasks.execute_driver_payout": {"queue": "high"},
+    "apps.payments.tasks.apply_webhook_events": {"queue": "high"},
     "apps.rides.tasks.driver_accept_timeout": {"queue": "high"},
+    "apps.rides.tasks.offer_round_timeout": {"queue": "high"},
+    "apps.rides.tasks.check_no_show": {"queue": "high"},
+    "apps.rides.tasks.fire_ride_timers": {"queue": "high"},
+    # DISPATCH (Matching off the request thread)
+    "apps.rides.tasks.match_ride": {"queue": "dispatch"},
+    "apps.rides.tasks.dispatch_cell_batch": {"queue": "dispatch"},
+    "apps.rides.tasks.retry_matching_unit": {"queue": "dispatch"},
     # MEDIUM PRIORITY (Revenue/Flow)
     "apps.rides.services.matching.*": {"queue": "medium"},
     "apps.rides.tasks.retry_matching*": {"queue": "medium"},
+    # Bounds Postgres position staleness; kept off the shared low queue
+    "apps.drivers.tasks.flush_driver_positions": {"queue": "medium"},
     "apps.payments.tasks.reconcile*": {"queue": "medium"},
+    # Scheduled-run batches make many gateway calls; kept off the high queue
+    "apps.payments.tasks.process_driver_payout_batch": {"queue": "medium"},
     # LOW PRIORITY (Non-Blocking)
     "apps.drivers.tasks.*": {"queue": "low"},
     "apps.notifications.tasks.*": {"queue": "low"},
 }
 
+# Max staleness of Driver.last_lat/last_lng in Postgres: positions live in
+# Redis and are flushed in bulk this often (apps/drivers/services/positions.py).
+DRIVER_POSITION_FLUSH_INTERVAL = float(os.getenv("DRIVER_POSITION_FLUSH_INTERVAL", "10"))
+
+# Per-ride timers (accept timeout, no-show, match retry) live in a Redis
+# sorted set and are fired every tick (apps/rides/services/timers.py).
+RIDE_TIMER_TICK = float(os.getenv("RIDE_TIMER_TICK", "1"))
+RIDE_TIMER_BATCH = 500  # timers claimed per Redis round trip
+RIDE_TIMER_LEASE = 30  # seconds before a claimed but unpublished timer refires
+RIDE_MATCH_RETRY_SECONDS = 15
+RIDE_RETRY_UNIT_SIZE = 25  # max rides of one cell re-matched per retry task
+# Each retry widens the pickup search radius (10 km first) by this much
+RIDE_SEARCH_RADIUS_STEP_KM = 2.5
+RIDE_SEARCH_RADIUS_MAX_KM = 20.0
+
+# Surge (apps/rides/services/surge_engine.py): hex cells, demand/supply in
+# decayed sliding windows, all active cells repriced together every interval.
+SURGE_HEX_EDGE_M = 500
+SURGE_BUCKET_SECONDS = 60
+SURGE_WINDOW_SECONDS = 900
+SURGE_HALF_LIFE_SECONDS = 300
+SURGE_NEIGHBOUR_WEIGHT = 0.5  # per neighbour, relative to the cell itself
+SURGE_RECOMPUTE_INTERVAL = float(os.getenv("SURGE_RECOMPUTE_INTERVAL", "15"))
+# Supply is a snapshot of the live driver geo index, not a counter
+SURGE_SUPPLY_INTERVAL = float(os.getenv("SURGE_SUPPLY_INTERVAL", "5"))
+# Max age of a process's cached surge grid (apps/rides/services/surge.py)
+# when no update has been pushed to it
+SURGE_CACHE_MAX_AGE = 2 * SURGE_RECOMPUTE_INTERVAL
+# Seconds a signed fare quote from the estimate can be booked at
+# (apps/rides/services/quote.py)
+FARE_QUOTE_TTL = int(os.getenv("FARE_QUOTE_TTL", "120"))
+
 CELERY_BEAT_SCHEDULE = {
     "weekly-driver-payouts": {
         "task": "apps.payments.tasks.trigger_scheduled_payouts",
@@ -264,12 +310,16 @@ CELERY_BEAT_SCHEDULE = {
     },
     "retry-ride-matching": {
         "task": "apps.rides.tasks.retry_matching_for_searching_rides",
-        "schedule": 15.0,  # Run every 15 seconds
+        "schedule": 300.0,  # Backstop only: retries run off per-ride timers
     },
     "auto-resolve-stuck-rides": {
         "task": "apps.rides.tasks.auto_resolve_stuck_rides",
         "schedule": 600.0,  # Run every 10 minutes
     },
+    "apply-webhook-events": {
+        "task": "apps.payments.tasks.apply_webhook_events",
+        "schedule": 60.0,  # Backstop only: ingest enqueues the applier
+    },
     "reconcile-pending-payments": {
         "task": "apps.payments.tasks.reconcile_pending_payments",
         "schedule": 900.0,  # Run every 15 minutes
@@ -299,6 +349,10 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.payments.tasks.audit_platform_ledger",
         "schedule": 86400.0,  # Run daily
     },
+    "verify-wallet-balances": {
+        "task": "apps.payments.tasks.verify_wallet_balances",
+        "schedule": crontab(hour=4, minute=0),  # 4 AM, after the ledger audit
+    },
     # ── Driver Management ───────────────────────────────────────────
     "recalculate-driver-scores": {
         "task": "apps.drivers.tasks.recalculate_all_driver_scores",
@@ -320,6 +374,28 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.drivers.tasks.prune_ghost_driver_sessions",
         "schedule": 120.0,  # Every 2 minutes
     },
+    "flush-driver-positions": {
+        "task": "apps.drivers.tasks.flush_driver_positions",
+        "schedule": DRIVER_POSITION_FLUSH_INTERVAL,
+        # A late flush is superseded by the next one
+        "options": {"expires": DRIVER_POSITION_FLUSH_INTERVAL},
+    },
+    "fire-ride-timers": {
+        "task": "apps.rides.tasks.fire_ride_timers",
+        "schedule": RIDE_TIMER_TICK,
+        # A tick that could not start in time is superseded by the next one
+        "options": {"expires": RIDE_TIMER_TICK},
+    },
+    "snapshot-surge-supply": {
+        "task": "apps.rides.tasks.snapshot_surge_supply",
+        "schedule": SURGE_SUPPLY_INTERVAL,
+        "options": {"expires": SURGE_SUPPLY_INTERVAL},
+    },
+    "recompute-surge-grid": {
+        "task": "apps.rides.tasks.recompute_surge_grid",
+        "schedule": SURGE_RECOMPUTE_INTERVAL,
+        "options": {"expires": SURGE_RECOMPUTE_INTERVAL},
+    },
 }
 
 
@@ -349,12 +425,43 @@ KAFKA_BOOTSTRAP_SERVERS = os.getenv(
     "kafka:9092",
 )
 
+# Shared producer (apps/common/kafka.py): publish() only fills a bounded
+# buffer; a background thread batches it out to the broker.
+KAFKA_PUBLISH_BUFFER = 10000  # events per process; further ones are dropped
+KAFKA_PRODUCER_LINGER_MS = 20
+KAFKA_PRODUCER_BATCH_SIZE = 65536  # bytes
+KAFKA_PRODUCER_COMPRESSION = os.getenv("KAFKA_PRODUCER_COMPRESSION", "gzip")
+KAFKA_PRODUCER_MAX_BLOCK_MS = 5000
+
+# Ride event consumer (consumers/ride_events.py): one worker per partition
+RIDE_EVENTS_WORKERS = int(os.getenv("RIDE_EVENTS_WORKERS", "8"))
+RIDE_EVENTS_MAX_POLL_RECORDS = 500
+RIDE_EVENTS_POLL_TIMEOUT_MS = 1000
+RIDE_EVENTS_DLQ_FLUSH_TIMEOUT = 10  # seconds
+RIDE_EVENTS_METRICS_PORT = int(os.getenv("RIDE_EVENTS_METRICS_PORT", "0")) or None
+
 # ============================================================
 # DOMAIN CONFIG
 # ============================================================
 
 RIDE_DRIVER_ACCEPT_TIMEOUT = 30  # seconds
 
+# "single": offer each ride as it arrives (first eligible driver wins).
+# "batch":  pool SEARCHING rides per dispatch cell for a short window and
+#           assign them together (see apps/rides/services/dispatch.py).
+RIDE_DISPATCH_MODE = os.getenv("RIDE_DISPATCH_MODE", "single")
+RIDE_DISPATCH_WINDOW_SECONDS = float(os.getenv("RIDE_DISPATCH_WINDOW_SECONDS", "2"))
+# Drivers offered each ride at once on the per-ride path; the first accept
+# wins (apps/rides/services/offers.py). 1 offers drivers one at a time.
+RIDE_OFFER_FANOUT = int(os.getenv("RIDE_OFFER_FANOUT", "1"))
+
+# Admin live map: positions fan out per tile (apps/admin_dashboard/tiles.py)
+# and reach each admin as one batched frame per interval.
+LIVE_MAP_TILE_DEG = 0.05  # ~5.5 km
+LIVE_MAP_MAX_TILES = 400  # per viewport; larger ones must zoom in
+LIVE_MAP_FRAME_INTERVAL = 1.0  # seconds
+LIVE_MAP_SNAPSHOT_CHUNK_SIZE = 500  # entries per snapshot frame on connect
+
 # ============================================================
 # CORS  (all origins use HTTPS — no plaintext http:// references)
 # ============================================================
@@ -433,6 +540,34 @@ RAZORPAY_ACCOUNT_NUMBER = os.getenv(
 
 PLATFORM_USER_ID = 1
 
+# Wallet balances are materialized per user (payments.WalletBalance) and
+# proven against the raw ledger nightly, this many users per query.
+WALLET_VERIFY_CHUNK_SIZE = 500
+# Ledger accounts written by every settlement, kept out of WalletBalance and
+# summed on read instead. PLATFORM_USER_ID is always one.
+LEDGER_HOUSE_ACCOUNT_IDS = []
+
+# Drivers paid out per process_driver_payout_batch task in the scheduled run
+PAYOUT_DISPATCH_BATCH_SIZE = 100
+
+# Gateway reconciliation (apps/payments/services/reconciliation.py): lookups
+# run on this many threads, no faster than the rate limit; a run stops at the
+# time budget (below the 15 min beat interval) and the next resumes after it.
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", "8"))
+RECONCILE_RATE_PER_SEC = float(os.getenv("RECONCILE_RATE_PER_SEC", "20"))
+RECONCILE_TIME_BUDGET = 600  # seconds
+# Backlogs this large are resolved from a paged gateway listing instead
+RECONCILE_LIST_MIN_ITEMS = 100
+RECONCILE_LIST_MAX_PAGES = 100
+
+# Gateway webhooks are acknowledged on receipt and applied by
+# apps.payments.tasks.apply_webhook_events, this many per transaction.
+WEBHOOK_APPLY_BATCH_SIZE = 100
+# A failed apply is retried after 30 s, doubling per attempt (beat picks it
+# up); after this many attempts the event is left FAILED.
+WEBHOOK_APPLY_RETRY_SECONDS = 30
+WEBHOOK_APPLY_MAX_ATTEMPTS = 8
+
 # ============================================================
 # SOCIAL OAUTH
 # ============================================================
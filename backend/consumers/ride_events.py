@@ -1,10 +1,32 @@
+"""
+Ride event consumer (topic ride_events, group ride-processor-v3).
+
+Partitions are processed in parallel, records of one partition in order:
+
+    poll()  ->  {partition: [records]}  ->  one worker per partition
+            ->  flush DLQ sends  ->  commit offsets  ->  poll() ...
+
+Ride events are keyed by ride id, so every event of a ride stays on one
+partition and is handled in order. Offsets are committed by hand once the
+whole batch is done; a record that could neither be processed nor parked in
+the DLQ stops its partition there (seek back) and is polled again, so
+nothing is committed past it. Delivery stays at-least-once.
+
+Metrics (prometheus, on RIDE_EVENTS_METRICS_PORT): consumed events by
+outcome, per-partition lag behind the high watermark, batch duration.
+"""
+
 import json
 import os
+import signal
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import django
 from django.conf import settings
-from django.db import transaction
+from django.db import close_old_connections, transaction
 from kafka import KafkaConsumer, KafkaProducer
 from kafka.errors import NoBrokersAvailable
 
@@ -17,33 +39,58 @@ django.setup()
 # -------------------------------------------------
 # Imports AFTER setup
 # -------------------------------------------------
+import apps.rides.kafka  # noqa: F401  registers the ride event schemas
+from apps.common.kafka import decode
+from apps.common.metrics import (
+    RIDE_EVENTS_BATCH_SECONDS,
+    RIDE_EVENTS_CONSUMED,
+    RIDE_EVENTS_LAG,
+)
 from apps.drivers.models import Driver
 from apps.rides.models import Ride
-from apps.rides.tasks import driver_accept_timeout
 from apps.rides.services.lifecycle import update_ride_status
+from apps.rides.services.timers import ACCEPT_TIMEOUT, schedule_timer
 
 logger = logging.getLogger(__name__)
 
+TOPIC = "ride_events"
+GROUP_ID = "ride-processor-v3"
 MAX_RETRIES = 3
 DLQ_TOPIC = "ride_events_dlq"
 RETRY_DELAY = 1
 
+_producer = None
+_producer_lock = threading.Lock()
+_stop = threading.Event()
+
+
 def get_kafka_producer():
-    try:
-        return KafkaProducer(
-            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-            acks=1
-        )
-    except Exception as e:
-        logger.error(f"Failed to create Kafka Producer for DLQ: {e}")
-        return None
+    """The DLQ producer, created once and shared by every partition worker."""
+    global _producer
+    with _producer_lock:
+        if _producer is None:
+            try:
+                _producer = KafkaProducer(
+                    bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+                    value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+                    acks=1,
+                )
+            except Exception as e:
+                logger.error(f"Failed to create Kafka Producer for DLQ: {e}")
+                return None
+        return _producer
+
 
 def send_to_dlq(event, reason):
+    """
+    Park an event in the DLQ. Sends are flushed once per batch, before its
+    offsets are committed (flush_dlq). Returns False when the event could
+    not be handed to the producer.
+    """
     producer = get_kafka_producer()
     if not producer:
         logger.critical(f"DLQ FAIL: Producer unavailable for event {event.get('ride_id', 'unknown')}")
-        return
+        return False
 
     payload = {
         "original_event": event,
@@ -52,10 +99,23 @@ def send_to_dlq(event, reason):
     }
     try:
         producer.send(DLQ_TOPIC, value=payload)
-        producer.flush()
         logger.warning(f"Event sent to DLQ: {reason}")
+        return True
     except Exception as e:
         logger.critical(f"DLQ ERROR: {e}")
+        return False
+
+
+def flush_dlq():
+    """Wait for this batch's DLQ sends. False if they may not have landed."""
+    if _producer is None:
+        return True
+    try:
+        _producer.flush(timeout=getattr(settings, "RIDE_EVENTS_DLQ_FLUSH_TIMEOUT", 10))
+        return True
+    except Exception as e:
+        logger.critical(f"DLQ flush failed: {e}")
+        return False
 
 def match_and_assign_driver(event: dict):
     ride_id = event.get("ride_id")
@@ -94,9 +154,8 @@ def match_and_assign_driver(event: dict):
             update_ride_status(ride, Ride.Status.OFFERED, driver=driver, search_attempt=attempt)
 
             DRIVER_ACCEPT_TIMEOUT = getattr(settings, "RIDE_DRIVER_ACCEPT_TIMEOUT", 30)
-            driver_accept_timeout.apply_async(
-                args=[ride.id, driver.id],
-                countdown=DRIVER_ACCEPT_TIMEOUT,
+            schedule_timer(
+                ACCEPT_TIMEOUT, ride.id, driver.id, delay=DRIVER_ACCEPT_TIMEOUT
             )
             logger.info(f"Ride {ride.id} offered to Driver {driver.id}")
             return
@@ -129,55 +188,151 @@ def process_ride_event(event: dict):
 
 def safe_deserialize(v):
     try:
-        return json.loads(v.decode("utf-8"))
+        return decode(v)
     except Exception as e:
         logger.error(f"Deserialization error: {e}")
         return {"_error": "MALFORMED", "raw": str(v)}
 
-def main():
+def handle_event(event: dict) -> bool:
+    """
+    Process one event, parking it in the DLQ when it fails. False only when
+    it could not be parked either: the record must be consumed again.
+    """
+    # Handle malformed JSON detected in deserializer
+    if event.get("_error") == "MALFORMED":
+        parked = send_to_dlq(event, "Malformed JSON")
+        if parked:
+            RIDE_EVENTS_CONSUMED.labels(outcome="dlq").inc()
+        return parked
+
+    retries = event.get("_retries", 0)
+    try:
+        process_ride_event(event)
+        RIDE_EVENTS_CONSUMED.labels(outcome="processed").inc()
+        return True
+    except Exception as exc:
+        logger.error(f"Processing error: {exc}")
+        e = exc
+
+    if retries < MAX_RETRIES:
+        event["_retries"] = retries + 1
+        time.sleep(RETRY_DELAY * (2 ** retries))
+        parked = send_to_dlq(event, f"Transient Error: {e}")
+    else:
+        parked = send_to_dlq(event, f"Max retries exceeded: {e}")
+        from apps.notifications.services.alerts import send_critical_alert
+        send_critical_alert(
+            title="Ride Event Processing Failed",
+            message=f"Event {event} failed after {MAX_RETRIES} retries. Error: {e}",
+            level="ERROR"
+        )
+    if parked:
+        RIDE_EVENTS_CONSUMED.labels(outcome="dlq").inc()
+    return parked
+
+
+def process_partition(records):
+    """
+    Handle one partition's share of a batch, in offset order. Returns the
+    offset to resume from when a record has to be consumed again, else None.
+    """
+    close_old_connections()
+    try:
+        for record in records:
+            if not handle_event(record.value):
+                return record.offset
+        return None
+    finally:
+        close_old_connections()
+
+
+def run_batch(consumer, executor, batch):
+    """Process one poll() result partition-parallel, then commit it."""
+    started = time.time()
+    futures = {
+        tp: executor.submit(process_partition, records)
+        for tp, records in batch.items()
+    }
+    for tp, future in futures.items():
+        try:
+            resume_at = future.result()
+        except Exception as e:
+            logger.error(f"Partition {tp.partition} batch failed: {e}")
+            resume_at = batch[tp][0].offset
+        if resume_at is not None:
+            consumer.seek(tp, resume_at)
+
+    if not flush_dlq():
+        # Nothing parked in this batch is known to have landed: consume it again
+        for tp, records in batch.items():
+            consumer.seek(tp, records[0].offset)
+        return
+
+    try:
+        # Positions are past every handled record and at any record to retry
+        consumer.commit()
+    except Exception as e:
+        # The batch is consumed again after the rebalance
+        logger.warning(f"Offset commit failed: {e}")
+
+    for tp in batch:
+        highwater = consumer.highwater(tp)
+        if highwater is not None:
+            RIDE_EVENTS_LAG.labels(partition=str(tp.partition)).set(
+                max(0, highwater - consumer.position(tp))
+            )
+    RIDE_EVENTS_BATCH_SECONDS.observe(time.time() - started)
+
+
+def _create_consumer():
     while True:
         try:
-            consumer = KafkaConsumer(
-                "ride_events",
+            return KafkaConsumer(
+                TOPIC,
                 bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
                 api_version=(2, 6, 0),
                 value_deserializer=safe_deserialize,
                 auto_offset_reset="earliest",
-                enable_auto_commit=True,
-                group_id="ride-processor-v3",
+                enable_auto_commit=False,
+                max_poll_records=getattr(settings, "RIDE_EVENTS_MAX_POLL_RECORDS", 500),
+                group_id=GROUP_ID,
             )
-            break
         except NoBrokersAvailable:
             logger.warning("Kafka not ready, retrying in 5s...")
             time.sleep(5)
 
-    logger.info("🚀 Ride Events Kafka Consumer started")
 
-    for message in consumer:
-        event = message.value
-        
-        # Handle malformed JSON detected in deserializer
-        if event.get("_error") == "MALFORMED":
-            send_to_dlq(event, "Malformed JSON")
-            continue
+def _request_stop(signum, frame):
+    logger.info(f"Signal {signum}: stopping after the current batch")
+    _stop.set()
+
+
+def main():
+    consumer = _create_consumer()
+
+    port = getattr(settings, "RIDE_EVENTS_METRICS_PORT", None)
+    if port:
+        from prometheus_client import start_http_server
 
-        retries = event.get("_retries", 0)
+        start_http_server(port)
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    workers = getattr(settings, "RIDE_EVENTS_WORKERS", 8)
+    timeout_ms = getattr(settings, "RIDE_EVENTS_POLL_TIMEOUT_MS", 1000)
+    logger.info(f"🚀 Ride Events Kafka Consumer started ({workers} partition workers)")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ride-events") as executor:
         try:
-            process_ride_event(event)
-        except Exception as e:
-            logger.error(f"Processing error: {e}")
-            if retries < MAX_RETRIES:
-                event["_retries"] = retries + 1
-                time.sleep(RETRY_DELAY * (2 ** retries))
-                send_to_dlq(event, f"Transient Error: {e}")
-            else:
-                send_to_dlq(event, f"Max retries exceeded: {e}")
-                from apps.notifications.services.alerts import send_critical_alert
-                send_critical_alert(
-                    title="Ride Event Processing Failed",
-                    message=f"Event {event} failed after {MAX_RETRIES} retries. Error: {e}",
-                    level="ERROR"
-                )
+            while not _stop.is_set():
+                batch = consumer.poll(timeout_ms=timeout_ms)
+                if batch:
+                    run_batch(consumer, executor, batch)
+        finally:
+            consumer.close(autocommit=False)
+            flush_dlq()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,121 @@
+"""
+Compare per-ride greedy matching against batch dispatch on a synthetic fleet.
+
+Both strategies see the same rides and drivers and use the same cost
+function (apps.rides.services.dispatch.pair_cost). Greedy mirrors the
+per-ride path: rides are served in arrival order and each takes the best
+driver still free. Batch solves the whole window at once.
+
+Usage (inside the backend container):
+    python scripts/benchmark_dispatch.py --rides 60 --drivers 80 --windows 20
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import django
+
+sys.path.append("/app")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from apps.rides.services.dispatch import (
+    LEVEL_PENALTY_KM,
+    UNREACHABLE,
+    pair_cost,
+    solve_assignment,
+)
+
+LEVELS = ["NORMAL", "ACTIVE", "CONSISTENT", "PRO"]
+CENTER = (13.0827, 80.2707)  # Chennai
+SPREAD_DEG = 0.08  # ~9km box
+RADIUS_KM = 10.0
+
+
+def _haversine_km(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def _point(rng):
+    return (
+        CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+        CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+    )
+
+
+def _window(rng, n_rides, n_drivers):
+    rides = [_point(rng) for _ in range(n_rides)]
+    drivers = [
+        (_point(rng), rng.choice(LEVELS), rng.uniform(20, 100))
+        for _ in range(n_drivers)
+    ]
+    dist = [[_haversine_km(r, d[0]) for d in drivers] for r in rides]
+    cost = [
+        [
+            pair_cost(km, d[1], d[2]) if km <= RADIUS_KM else UNREACHABLE
+            for km, d in zip(row, drivers)
+        ]
+        for row in dist
+    ]
+    return dist, cost
+
+
+def _greedy(cost):
+    taken, pairs = set(), []
+    for r, row in enumerate(cost):
+        best = min(
+            (c for c in range(len(row)) if c not in taken and row[c] < UNREACHABLE),
+            key=row.__getitem__,
+            default=None,
+        )
+        if best is not None:
+            taken.add(best)
+            pairs.append((r, best))
+    return pairs
+
+
+def _run(strategy, windows):
+    matched, total_km, elapsed = 0, 0.0, 0.0
+    for dist, cost in windows:
+        start = time.perf_counter()
+        pairs = strategy(cost)
+        elapsed += time.perf_counter() - start
+        for r, c in pairs:
+            if cost[r][c] < UNREACHABLE:
+                matched += 1
+                total_km += dist[r][c]
+    return matched, total_km / max(matched, 1), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rides", type=int, default=60)
+    parser.add_argument("--drivers", type=int, default=80)
+    parser.add_argument("--windows", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    windows = [_window(rng, args.rides, args.drivers) for _ in range(args.windows)]
+
+    print(f"Fleet: {args.drivers} drivers, {args.rides} rides/window, "
+          f"{args.windows} windows (level penalty {LEVEL_PENALTY_KM} km/level)")
+    for name, strategy in (("per-ride greedy", _greedy), ("batch dispatch", solve_assignment)):
+        matched, mean_km, elapsed = _run(strategy, windows)
+        print(
+            f"  {name:<16} matched={matched:<5} mean_pickup={mean_km:.3f} km "
+            f"solver={elapsed * 1000:.1f} ms ({matched / max(elapsed, 1e-9):,.0f} rides/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Local stand-in for the Razorpay endpoints gateway reconciliation uses, with
+configurable latency and failures. Used by the reconciliation tests, and
+runnable on its own for load runs:
+
+    python -m tests.fake_gateway --port 9999 --latency 0.2 --failure-rate 0.05
+
+Point a client at it with
+razorpay.Client(auth=("key", "secret"), base_url="http://127.0.0.1:9999").
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeGateway:
+    """
+    payouts: gateway payout id -> {"id", "reference_id", "status", "created_at"}
+    payments: payment id -> {"id", "order_id", "status", "created_at"}
+
+    Requests whose path contains one of `fail_paths` always get a 500; any
+    other request fails with probability `failure_rate`.
+    """
+
+    def __init__(self, *, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_paths = set()
+        self.payouts = {}
+        self.payments = {}
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = None
+
+    def add_payout(self, payout_id, reference_id, status, created_at=None):
+        self.payouts[payout_id] = {
+            "id": payout_id,
+            "entity": "payout",
+            "reference_id": reference_id,
+            "status": status,
+            "created_at": int(created_at or time.time()),
+        }
+
+    def add_payment(self, payment_id, order_id, status, created_at=None):
+        self.payments[payment_id] = {
+            "id": payment_id,
+            "entity": "payment",
+            "order_id": order_id,
+            "status": status,
+            "created_at": int(created_at or time.time()),
+        }
+
+    def paths(self, prefix=""):
+        return [path for path in self.requests if path.startswith(prefix)]
+
+    # ── HTTP ────────────────────────────────────────────────────
+
+    def start(self, port=0):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                gateway._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _serve(self, handler):
+        url = urlparse(handler.path)
+        with self._lock:
+            self.requests.append(url.path)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            fail = any(p in url.path for p in self.fail_paths) or (
+                self._random.random() < self.failure_rate
+            )
+        try:
+            time.sleep(self.latency)
+            if fail:
+                return self._reply(handler, 500, _error("SERVER_ERROR", "Injected failure"))
+            status, body = self._route(url.path, parse_qs(url.query))
+            return self._reply(handler, status, body)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _route(self, path, query):
+        parts = path.strip("/").split("/")
+        if parts[0] == "v1":
+            parts = parts[1:]
+        if parts == ["payouts"]:
+            if "reference_id" in query:
+                items = [
+                    p for p in self.payouts.values()
+                    if p["reference_id"] == query["reference_id"][0]
+                ]
+                return 200, _collection(items)
+            return 200, _page(self.payouts.values(), query)
+        if len(parts) == 2 and parts[0] == "payouts":
+            payout = self.payouts.get(parts[1])
+            if payout is None:
+                return 400, _error("BAD_REQUEST_ERROR", "The id provided does not exist")
+            return 200, payout
+        if parts == ["payments"]:
+            return 200, _page(self.payments.values(), query)
+        if len(parts) == 3 and parts[0] == "orders" and parts[2] == "payments":
+            items = [p for p in self.payments.values() if p["order_id"] == parts[1]]
+            return 200, _collection(items)
+        return 404, _error("BAD_REQUEST_ERROR", "The requested URL was not found")
+
+    @staticmethod
+    def _reply(handler, status, body):
+        raw = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(raw)))
+        handler.end_headers()
+        handler.wfile.write(raw)
+
+
+def _collection(items):
+    return {"entity": "collection", "count": len(items), "items": list(items)}
+
+
+def _page(items, query):
+    since = int(query.get("from", ["0"])[0])
+    count = min(int(query.get("count", ["10"])[0]), 100)
+    skip = int(query.get("skip", ["0"])[0])
+    # Razorpay lists newest first
+    items = sorted(
+        (i for i in items if i["created_at"] >= since),
+        key=lambda i: i["created_at"],
+        reverse=True,
+    )
+    return _collection(items[skip : skip + count])
+
+
+def _error(code, description):
+    return {"error": {"code": code, "description": description}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--payouts", type=int, default=1000)
+    args = parser.parse_args()
+
+    gateway = FakeGateway(latency=args.latency, failure_rate=args.failure_rate)
+    for n in range(args.payouts):
+        gateway.add_payout(f"pout_{n}", f"payout:fake:{n}", "processed")
+    print(f"Fake gateway on {gateway.start(args.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        gateway.stop()
+
+
+if __name__ == "__main__":
+    main()
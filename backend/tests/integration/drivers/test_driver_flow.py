@@ -2,6 +2,7 @@ import pytest
 from rest_framework.test import APIClient
 
 from apps.drivers.models import Driver
+from apps.drivers.services.positions import flush_driver_positions
 from apps.users.models import User
 
 
@@ -38,6 +39,7 @@ class TestDriverFlow:
         )
         assert res.status_code == 200
 
+        flush_driver_positions()
         self.driver.refresh_from_db()
         assert self.driver.last_lat == 12.9716
         assert self.driver.last_lng == 77.5946
@@ -11,6 +11,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.drivers.models import Driver
+from apps.drivers.services.positions import flush_driver_positions
 from apps.rides.models import Ride
 
 User = get_user_model()
@@ -151,6 +152,7 @@ class TestDriverLocation:
 
         assert response.status_code == status.HTTP_200_OK
 
+        flush_driver_positions()
         self.driver.refresh_from_db()
         assert self.driver.last_lat == 13.0827
         assert self.driver.last_lng == 80.2707
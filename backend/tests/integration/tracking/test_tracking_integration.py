@@ -3,6 +3,7 @@ from unittest.mock import patch
 import pytest
 from rest_framework.test import APIClient
 
+from apps.drivers.services.positions import flush_driver_positions
 from apps.users.models import User
 
 
@@ -31,7 +32,8 @@ def test_update_location_view(mock_get_layer, mock_async_to_sync, client):
 
     assert resp.status_code == 200
 
-    # Verify DB
+    # Verify DB (positions are written behind)
+    flush_driver_positions()
     driver.refresh_from_db()
     assert driver.last_lat == 12.9716
     assert driver.last_lng == 77.5946
@@ -179,14 +179,15 @@ class TestRidesApiHighValue:
         # The task cancels the stale ride via cancel_ride, verify result
         assert s1.status == Ride.Status.CANCELLED
 
-    @patch("apps.rides.services.matching.find_driver_and_offer_ride")
-    def test_retry_matching_task(self, mock_find):
+    @patch("apps.rides.services.timers.schedule_timer")
+    @patch("apps.common.redis.redis_client")
+    def test_retry_matching_task(self, mock_redis, mock_schedule):
         """
-        WHY: Verifies the retry matcher picks up stuck SEARCHING rides.
+        WHY: Verifies the retry backstop re-arms timers for stuck SEARCHING rides.
         """
         from apps.rides.tasks import retry_matching_for_searching_rides
 
-        Ride.objects.create(
+        ride = Ride.objects.create(
             rider=self.rider,
             status=Ride.Status.SEARCHING,
             pickup_lat=0,
@@ -196,4 +197,6 @@ class TestRidesApiHighValue:
         )
 
         retry_matching_for_searching_rides()
-        mock_find.assert_called_once()
+        mock_schedule.assert_called_once()
+        assert mock_schedule.call_args[0][1] == ride.id
+        assert mock_schedule.call_args[1]["nx"] is True
@@ -0,0 +1,77 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from apps.admin_dashboard.consumers.live_map import AdminLiveMapConsumer
+from apps.drivers.models import Driver
+from apps.payments.models import Payment
+from apps.rides.models import Ride
+
+
+def _make_fleet(django_user_model, size):
+    drivers = []
+    for i in range(size):
+        driver_user = django_user_model.objects.create_user(
+            username=f"+91911000{i:04d}", phone=f"+91911000{i:04d}", role="driver"
+        )
+        rider = django_user_model.objects.create_user(
+            username=f"+91922000{i:04d}", phone=f"+91922000{i:04d}"
+        )
+        driver = Driver.objects.get(user=driver_user)
+        Driver.objects.filter(id=driver.id).update(
+            status="BUSY", last_lat=13.0, last_lng=80.2
+        )
+        ride = Ride.objects.create(
+            rider=rider,
+            driver=driver,
+            pickup_lat=13.0,
+            pickup_lng=80.2,
+            drop_lat=13.1,
+            drop_lng=80.3,
+            status=Ride.Status.ONGOING,
+        )
+        Payment.objects.create(
+            ride_id=ride.id, user=rider, amount=100, status=Payment.Status.CAPTURED
+        )
+        drivers.append(driver)
+    return drivers
+
+
+@pytest.mark.django_db
+@patch("apps.drivers.redis_rider.get_rider_last_points", return_value={})
+@patch("apps.drivers.redis.get_driver_last_points")
+class TestInitialSnapshot:
+    @pytest.mark.parametrize("size", [2, 12])
+    def test_query_count_is_flat(
+        self, mock_points, _, size, django_user_model, django_assert_num_queries
+    ):
+        drivers = _make_fleet(django_user_model, size)
+        mock_points.return_value = {drivers[0].id: (13.05, 80.25)}
+        consumer = AdminLiveMapConsumer()
+
+        # Active rides, drivers, captured payments
+        with django_assert_num_queries(3):
+            rides = consumer._fetch_active_rides()
+            drivers_data = consumer._fetch_drivers_data(rides)
+            riders_data = consumer._fetch_riders_data(rides)
+
+        assert len(drivers_data) == len(riders_data) == size
+        first = next(d for d in drivers_data if d["driver_id"] == drivers[0].id)
+        assert (first["lat"], first["lng"]) == (13.05, 80.25)
+        assert first["ride"]["payment_status"] == Payment.Status.CAPTURED
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_sent_in_chunks(settings):
+    settings.LIVE_MAP_SNAPSHOT_CHUNK_SIZE = 2
+    consumer = AdminLiveMapConsumer()
+    consumer.send = AsyncMock()
+
+    await consumer._send_snapshot(
+        "DRIVER_LOCATIONS_BATCH", [{"driver_id": i} for i in range(5)]
+    )
+
+    frames = [json.loads(c.kwargs["text_data"]) for c in consumer.send.call_args_list]
+    assert [len(f["data"]) for f in frames] == [2, 2, 1]
+    assert {f["type"] for f in frames} == {"DRIVER_LOCATIONS_BATCH"}
@@ -0,0 +1,92 @@
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from apps.admin_dashboard.consumers.live_map import AdminLiveMapConsumer
+from apps.admin_dashboard.tiles import tile_group, tile_of, tiles_for_bounds
+
+
+@pytest.fixture(autouse=True)
+def tile_settings(settings):
+    settings.LIVE_MAP_TILE_DEG = 0.05
+    settings.LIVE_MAP_MAX_TILES = 4
+
+
+def test_tile_of_floors_negative_coordinates():
+    assert tile_of(13.01, 80.26) == (260, 1605)
+    assert tile_of(-0.01, -0.01) == (-1, -1)
+    assert tile_group((-1, 3)) == "admin_live_map.tile.-1.3"
+
+
+def test_tiles_for_bounds_covers_viewport():
+    assert tiles_for_bounds(13.01, 80.21, 13.06, 80.26, max_tiles=4) == {
+        (260, 1604),
+        (260, 1605),
+        (261, 1604),
+        (261, 1605),
+    }
+
+
+def test_tiles_for_bounds_rejects_large_viewport():
+    assert tiles_for_bounds(12.0, 79.0, 14.0, 81.0, max_tiles=400) is None
+
+
+@pytest.mark.asyncio
+class TestViewportSubscription:
+    def _consumer(self):
+        consumer = AdminLiveMapConsumer()
+        consumer.channel_name = "admin.1"
+        consumer.channel_layer = AsyncMock()
+        consumer.send = AsyncMock()
+        return consumer
+
+    async def test_pan_only_joins_and_leaves_the_difference(self):
+        consumer = self._consumer()
+        await consumer._subscribe_viewport(
+            {"south": 13.01, "west": 80.21, "north": 13.02, "east": 80.26}
+        )
+        consumer.channel_layer.reset_mock()
+
+        await consumer._subscribe_viewport(
+            {"south": 13.01, "west": 80.26, "north": 13.02, "east": 80.31}
+        )
+
+        consumer.channel_layer.group_discard.assert_awaited_once_with(
+            "admin_live_map.tile.260.1604", "admin.1"
+        )
+        consumer.channel_layer.group_add.assert_awaited_once_with(
+            "admin_live_map.tile.260.1606", "admin.1"
+        )
+        assert consumer.tiles == {(260, 1605), (260, 1606)}
+
+    async def test_too_large_viewport_keeps_current_tiles(self):
+        consumer = self._consumer()
+        consumer.tiles = {(260, 1605)}
+
+        await consumer._subscribe_viewport(
+            {"south": 12.0, "west": 79.0, "north": 14.0, "east": 81.0}
+        )
+
+        consumer.channel_layer.group_add.assert_not_called()
+        sent = json.loads(consumer.send.call_args.kwargs["text_data"])
+        assert sent == {"type": "VIEWPORT_TOO_LARGE", "data": {"max_tiles": 4}}
+        assert consumer.tiles == {(260, 1605)}
+
+    async def test_pings_are_coalesced_per_driver(self):
+        consumer = self._consumer()
+        for lat in (13.0, 13.1):
+            await consumer.driver_location_updated(
+                {"data": {"driver_id": 7, "lat": lat, "lng": 80.2}}
+            )
+        await consumer.rider_location_updated({"data": {"rider_id": 9, "lat": 13.0}})
+
+        await consumer._flush_frames()
+        await consumer._flush_frames()
+
+        frames = [json.loads(c.kwargs["text_data"]) for c in consumer.send.call_args_list]
+        assert [f["type"] for f in frames] == [
+            "DRIVER_LOCATIONS_BATCH",
+            "RIDER_LOCATIONS_BATCH",
+        ]
+        assert frames[0]["data"] == [{"driver_id": 7, "lat": 13.1, "lng": 80.2}]
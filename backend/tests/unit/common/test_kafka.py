@@ -0,0 +1,86 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.common import kafka
+from apps.common.metrics import KAFKA_PUBLISH_FAILURES, KAFKA_PUBLISHED
+
+
+@pytest.fixture(autouse=True)
+def fresh_publisher():
+    with patch.object(kafka, "_publisher", None):
+        yield
+
+
+@pytest.fixture
+def producer():
+    producer = MagicMock()
+    with patch.object(kafka._Publisher, "_get_producer", return_value=producer):
+        yield producer
+
+
+def _count(metric, **labels):
+    return metric.labels(**labels)._value.get()
+
+
+class TestEncoding:
+    def test_registered_event_is_a_compact_array(self):
+        import apps.rides.kafka  # noqa: F401  registers RIDE_SEARCHING
+
+        event = {"event": "RIDE_SEARCHING", "ride_id": 7, "driver_ids": [3, 4], "attempt": 2}
+
+        raw = kafka.encode(event)
+
+        assert raw == b'[1,"RIDE_SEARCHING",7,[3,4],2]'
+        assert kafka.decode(raw) == event
+
+    def test_other_values_are_compact_json(self):
+        raw = kafka.encode({"event": "COMPLETED", "ride_id": 7})
+
+        assert raw == b'{"event":"COMPLETED","ride_id":7}'
+        assert kafka.decode(raw) == json.loads(raw)
+
+    def test_schema_ids_cannot_be_reused(self):
+        kafka.register_schema(901, ("a", "b"))
+        with pytest.raises(ValueError):
+            kafka.register_schema(901, ("a", "c"))
+
+
+class TestPublish:
+    def test_events_are_sent_from_the_background_thread(self, producer):
+        before = _count(KAFKA_PUBLISHED, topic="t")
+
+        assert kafka.publish("t", {"x": 1}, key=5) is True
+        kafka.flush(timeout=2)
+
+        producer.send.assert_called_once_with("t", key=5, value={"x": 1})
+        future = producer.send.return_value
+        future.add_callback.call_args.args[0](MagicMock())
+        assert _count(KAFKA_PUBLISHED, topic="t") == before + 1
+
+    def test_full_buffer_drops_instead_of_blocking(self, settings):
+        settings.KAFKA_PUBLISH_BUFFER = 1
+        before = _count(KAFKA_PUBLISH_FAILURES, topic="t", reason="buffer_full")
+
+        # A stalled sender: nothing drains the buffer
+        with patch.object(kafka._Publisher, "_run", lambda self: None):
+            assert kafka.publish("t", {"x": 1}) is True
+            assert kafka.publish("t", {"x": 2}) is False
+
+        assert _count(KAFKA_PUBLISH_FAILURES, topic="t", reason="buffer_full") == before + 1
+
+    def test_send_error_is_counted(self, producer):
+        producer.send.side_effect = RuntimeError("no brokers")
+        before = _count(KAFKA_PUBLISH_FAILURES, topic="t", reason="send_error")
+
+        kafka.publish("t", {"x": 1})
+        kafka.flush(timeout=2)
+
+        assert _count(KAFKA_PUBLISH_FAILURES, topic="t", reason="send_error") == before + 1
+
+    def test_forked_process_gets_its_own_publisher(self, producer):
+        first = kafka._get_publisher()
+        first.pid = -1  # as seen from a forked child
+
+        assert kafka._get_publisher() is not first
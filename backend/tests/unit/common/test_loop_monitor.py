@@ -0,0 +1,27 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from apps.common.loop_monitor import ensure_loop_monitor
+
+
+@pytest.mark.asyncio
+class TestLoopMonitor:
+    async def test_one_probe_per_loop(self):
+        task = ensure_loop_monitor()
+        assert ensure_loop_monitor() is task
+        task.cancel()
+
+    @override_settings(LOOP_LAG_INTERVAL=0.01)
+    async def test_blocking_call_is_observed_as_lag(self):
+        with patch("apps.common.loop_monitor.EVENT_LOOP_LAG") as mock_lag:
+            task = ensure_loop_monitor()
+            await asyncio.sleep(0)  # let the probe start its sleep
+            time.sleep(0.05)  # block the loop
+            await asyncio.sleep(0.02)
+            task.cancel()
+
+        assert max(call.args[0] for call in mock_lag.observe.call_args_list) >= 0.03
@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+import pytest
+
+from apps.drivers.models import Driver, DriverStats
+from apps.drivers.services.state import (
+    DriverState,
+    get_driver_states,
+    state_key,
+    update_driver_state,
+)
+
+
+@pytest.fixture
+def driver(django_user_model):
+    user = django_user_model.objects.create_user(
+        username="+919000000001", phone="+919000000001", role="driver"
+    )
+    return Driver.objects.get(user=user)
+
+
+WARM = {
+    "status": "ONLINE",
+    "level": "PRO",
+    "score": "88.5",
+    "trust_score": "95.0",
+    "is_suspended": "0",
+}
+
+
+class TestDriverState:
+    def test_eligibility(self):
+        base = dict(id=1, status="ONLINE", level="PRO", score=50.0)
+        assert DriverState(**base, trust_score=90.0, is_suspended=False).is_eligible
+        assert not DriverState(**base, trust_score=59.0, is_suspended=False).is_eligible
+        assert not DriverState(**base, trust_score=90.0, is_suspended=True).is_eligible
+        assert not DriverState(
+            **{**base, "status": "BUSY"}, trust_score=90.0, is_suspended=False
+        ).is_eligible
+
+    @patch("apps.drivers.services.state.redis_client")
+    def test_update_writes_hash_with_ttl(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+
+        update_driver_state(7, status="ONLINE", is_suspended=False, score=None)
+
+        pipe.hset.assert_called_once_with(
+            state_key(7), mapping={"status": "ONLINE", "is_suspended": 0, "score": 0.0}
+        )
+        pipe.expire.assert_called_once()
+
+    @patch("apps.drivers.services.state._load_from_db")
+    @patch("apps.drivers.services.state.redis_client")
+    def test_warm_read_skips_db(self, mock_redis, mock_load):
+        mock_redis.pipeline.return_value.execute.return_value = [WARM]
+
+        states = get_driver_states([7])
+
+        assert states[7] == DriverState(7, "ONLINE", "PRO", 88.5, 95.0, False)
+        mock_load.assert_not_called()
+
+    @pytest.mark.django_db
+    @patch("apps.drivers.services.state.redis_client")
+    def test_partial_hash_is_backfilled_from_db(self, mock_redis, driver):
+        Driver.objects.filter(id=driver.id).update(status=Driver.Status.ONLINE)
+        DriverStats.objects.create(driver=driver.user, score=42.0, trust_score=80.0)
+        mock_redis.pipeline.return_value.execute.return_value = [{"status": "ONLINE"}]
+
+        states = get_driver_states([driver.id])
+
+        assert states[driver.id].score == 42.0
+        assert states[driver.id].is_eligible
+        mock_redis.pipeline.return_value.hset.assert_called_once()
+
+
+@pytest.mark.django_db
+class TestDriverStateSignals:
+    @patch("apps.drivers.signals.update_driver_state")
+    def test_location_only_save_is_ignored(
+        self, mock_update, driver, django_capture_on_commit_callbacks
+    ):
+        driver.last_lat, driver.last_lng = 13.0, 80.2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            driver.save(update_fields=["last_lat", "last_lng"])
+
+        mock_update.assert_not_called()
+
+    @patch("apps.drivers.signals.update_driver_state")
+    def test_status_change_is_mirrored(
+        self, mock_update, driver, django_capture_on_commit_callbacks
+    ):
+        driver.status = Driver.Status.ONLINE
+
+        with django_capture_on_commit_callbacks(execute=True):
+            driver.save(update_fields=["status"])
+
+        mock_update.assert_called_once_with(
+            driver.id, status="ONLINE", level=driver.level
+        )
+
+    @patch("apps.drivers.signals.update_driver_state")
+    def test_stats_change_is_mirrored_by_driver_id(
+        self, mock_update, driver, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            DriverStats.objects.create(driver=driver.user, trust_score=40.0)
+
+        mock_update.assert_called_once_with(
+            driver.id, score=0.0, trust_score=40.0, is_suspended=False
+        )
+
+
+@pytest.mark.django_db
+class TestMatchingUsesReadModel:
+    @patch("apps.drivers.services.geo.unlock_driver_from_offer")
+    @patch("apps.drivers.services.geo.lock_driver_for_offer", return_value=True)
+    @patch("apps.rides.services.matching._offer_ride_to_driver", return_value=False)
+    @patch("apps.rides.services.matching._get_sorted_candidates")
+    def test_stale_state_falls_through_to_next_driver(
+        self, mock_candidates, mock_offer, mock_lock, mock_unlock, ride, driver
+    ):
+        from apps.rides.services.matching import find_driver_and_offer_ride
+
+        Driver.objects.filter(id=driver.id).update(status=Driver.Status.ONLINE)
+        DriverStats.objects.create(driver=driver.user)
+        stale = DriverState(999999, "ONLINE", "PRO", 99.0, 100.0, False)
+        fresh = DriverState(driver.id, "ONLINE", "NORMAL", 10.0, 100.0, False)
+        mock_candidates.return_value = ([stale, fresh], [stale.id, fresh.id])
+
+        find_driver_and_offer_ride(ride.id)
+
+        mock_unlock.assert_called_once_with(driver_id=stale.id)
+        assert mock_offer.call_args[0][1].id == driver.id
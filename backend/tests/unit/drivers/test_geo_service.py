@@ -4,6 +4,7 @@ from apps.drivers.services.geo import (
     add_driver_to_geo,
     get_nearby_driver_ids,
     remove_driver_from_geo,
+    search_available_drivers,
 )
 
 
@@ -21,11 +22,29 @@ def test_remove_driver(mock_redis):
 
 @patch("apps.drivers.services.geo.redis_client")
 def test_get_nearby(mock_redis):
-    mock_redis.geosearch.return_value = ["1", "2", "3"]
+    script = mock_redis.register_script.return_value
+    script.return_value = ["1", "0.4", "2", "1.2", "3", "2.9"]
 
     ids = get_nearby_driver_ids(lat=10, lng=20, radius_km=5)
 
     assert ids == [1, 2, 3]
-    mock_redis.geosearch.assert_called_with(
-        "drivers:geo", longitude=20, latitude=10, radius=5, unit="km", count=5
-    )
+    script.assert_called_once_with(keys=["drivers:geo"], args=[20, 10, 5, 5, 20, 0])
+    mock_redis.geosearch.assert_not_called()
+    mock_redis.exists.assert_not_called()
+
+
+@patch("apps.drivers.services.geo.redis_client")
+def test_search_available_drivers_single_round_trip(mock_redis):
+    script = mock_redis.register_script.return_value
+    script.return_value = ["7", "0.25", "3", "1.5"]
+
+    hits = search_available_drivers(lat=10, lng=20, radius_km=10, limit=2)
+
+    assert hits == [(7, 0.25), (3, 1.5)]
+    script.assert_called_once_with(keys=["drivers:geo"], args=[20, 10, 10, 2, 8, 1])
+
+
+@patch("apps.drivers.services.geo.redis_client")
+def test_search_available_drivers_empty(mock_redis):
+    mock_redis.register_script.return_value.return_value = []
+    assert search_available_drivers(lat=10, lng=20) == []
@@ -0,0 +1,66 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.drivers.models import Driver
+from apps.drivers.redis import DIRTY_POSITIONS_KEY, mark_position_dirty
+from apps.drivers.services.positions import flush_driver_positions
+
+
+@pytest.fixture
+def driver(django_user_model):
+    user = django_user_model.objects.create_user(
+        username="+919000000003", phone="+919000000003", role="driver"
+    )
+    return Driver.objects.get(user=user)
+
+
+def test_mark_position_dirty_keeps_latest_only():
+    client = MagicMock()
+    mark_position_dirty(client, 7, 13.0, 80.2, 1000)
+    client.hset.assert_called_once_with(DIRTY_POSITIONS_KEY, "7", "13.0,80.2,1000")
+
+
+@pytest.mark.django_db
+class TestFlushDriverPositions:
+    @patch("apps.drivers.services.positions.redis_client")
+    def test_nothing_pending(self, mock_redis):
+        mock_redis.register_script.return_value.return_value = []
+        assert flush_driver_positions() == 0
+
+    @patch("apps.drivers.services.positions.DRIVER_POSITION_FLUSH_LAG")
+    @patch("apps.drivers.services.positions.redis_client")
+    def test_bulk_writes_latest_positions(
+        self, mock_redis, mock_lag, driver, django_assert_max_num_queries
+    ):
+        ts = int(time.time()) - 4
+        mock_redis.register_script.return_value.return_value = [
+            str(driver.id),
+            f"13.05,80.25,{ts}",
+        ]
+
+        with django_assert_max_num_queries(1):
+            assert flush_driver_positions() == 1
+
+        driver.refresh_from_db()
+        assert (driver.last_lat, driver.last_lng) == (13.05, 80.25)
+        assert mock_lag.set.call_args[0][0] >= 4
+
+    @patch("django.db.models.query.QuerySet.bulk_update")
+    @patch("apps.drivers.services.positions.redis_client")
+    def test_failed_write_is_requeued_without_clobbering(
+        self, mock_redis, mock_bulk, driver
+    ):
+        mock_bulk.side_effect = RuntimeError("db down")
+        mock_redis.register_script.return_value.return_value = [
+            str(driver.id),
+            "13.0,80.0,1000",
+        ]
+
+        with pytest.raises(RuntimeError):
+            flush_driver_positions()
+
+        mock_redis.pipeline.return_value.hsetnx.assert_called_once_with(
+            DIRTY_POSITIONS_KEY, str(driver.id), "13.0,80.0,1000"
+        )
@@ -40,6 +40,16 @@ def _make_driver(user):
     return driver
 
 
+def _credit(user, amount):
+    from apps.payments.models import LedgerEntry
+    return LedgerEntry.objects.create(
+        user=user,
+        amount=Decimal(amount),
+        entry_type=LedgerEntry.Type.CREDIT,
+        reason=LedgerEntry.Reason.DRIVER_EARNING,
+    )
+
+
 def _make_payout(user, status="PROCESSING", reference="ref_test", amount="500.00",
                  gateway_payout_id="gw_123", failure_reason=""):
     from apps.payments.models import Payout
@@ -75,19 +85,19 @@ class TestTriggerScheduledPayouts:
         assert "backpressure" in result.lower() or "Shedding" in result
 
     def test_driver_with_sufficient_balance_queued(self, driver_user):
+        _credit(driver_user, "600.00")
         from apps.payments.tasks import trigger_scheduled_payouts
         with patch("apps.common.backpressure.CeleryQueueGuard.can_enqueue", return_value=True), \
-             patch("apps.payments.tasks.get_available_balance", return_value=Decimal("600.00")), \
-             patch("apps.payments.tasks.process_driver_payout.delay") as mock_delay:
+             patch("apps.payments.tasks.process_driver_payout_batch.delay") as mock_delay:
             result = trigger_scheduled_payouts()
         mock_delay.assert_called()
         assert "Triggered" in result
 
     def test_driver_with_insufficient_balance_skipped(self, driver_user):
+        _credit(driver_user, "10.00")
         from apps.payments.tasks import trigger_scheduled_payouts
         with patch("apps.common.backpressure.CeleryQueueGuard.can_enqueue", return_value=True), \
-             patch("apps.payments.tasks.get_available_balance", return_value=Decimal("10.00")), \
-             patch("apps.payments.tasks.process_driver_payout.delay") as mock_delay:
+             patch("apps.payments.tasks.process_driver_payout_batch.delay") as mock_delay:
             result = trigger_scheduled_payouts()
         mock_delay.assert_not_called()
         assert "0" in result
@@ -95,6 +105,7 @@ class TestTriggerScheduledPayouts:
     def test_fraud_flagged_driver_skipped(self, user, driver_user):
         from apps.rides.models import Ride
         driver = _make_driver(driver_user)
+        _credit(driver_user, "600.00")
         Ride.objects.create(
             rider=user, driver=driver,
             pickup_lat=12.9, pickup_lng=77.5,
@@ -103,12 +114,11 @@ class TestTriggerScheduledPayouts:
         )
         from apps.payments.tasks import trigger_scheduled_payouts
         with patch("apps.common.backpressure.CeleryQueueGuard.can_enqueue", return_value=True), \
-             patch("apps.payments.tasks.get_available_balance", return_value=Decimal("600.00")), \
-             patch("apps.payments.tasks.process_driver_payout.delay") as mock_delay:
+             patch("apps.payments.tasks.process_driver_payout_batch.delay") as mock_delay:
             trigger_scheduled_payouts()
         # The fraud-flagged driver must not be scheduled
         for c in mock_delay.call_args_list:
-            assert c[0][0] != driver.id
+            assert driver.id not in c[0][0]
 
     def test_blocked_driver_excluded(self, driver_user):
         """Drivers with BLOCKED status are excluded from payout."""
@@ -116,14 +126,14 @@ class TestTriggerScheduledPayouts:
         driver = _make_driver(driver_user)
         driver.status = Driver.Status.BLOCKED
         driver.save()
+        _credit(driver_user, "600.00")
         from apps.payments.tasks import trigger_scheduled_payouts
         with patch("apps.common.backpressure.CeleryQueueGuard.can_enqueue", return_value=True), \
-             patch("apps.payments.tasks.get_available_balance", return_value=Decimal("600.00")), \
-             patch("apps.payments.tasks.process_driver_payout.delay") as mock_delay:
+             patch("apps.payments.tasks.process_driver_payout_batch.delay") as mock_delay:
             result = trigger_scheduled_payouts()
         # blocked driver excluded; no calls expected
         for c in mock_delay.call_args_list:
-            assert c[0][0] != driver.id
+            assert driver.id not in c[0][0]
 
 
 # ─────────────────────────────────────────────────────────────
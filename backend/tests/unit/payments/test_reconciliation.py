@@ -0,0 +1,209 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+import razorpay
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.payments.models import Payment, Payout
+from apps.payments.services.reconciliation import CHECKPOINT_KEY, RateLimiter
+from apps.payments.tasks import reconcile_pending_payments, reconcile_processing_payouts
+from tests.fake_gateway import FakeGateway
+
+
+@pytest.fixture(autouse=True)
+def bypass_idempotency():
+    with patch("apps.common.idempotency.cache") as mock_cache:
+        mock_cache.add.return_value = True
+        mock_cache.get.return_value = None
+        yield mock_cache
+
+
+@pytest.fixture(autouse=True)
+def clean_checkpoints():
+    cache.delete_many([CHECKPOINT_KEY.format("payouts"), CHECKPOINT_KEY.format("payments")])
+    yield
+    cache.delete_many([CHECKPOINT_KEY.format("payouts"), CHECKPOINT_KEY.format("payments")])
+
+
+@pytest.fixture
+def gateway(settings):
+    settings.RECONCILE_RATE_PER_SEC = 0
+    gateway = FakeGateway(latency=0.05)
+    client = razorpay.Client(auth=("key", "secret"), base_url=gateway.start())
+    with (
+        patch("apps.payments.services.payout_gateway.client", client),
+        patch("apps.payments.views.razorpay_client", client),
+        # Injected failures must not trip the shared circuit breaker
+        patch("apps.common.circuit_breaker.cache") as breaker,
+    ):
+        breaker.get.side_effect = lambda key, default=None: default
+        yield gateway
+    gateway.stop()
+
+
+@pytest.fixture
+def processing_payouts(django_user_model, gateway):
+    driver_user = django_user_model.objects.create_user(
+        username="+919550000001", phone="+919550000001", role="driver"
+    )
+    payouts = []
+    for n in range(10):
+        payout = Payout.objects.create(
+            driver=driver_user,
+            amount=Decimal("600.00"),
+            fee=Decimal("0.00"),
+            net_amount=Decimal("600.00"),
+            status=Payout.Status.PROCESSING,
+            reference=f"payout:recon:{n}",
+            gateway_payout_id=f"pout_{n}",
+        )
+        gateway.add_payout(f"pout_{n}", payout.reference, "processed")
+        payouts.append(payout)
+    Payout.objects.filter(id__in=[p.id for p in payouts]).update(
+        updated_at=timezone.now() - timedelta(minutes=30)
+    )
+    return payouts
+
+
+@pytest.fixture
+def marks():
+    with (
+        patch("apps.payments.services.payout.mark_payout_success") as success,
+        patch("apps.payments.services.payout.mark_payout_failed") as failed,
+    ):
+        yield success, failed
+
+
+def _reconciled(mark):
+    return sorted(c.kwargs["payout"].reference for c in mark.call_args_list)
+
+
+@pytest.mark.django_db
+class TestPayoutReconciliation:
+    def test_lookups_run_concurrently_up_to_the_worker_limit(
+        self, settings, gateway, processing_payouts, marks
+    ):
+        settings.RECONCILE_WORKERS = 4
+
+        started = time.monotonic()
+        result = reconcile_processing_payouts()
+
+        assert result == "Reconciled 10 processing payouts."
+        assert len(gateway.paths("/payouts/")) == 10
+        assert 1 < gateway.max_in_flight <= 4
+        # 10 serial lookups at 50 ms each would take 0.5 s
+        assert time.monotonic() - started < 0.4
+
+    def test_large_backlog_is_read_from_one_listing(
+        self, settings, gateway, processing_payouts, marks
+    ):
+        settings.RECONCILE_LIST_MIN_ITEMS = 5
+        gateway.payouts["pout_3"]["status"] = "failed"
+        # Listed under another reference: looked up on its own
+        gateway.payouts["pout_9"]["reference_id"] = "unknown"
+
+        reconcile_processing_payouts()
+
+        success, failed = marks
+        assert gateway.paths() == ["/payouts", "/payouts/pout_9"]
+        assert len(success.call_args_list) == 9
+        assert _reconciled(failed) == ["payout:recon:3"]
+
+    def test_failed_lookups_are_alerted_once_and_skipped(
+        self, gateway, processing_payouts, marks
+    ):
+        gateway.fail_paths = {"pout_2", "pout_7"}
+
+        with patch("apps.notifications.services.alerts.send_critical_alert") as alert:
+            result = reconcile_processing_payouts()
+
+        assert result == "Reconciled 8 processing payouts."
+        alert.assert_called_once()
+        assert "Errors: 2" in alert.call_args.kwargs["title"]
+
+    def test_run_out_of_time_resumes_from_checkpoint(
+        self, settings, gateway, processing_payouts, marks
+    ):
+        settings.RECONCILE_WORKERS = 1  # 4 payouts per chunk
+        settings.RECONCILE_TIME_BUDGET = 0  # one chunk per run
+        success, _ = marks
+        key = CHECKPOINT_KEY.format("payouts")
+
+        reconcile_processing_payouts()
+        assert len(success.call_args_list) == 4
+        assert cache.get(key) == processing_payouts[3].id
+
+        reconcile_processing_payouts()
+        reconcile_processing_payouts()
+
+        references = [c.kwargs["payout"].reference for c in success.call_args_list]
+        assert references == [p.reference for p in processing_payouts]
+        assert cache.get(key) is None
+
+
+@pytest.mark.django_db
+class TestPaymentReconciliation:
+    @pytest.fixture
+    def pending(self, user, gateway):
+        from apps.rides.models import Ride
+
+        payments = []
+        for n in range(3):
+            ride = Ride.objects.create(
+                rider=user, pickup_lat=12.9, pickup_lng=77.5,
+                drop_lat=12.8, drop_lng=77.4, status="COMPLETED",
+            )
+            payments.append(
+                Payment.objects.create(
+                    user=user, ride_id=ride.id, amount=Decimal("100.00"),
+                    status=Payment.Status.CREATED, gateway_order_id=f"order_{n}",
+                )
+            )
+        Payment.objects.filter(id__in=[p.id for p in payments]).update(
+            created_at=timezone.now() - timedelta(minutes=30)
+        )
+        gateway.add_payment("pay_0", "order_0", "captured")
+        gateway.add_payment("pay_1a", "order_1", "failed")
+        gateway.add_payment("pay_2", "order_2", "captured")
+        return payments
+
+    def test_listing_finds_captures_without_per_order_calls(
+        self, settings, gateway, pending
+    ):
+        settings.RECONCILE_LIST_MIN_ITEMS = 2
+
+        with patch("apps.payments.services.payout.settle_driver_payout"):
+            result = reconcile_pending_payments()
+
+        assert result == "Reconciled 2 dropped payments automatically."
+        assert gateway.paths() == ["/v1/payments"]
+        statuses = Payment.objects.order_by("id").values_list("status", flat=True)
+        assert list(statuses) == ["CAPTURED", "CREATED", "CAPTURED"]
+
+    def test_failed_listing_falls_back_to_order_lookups(
+        self, settings, gateway, pending
+    ):
+        settings.RECONCILE_LIST_MIN_ITEMS = 2
+        gateway.fail_paths = {"/v1/payments"}
+
+        with patch("apps.payments.services.payout.settle_driver_payout"):
+            result = reconcile_pending_payments()
+
+        assert result == "Reconciled 2 dropped payments automatically."
+        assert len(gateway.paths("/v1/orders/")) == 3
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    limiter = RateLimiter(50)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: limiter.acquire(), range(10)))
+
+    # The first call is free, the other nine wait 20 ms apart
+    assert time.monotonic() - started >= 0.18
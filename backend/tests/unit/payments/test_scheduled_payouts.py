@@ -0,0 +1,125 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from apps.drivers.models import Driver
+from apps.payments.models import LedgerEntry, Payout
+from apps.payments.tasks import (
+    process_driver_payout,
+    process_driver_payout_batch,
+    trigger_scheduled_payouts,
+)
+
+
+@pytest.fixture(autouse=True)
+def bypass_idempotency():
+    with patch("apps.common.idempotency.cache") as mock_cache:
+        mock_cache.add.return_value = True
+        mock_cache.get.return_value = None
+        yield mock_cache
+
+
+def _driver(django_user_model, n, balance):
+    user = django_user_model.objects.create_user(
+        username=f"+91944000{n:04d}", phone=f"+91944000{n:04d}", role="driver"
+    )
+    if balance:
+        LedgerEntry.objects.create(
+            user=user,
+            amount=Decimal(balance),
+            entry_type=LedgerEntry.Type.CREDIT,
+            reason=LedgerEntry.Reason.DRIVER_EARNING,
+        )
+    return Driver.objects.get(user=user)
+
+
+@pytest.mark.django_db
+class TestScheduledPayoutRun:
+    def test_eligible_drivers_are_found_in_one_query_and_batched(
+        self, django_user_model, settings, django_assert_num_queries, platform_user
+    ):
+        settings.PAYOUT_DISPATCH_BATCH_SIZE = 2
+        payable = [_driver(django_user_model, i, "700.00") for i in range(3)]
+        _driver(django_user_model, 3, "100.00")
+        _driver(django_user_model, 4, None)
+        paid = _driver(django_user_model, 5, "900.00")
+        Payout.objects.create(
+            driver=paid.user,
+            amount=Decimal("900.00"),
+            fee=Decimal("0.00"),
+            net_amount=Decimal("900.00"),
+            reference=f"payout:scheduled:{paid.user_id}:{timezone.now().date().isoformat()}",
+        )
+
+        with (
+            patch(
+                "apps.common.backpressure.CeleryQueueGuard.can_enqueue",
+                return_value=True,
+            ),
+            patch(
+                "apps.payments.tasks.process_driver_payout_batch.delay"
+            ) as dispatch,
+            django_assert_num_queries(1),
+        ):
+            result = trigger_scheduled_payouts()
+
+        assert result == "Triggered payouts for 3 drivers"
+        assert [c.args[0] for c in dispatch.call_args_list] == [
+            [payable[0].id, payable[1].id],
+            [payable[2].id],
+        ]
+
+    def test_failing_driver_is_handed_to_the_retrying_task(self):
+        with (
+            patch(
+                "apps.payments.tasks._pay_out_driver",
+                side_effect=[RuntimeError("db gone"), "Payout ok"],
+            ) as pay_out,
+            patch("apps.payments.tasks.process_driver_payout.delay") as retry,
+        ):
+            result = process_driver_payout_batch([11, 12])
+
+        assert [c.args[0] for c in pay_out.call_args_list] == [11, 12]
+        retry.assert_called_once_with(11)
+        assert result == "Processed 2 payouts (1 deferred to retry)"
+
+
+@pytest.mark.django_db
+class TestPayoutEligibilityUnderLock:
+    """Drivers blocked or flagged after dispatch must not be paid, retry included."""
+
+    @pytest.fixture
+    def payable(self, django_user_model, platform_user):
+        return _driver(django_user_model, 1, "700.00")
+
+    @pytest.mark.parametrize("task", [process_driver_payout_batch, process_driver_payout])
+    def test_driver_blocked_after_dispatch_is_not_paid(self, payable, task):
+        Driver.objects.filter(id=payable.id).update(status=Driver.Status.BLOCKED)
+
+        with patch("apps.payments.tasks.create_driver_payout") as gateway:
+            task([payable.id] if task is process_driver_payout_batch else payable.id)
+
+        gateway.assert_not_called()
+        assert not Payout.objects.filter(driver=payable.user).exists()
+
+    @pytest.mark.parametrize("task", [process_driver_payout_batch, process_driver_payout])
+    def test_driver_flagged_after_dispatch_is_not_paid(self, payable, user, task):
+        from apps.rides.models import Ride
+
+        Ride.objects.create(
+            rider=user,
+            driver=payable,
+            pickup_lat=0,
+            pickup_lng=0,
+            drop_lat=0,
+            drop_lng=0,
+            is_fraud_flagged=True,
+        )
+
+        with patch("apps.payments.tasks.create_driver_payout") as gateway:
+            task([payable.id] if task is process_driver_payout_batch else payable.id)
+
+        gateway.assert_not_called()
+        assert not Payout.objects.filter(driver=payable.user).exists()
@@ -36,10 +36,10 @@ class TestPaymentTasks:
         return driver
 
     def test_trigger_scheduled_payouts_success(self, driver_with_balance):
-        with patch('apps.payments.tasks.process_driver_payout.delay') as mock_delay:
+        with patch('apps.payments.tasks.process_driver_payout_batch.delay') as mock_delay:
             result = trigger_scheduled_payouts()
             assert "Triggered payouts for 1 drivers" in result
-            mock_delay.assert_called_once_with(driver_with_balance.id)
+            mock_delay.assert_called_once_with([driver_with_balance.id])
 
     def test_trigger_scheduled_payouts_fraud_blocked(self, driver_with_balance, rider_user):
         # Create a fraud flagged ride for this driver
@@ -51,7 +51,7 @@ class TestPaymentTasks:
             pickup_address="A", drop_address="B"
         )
         
-        with patch('apps.payments.tasks.process_driver_payout.delay') as mock_delay:
+        with patch('apps.payments.tasks.process_driver_payout_batch.delay') as mock_delay:
             result = trigger_scheduled_payouts()
             assert "Triggered payouts for 0 drivers" in result
             mock_delay.assert_not_called()
@@ -1,13 +1,26 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
-from apps.payments.models import LedgerEntry
+import pytest
+from django.db import transaction
+
+from apps.payments.models import LedgerEntry, Payment, WalletBalance
+from apps.payments.services import ledger
 from apps.payments.services.wallet import (
     get_available_balance,
     get_held_balance,
     get_wallet_balance,
+    verify_wallet_balances,
 )
 
 
+@pytest.fixture(autouse=True)
+def house_account(platform_user):
+    # Created first so test users never take PLATFORM_USER_ID
+    return platform_user
+
+
 def test_wallet_balance_calculation(user):
     # Credit 100
     LedgerEntry.objects.create(
@@ -71,3 +84,103 @@ def test_available_balance(user):
 
     # Available: 70 - 30 = 40
     assert get_available_balance(user) == Decimal("40.00")
+
+
+def test_balance_reads_are_one_snapshot_lookup(user, django_assert_num_queries):
+    ledger.credit(user=user, amount="100.00", reference="c1", reason="INCENTIVE")
+    ledger.hold(user=user, amount="40.00", reference="h1", reason="DRIVER_PAYOUT")
+
+    with django_assert_num_queries(1):
+        assert get_available_balance(user) == Decimal("60.00")
+
+
+def test_replayed_ledger_write_is_counted_once(user):
+    for _ in range(2):
+        ledger.debit(user=user, amount="25.00", reference="d1", reason="PAYMENT")
+
+    assert WalletBalance.objects.get(user=user).debits == Decimal("25.00")
+    assert get_wallet_balance(user) == Decimal("-25.00")
+
+
+def test_verifier_repairs_drifted_and_missing_snapshots(user, django_user_model):
+    other = django_user_model.objects.create_user(
+        username="+919000000042", phone="+919000000042", role="driver"
+    )
+    ledger.credit(user=user, amount="80.00", reference="c1", reason="INCENTIVE")
+    ledger.credit(user=other, amount="10.00", reference="c2", reason="INCENTIVE")
+    WalletBalance.objects.filter(user=user).update(credits=Decimal("999.00"))
+    WalletBalance.objects.filter(user=other).delete()
+
+    assert sorted(verify_wallet_balances(chunk_size=1)) == sorted([user.id, other.id])
+    assert get_wallet_balance(user) == Decimal("80.00")
+    assert get_wallet_balance(other) == Decimal("10.00")
+    assert verify_wallet_balances() == []
+
+
+def test_house_account_is_summed_from_the_ledger(user, platform_user):
+    ledger.credit(user=platform_user, amount="20.00", reference="commission:1", reason="PLATFORM_COMMISSION")
+    ledger.credit(user=platform_user, amount="2.50", reference="fee:1", reason="WITHDRAWAL_FEE")
+    ledger.debit(user=platform_user, amount="5.00", reference="refund:1", reason="REFUND")
+
+    assert not WalletBalance.objects.filter(user=platform_user).exists()
+    assert get_wallet_balance(platform_user) == Decimal("17.50")
+    assert verify_wallet_balances() == []
+
+
+def _captured_ride(rider, django_user_model, n):
+    from apps.rides.models import Ride
+
+    driver_user = django_user_model.objects.create_user(
+        username=f"+91944000{n:04d}", phone=f"+91944000{n:04d}", role="driver"
+    )
+    ride = Ride.objects.create(
+        rider=rider,
+        driver=driver_user.driver,
+        pickup_lat=0,
+        pickup_lng=0,
+        drop_lat=0,
+        drop_lng=0,
+        status=Ride.Status.COMPLETED,
+    )
+    payment = Payment.objects.create(
+        user=rider,
+        ride_id=ride.id,
+        amount=Decimal("100.00"),
+        status=Payment.Status.CAPTURED,
+        gateway_payment_id=f"pay_{n}",
+    )
+    return ride, payment
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_settlements_do_not_block_on_the_platform_row(
+    user, platform_user, django_user_model
+):
+    from apps.payments.services.payout import settle_driver_payout
+
+    (first_ride, first_payment), (second_ride, second_payment) = (
+        _captured_ride(user, django_user_model, n) for n in (1, 2)
+    )
+    first_settled, release = threading.Event(), threading.Event()
+
+    def settle_and_stay_open():
+        with transaction.atomic():
+            settle_driver_payout(ride=first_ride, payment=first_payment)
+            first_settled.set()
+            release.wait(10)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        held = executor.submit(settle_and_stay_open)
+        assert first_settled.wait(10)
+        second = executor.submit(
+            settle_driver_payout, ride=second_ride, payment=second_payment
+        )
+        try:
+            # Both credited the platform; the second must not wait for the first
+            assert second.result(timeout=5) == (Decimal("80.00"), Decimal("20.00"))
+        finally:
+            release.set()
+        held.result()
+
+    assert get_wallet_balance(platform_user) == Decimal("40.00")
+    assert verify_wallet_balances() == []
@@ -0,0 +1,210 @@
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.payments.models import LedgerEntry, Payment, Payout, WebhookEvent
+from apps.payments.services.webhooks import APPLY_KICK_KEY, APPLY_LOCK_KEY
+from apps.payments.tasks import apply_webhook_events
+from tests.unit.payments.test_payment_webhook import sign
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(settings):
+    settings.RAZORPAY_WEBHOOK_SECRET = "test_secret"
+
+
+@pytest.fixture(autouse=True)
+def clean_applier_keys():
+    cache.delete_many([APPLY_KICK_KEY, APPLY_LOCK_KEY])
+    yield
+    cache.delete_many([APPLY_KICK_KEY, APPLY_LOCK_KEY])
+
+
+def _captured(n, order_id=None):
+    return {
+        "id": f"evt_{n}",
+        "event": "payment.captured",
+        "payload": {
+            "payment": {
+                "entity": {
+                    "id": f"pay_{n}",
+                    "order_id": order_id or f"order_{n}",
+                    "amount": 10000,
+                }
+            }
+        },
+    }
+
+
+def _post(client, payload):
+    body = json.dumps(payload).encode()
+    return client.post(
+        reverse("payments:razorpay-webhook"),
+        data=body,
+        content_type="application/json",
+        HTTP_X_RAZORPAY_SIGNATURE=sign(body),
+    )
+
+
+@pytest.fixture
+def payments(user):
+    return [
+        Payment.objects.create(
+            user=user, ride_id=None, amount=Decimal("100.00"), gateway_order_id=f"order_{n}"
+        )
+        for n in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestIngest:
+    def test_ingest_records_and_enqueues_without_applying(self, client, payments):
+        with patch("apps.payments.tasks.apply_webhook_events.delay") as delay:
+            r1 = _post(client, _captured(0))
+            r2 = _post(client, _captured(1))
+
+        assert r1.status_code == r2.status_code == 200
+        # One applier run covers the burst
+        delay.assert_called_once()
+        assert WebhookEvent.objects.filter(status="RECEIVED").count() == 2
+        assert not Payment.objects.filter(status=Payment.Status.CAPTURED).exists()
+
+    def test_malformed_payment_event_is_rejected(self, client):
+        payload = _captured(0)
+        del payload["payload"]["payment"]["entity"]["order_id"]
+
+        assert _post(client, payload).status_code == 400
+        assert not WebhookEvent.objects.exists()
+
+
+@pytest.mark.django_db
+class TestApplier:
+    def test_events_are_applied_in_batches_exactly_once(self, client, settings, payments):
+        settings.WEBHOOK_APPLY_BATCH_SIZE = 2
+        with patch("apps.payments.tasks.apply_webhook_events.delay"):
+            for n in range(3):
+                _post(client, _captured(n))
+            _post(client, _captured(0))  # replay
+
+        assert apply_webhook_events() == "Applied 3 webhook events"
+        assert apply_webhook_events() == "Applied 0 webhook events"
+
+        assert set(WebhookEvent.objects.values_list("status", flat=True)) == {"PROCESSED"}
+        assert LedgerEntry.objects.filter(reason=LedgerEntry.Reason.PAYMENT).count() == 3
+        for payment in payments:
+            payment.refresh_from_db()
+            assert payment.status == Payment.Status.CAPTURED
+
+    def test_failing_event_does_not_hold_back_the_batch(self, client, payments):
+        with patch("apps.payments.tasks.apply_webhook_events.delay"):
+            for n in range(3):
+                _post(client, _captured(n))
+
+        real_create = LedgerEntry.objects.create
+
+        def create(**kwargs):
+            if kwargs["reference"] == f"payment:{payments[1].id}":
+                raise RuntimeError("ledger unavailable")
+            return real_create(**kwargs)
+
+        with patch.object(LedgerEntry.objects, "create", side_effect=create):
+            apply_webhook_events()
+
+        statuses = dict(WebhookEvent.objects.values_list("event_id", "status"))
+        assert statuses == {"evt_0": "PROCESSED", "evt_1": "RECEIVED", "evt_2": "PROCESSED"}
+        failed = WebhookEvent.objects.get(event_id="evt_1")
+        assert (failed.error, failed.attempts) == ("ledger unavailable", 1)
+        # The failed event's changes were rolled back with its savepoint
+        payments[1].refresh_from_db()
+        assert payments[1].status == Payment.Status.CREATED
+
+    def test_failed_event_is_applied_by_a_later_run(self, client, settings, payments):
+        settings.WEBHOOK_APPLY_RETRY_SECONDS = 30
+        with patch("apps.payments.tasks.apply_webhook_events.delay"):
+            _post(client, _captured(0))
+
+        with patch(
+            "apps.payments.services.webhooks._apply_payment_event",
+            side_effect=RuntimeError("lock wait timeout"),
+        ):
+            apply_webhook_events()
+
+        event = WebhookEvent.objects.get()
+        assert (event.status, event.attempts, event.processed_at) == ("RECEIVED", 1, None)
+        # Backing off: the next run leaves it alone
+        assert apply_webhook_events() == "Applied 0 webhook events"
+
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        assert apply_webhook_events() == "Applied 1 webhook events"
+
+        event.refresh_from_db()
+        assert (event.status, event.attempts, event.error) == ("PROCESSED", 2, "")
+        payments[0].refresh_from_db()
+        assert payments[0].status == Payment.Status.CAPTURED
+
+    def test_event_is_failed_after_the_last_attempt(self, client, settings, payments):
+        settings.WEBHOOK_APPLY_RETRY_SECONDS = 0
+        settings.WEBHOOK_APPLY_MAX_ATTEMPTS = 3
+        with patch("apps.payments.tasks.apply_webhook_events.delay"):
+            _post(client, _captured(0))
+
+        with patch(
+            "apps.payments.services.webhooks._apply_payment_event",
+            side_effect=RuntimeError("boom"),
+        ) as apply:
+            for _ in range(4):
+                apply_webhook_events()
+
+        assert apply.call_count == 3
+        event = WebhookEvent.objects.get()
+        assert (event.status, event.attempts, event.error) == ("FAILED", 3, "boom")
+        assert event.processed_at is not None
+
+    def test_unknown_order_is_ignored(self, client):
+        with patch("apps.payments.tasks.apply_webhook_events.delay"):
+            _post(client, _captured(9))
+
+        apply_webhook_events()
+
+        assert WebhookEvent.objects.get().status == "IGNORED"
+
+    def test_payout_event_settles_the_payout(self, django_user_model):
+        driver_user = django_user_model.objects.create_user(
+            username="+919550000002", phone="+919550000002", role="driver"
+        )
+        payout = Payout.objects.create(
+            driver=driver_user,
+            amount=Decimal("500.00"),
+            fee=Decimal("0.00"),
+            net_amount=Decimal("500.00"),
+            status=Payout.Status.PROCESSING,
+            reference="payout:applier:1",
+        )
+        WebhookEvent.objects.create(
+            gateway="razorpay",
+            event_id="evt_payout_1",
+            event_type="payout.processed",
+            payload={
+                "payload": {
+                    "payout": {
+                        "entity": {"reference_id": payout.reference, "status": "processed"}
+                    }
+                }
+            },
+        )
+
+        with patch("apps.payments.services.payout.mark_payout_success") as success:
+            apply_webhook_events()
+
+        assert success.call_args.kwargs["payout"] == payout
+        assert WebhookEvent.objects.get().status == "PROCESSED"
+
+    def test_concurrent_run_is_skipped(self):
+        cache.add(APPLY_LOCK_KEY, "1")
+
+        assert apply_webhook_events() == "Webhook applier already running"
@@ -0,0 +1,119 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.drivers.models import Driver
+from apps.rides.models import Ride
+from apps.rides.services.active_ride import (
+    NO_RIDE,
+    ActiveRide,
+    get_active_ride_snapshot,
+    notify_driver_ride_event,
+)
+from apps.tracking.consumers.driver_location import DriverLocationConsumer
+
+
+@pytest.fixture
+def driver(django_user_model):
+    user = django_user_model.objects.create_user(
+        username="+919000000002", phone="+919000000002", role="driver"
+    )
+    return Driver.objects.get(user=user)
+
+
+@pytest.mark.django_db
+class TestActiveRideSnapshot:
+    @patch("apps.rides.services.active_ride.redis_client")
+    def test_miss_loads_once_and_caches(self, mock_redis, driver, ride):
+        Ride.objects.filter(id=ride.id).update(driver=driver, status=Ride.Status.ONGOING)
+        mock_redis.get.return_value = None
+
+        snapshot = get_active_ride_snapshot(driver.id)
+
+        assert snapshot.id == ride.id
+        assert snapshot.status == Ride.Status.ONGOING
+        cached = mock_redis.set.call_args[0][1]
+        assert ActiveRide(**json.loads(cached)) == snapshot
+
+    @patch("apps.rides.services.active_ride.redis_client")
+    def test_idle_driver_is_cached_as_no_ride(self, mock_redis, driver):
+        mock_redis.get.return_value = None
+
+        assert get_active_ride_snapshot(driver.id) is None
+        assert mock_redis.set.call_args[0][1] == NO_RIDE
+
+    @patch("apps.rides.services.active_ride.load_active_ride")
+    @patch("apps.rides.services.active_ride.redis_client")
+    def test_hit_skips_db(self, mock_redis, mock_load):
+        mock_redis.get.return_value = NO_RIDE
+
+        assert get_active_ride_snapshot(7) is None
+        mock_load.assert_not_called()
+
+    @patch("apps.rides.services.active_ride.async_to_sync")
+    @patch("apps.rides.services.active_ride.redis_client")
+    def test_notify_invalidates_and_publishes(self, mock_redis, mock_async):
+        notify_driver_ride_event(7, 3, Ride.Status.SEARCHING)
+
+        mock_redis.delete.assert_called_once_with("driver:7:active_ride")
+        mock_async.return_value.assert_called_once_with(
+            "driver_7_rides",
+            {"type": "ride_status_update", "ride_id": 3, "status": "SEARCHING"},
+        )
+
+
+@pytest.mark.asyncio
+class TestLocationSocketRideState:
+    def _consumer(self):
+        consumer = DriverLocationConsumer()
+        consumer.driver = MagicMock(id=7)
+        consumer.active_ride = None
+        consumer.active_ride_stale = True
+        return consumer
+
+    async def test_steady_state_pings_do_not_query(self):
+        consumer = self._consumer()
+        ride = MagicMock(id=3)
+
+        with patch(
+            "apps.tracking.consumers.driver_location.load_active_ride",
+            return_value=ride,
+        ) as mock_load:
+            for _ in range(5):
+                assert await consumer._get_active_ride() is ride
+
+        mock_load.assert_called_once_with(7)
+
+    async def test_lifecycle_event_triggers_one_reload(self):
+        consumer = self._consumer()
+        consumer.active_ride, consumer.active_ride_stale = MagicMock(id=3), False
+
+        await consumer.ride_status_update({"ride_id": 3, "status": "ARRIVED"})
+
+        with patch(
+            "apps.tracking.consumers.driver_location.load_active_ride"
+        ) as mock_load:
+            await consumer._get_active_ride()
+            await consumer._get_active_ride()
+        mock_load.assert_called_once_with(7)
+
+    async def test_finished_ride_is_dropped_without_query(self):
+        consumer = self._consumer()
+        consumer.active_ride, consumer.active_ride_stale = MagicMock(id=3), False
+
+        await consumer.ride_status_update({"ride_id": 3, "status": "COMPLETED"})
+
+        with patch(
+            "apps.tracking.consumers.driver_location.load_active_ride"
+        ) as mock_load:
+            assert await consumer._get_active_ride() is None
+        mock_load.assert_not_called()
+
+    async def test_new_offer_is_picked_up(self):
+        consumer = self._consumer()
+        consumer.active_ride_stale = False
+
+        await consumer.ride_offer({"data": {"ride_id": 9}})
+
+        assert consumer.active_ride_stale
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import patch, MagicMock
 from decimal import Decimal
@@ -9,6 +10,7 @@ from apps.rides.models import Ride
 from apps.rides.services.lifecycle import update_ride_status, _handle_completed
 from apps.rides.services.cancellation import cancel_ride
 from apps.rides.services.surge import get_surge, get_surge_multiplier
+from apps.rides.services.surge_engine import cell_id_from_lat_lng
 from apps.rides.services.matching import find_driver_and_offer_ride
 
 import uuid
@@ -148,6 +150,8 @@ class TestCancellationCoverage:
 
 
 @pytest.mark.django_db
+@patch('apps.rides.services.surge._SurgeCache._listen', lambda self: None)
+@patch('apps.rides.services.surge._cache', None)
 class TestSurgeCoverage:
     @patch('apps.rides.services.surge.redis_client.get')
     def test_get_surge_no_value(self, mock_get):
@@ -156,7 +160,7 @@ class TestSurgeCoverage:
 
     @patch('apps.rides.services.surge.redis_client.get')
     def test_get_surge_with_value(self, mock_get):
-        mock_get.return_value = b'1.5'
+        mock_get.return_value = json.dumps({cell_id_from_lat_lng(12.9716, 77.5946): 1.5})
         assert get_surge(12.9716, 77.5946) == 1.5
 
 
@@ -168,11 +172,11 @@ class TestMatchingCoverage:
         # Should gracefully return without modifying ride
         assert find_driver_and_offer_ride(ride.id) is None
 
-    @patch('apps.drivers.services.geo.is_driver_locked')
+    @patch('apps.drivers.services.geo.lock_driver_for_offer')
     @patch('apps.rides.services.matching._get_sorted_candidates')
-    def test_find_driver_all_locked(self, mock_get_candidates, mock_is_locked, ride, driver_profile):
+    def test_find_driver_all_locked(self, mock_get_candidates, mock_lock_driver, ride, driver_profile):
         mock_get_candidates.return_value = ([driver_profile], [driver_profile.id])
-        mock_is_locked.return_value = True
+        mock_lock_driver.return_value = False
         
         assert find_driver_and_offer_ride(ride.id) is None
 
@@ -186,13 +190,15 @@ class TestMatchingCoverage:
         
         assert find_driver_and_offer_ride(ride.id) is None
 
-    @patch('apps.rides.tasks.driver_accept_timeout.apply_async')
+    @patch('apps.rides.services.matching.schedule_timer')
     @patch('apps.drivers.services.metrics.update_driver_metrics')
     @patch('apps.drivers.services.geo.lock_driver_for_offer')
     @patch('apps.drivers.services.geo.is_driver_locked')
     @patch('apps.rides.services.matching._get_sorted_candidates')
     @patch('apps.rides.services.lifecycle._broadcast_status_update')
     def test_find_driver_success_offered(self, mock_broadcast, mock_get_candidates, mock_is_locked, mock_lock_driver, mock_update_metrics, mock_timeout, ride, driver_profile):
+        from apps.drivers.models import DriverStats
+        DriverStats.objects.get_or_create(driver=driver_profile.user)
         mock_get_candidates.return_value = ([driver_profile], [driver_profile.id])
         mock_is_locked.return_value = False
         mock_lock_driver.return_value = True
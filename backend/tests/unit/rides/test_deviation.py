@@ -1,13 +1,14 @@
 from unittest.mock import MagicMock, patch, AsyncMock
 import math
 
+import polyline
 import pytest
 
 from apps.rides.services.deviation import (
     haversine_distance,
-    point_to_segment_distance,
     check_route_deviation,
 )
+from apps.tracking.route_index import RouteIndex
 
 
 # ─── haversine_distance ───────────────────────────────────────────────────────
@@ -28,49 +29,6 @@ def test_haversine_symmetry():
     assert d1 == pytest.approx(d2, rel=1e-6)
 
 
-# ─── point_to_segment_distance ───────────────────────────────────────────────
-
-def test_point_to_segment_on_segment():
-    # Point is near the midpoint of a horizontal segment
-    s1 = (0.0, 0.0)
-    s2 = (0.0, 1.0)
-    pt = (0.0, 0.5)
-    dist = point_to_segment_distance(pt, s1, s2)
-    # Point is on the segment, distance should be ~0
-    assert dist < 1000  # very small in haversine meters
-
-
-def test_point_to_segment_zero_length():
-    # Degenerate segment (same start and end)
-    s1 = (12.97, 77.59)
-    s2 = (12.97, 77.59)
-    pt = (12.98, 77.60)
-    dist = point_to_segment_distance(pt, s1, s2)
-    # Should fall back to haversine of pt to s1
-    expected = haversine_distance(12.98, 77.60, 12.97, 77.59)
-    assert dist == pytest.approx(expected, rel=1e-6)
-
-
-def test_point_to_segment_before_start():
-    # t < 0 → clamp to s1
-    s1 = (1.0, 1.0)
-    s2 = (2.0, 2.0)
-    pt = (0.0, 0.0)
-    dist = point_to_segment_distance(pt, s1, s2)
-    expected = haversine_distance(0, 0, 1, 1)
-    assert dist == pytest.approx(expected, rel=1e-4)
-
-
-def test_point_to_segment_after_end():
-    # t > 1 → clamp to s2
-    s1 = (1.0, 1.0)
-    s2 = (2.0, 2.0)
-    pt = (3.0, 3.0)
-    dist = point_to_segment_distance(pt, s1, s2)
-    expected = haversine_distance(3, 3, 2, 2)
-    assert dist == pytest.approx(expected, rel=1e-4)
-
-
 # ─── check_route_deviation ────────────────────────────────────────────────────
 
 def test_no_polyline_returns_false():
@@ -83,24 +41,22 @@ def test_no_polyline_returns_false():
     assert dist == 0
 
 
-@patch("apps.rides.services.deviation.polyline")
-def test_empty_polyline_returns_false(mock_polyline):
+@patch("apps.rides.services.deviation.get_route_index")
+def test_empty_polyline_returns_false(mock_route):
     ride = MagicMock()
     ride.planned_route_polyline = "dummy"
-    mock_polyline.decode.return_value = []
+    mock_route.return_value = RouteIndex([])
 
     driver = MagicMock()
     result, dist = check_route_deviation(driver, ride, 12.97, 77.59)
     assert result is False
 
 
-@patch("apps.rides.services.deviation.polyline")
-def test_single_segment_polyline_not_deviated(mock_polyline):
+def test_single_segment_polyline_not_deviated():
     # Two points, driver is on the segment
     ride = MagicMock()
-    ride.planned_route_polyline = "dummy"
+    ride.planned_route_polyline = polyline.encode([(12.97, 77.59), (12.98, 77.60)])
     ride.id = 10
-    mock_polyline.decode.return_value = [(12.97, 77.59), (12.98, 77.60)]
 
     driver = MagicMock()
     # Driver is right at the first polyline point (no deviation)
@@ -110,13 +66,11 @@ def test_single_segment_polyline_not_deviated(mock_polyline):
 
 @patch("apps.rides.services.deviation.get_channel_layer")
 @patch("apps.rides.services.deviation.async_to_sync")
-@patch("apps.rides.services.deviation.polyline")
-def test_large_deviation_triggers_alert(mock_polyline, mock_async_sync, mock_get_layer):
+def test_large_deviation_triggers_alert(mock_async_sync, mock_get_layer):
     ride = MagicMock()
     ride.id = 99
-    ride.planned_route_polyline = "dummy"
     # Very far route: Chennai
-    mock_polyline.decode.return_value = [(12.97, 77.59), (12.98, 77.60)]
+    ride.planned_route_polyline = polyline.encode([(12.97, 77.59), (12.98, 77.60)])
 
     mock_channel_layer = MagicMock()
     mock_get_layer.return_value = mock_channel_layer
@@ -134,11 +88,11 @@ def test_large_deviation_triggers_alert(mock_polyline, mock_async_sync, mock_get
     assert dist > 500
 
 
-@patch("apps.rides.services.deviation.polyline")
-def test_exception_returns_false(mock_polyline):
+@patch("apps.rides.services.deviation.get_route_index")
+def test_exception_returns_false(mock_route):
     ride = MagicMock()
     ride.planned_route_polyline = "bad"
-    mock_polyline.decode.side_effect = Exception("bad data")
+    mock_route.side_effect = Exception("bad data")
 
     driver = MagicMock()
     result, dist = check_route_deviation(driver, ride, 12.97, 77.59)
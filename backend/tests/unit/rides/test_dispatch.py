@@ -0,0 +1,243 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.test import override_settings
+
+from apps.rides.models import Ride
+from apps.rides.services.dispatch import (
+    UNREACHABLE,
+    build_cost_matrix,
+    dispatch_cell_id,
+    dispatch_retries,
+    drain_cell,
+    enqueue_ride,
+    pair_cost,
+    retry_unit,
+    search_radius_km,
+    solve_assignment,
+    submit_for_matching,
+)
+
+
+class TestSolveAssignment:
+    def test_empty(self):
+        assert solve_assignment([]) == []
+        assert solve_assignment([[]]) == []
+
+    def test_beats_greedy(self):
+        # Greedy (ride 0 first) takes driver 0 and forces ride 1 onto 9km.
+        cost = [
+            [1.0, 2.0],
+            [1.5, 9.0],
+        ]
+        assert solve_assignment(cost) == [(0, 1), (1, 0)]
+
+    def test_more_drivers_than_rides(self):
+        cost = [[5.0, 1.0, 3.0]]
+        assert solve_assignment(cost) == [(0, 1)]
+
+    def test_more_rides_than_drivers(self):
+        cost = [[4.0], [1.0], [3.0]]
+        assert solve_assignment(cost) == [(1, 0)]
+
+
+class TestCostModel:
+    def test_level_and_score_penalise(self):
+        assert pair_cost(1.0, "PRO", 100.0) == pytest.approx(1.0)
+        assert pair_cost(1.0, "NORMAL", 100.0) > pair_cost(1.0, "PRO", 100.0)
+        assert pair_cost(1.0, "PRO", 0.0) > pair_cost(1.0, "PRO", 100.0)
+
+    def test_rejected_and_out_of_range_are_unreachable(self):
+        ride = MagicMock(id=1, rejected_driver_ids=[20])
+        d10 = MagicMock(id=10, level="PRO", score=100.0)
+        d20 = MagicMock(id=20, level="PRO", score=100.0)
+        d30 = MagicMock(id=30, level="PRO", score=100.0)
+        distances = {1: {10: 1.0, 20: 0.5}}
+
+        matrix = build_cost_matrix([ride], [d10, d20, d30], distances)
+
+        assert matrix[0][0] == pytest.approx(1.0)
+        assert matrix[0][1] == UNREACHABLE
+        assert matrix[0][2] == UNREACHABLE
+
+
+class TestBatchPool:
+    def test_dispatch_cell_id_is_coarse(self):
+        assert dispatch_cell_id(13.0827, 80.2707) == dispatch_cell_id(13.09, 80.29)
+
+    @patch("apps.rides.tasks.dispatch_cell_batch.apply_async")
+    @patch("apps.rides.services.dispatch.redis_client")
+    def test_first_ride_opens_window(self, mock_redis, mock_task):
+        mock_redis.set.return_value = True
+        ride = MagicMock(id=7, pickup_lat=13.08, pickup_lng=80.27)
+
+        enqueue_ride(ride)
+
+        mock_redis.zadd.assert_called_once()
+        mock_task.assert_called_once()
+
+    @patch("apps.rides.tasks.dispatch_cell_batch.apply_async")
+    @patch("apps.rides.services.dispatch.redis_client")
+    def test_later_rides_join_open_window(self, mock_redis, mock_task):
+        mock_redis.set.return_value = None
+        ride = MagicMock(id=8, pickup_lat=13.08, pickup_lng=80.27)
+
+        enqueue_ride(ride)
+
+        mock_redis.zadd.assert_called_once()
+        mock_task.assert_not_called()
+
+    @patch("apps.rides.services.dispatch.redis_client")
+    def test_pickup_distances_one_pipeline(self, mock_redis):
+        from apps.rides.services.dispatch import _pickup_distances
+
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [["5", "0.3", "9", "2.0"], []]
+        rides = [
+            MagicMock(id=1, pickup_lat=13.08, pickup_lng=80.27, match_retries=0),
+            MagicMock(id=2, pickup_lat=13.10, pickup_lng=80.20, match_retries=4),
+        ]
+
+        assert _pickup_distances(rides) == {1: {5: 0.3, 9: 2.0}, 2: {}}
+        search = mock_redis.register_script.return_value
+        assert search.call_count == 2
+        # The second ride has been retried: wider radius
+        assert [c.kwargs["args"][2] for c in search.call_args_list] == [10.0, 20.0]
+        pipe.execute.assert_called_once()
+
+    @patch("apps.rides.services.dispatch.redis_client")
+    def test_drain_cell(self, mock_redis):
+        mock_redis.pipeline.return_value.execute.return_value = [1, ["3", "5"], 1]
+        assert drain_cell("13.1:80.3") == [3, 5]
+
+
+@pytest.mark.django_db
+class TestSubmitForMatching:
+    @override_settings(RIDE_DISPATCH_MODE="single")
+    @patch("apps.rides.services.matching.find_driver_and_offer_ride")
+    def test_single_mode_matches_inline(self, mock_match):
+        submit_for_matching(42)
+        mock_match.assert_called_once_with(42)
+
+    @override_settings(RIDE_DISPATCH_MODE="batch")
+    @patch("apps.rides.services.dispatch.enqueue_ride")
+    @patch("apps.rides.services.matching.find_driver_and_offer_ride")
+    def test_batch_mode_pools_ride(self, mock_match, mock_enqueue, ride):
+        submit_for_matching(ride.id)
+        mock_match.assert_not_called()
+        mock_enqueue.assert_called_once()
+
+
+class TestRequestMatching:
+    @patch("apps.rides.services.dispatch.submit_for_matching")
+    @patch("apps.rides.tasks.match_ride.apply_async")
+    def test_enqueues_on_dispatch_queue(self, mock_async, mock_submit):
+        from apps.rides.services.dispatch import DISPATCH_QUEUE, request_matching
+
+        request_matching(5)
+
+        mock_async.assert_called_once_with((5,), queue=DISPATCH_QUEUE)
+        mock_submit.assert_not_called()
+
+    @patch("apps.rides.services.dispatch.submit_for_matching")
+    @patch("apps.rides.tasks.match_ride.apply_async", side_effect=OSError("broker down"))
+    def test_broker_failure_matches_inline(self, mock_async, mock_submit):
+        from apps.rides.services.dispatch import request_matching
+
+        request_matching(5)
+
+        mock_submit.assert_called_once_with(5)
+
+
+def _searching_ride(user, lat, lng):
+    return Ride.objects.create(
+        rider=user,
+        pickup_lat=lat,
+        pickup_lng=lng,
+        drop_lat=lat + 0.05,
+        drop_lng=lng + 0.05,
+        status=Ride.Status.SEARCHING,
+    )
+
+
+@override_settings(RIDE_SEARCH_RADIUS_STEP_KM=2.5, RIDE_SEARCH_RADIUS_MAX_KM=20.0)
+def test_search_radius_widens_per_retry():
+    assert [search_radius_km(n) for n in (0, 1, 2, 10)] == [10.0, 12.5, 15.0, 20.0]
+
+
+@pytest.mark.django_db
+class TestRetries:
+    @override_settings(RIDE_RETRY_UNIT_SIZE=2)
+    @patch("apps.rides.tasks.retry_matching_unit.apply_async")
+    def test_retries_are_split_per_cell_oldest_first(self, mock_async, user):
+        chennai = [_searching_ride(user, 13.08, 80.27) for _ in range(3)]
+        bangalore = _searching_ride(user, 12.97, 77.59)
+        Ride.objects.filter(id=chennai[2].id).update(status=Ride.Status.OFFERED)
+
+        ids = [bangalore.id, chennai[1].id, chennai[0].id, chennai[2].id]
+        assert dispatch_retries(ids) == 2
+
+        units = [c.args[0][0] for c in mock_async.call_args_list]
+        assert units == [[chennai[0].id, chennai[1].id], [bangalore.id]]
+        assert {c.kwargs["queue"] for c in mock_async.call_args_list} == {"dispatch"}
+
+    @override_settings(RIDE_RETRY_UNIT_SIZE=1)
+    @patch("apps.rides.tasks.retry_matching_unit.apply_async")
+    def test_each_unit_is_reported_once_it_is_published(self, mock_async, user):
+        first, second = (_searching_ride(user, 13.08, 80.27) for _ in range(2))
+        mock_async.side_effect = [None, ConnectionError("broker down")]
+        published = []
+
+        with pytest.raises(ConnectionError):
+            dispatch_retries([first.id, second.id], on_published=published.append)
+
+        assert published == [[first.id]]
+
+    @override_settings(RIDE_DISPATCH_MODE="single")
+    @patch("apps.rides.services.dispatch.schedule_match_retry")
+    @patch("apps.rides.services.matching.find_driver_and_offer_ride")
+    def test_unit_counts_attempt_and_survives_a_bad_ride(
+        self, mock_match, mock_retry, user
+    ):
+        first, second = (_searching_ride(user, 13.08, 80.27) for _ in range(2))
+        mock_match.side_effect = [RuntimeError("boom"), None]
+
+        retry_unit([first.id, second.id])
+
+        assert [c.args[0] for c in mock_match.call_args_list] == [first.id, second.id]
+        mock_retry.assert_called_once_with(first.id)
+        first.refresh_from_db()
+        assert first.match_retries == 1
+
+    @patch("apps.rides.kafka.publish")
+    def test_published_offers_do_not_widen_the_search(self, mock_publish, user):
+        from django.db.models import F
+
+        from apps.rides.kafka import publish_ride_match_event
+
+        ride = _searching_ride(user, 13.08, 80.27)
+        stale = Ride.objects.get(id=ride.id)  # as held by an on_commit hook
+        Ride.objects.filter(id=ride.id).update(
+            match_retries=F("match_retries") + 1,
+            search_attempt=F("search_attempt") + 1,
+        )
+
+        publish_ride_match_event(ride=stale, driver_ids=[5, 6])
+
+        ride.refresh_from_db()
+        # Offer sequence counted in place; the retry count is untouched
+        assert (ride.search_attempt, ride.match_retries) == (2, 1)
+        assert mock_publish.call_args.args[1]["attempt"] == 1
+
+    @patch("apps.rides.kafka.publish", return_value=False)
+    def test_dropped_search_event_does_not_count_an_attempt(self, mock_publish, user):
+        from apps.rides.kafka import publish_ride_match_event
+
+        ride = _searching_ride(user, 13.08, 80.27)
+
+        publish_ride_match_event(ride=ride, driver_ids=[5, 6])
+
+        mock_publish.assert_called_once()
+        assert ride.search_attempt == 0
+        ride.refresh_from_db()
+        assert ride.search_attempt == 0
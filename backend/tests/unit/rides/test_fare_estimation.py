@@ -95,3 +95,89 @@ def test_estimate_fare_enforces_minimum(mock_fare_config, mock_distance, mock_ge
 def _call_estimate_fare(pickup, drop, vehicle_type="go"):
     from apps.rides.services.fare import estimate_fare
     return estimate_fare(pickup, drop, vehicle_type)
+
+
+# ─── quote_fares ──────────────────────────────────────────────────────────────
+
+def _config(vehicle_type, base_fare, per_km_rate):
+    config = MagicMock()
+    config.vehicle_type = vehicle_type
+    config.base_fare = Decimal(base_fare)
+    config.per_km_rate = Decimal(per_km_rate)
+    config.per_min_rate = Decimal("1.00")
+    config.base_distance_km = Decimal("2.0")
+    config.minimum_fare = Decimal("40.00")
+    return config
+
+
+@patch("apps.rides.services.fare.get_surge", return_value=1.5)
+@patch("apps.rides.services.fare.get_distance_and_duration", return_value=(10.0, 20.0))
+@patch("apps.rides.services.fare.FareConfig")
+def test_quote_fares_prices_every_type_in_one_pass(mock_fare_config, mock_distance, mock_get_surge):
+    from apps.rides.services.fare import estimate_fare, quote_fares
+
+    configs = [_config("auto", "30.00", "10.00"), _config("go", "50.00", "12.00")]
+    mock_fare_config.get_active.return_value = configs
+
+    quote = quote_fares((12.97, 77.59), (13.0, 77.6))
+
+    mock_distance.assert_called_once()
+    mock_get_surge.assert_called_once_with(12.97, 77.59)
+    mock_fare_config.get_for.assert_not_called()
+    assert quote["surge_multiplier"] == 1.5
+    assert (quote["distance_km"], quote["duration_min"]) == (10.0, 20.0)
+    # go: (50 + 8 * 12 + 20) * 1.5
+    assert quote["prices"] == {"auto": Decimal("195.00"), "go": Decimal("249.00")}
+
+    # Each price matches the single-type estimate
+    for config in configs:
+        mock_fare_config.get_for.return_value = config
+        single = estimate_fare((12.97, 77.59), (13.0, 77.6), config.vehicle_type, 10.0, 20.0)
+        assert single["estimated_fare"] == quote["prices"][config.vehicle_type]
+
+
+@pytest.mark.django_db
+def test_active_config_snapshot_is_refreshed_on_save():
+    from apps.rides.fare_models import FareConfig
+
+    FareConfig.objects.create(vehicle_type="go")
+    assert [c.vehicle_type for c in FareConfig.get_active()] == ["go"]
+
+    FareConfig.objects.create(vehicle_type="auto")
+    assert [c.vehicle_type for c in FareConfig.get_active()] == ["auto", "go"]
+
+
+@pytest.mark.django_db
+def test_estimate_view_returns_every_price_from_one_quote(api_client, user):
+    quote = {
+        "distance_km": 10.0,
+        "duration_min": 20.0,
+        "surge_multiplier": 1.5,
+        "prices": {"auto": Decimal("195.00"), "go": Decimal("249.00")},
+    }
+    api_client.force_authenticate(user=user)
+    route = {"polyline": "enc", "distance_km": 10.0, "duration_min": 20.0}
+    with patch("apps.rides.views.quote_fares", return_value=quote) as mock_quote, \
+         patch("apps.rides.views.get_planned_route", return_value=route) as mock_route:
+        resp = api_client.post("/api/rides/estimate-fare/", {
+            "pickup_lat": 12.97, "pickup_lng": 77.59,
+            "drop_lat": 13.0, "drop_lng": 77.6,
+        })
+
+    assert resp.status_code == 200
+    # The trip is routed once and that route is priced
+    mock_route.assert_called_once_with((12.97, 77.59), (13.0, 77.6))
+    mock_quote.assert_called_once_with(
+        (12.97, 77.59), (13.0, 77.6), distance_km=10.0, duration_min=20.0
+    )
+    assert resp.data.pop("quote_token")
+    assert resp.data == {
+        "estimated_fare": 249.0,
+        "discount_applied": 0.0,
+        "final_estimate": 249.0,
+        "prices": {"auto": 195.0, "go": 249.0},
+        "distance_km": 10.0,
+        "duration_min": 20.0,
+        "surge_multiplier": 1.5,
+        "polyline": "enc",
+    }
@@ -0,0 +1,132 @@
+"""
+tests/unit/rides/test_fare_quote.py
+
+Signed fare quotes: issued by EstimateFareView, honoured by CreateRideView.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from apps.rides.services.quote import issue_quote_token, read_quote_token
+
+PICKUP = (12.9716, 77.5946)
+DROP = (12.9352, 77.6245)
+QUOTE = {
+    "distance_km": 5.237,
+    "duration_min": 14.96,
+    "surge_multiplier": 1.2,
+    "prices": {"auto": Decimal("96.00"), "go": Decimal("132.40")},
+}
+ROUTE = {"polyline": "enc_polyline", "distance_km": 5.237, "duration_min": 14.96}
+
+
+def _token(rider_id=7):
+    return issue_quote_token(rider_id, PICKUP, DROP, QUOTE, "enc_polyline")
+
+
+class TestQuoteToken:
+    def test_round_trip_returns_the_quoted_fare(self):
+        fare_data = read_quote_token(_token(), 7, PICKUP, DROP, "go")
+
+        assert fare_data == {
+            "distance_km": 5.24,
+            "duration_min": 15.0,
+            "estimated_fare": Decimal("132.40"),
+            "surge_multiplier": 1.2,
+            "polyline": "enc_polyline",
+        }
+
+    def test_tampered_token_is_rejected(self):
+        token = _token()
+        forged = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+
+        assert read_quote_token(forged, 7, PICKUP, DROP, "go") is None
+        assert read_quote_token("not-a-token", 7, PICKUP, DROP, "go") is None
+
+    @pytest.mark.parametrize("token", [12345, 1.5, ["a"], {"rider": 7}])
+    def test_non_string_token_is_rejected(self, token):
+        assert read_quote_token(token, 7, PICKUP, DROP, "go") is None
+
+    def test_expired_token_is_rejected(self, settings):
+        settings.FARE_QUOTE_TTL = -1
+
+        assert read_quote_token(_token(), 7, PICKUP, DROP, "go") is None
+
+    @pytest.mark.parametrize(
+        "rider_id, pickup, drop, vehicle_type",
+        [
+            (8, PICKUP, DROP, "go"),  # another rider
+            (7, (12.98, 77.5946), DROP, "go"),  # moved pickup
+            (7, PICKUP, (12.94, 77.6245), "go"),  # moved drop
+            (7, PICKUP, DROP, "premier"),  # not quoted
+        ],
+    )
+    def test_token_only_covers_the_quoted_trip(self, rider_id, pickup, drop, vehicle_type):
+        assert read_quote_token(_token(), rider_id, pickup, drop, vehicle_type) is None
+
+
+@pytest.fixture
+def booking():
+    with patch("apps.rides.views.endpoint_cooldown", return_value=True), \
+         patch("apps.rides.views.request_matching"), \
+         patch("apps.rides.views.increment_demand"), \
+         patch("apps.rides.views.CreateRideView._broadcast_ride_created"), \
+         patch("apps.common.idempotency.cache") as mock_cache:
+        mock_cache.add.return_value = True
+        mock_cache.get.return_value = None
+        yield
+
+
+@pytest.mark.django_db
+class TestCreateRideWithQuote:
+    URL = "/api/rides/request/"
+
+    def _payload(self, **extra):
+        return {
+            "pickup_lat": PICKUP[0], "pickup_lng": PICKUP[1],
+            "drop_lat": DROP[0], "drop_lng": DROP[1],
+            "vehicle_type": "go",
+            **extra,
+        }
+
+    def test_estimate_quote_is_booked_without_repricing(self, api_client, user, booking):
+        from apps.rides.models import Ride
+
+        api_client.force_authenticate(user=user)
+        with patch("apps.rides.views.quote_fares", return_value=QUOTE), \
+             patch("apps.rides.views.get_planned_route", return_value=ROUTE):
+            estimate = api_client.post("/api/rides/estimate-fare/", self._payload())
+        assert estimate.status_code == 200
+
+        with patch("apps.rides.views.estimate_fare") as mock_estimate, \
+             patch("apps.rides.views.get_planned_route") as mock_route:
+            resp = api_client.post(self.URL, self._payload(quote_token=estimate.data["quote_token"]))
+
+        assert resp.status_code == 201
+        mock_estimate.assert_not_called()
+        mock_route.assert_not_called()
+        ride = Ride.objects.get(id=resp.data["id"])
+        assert ride.base_fare == Decimal("132.40")
+        assert ride.planned_route_polyline == "enc_polyline"
+        assert ride.planned_distance_km == 5.24
+
+    def test_unusable_quote_falls_back_to_pricing(self, api_client, user, booking):
+        api_client.force_authenticate(user=user)
+        fare = {"estimated_fare": Decimal("140.00"), "distance_km": 5.3, "duration_min": 16}
+        with patch("apps.rides.views.estimate_fare", return_value=fare) as mock_estimate, \
+             patch("apps.rides.views.get_planned_route", return_value={"polyline": "fresh"}):
+            resp = api_client.post(self.URL, self._payload(quote_token=_token(rider_id=user.id + 1)))
+
+        assert resp.status_code == 201
+        mock_estimate.assert_called_once_with(PICKUP, DROP, "go")
+
+    def test_non_string_quote_is_priced_like_no_quote(self, api_client, user, booking):
+        api_client.force_authenticate(user=user)
+        fare = {"estimated_fare": Decimal("140.00"), "distance_km": 5.3, "duration_min": 16}
+        with patch("apps.rides.views.estimate_fare", return_value=fare) as mock_estimate, \
+             patch("apps.rides.views.get_planned_route", return_value={"polyline": "fresh"}):
+            resp = api_client.post(self.URL, self._payload(quote_token=12345), format="json")
+
+        assert resp.status_code == 201
+        mock_estimate.assert_called_once_with(PICKUP, DROP, "go")
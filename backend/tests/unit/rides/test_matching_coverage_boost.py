@@ -73,11 +73,17 @@ class TestMatchingCoverageBoost:
         self.ride.refresh_from_db()
         assert self.ride.status == Ride.Status.SEARCHING
 
+    @patch("apps.rides.services.matching.get_driver_states")
     @patch("apps.rides.services.matching.get_nearby_driver_ids")
-    @patch("apps.drivers.services.geo.is_driver_locked", return_value=True)
-    def test_find_driver_all_locked(self, mock_locked, mock_nearby):
+    @patch("apps.drivers.services.geo.lock_driver_for_offer", return_value=False)
+    def test_find_driver_all_locked(self, mock_lock, mock_nearby, mock_states):
         # Trigger line 237-239 (locking check)
         mock_nearby.return_value = [self.driver.id]
+        mock_states.return_value = {
+            self.driver.id: MagicMock(
+                id=self.driver.id, level="NORMAL", score=0.0, is_eligible=True
+            )
+        }
         
         find_driver_and_offer_ride(self.ride.id)
         
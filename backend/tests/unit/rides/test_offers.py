@@ -0,0 +1,289 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.common.redis import redis_client
+from apps.drivers.models import Driver
+from apps.drivers.services.geo import is_driver_locked, lock_driver_for_offer
+from apps.rides.models import Ride
+from apps.rides.services import matching
+from apps.rides.services.offers import (
+    CLAIMED,
+    TAKEN,
+    WINNER_KEY,
+    claim_offer,
+    expire_offer_round,
+    open_offer_round,
+)
+
+# Rounds are opened in Redis and settled by the real claim / decline scripts
+
+
+def _open_round(ride, drivers):
+    for driver in drivers:
+        assert lock_driver_for_offer(driver_id=driver.id)
+    open_offer_round(ride.id, [d.id for d in drivers], timeout=30)
+
+
+def _locked(drivers):
+    return [bool(is_driver_locked(driver_id=d.id)) for d in drivers]
+
+
+@pytest.fixture
+def drivers(django_user_model):
+    drivers = []
+    for i in range(4):
+        user = django_user_model.objects.create_user(
+            username=f"+91933000{i:04d}", phone=f"+91933000{i:04d}", role="driver"
+        )
+        driver = Driver.objects.get(user=user)
+        driver.status = Driver.Status.ONLINE
+        driver.save(update_fields=["status"])
+        drivers.append(driver)
+    return drivers
+
+
+@pytest.fixture
+def side_effects():
+    with (
+        patch("apps.rides.signals.async_to_sync"),
+        patch("apps.rides.services.lifecycle._broadcast_status_update"),
+        patch("apps.rides.services.active_ride.notify_driver_ride_event") as notify,
+        patch("apps.rides.services.dispatch.request_matching") as rematch,
+        patch("apps.rides.views.endpoint_cooldown", return_value=True),
+        patch("apps.common.idempotency.cache") as cache,
+    ):
+        cache.add.return_value = True
+        cache.get.return_value = None
+        yield SimpleNamespace(notify=notify, rematch=rematch)
+
+
+@pytest.fixture
+def offered_ride(ride):
+    Ride.objects.filter(id=ride.id).update(status=Ride.Status.OFFERED)
+    return ride
+
+
+@pytest.mark.django_db
+class TestParallelOffers:
+    def test_top_k_candidates_get_one_round(
+        self, ride, drivers, settings, django_capture_on_commit_callbacks
+    ):
+        settings.RIDE_OFFER_FANOUT = 2
+        candidates = [SimpleNamespace(id=d.id) for d in drivers]
+        with (
+            patch.object(
+                matching, "_get_sorted_candidates", return_value=(candidates, [])
+            ),
+            patch(
+                "apps.drivers.services.geo.lock_driver_for_offer", return_value=True
+            ) as lock,
+            patch.object(matching, "_lock_chosen_driver", side_effect=drivers),
+            patch.object(matching, "open_offer_round") as open_round,
+            patch.object(matching, "_notify_driver_of_match") as notify,
+            patch.object(matching, "_send_match_push_notification"),
+            patch.object(matching, "_publish_kafka_match_event"),
+            patch("apps.rides.signals.async_to_sync"),
+            patch("apps.rides.services.lifecycle._broadcast_status_update"),
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            matching.find_driver_and_offer_ride(ride.id)
+
+        ride.refresh_from_db()
+        assert (ride.status, ride.driver_id) == (Ride.Status.OFFERED, None)
+        assert lock.call_count == 2
+        assert open_round.call_args.args == (ride.id, [drivers[0].id, drivers[1].id])
+        assert [c.args[1] for c in notify.call_args_list] == drivers[:2]
+
+    def test_first_accept_wins_and_losers_are_released(
+        self,
+        api_client,
+        offered_ride,
+        drivers,
+        side_effects,
+        django_capture_on_commit_callbacks,
+    ):
+        _open_round(offered_ride, drivers[:3])
+        with django_capture_on_commit_callbacks(execute=True):
+            won = _accept_ride(api_client, offered_ride, drivers[0])
+            # Before the winner's transaction commits
+            lost = _accept_ride(api_client, offered_ride, drivers[1])
+        # After the round was closed and its drivers released
+        late = _accept_ride(api_client, offered_ride, drivers[2])
+
+        assert [r.status_code for r in (won, lost, late)] == [200, 409, 409]
+        offered_ride.refresh_from_db()
+        assert offered_ride.status == Ride.Status.ASSIGNED
+        assert offered_ride.driver_id == drivers[0].id
+        assert _locked(drivers[:3]) == [True, False, False]
+
+    def test_claim_from_an_expired_round_cannot_assign(
+        self,
+        api_client,
+        offered_ride,
+        drivers,
+        side_effects,
+        django_capture_on_commit_callbacks,
+    ):
+        _open_round(offered_ride, drivers[:2])
+        # Claimed in Redis, but the round timer takes the row lock first
+        assert claim_offer(offered_ride.id, drivers[0].id) == CLAIMED
+        with django_capture_on_commit_callbacks(execute=True):
+            expire_offer_round(offered_ride.id)
+        offered_ride.refresh_from_db()
+        assert offered_ride.status == Ride.Status.SEARCHING
+        assert offered_ride.rejected_driver_ids == [drivers[0].id, drivers[1].id]
+        assert _locked(drivers[:2]) == [False, False]
+        side_effects.rematch.assert_called_once_with(offered_ride.id)
+
+        # ...and the next round is open by the time the stale claim gets there
+        Ride.objects.filter(id=offered_ride.id).update(status=Ride.Status.OFFERED)
+        _open_round(offered_ride, drivers[2:3])
+        with patch("apps.rides.views.claim_offer", return_value=CLAIMED):
+            response = _accept_ride(api_client, offered_ride, drivers[0])
+
+        assert response.status_code == 400
+        offered_ride.refresh_from_db()
+        assert (offered_ride.status, offered_ride.driver_id) == (
+            Ride.Status.OFFERED,
+            None,
+        )
+
+    def test_last_decline_reopens_the_round(
+        self,
+        api_client,
+        offered_ride,
+        drivers,
+        side_effects,
+        django_capture_on_commit_callbacks,
+    ):
+        _open_round(offered_ride, drivers[:2])
+        with django_capture_on_commit_callbacks(execute=True):
+            for driver in drivers[:2]:
+                response = _reject_ride(api_client, offered_ride, driver)
+                assert response.status_code == 200
+
+        offered_ride.refresh_from_db()
+        assert offered_ride.status == Ride.Status.SEARCHING
+        assert offered_ride.rejected_driver_ids == [drivers[0].id, drivers[1].id]
+        assert _locked(drivers[:2]) == [False, False]
+        side_effects.rematch.assert_called_once_with(offered_ride.id)
+
+    def test_taken_claim_never_reaches_the_row_lock(
+        self, api_client, ride, drivers, side_effects
+    ):
+        with patch("apps.rides.views.claim_offer", return_value=TAKEN):
+            response = _accept_ride(api_client, ride, drivers[1])
+        assert response.status_code == 409
+
+
+@pytest.mark.django_db(transaction=True)
+class TestOfferRaces:
+    """
+    Drivers of one round acting at the same moment, each on its own thread
+    and connection, against real row locks and the real Redis scripts.
+    """
+
+    def test_simultaneous_accepts_have_exactly_one_winner(
+        self, offered_ride, drivers, side_effects
+    ):
+        _open_round(offered_ride, drivers)
+        claims = []
+
+        def recording_claim(ride_id, driver_id):
+            result = claim_offer(ride_id, driver_id)
+            claims.append(result)
+            return result
+
+        with patch("apps.rides.views.claim_offer", side_effect=recording_claim):
+            responses = _race(
+                *(lambda d=d: _accept_ride(APIClient(), offered_ride, d) for d in drivers)
+            )
+
+        codes = [r.status_code for r in responses]
+        assert sorted(codes) == [200] + [409] * (len(drivers) - 1)
+        assert sorted(claims) == [CLAIMED] + [TAKEN] * (len(drivers) - 1)
+        winner = drivers[codes.index(200)]
+        assert redis_client.get(WINNER_KEY.format(offered_ride.id)) == str(winner.id)
+
+        offered_ride.refresh_from_db()
+        assert (offered_ride.status, offered_ride.driver_id) == (
+            Ride.Status.ASSIGNED,
+            winner.id,
+        )
+        losers = [d for d in drivers if d != winner]
+        assert _locked(losers) == [False] * len(losers)
+        side_effects.rematch.assert_not_called()
+
+    def test_accept_racing_the_round_timer(self, offered_ride, drivers, side_effects):
+        _open_round(offered_ride, drivers[:2])
+
+        accepted, _ = _race(
+            lambda: _accept_ride(APIClient(), offered_ride, drivers[0]),
+            lambda: expire_offer_round(offered_ride.id),
+        )
+
+        offered_ride.refresh_from_db()
+        if accepted.status_code == 200:
+            assert (offered_ride.status, offered_ride.driver_id) == (
+                Ride.Status.ASSIGNED,
+                drivers[0].id,
+            )
+            assert _locked(drivers[1:2]) == [False]
+            side_effects.rematch.assert_not_called()
+        else:
+            # The timer closed the round first: nobody is assigned
+            assert accepted.status_code == 400
+            assert (offered_ride.status, offered_ride.driver_id) == (
+                Ride.Status.SEARCHING,
+                None,
+            )
+            assert offered_ride.rejected_driver_ids == [drivers[0].id, drivers[1].id]
+            assert _locked(drivers[:2]) == [False, False]
+            side_effects.rematch.assert_called_once_with(offered_ride.id)
+
+    def test_accept_racing_the_last_decline(self, offered_ride, drivers, side_effects):
+        _open_round(offered_ride, drivers[:2])
+        assert _reject_ride(APIClient(), offered_ride, drivers[1]).status_code == 200
+
+        # The one driver left accepts as its app declines on a timeout
+        accepted, declined = _race(
+            lambda: _accept_ride(APIClient(), offered_ride, drivers[0]),
+            lambda: _reject_ride(APIClient(), offered_ride, drivers[0]),
+        )
+
+        offered_ride.refresh_from_db()
+        assert sorted([accepted.status_code, declined.status_code]) == [200, 400]
+        if accepted.status_code == 200:
+            assert (offered_ride.status, offered_ride.driver_id) == (
+                Ride.Status.ASSIGNED,
+                drivers[0].id,
+            )
+            side_effects.rematch.assert_not_called()
+        else:
+            assert (offered_ride.status, offered_ride.driver_id) == (
+                Ride.Status.SEARCHING,
+                None,
+            )
+            assert offered_ride.rejected_driver_ids == [drivers[1].id, drivers[0].id]
+            assert _locked(drivers[:2]) == [False, False]
+            side_effects.rematch.assert_called_once_with(offered_ride.id)
+
+
+def _race(*calls):
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = [executor.submit(call) for call in calls]
+        return [future.result() for future in futures]
+
+
+def _accept_ride(client, ride, driver):
+    client.force_authenticate(user=driver.user)
+    return client.post(f"/api/rides/{ride.id}/accept/")
+
+
+def _reject_ride(client, ride, driver):
+    client.force_authenticate(user=driver.user)
+    return client.post(f"/api/rides/{ride.id}/reject/")
@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+import pytest
+from django.db import transaction
+
+from apps.rides.models import Ride
+
+
+@pytest.fixture
+def group_send():
+    with patch("apps.rides.signals.async_to_sync") as mock_async:
+        yield mock_async.return_value
+
+
+@pytest.fixture
+def loaded_ride(user, group_send, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        ride = Ride.objects.create(
+            rider=user,
+            pickup_lat=12.9716,
+            pickup_lng=77.5946,
+            drop_lat=12.9352,
+            drop_lng=77.6245,
+            status=Ride.Status.SEARCHING,
+        )
+    group_send.reset_mock()
+    return Ride.objects.get(id=ride.id)
+
+
+def _sent(group_send):
+    return [c.args for c in group_send.call_args_list]
+
+
+@pytest.mark.django_db
+class TestRideBroadcasts:
+    def test_create_is_sent_in_full(
+        self, user, group_send, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            ride = Ride.objects.create(
+                rider=user,
+                pickup_lat=12.9716,
+                pickup_lng=77.5946,
+                drop_lat=12.9352,
+                drop_lng=77.6245,
+            )
+
+        ((group, message),) = _sent(group_send)
+        assert group == f"ride_{ride.id}"
+        assert message["data"]["ride"]["pickup_address"] == ""
+        assert message["data"]["changed"] is None
+
+    def test_saves_in_one_transaction_are_sent_once(
+        self, loaded_ride, group_send, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                loaded_ride.transition_to(Ride.Status.ASSIGNED)
+                loaded_ride.otp_code = "4821"
+                loaded_ride.save(update_fields=["otp_code"])
+                loaded_ride.waiting_seconds = 30
+                loaded_ride.save(update_fields=["waiting_seconds"])
+
+        ((group, message),) = _sent(group_send)
+        data = message["data"]
+        assert data["changed"] == ["otp_code", "status", "updated_at"]
+        assert data["ride"] == {
+            "id": loaded_ride.id,
+            "status": Ride.Status.ASSIGNED,
+            "otp_code": "4821",
+            "updated_at": data["ride"]["updated_at"],
+        }
+
+    def test_full_save_diffs_against_loaded_values(
+        self, loaded_ride, group_send, django_capture_on_commit_callbacks
+    ):
+        loaded_ride.pickup_address = "MG Road"
+        with django_capture_on_commit_callbacks(execute=True):
+            loaded_ride.save()
+
+        ((_, message),) = _sent(group_send)
+        assert "pickup_address" in message["data"]["changed"]
+        assert "drop_address" not in message["data"]["ride"]
+
+    def test_invisible_change_is_not_sent(
+        self, loaded_ride, group_send, django_capture_on_commit_callbacks
+    ):
+        loaded_ride.waiting_seconds = 12
+        with django_capture_on_commit_callbacks(execute=True):
+            loaded_ride.save(update_fields=["waiting_seconds"])
+
+        group_send.assert_not_called()
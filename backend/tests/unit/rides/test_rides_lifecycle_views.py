@@ -55,7 +55,7 @@ class TestRidesLifecycleViews:
         # Mocking services that are called during creation
         with patch('apps.rides.views.estimate_fare') as mock_est, \
              patch('apps.rides.views.get_planned_route') as mock_route, \
-             patch('apps.rides.views.find_driver_and_offer_ride') as mock_matching, \
+             patch('apps.rides.views.request_matching') as mock_matching, \
              patch('apps.rides.views.increment_demand'):
             
             mock_est.return_value = {
@@ -91,7 +91,7 @@ class TestRidesLifecycleViews:
         ride.save()
         
         url = reverse('ride-reject', kwargs={'ride_id': ride.id})
-        with patch('apps.rides.views.find_driver_and_offer_ride') as mock_matching:
+        with patch('apps.rides.views.request_matching') as mock_matching:
             response = authenticated_driver_client.post(url)
             assert response.status_code == status.HTTP_200_OK
             ride.refresh_from_db()
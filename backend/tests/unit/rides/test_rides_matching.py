@@ -53,8 +53,8 @@ class TestMatchingService:
         
         mock_nearby.return_value = [driver.id]
         
-        # Need to patch driver_accept_timeout as well since it's called inside
-        with patch("apps.rides.services.matching.driver_accept_timeout.apply_async"):
+        # Need to patch the accept timer as well since it's armed inside
+        with patch("apps.rides.services.matching.schedule_timer"):
             find_driver_and_offer_ride(ride.id)
             
         ride.refresh_from_db()
@@ -103,7 +103,8 @@ class TestEstimateFareView:
 
     def test_estimate_fare_raises_exception(self, api_client, user):
         api_client.force_authenticate(user=user)
-        with patch("apps.rides.views.estimate_fare", side_effect=ValueError("bad coords")):
+        with patch("apps.rides.views.get_planned_route", return_value=ROUTE_MOCK), \
+             patch("apps.rides.views.quote_fares", side_effect=ValueError("bad coords")):
             resp = api_client.post(self.URL, {
                 "pickup_lat": 12.97, "pickup_lng": 77.59,
                 "drop_lat": 12.93, "drop_lng": 77.62,
@@ -149,7 +150,7 @@ class TestCreateRideView:
         with patch("apps.rides.views.estimate_fare", return_value=FARE_MOCK), \
              patch("apps.rides.views.get_planned_route", return_value=ROUTE_MOCK), \
              patch("apps.rides.views.endpoint_cooldown", return_value=True), \
-             patch("apps.rides.views.find_driver_and_offer_ride"), \
+             patch("apps.rides.views.request_matching"), \
              patch("apps.rides.views.increment_demand"), \
              patch("apps.rides.views.cell_id_from_lat_lng", return_value="cell_1"), \
              patch("apps.rides.views.CreateRideView._broadcast_ride_created"), \
@@ -203,7 +204,7 @@ class TestCreateRideView:
         with patch("apps.rides.views.estimate_fare", return_value=FARE_MOCK), \
              patch("apps.rides.views.get_planned_route", return_value=ROUTE_MOCK), \
              patch("apps.rides.views.endpoint_cooldown", return_value=True), \
-             patch("apps.rides.views.find_driver_and_offer_ride"), \
+             patch("apps.rides.views.request_matching"), \
              patch("apps.rides.views.increment_demand"), \
              patch("apps.rides.views.cell_id_from_lat_lng", return_value="c"), \
              patch("apps.rides.views.CreateRideView._broadcast_ride_created"), \
@@ -228,7 +229,7 @@ class TestCreateRideView:
         with patch("apps.rides.views.estimate_fare", return_value=FARE_MOCK), \
              patch("apps.rides.views.get_planned_route", return_value=ROUTE_MOCK), \
              patch("apps.rides.views.endpoint_cooldown", return_value=True), \
-             patch("apps.rides.views.find_driver_and_offer_ride"), \
+             patch("apps.rides.views.request_matching"), \
              patch("apps.rides.views.increment_demand"), \
              patch("apps.rides.views.cell_id_from_lat_lng", return_value="c"), \
              patch("apps.rides.views.CreateRideView._broadcast_ride_created"), \
@@ -338,7 +339,7 @@ class TestRejectRideView:
         )
         api_client.force_authenticate(user=driver_user)
         with patch("apps.drivers.services.metrics.update_driver_metrics"), \
-             patch("apps.rides.views.find_driver_and_offer_ride"), \
+             patch("apps.rides.views.request_matching"), \
              patch("apps.common.idempotency.cache"):
             resp = api_client.post(f"/api/rides/{ride.id}/reject/")
         assert resp.status_code == 200
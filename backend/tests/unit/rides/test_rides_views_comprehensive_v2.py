@@ -93,7 +93,7 @@ class TestRidesViewsComprehensiveV2:
 
     @patch("apps.rides.views.estimate_fare")
     @patch("apps.rides.views.get_planned_route")
-    @patch("apps.rides.views.find_driver_and_offer_ride")
+    @patch("apps.rides.views.request_matching")
     def test_create_ride_success(self, mock_find, mock_route, mock_est):
         mock_est.return_value = {"estimated_fare": 100, "distance_km": 5, "duration_min": 10}
         mock_route.return_value = {"polyline": "abc"}
@@ -36,8 +36,9 @@ class TestRidesViewsErrorPaths:
     def test_estimate_fare_service_error(self, authenticated_rider_client):
         url = reverse('ride-estimate')
         data = {"pickup_lat": 12.97, "pickup_lng": 77.59, "drop_lat": 12.98, "drop_lng": 77.60}
-        with patch('apps.rides.views.estimate_fare') as mock_est:
-            mock_est.side_effect = Exception("Service unavailable")
+        with patch('apps.rides.views.get_planned_route', return_value={"polyline": "", "distance_km": 1.5, "duration_min": 3}), \
+             patch('apps.rides.views.quote_fares') as mock_quote:
+            mock_quote.side_effect = Exception("Service unavailable")
             response = authenticated_rider_client.post(url, data)
             assert response.status_code == status.HTTP_400_BAD_REQUEST
 
@@ -0,0 +1,92 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from apps.common.metrics import SURGE_CACHE_LOOKUPS
+from apps.rides.services import surge
+from apps.rides.services.surge_engine import SURGE_GRID_KEY, SURGE_UPDATES_CHANNEL
+
+_listen = surge._SurgeCache._listen  # the real loop; fixtures stub it out
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    with patch.object(surge, "_cache", None):
+        yield
+
+
+@pytest.fixture
+def mock_redis():
+    with (
+        patch.object(surge._SurgeCache, "_listen", lambda self: None),
+        patch.object(surge, "redis_client") as mock_redis,
+    ):
+        mock_redis.get.return_value = json.dumps({"3:4": 2.5})
+        yield mock_redis
+
+
+@pytest.fixture
+def clock():
+    with patch.object(surge.time, "monotonic", return_value=1000.0) as monotonic:
+        yield monotonic
+
+
+def _count(result):
+    return SURGE_CACHE_LOOKUPS.labels(result=result)._value.get()
+
+
+class TestSurgeCache:
+    def test_grid_is_loaded_once_then_served_from_memory(self, mock_redis, clock):
+        hits, misses = _count("hit"), _count("miss")
+
+        assert surge.get_surge_multiplier("3:4") == 2.5
+        assert surge.get_surge_multiplier("3:4") == 2.5
+        assert surge.get_surge_multiplier("9:9") == 1.0  # not surging
+
+        mock_redis.get.assert_called_once_with(SURGE_GRID_KEY)
+        assert (_count("hit") - hits, _count("miss") - misses) == (2, 1)
+
+    def test_pushed_grid_replaces_the_cached_one(self, mock_redis, clock):
+        surge.get_surge_multiplier("3:4")
+
+        surge._get_cache().store({"3:4": 1.4})
+
+        assert surge.get_surge_multiplier("3:4") == 1.4
+        assert mock_redis.get.call_count == 1
+
+    def test_grid_older_than_max_age_is_reloaded(self, settings, mock_redis, clock):
+        settings.SURGE_CACHE_MAX_AGE = 30
+        surge.get_surge_multiplier("3:4")
+
+        clock.return_value += 29
+        surge.get_surge_multiplier("3:4")
+        assert mock_redis.get.call_count == 1
+
+        mock_redis.get.return_value = None  # grid expired: surge is over
+        clock.return_value += 2
+        assert surge.get_surge_multiplier("3:4") == 1.0
+        assert mock_redis.get.call_count == 2
+
+    def test_forked_process_gets_its_own_cache(self, mock_redis):
+        first = surge._get_cache()
+        first.pid = -1  # as seen from a forked child
+
+        assert surge._get_cache() is not first
+
+
+def test_listener_applies_published_grids(mock_redis):
+    pubsub = mock_redis.pubsub.return_value
+    pubsub.listen.return_value = [{"data": json.dumps({"3:4": 1.8})}]
+    cache = surge._get_cache()
+
+    # The loop reconnects forever; stop it at the first retry
+    with (
+        patch.object(surge.time, "sleep", side_effect=StopIteration),
+        pytest.raises(StopIteration),
+    ):
+        _listen(cache)
+
+    pubsub.subscribe.assert_called_once_with(SURGE_UPDATES_CHANNEL)
+    mock_redis.get.assert_called_once_with(SURGE_GRID_KEY)
+    assert cache.grid == {"3:4": 1.8}
@@ -1,59 +1,267 @@
+import json
+import math
+from unittest.mock import patch
+
 import pytest
-from unittest.mock import patch, MagicMock
+
 from apps.rides.services.surge_engine import (
+    LUA_LIVE_SUPPLY,
+    SUPPLY_KEY,
+    SUPPLY_TTL,
+    SURGE_GRID_KEY,
+    SURGE_TTL,
+    SURGE_UPDATES_CHANNEL,
     cell_id_from_lat_lng,
-    recompute_surge,
+    compute_surge_grid,
+    hex_from_lat_lng,
     increment_demand,
-    decrement_demand,
-    increment_supply,
-    decrement_supply
+    lat_lng_from_geo_score,
+    neighbour_cell_ids,
+    recompute_surge_grid,
+    snapshot_supply,
 )
 
+NOW = 600_000.0  # bucket 10_000 at 60 s buckets
+
+
+class TestGrid:
+    def test_nearby_points_share_a_cell(self):
+        assert cell_id_from_lat_lng(12.9716, 77.5946) == cell_id_from_lat_lng(12.9718, 77.5947)
+        assert cell_id_from_lat_lng(12.9716, 77.5946) != cell_id_from_lat_lng(12.99, 77.5946)
+
+    def test_cell_spacing_is_uniform(self, settings):
+        settings.SURGE_HEX_EDGE_M = 500
+        # Hex centres are edge * sqrt(3) apart: ~866 m. Stepping ~870 m east
+        # (at this latitude) always lands in an adjacent cell.
+        step = 870 / (111_320 * math.cos(math.radians(12.97)))
+        for i in range(20):
+            here = cell_id_from_lat_lng(12.97, 77.5 + i * step)
+            there = cell_id_from_lat_lng(12.97, 77.5 + (i + 1) * step)
+            assert there in neighbour_cell_ids(here) + [here]
+
+    def test_neighbours_are_six_distinct_adjacent_cells(self):
+        neighbours = neighbour_cell_ids("10:-4")
+        assert len(set(neighbours)) == 6
+        assert all("10:-4" in neighbour_cell_ids(n) for n in neighbours)
+
+    def test_hex_round_stays_on_the_grid(self):
+        q, r = hex_from_lat_lng(28.6139, 77.2090)
+        assert isinstance(q, int) and isinstance(r, int)
+
+    def test_geo_scores_decode_to_positions(self):
+        # GEOADD Sicily 13.361389 38.115556 Palermo 15.087269 37.502669 Catania
+        lat, lng = lat_lng_from_geo_score("3479099956230698")
+        assert (round(lat, 5), round(lng, 5)) == (38.11556, 13.36139)
+        lat, lng = lat_lng_from_geo_score(3479447370796909.0)
+        assert (round(lat, 5), round(lng, 5)) == (37.50267, 15.08727)
+
+
+@patch("apps.rides.services.surge_engine.time.time", return_value=NOW)
+@patch("apps.rides.services.surge_engine.redis_client")
+def test_demand_is_one_pipelined_bucket_write(mock_redis, _):
+    pipe = mock_redis.pipeline.return_value
+
+    increment_demand("cell1")
+    pipe.hincrby.assert_called_with("surge:demand:10000", "cell1", 1)
+    pipe.expire.assert_called_with("surge:demand:10000", 960)
+    pipe.execute.assert_called_once()
+
+    # Nothing is recomputed inline
+    mock_redis.setex.assert_not_called()
+    mock_redis.get.assert_not_called()
+
+
 @pytest.mark.django_db
-class TestSurgeEngine:
+@patch("apps.rides.services.surge_engine._record")
+class TestDemandIsCountedOnce:
+    """A request's demand is left to age out of the window, never rewritten."""
 
-    def test_cell_id_generation(self):
-        assert cell_id_from_lat_lng(12.9716, 77.5946) == "12.97:77.59"
-        assert cell_id_from_lat_lng(12.978, 77.592) == "12.98:77.59"
+    @pytest.fixture
+    def driver(self, django_user_model):
+        user = django_user_model.objects.create_user(
+            username="+919330009999", phone="+919330009999", role="driver"
+        )
+        return user.driver
 
-    @patch("apps.rides.services.surge_engine.redis_client")
-    def test_recompute_surge_no_supply(self, mock_redis):
-        mock_redis.get.side_effect = ["10", "0"] # demand=10, supply=0
-        surge = recompute_surge("test_cell")
-        assert surge == 3.0 # SURGE_MAX
-        mock_redis.setex.assert_called()
+    def test_accept_timeout_does_not_count_the_ride_again(self, mock_record, ride, driver):
+        from apps.rides.models import Ride
+        from apps.rides.tasks import driver_accept_timeout
 
-    @patch("apps.rides.services.surge_engine.redis_client")
-    def test_recompute_surge_normal(self, mock_redis):
-        mock_redis.get.side_effect = ["10", "5"] # demand=10, supply=5
-        surge = recompute_surge("test_cell")
-        assert surge == 2.0
-        mock_redis.setex.assert_called_with("geo:test_cell:surge", 60, 2.0)
+        Ride.objects.filter(id=ride.id).update(driver=driver, status=Ride.Status.OFFERED)
+        with patch("apps.rides.services.dispatch.request_matching"), \
+             patch("apps.rides.services.active_ride.notify_driver_ride_event"), \
+             patch("apps.rides.tasks.add_driver_to_geo"):
+            driver_accept_timeout(ride.id, driver.id)
+
+        ride.refresh_from_db()
+        assert ride.status == Ride.Status.SEARCHING
+        mock_record.assert_not_called()
+
+    def test_no_show_cancellation_does_not_uncount_the_ride(self, mock_record, ride, driver):
+        from django.utils import timezone
+
+        from apps.rides.models import Ride
+        from apps.rides.tasks import check_no_show
+
+        Ride.objects.filter(id=ride.id).update(
+            driver=driver,
+            status=Ride.Status.ARRIVED,
+            arrived_at=timezone.now() - timezone.timedelta(minutes=10),
+        )
+        with patch("apps.rides.tasks.handle_no_show") as mock_no_show, \
+             patch("apps.rides.tasks.update_driver_metrics"):
+            check_no_show(ride.id)
+
+        mock_no_show.assert_called_once()
+        mock_record.assert_not_called()
+
+
+class TestComputeSurgeGrid:
+    def test_neighbours_of_a_hot_cell_are_smoothed(self, settings):
+        settings.SURGE_NEIGHBOUR_WEIGHT = 0.5
+
+        grid = compute_surge_grid({"0:0": 10.0}, {"0:0": 2.0})
+
+        assert grid["0:0"] == 3.0  # 10 / 2, clamped
+        assert len(grid) == 7
+        # 5 demand / 1 supply from the hot cell next door
+        assert grid["1:0"] == 3.0
+
+    def test_supply_next_door_damps_a_cell(self, settings):
+        settings.SURGE_NEIGHBOUR_WEIGHT = 0.5
+
+        alone = compute_surge_grid({"0:0": 6.0}, {"0:0": 3.0})
+        helped = compute_surge_grid({"0:0": 6.0}, {"0:0": 3.0, "1:0": 2.0})
+
+        assert alone["0:0"] == 2.0
+        assert helped["0:0"] == 1.5  # 6 / (3 + 0.5 * 2)
 
+    def test_negative_net_counts_are_ignored(self):
+        grid = compute_surge_grid({"0:0": -3.0}, {"0:0": 0.0})
+
+        assert set(grid.values()) == {1.0}
+
+
+@pytest.fixture
+def windows(settings):
+    settings.SURGE_BUCKET_SECONDS = 60
+    settings.SURGE_WINDOW_SECONDS = 180  # three buckets
+    settings.SURGE_HALF_LIFE_SECONDS = 60
+    settings.SURGE_NEIGHBOUR_WEIGHT = 0
+
+
+@patch("apps.rides.services.surge_engine.redis_client")
+def test_recompute_reads_the_window_once_and_decays_old_buckets(mock_redis, windows):
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [
+        [
+            {"0:0": "2"}, {"0:0": "4"}, {"5:5": "8"},  # demand: now, -1, -2 buckets
+            json.dumps({"0:0": 1, "5:5": 1}),  # supply snapshot
+        ],
+        [],
+    ]
+
+    grid = recompute_surge_grid(now=NOW)
+
+    keys = [c.args[0] for c in pipe.hgetall.call_args_list]
+    assert keys == ["surge:demand:10000", "surge:demand:9999", "surge:demand:9998"]
+    pipe.get.assert_called_once_with(SUPPLY_KEY)
+    assert grid["0:0"] == 3.0  # 2 + 4 * 0.5 = 4 demand / 1 driver, clamped
+    assert grid["5:5"] == 2.0  # 8 * 0.25 / 1 driver
+    assert grid["1:0"] == 1.0  # a neighbour, smoothed back to 1.0
+    # Only surging cells are stored and pushed
+    key, stored = pipe.set.call_args.args
+    assert key == SURGE_GRID_KEY
+    assert json.loads(stored) == {"0:0": 3.0, "5:5": 2.0}
+    assert pipe.set.call_args.kwargs == {"ex": SURGE_TTL}
+    pipe.publish.assert_called_once_with(SURGE_UPDATES_CHANNEL, stored)
+    assert pipe.execute.call_count == 2
+
+
+@patch("apps.rides.services.surge_engine.redis_client")
+def test_recompute_without_supply_snapshot_writes_nothing(mock_redis, windows):
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.return_value = [{"0:0": "9"}, {}, {}, None]
+
+    assert recompute_surge_grid(now=NOW) == {}
+    pipe.set.assert_not_called()
+    pipe.publish.assert_not_called()
+
+
+@patch("apps.rides.services.surge_engine.redis_client")
+def test_surge_task_reports_cells(mock_redis, windows):
+    from apps.rides.tasks import recompute_surge_grid as task
+
+    mock_redis.pipeline.return_value.execute.side_effect = [[{}, {}, {}, "{}"], []]
+
+    assert task() == "Recomputed surge for 0 cells"
+
+
+class TestSupplySnapshot:
+    PALERMO = "3479099956230698"
+    CATANIA = "3479447370796909"
+
+    @patch("apps.rides.services.surge_engine.SUPPLY_SCAN_CHUNK", 2)
     @patch("apps.rides.services.surge_engine.redis_client")
-    def test_recompute_surge_clamped_min(self, mock_redis):
-        mock_redis.get.side_effect = ["1", "5"] # demand=1, supply=5 -> 0.2
-        surge = recompute_surge("test_cell")
-        assert surge == 1.0 # SURGE_MIN
-        
+    def test_live_drivers_are_binned_in_chunked_scans(self, mock_redis):
+        mock_redis.zcard.return_value = 5
+        script = mock_redis.register_script.return_value
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [[self.PALERMO, self.PALERMO], [self.CATANIA], []]
+
+        supply = snapshot_supply()
+
+        mock_redis.register_script.assert_called_once_with(LUA_LIVE_SUPPLY)
+        assert [c.kwargs["args"][:2] for c in script.call_args_list] == [[0, 1], [2, 3], [4, 5]]
+        assert script.call_args.kwargs["args"][2] == "ONLINE"
+        assert supply == {
+            cell_id_from_lat_lng(38.115556, 13.361389): 2,
+            cell_id_from_lat_lng(37.502669, 15.087269): 1,
+        }
+        mock_redis.set.assert_called_once_with(SUPPLY_KEY, json.dumps(supply), ex=SUPPLY_TTL)
+
     @patch("apps.rides.services.surge_engine.redis_client")
-    def test_recompute_surge_clamped_max(self, mock_redis):
-        mock_redis.get.side_effect = ["100", "2"] # demand=100, supply=2 -> 50.0
-        surge = recompute_surge("test_cell")
-        assert surge == 3.0 # SURGE_MAX
+    def test_empty_index_is_an_empty_snapshot(self, mock_redis):
+        mock_redis.zcard.return_value = 0
+
+        assert snapshot_supply() == {}
+        mock_redis.set.assert_called_once_with(SUPPLY_KEY, "{}", ex=SUPPLY_TTL)
+
+    @patch("apps.rides.services.surge_engine.SUPPLY_SCAN_CHUNK", 2)
+    def test_snapshot_runs_the_live_supply_script_on_redis(self):
+        from apps.common.redis import redis_client
+        from apps.drivers.redis import DRIVER_GEO_KEY
+
+        palermo, catania = (38.115556, 13.361389), (37.502669, 15.087269)
+        drivers = {
+            # id: (position, heartbeat, state hash status)
+            1: (palermo, True, "ONLINE"),
+            2: (palermo, True, None),  # no state hash yet
+            3: (palermo, True, "BUSY"),
+            4: (palermo, False, "ONLINE"),  # heartbeat expired
+            5: (catania, True, "ONLINE"),
+            6: (catania, True, "OFFLINE"),
+        }
+        for driver_id, ((lat, lng), alive, status) in drivers.items():
+            redis_client.geoadd(DRIVER_GEO_KEY, (lng, lat, str(driver_id)))
+            if alive:
+                redis_client.set(f"driver:{driver_id}:last_seen", 1)
+            if status:
+                redis_client.hset(f"driver:{driver_id}:state", "status", status)
+
+        supply = snapshot_supply()
+
+        assert supply == {
+            cell_id_from_lat_lng(*palermo): 2,
+            cell_id_from_lat_lng(*catania): 1,
+        }
+        assert json.loads(redis_client.get(SUPPLY_KEY)) == supply
 
-    @patch("apps.rides.services.surge_engine.recompute_surge")
     @patch("apps.rides.services.surge_engine.redis_client")
-    def test_counters(self, mock_redis, mock_recompute):
-        increment_demand("cell1")
-        mock_redis.incr.assert_called_with("geo:cell1:demand")
-        mock_recompute.assert_called_with("cell1")
-        
-        decrement_demand("cell1")
-        mock_redis.decr.assert_called_with("geo:cell1:demand")
-        
-        increment_supply("cell1")
-        mock_redis.incr.assert_called_with("geo:cell1:supply")
-        
-        decrement_supply("cell1")
-        mock_redis.decr.assert_called_with("geo:cell1:supply")
+    def test_snapshot_task_reports_drivers(self, mock_redis):
+        from apps.rides.tasks import snapshot_surge_supply
+
+        mock_redis.zcard.return_value = 2
+        mock_redis.pipeline.return_value.execute.return_value = [[self.PALERMO, self.CATANIA]]
+
+        assert snapshot_surge_supply() == "Snapshot 2 drivers"
@@ -0,0 +1,173 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from apps.common.redis import redis_client
+from apps.rides.services.timers import (
+    ACCEPT_TIMEOUT,
+    LUA_ACK,
+    LUA_CLAIM_DUE,
+    NO_SHOW,
+    TIMERS_KEY,
+    fire_due_timers,
+    schedule_timer,
+)
+
+
+@patch("apps.rides.services.timers.time.time", return_value=1000.0)
+@patch("apps.rides.services.timers.redis_client")
+def test_schedule_timer_is_one_zadd(mock_redis, _):
+    schedule_timer(ACCEPT_TIMEOUT, 3, 7, delay=60)
+
+    mock_redis.zadd.assert_called_once_with(
+        TIMERS_KEY, {"accept:3:7": 1_060_000}, nx=False
+    )
+
+
+# The tests below run the real claim / ack scripts against Redis
+
+
+def _due(kind, *args):
+    schedule_timer(kind, *args, delay=-1)
+
+
+def _publish_retries(ride_ids, on_published):
+    on_published(ride_ids)
+    return 1
+
+
+class TestFireDueTimers:
+    @patch("apps.rides.services.dispatch.dispatch_retries", side_effect=_publish_retries)
+    @patch("apps.rides.tasks.check_no_show.apply_async")
+    @patch("apps.rides.tasks.driver_accept_timeout.apply_async")
+    def test_each_due_timer_publishes_its_task(
+        self, mock_accept, mock_no_show, mock_retries
+    ):
+        _due(ACCEPT_TIMEOUT, 3, 7)
+        _due(NO_SHOW, 4)
+        _due("retry", 5)
+        schedule_timer(NO_SHOW, 6, delay=60)  # not due yet
+
+        assert fire_due_timers() == 3
+
+        mock_accept.assert_called_once_with((3, 7))
+        mock_no_show.assert_called_once_with((4,))
+        assert list(mock_retries.call_args[0][0]) == [5]
+        # Fired timers are acked away; the pending one is untouched
+        assert redis_client.zrange(TIMERS_KEY, 0, -1) == ["no_show:6"]
+
+    @patch("apps.rides.tasks.check_no_show.apply_async")
+    @patch("apps.rides.tasks.driver_accept_timeout.apply_async")
+    def test_unpublished_timer_stays_leased(self, mock_accept, mock_no_show, settings):
+        settings.RIDE_TIMER_LEASE = 30
+        _due(ACCEPT_TIMEOUT, 3, 7)
+        _due(NO_SHOW, 4)
+        mock_accept.side_effect = ConnectionError("broker down")
+
+        assert fire_due_timers() == 1
+
+        assert redis_client.zscore(TIMERS_KEY, "no_show:4") is None
+        leased_until = redis_client.zscore(TIMERS_KEY, "accept:3:7")
+        assert leased_until / 1000 == pytest.approx(time.time() + 30, abs=5)
+
+    @patch("apps.rides.services.dispatch.dispatch_retries")
+    def test_published_retry_units_are_acked_before_a_failure(self, mock_retries):
+        for ride_id in (5, 6, 7):
+            _due("retry", ride_id)
+
+        def publish_one_unit_then_fail(ride_ids, on_published):
+            on_published([5, 6])
+            raise ConnectionError("broker down")
+
+        mock_retries.side_effect = publish_one_unit_then_fail
+
+        assert fire_due_timers() == 2
+        # Only the unpublished retry stays leased and fires again
+        assert redis_client.zrange(TIMERS_KEY, 0, -1) == ["retry:7"]
+        assert redis_client.zscore(TIMERS_KEY, "retry:7") / 1000 > time.time()
+
+    @patch("apps.rides.services.dispatch.dispatch_retries", return_value=0)
+    def test_retries_of_rides_no_longer_searching_are_acked(self, mock_retries):
+        _due("retry", 5)
+
+        assert fire_due_timers() == 1
+        assert redis_client.zcard(TIMERS_KEY) == 0
+
+    @patch("apps.rides.tasks.driver_accept_timeout.apply_async")
+    def test_claimed_but_unacked_timer_fires_again_after_the_lease(
+        self, mock_accept, settings
+    ):
+        settings.RIDE_TIMER_LEASE = 30
+        _due(ACCEPT_TIMEOUT, 3, 7)
+        now = time.time()
+
+        # A tick claims the timer and dies before acking it
+        with patch("apps.rides.services.timers.redis_client.pipeline") as mock_pipe:
+            assert fire_due_timers() == 1
+        mock_pipe.return_value.execute.assert_called_once()
+        assert mock_accept.call_count == 1
+
+        # Within the lease nobody else fires it
+        with patch("apps.rides.services.timers.time.time", return_value=now + 29):
+            assert fire_due_timers() == 0
+
+        # Once the lease runs out, the next tick does
+        with patch("apps.rides.services.timers.time.time", return_value=now + 31):
+            assert fire_due_timers() == 1
+        assert mock_accept.call_count == 2
+        assert redis_client.zcard(TIMERS_KEY) == 0
+
+    @patch("apps.rides.tasks.check_no_show.apply_async")
+    def test_full_batches_are_drained_in_one_tick(self, mock_no_show, settings):
+        settings.RIDE_TIMER_BATCH = 2
+        for ride_id in (1, 2, 3):
+            _due(NO_SHOW, ride_id)
+
+        assert fire_due_timers() == 3
+        assert mock_no_show.call_count == 3
+
+
+def test_ack_with_a_stale_lease_is_a_noop():
+    claim = redis_client.register_script(LUA_CLAIM_DUE)
+    ack = redis_client.register_script(LUA_ACK)
+    _due(NO_SHOW, 4)
+    now_ms = int(time.time() * 1000)
+
+    assert claim(keys=[TIMERS_KEY], args=[now_ms, 10, now_ms + 30_000]) == ["no_show:4"]
+    # Re-armed while its task was being published
+    schedule_timer(NO_SHOW, 4, delay=120)
+    rearmed = redis_client.zscore(TIMERS_KEY, "no_show:4")
+
+    assert ack(keys=[TIMERS_KEY], args=["no_show:4", now_ms + 30_000]) == 0
+    assert redis_client.zscore(TIMERS_KEY, "no_show:4") == rearmed
+
+    # The current lease acks it
+    now_ms = int(rearmed) + 1
+    assert claim(keys=[TIMERS_KEY], args=[now_ms, 10, now_ms + 30_000]) == ["no_show:4"]
+    assert ack(keys=[TIMERS_KEY], args=["no_show:4", now_ms + 30_000]) == 1
+
+
+@patch("apps.rides.tasks.check_no_show.apply_async")
+def test_concurrent_ticks_never_claim_the_same_timer(mock_no_show, settings):
+    settings.RIDE_TIMER_BATCH = 7
+    pipe = redis_client.pipeline(transaction=False)
+    for ride_id in range(200):
+        schedule_timer(NO_SHOW, ride_id, delay=-1, client=pipe)
+    pipe.execute()
+
+    fired, lock = [], threading.Lock()
+
+    def publish(args):
+        with lock:
+            fired.append(args[0])
+
+    mock_no_show.side_effect = publish
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        counts = list(executor.map(lambda _: fire_due_timers(), range(4)))
+
+    assert sum(counts) == 200
+    assert sorted(fired) == list(range(200))
+    assert redis_client.zcard(TIMERS_KEY) == 0
@@ -41,7 +41,7 @@ class TestRideViews:
 
     @patch("apps.rides.views.estimate_fare")
     @patch("apps.rides.views.get_planned_route")
-    @patch("apps.rides.views.find_driver_and_offer_ride")
+    @patch("apps.rides.views.request_matching")
     @patch("apps.rides.views.increment_demand")
     def test_create_ride_view_success(self, mock_demand, mock_find_driver, mock_route, mock_fare, factory, user):
         mock_fare.return_value = {
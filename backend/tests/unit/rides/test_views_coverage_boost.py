@@ -50,7 +50,7 @@ class TestViewsCoverageBoost:
         assert "Invalid coordinates or missing fields" in response.data["error"]
         mock_logger.error.assert_called()
 
-    @patch("apps.rides.views.find_driver_and_offer_ride")
+    @patch("apps.rides.views.request_matching")
     @patch("apps.drivers.services.metrics.update_driver_metrics")
     def test_reject_ride_updates_rejected_ids(self, mock_metrics, mock_offer):
         # Trigger line 335-337
@@ -30,8 +30,8 @@ class TestConsumersRideEvents:
             "attempt": 2
         })
 
-    @patch("consumers.ride_events.driver_accept_timeout.apply_async")
-    def test_successful_match(self, mock_apply, rider_user, driver_user):
+    @patch("consumers.ride_events.schedule_timer")
+    def test_successful_match(self, mock_schedule, rider_user, driver_user):
         driver = driver_user.driver
         driver.status = Driver.Status.ONLINE
         driver.save()
@@ -58,28 +58,42 @@ class TestConsumersRideEvents:
         ride.refresh_from_db()
         assert ride.status == Ride.Status.SEARCHING
 
+    @patch("consumers.ride_events.run_batch")
     @patch("consumers.ride_events.KafkaConsumer")
-    def test_main_loop(self, mock_kafka):
-        # Setup mock behavior to return one message then stop
+    def test_main_loop(self, mock_kafka, mock_run_batch):
+        # Setup mock behavior to return one batch then stop
+        import threading
+
+        stop = threading.Event()
+        batch = {MagicMock(): [MagicMock(value={"event": "TEST"}, offset=0)]}
         mock_consumer_instance = MagicMock()
-        mock_message = MagicMock()
-        mock_message.value = {"event": "TEST"}
-        mock_consumer_instance.__iter__.return_value = [mock_message]
+        mock_consumer_instance.poll.side_effect = lambda **kw: stop.set() or batch
         mock_kafka.return_value = mock_consumer_instance
 
         from consumers.ride_events import main
-        main()
-        
+        with patch("consumers.ride_events._stop", stop), \
+             patch("consumers.ride_events.signal.signal"):
+            main()
+
         mock_kafka.assert_called_once()
-    
+        assert mock_kafka.call_args.kwargs["enable_auto_commit"] is False
+        assert mock_run_batch.call_args.args[2] is batch
+        mock_consumer_instance.close.assert_called_once_with(autocommit=False)
+
     @patch("consumers.ride_events.KafkaConsumer")
     @patch("consumers.ride_events.time.sleep")
     def test_main_nobrokers(self, mock_sleep, mock_kafka):
+        import threading
+
         from kafka.errors import NoBrokersAvailable
         mock_kafka.side_effect = [NoBrokersAvailable(), MagicMock()]
-        
+        stop = threading.Event()
+        stop.set()
+
         from consumers.ride_events import main
-        main()
-        
+        with patch("consumers.ride_events._stop", stop), \
+             patch("consumers.ride_events.signal.signal"):
+            main()
+
         assert mock_kafka.call_count == 2
         mock_sleep.assert_called_once_with(5)
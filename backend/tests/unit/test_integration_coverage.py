@@ -99,20 +99,22 @@ class TestSupportsViews:
 # ─────────────────────────────────────────────────────────────
 @pytest.mark.django_db
 class TestRidesTasks:
-    def test_driver_accept_timeout(self, driver_user, ride):
+    def test_driver_accept_timeout(self, driver_user, ride, django_capture_on_commit_callbacks):
         from apps.rides.tasks import driver_accept_timeout
         from apps.rides.models import Ride
         driver = driver_user.driver
         ride.driver = driver
         ride.status = Ride.Status.OFFERED
         ride.save()
-        with patch("apps.rides.services.matching.find_driver_and_offer_ride"), \
+        with patch("apps.rides.services.dispatch.request_matching") as mock_rematch, \
+             patch("apps.rides.services.active_ride.notify_driver_ride_event"), \
              patch("apps.rides.tasks.add_driver_to_geo"), \
-             patch("apps.rides.tasks.increment_demand"), \
-             patch("apps.rides.tasks.increment_supply"):
+             django_capture_on_commit_callbacks(execute=True):
             driver_accept_timeout(ride.id, driver.id)
         ride.refresh_from_db()
         assert ride.status == Ride.Status.SEARCHING
+        # Re-matched through the dispatch queue, like a declined round
+        mock_rematch.assert_called_once_with(ride.id)
 
     def test_check_no_show_task(self, driver_user, ride):
         from apps.rides.tasks import check_no_show
@@ -75,9 +75,9 @@ class TestAdminLiveMapConsumer:
 
         # Test receive snapshot
         response = await communicator.receive_json_from()
-        assert response["type"] == "DRIVER_LOCATION_UPDATED"
-        assert response["data"]["driver_id"] == driver.id
-        assert response["data"]["lat"] == 12.9716
+        assert response["type"] == "DRIVER_LOCATIONS_BATCH"
+        assert response["data"][0]["driver_id"] == driver.id
+        assert response["data"][0]["lat"] == 12.9716
 
         await communicator.disconnect()
 
@@ -99,12 +99,14 @@ class TestAdminLiveMapConsumer:
             }
         }
         await consumer.driver_location_updated(event)
-        
-        # Verify call
+        consumer.send.assert_not_called()
+
+        # Pings go out in the next batched frame
+        await consumer._flush_frames()
         args, kwargs = consumer.send.call_args
         sent_data = json.loads(kwargs["text_data"])
-        assert sent_data["type"] == "DRIVER_LOCATION_UPDATED"
-        assert sent_data["data"]["driver_id"] == 123
+        assert sent_data["type"] == "DRIVER_LOCATIONS_BATCH"
+        assert sent_data["data"][0]["driver_id"] == 123
 
     async def test_admin_generic_event_forwarding(self, admin_user):
         from unittest.mock import AsyncMock
@@ -1,13 +1,16 @@
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 from apps.rides.services.matching import find_driver_and_offer_ride
 
 
+@patch("apps.rides.services.matching.schedule_timer")
 @patch("apps.rides.services.matching.update_ride_status")
 @patch("apps.drivers.services.metrics.update_driver_metrics", create=True)
 @patch("apps.drivers.services.geo.lock_driver_for_offer", create=True)
 @patch("apps.drivers.services.geo.is_driver_locked", create=True)
 @patch("apps.drivers.models.DriverStats", create=True)
+@patch("apps.rides.services.matching.get_driver_states")
 @patch("apps.rides.services.matching.get_nearby_driver_ids")
 @patch("apps.rides.services.matching.Ride")
 @patch("apps.rides.services.matching.Driver")
@@ -17,11 +20,13 @@ def test_matching_logic_success(
     mock_Driver_cls,
     mock_Ride_cls,
     mock_geo,
+    mock_states,
     mock_stats_cls,
     mock_is_locked,
     mock_lock,
     mock_metrics,
     mock_update_status,
+    mock_schedule_timer,
 ):
     # Setup Constants
     mock_Ride_cls.Status.SEARCHING = "SEARCHING"
@@ -33,6 +38,9 @@ def test_matching_logic_success(
     mock_ride = MagicMock()
     mock_ride.id = 1
     mock_ride.status = "SEARCHING"
+    mock_ride.search_attempt = 0
+    mock_ride.match_retries = 0
+    mock_ride.created_at = datetime.now(timezone.utc)
     mock_ride.rejected_driver_ids = []
     mock_Ride_cls.objects.select_for_update.return_value.filter.return_value.first.return_value = (
         mock_ride
@@ -41,16 +49,17 @@ def test_matching_logic_success(
     # Geo returns 101
     mock_geo.return_value = [101]
 
-    # Online IDs
-    mock_Driver_cls.objects.filter.return_value.values_list.return_value = [101]
+    # Read model: 101 is eligible
+    mock_states.return_value = {
+        101: MagicMock(id=101, level="NORMAL", score=50.0, is_eligible=True)
+    }
 
-    # DB Candidates
+    # Only the chosen driver is locked in Postgres
     mock_driver = MagicMock()
     mock_driver.id = 101
-    mock_driver.level = "NORMAL"
-    mock_Driver_cls.objects.select_for_update.return_value.select_related.return_value.filter.return_value = [
+    mock_Driver_cls.objects.select_for_update.return_value.select_related.return_value.filter.return_value.first.return_value = (
         mock_driver
-    ]
+    )
 
     # Locks
     mock_is_locked.return_value = False
@@ -75,6 +84,8 @@ def test_matching_no_drivers_found(mock_atomic, mock_Ride_cls, mock_geo):
     mock_Ride_cls.Status.SEARCHING = "SEARCHING"
     mock_ride = MagicMock()
     mock_ride.status = "SEARCHING"
+    mock_ride.search_attempt = 0
+    mock_ride.match_retries = 0
     mock_Ride_cls.objects.select_for_update.return_value.filter.return_value.first.return_value = (
         mock_ride
     )
@@ -87,18 +98,27 @@ def test_matching_no_drivers_found(mock_atomic, mock_Ride_cls, mock_geo):
 
 @patch("apps.drivers.services.geo.lock_driver_for_offer", create=True)
 @patch("apps.drivers.services.geo.is_driver_locked", create=True)
+@patch("apps.rides.services.matching.get_driver_states", return_value={})
 @patch("apps.rides.services.matching.get_nearby_driver_ids")
 @patch("apps.rides.services.matching.Ride")
 @patch("apps.rides.services.matching.Driver")
 @patch("apps.rides.services.matching.transaction.atomic")
 def test_matching_skip_rejected_drivers(
-    mock_atomic, mock_Driver_cls, mock_Ride_cls, mock_geo, mock_is_locked, mock_lock
+    mock_atomic,
+    mock_Driver_cls,
+    mock_Ride_cls,
+    mock_geo,
+    mock_states,
+    mock_is_locked,
+    mock_lock,
 ):
     mock_Ride_cls.Status.SEARCHING = "SEARCHING"
     mock_Driver_cls.Status.ONLINE = "ONLINE"
 
     mock_ride = MagicMock()
     mock_ride.status = "SEARCHING"
+    mock_ride.search_attempt = 0
+    mock_ride.match_retries = 0
     mock_ride.rejected_driver_ids = [101]
     mock_Ride_cls.objects.select_for_update.return_value.filter.return_value.first.return_value = (
         mock_ride
@@ -107,12 +127,25 @@ def test_matching_skip_rejected_drivers(
     # 101 rejected, 102 available
     mock_geo.return_value = [101, 102]
 
-    # Online IDs should only include 102
-    mock_Driver_cls.objects.filter.return_value.values_list.return_value = [102]
-
     find_driver_and_offer_ride(1)
 
-    # Verify online filter called with 102, not 101
-    args, kwargs = mock_Driver_cls.objects.filter.call_args
-    assert 102 in kwargs["id__in"]
-    assert 101 not in kwargs["id__in"]
+    # Read model is only consulted for 102, and Postgres not at all
+    mock_states.assert_called_once_with([102])
+    mock_Driver_cls.objects.filter.assert_not_called()
+    mock_Driver_cls.objects.select_for_update.assert_not_called()
+
+
+@patch("apps.rides.services.matching.DRIVER_ACCEPT_TIMEOUT", 45)
+@patch("apps.rides.services.matching.forget_active_ride")
+@patch("apps.rides.services.matching.async_to_sync")
+def test_offer_countdown_matches_the_accept_timer(mock_async, _):
+    from apps.rides.services.matching import _notify_driver_of_match
+
+    ride = MagicMock(pickup_lat=12.97, pickup_lng=77.59, drop_lat=13.0, drop_lng=77.6, base_fare=120)
+    stats = MagicMock(rejection_count_today=0)
+
+    _notify_driver_of_match(ride, MagicMock(id=9), False, stats)
+
+    _, message = mock_async.return_value.call_args.args
+    assert message["type"] == "ride_offer"
+    assert message["data"]["timeout"] == 45
@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from kafka.structs import TopicPartition
+
+from apps.common.metrics import RIDE_EVENTS_LAG
+from consumers import ride_events
+from consumers.ride_events import get_kafka_producer, run_batch
+
+P0 = TopicPartition("ride_events", 0)
+P1 = TopicPartition("ride_events", 1)
+
+
+def _records(partition, *ride_ids, start=0):
+    return [
+        MagicMock(value={"event": "COMPLETED", "ride_id": ride_id}, offset=start + i)
+        for i, ride_id in enumerate(ride_ids)
+    ]
+
+
+@pytest.fixture
+def consumer():
+    consumer = MagicMock()
+    consumer.highwater.return_value = 120
+    consumer.position.return_value = 100
+    return consumer
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+@patch("consumers.ride_events.flush_dlq", return_value=True)
+class TestRunBatch:
+    def test_partitions_run_in_parallel_each_in_order(
+        self, _, consumer, executor
+    ):
+        batch = {P0: _records(0, 1, 2, 3), P1: _records(1, 4, 5, 6)}
+        both_started = threading.Barrier(2, timeout=5)
+        seen = {0: [], 1: []}
+
+        def process(event):
+            partition = 0 if event["ride_id"] <= 3 else 1
+            if not seen[partition]:
+                # Deadlocks unless both partitions are in flight at once
+                both_started.wait()
+            seen[partition].append(event["ride_id"])
+
+        with patch("consumers.ride_events.process_ride_event", side_effect=process):
+            run_batch(consumer, executor, batch)
+
+        assert seen == {0: [1, 2, 3], 1: [4, 5, 6]}
+        consumer.seek.assert_not_called()
+        consumer.commit.assert_called_once_with()
+        assert RIDE_EVENTS_LAG.labels(partition="1")._value.get() == 20
+
+    def test_unparked_record_is_consumed_again(self, _, consumer, executor):
+        batch = {P0: _records(0, 1, 2, 3, start=10), P1: _records(1, 4)}
+
+        def handle(event):
+            return event["ride_id"] != 2
+
+        with patch("consumers.ride_events.handle_event", side_effect=handle) as h:
+            run_batch(consumer, executor, batch)
+
+        consumer.seek.assert_called_once_with(P0, 11)
+        # Nothing after the failed record of that partition ran
+        assert [c.args[0]["ride_id"] for c in h.call_args_list if c.args[0]["ride_id"] < 4] == [1, 2]
+        consumer.commit.assert_called_once_with()
+
+    def test_unflushed_dlq_replays_the_batch(self, mock_flush, consumer, executor):
+        mock_flush.return_value = False
+        batch = {P0: _records(0, 1, 2, start=40), P1: _records(1, 4, start=7)}
+
+        with patch("consumers.ride_events.handle_event", return_value=True):
+            run_batch(consumer, executor, batch)
+
+        consumer.seek.assert_any_call(P0, 40)
+        consumer.seek.assert_any_call(P1, 7)
+        consumer.commit.assert_not_called()
+
+
+def test_dlq_producer_is_created_once():
+    with (
+        patch.object(ride_events, "_producer", None),
+        patch("consumers.ride_events.KafkaProducer") as producer_class,
+    ):
+        for _ in range(3):
+            ride_events.send_to_dlq({"ride_id": 1}, "reason")
+
+        assert get_kafka_producer() is producer_class.return_value
+        producer_class.assert_called_once()
+        assert producer_class.return_value.send.call_count == 3
@@ -6,6 +6,7 @@ from consumers.ride_events import send_to_dlq
 def test_send_to_dlq_success(mock_logger, mock_get_producer):
     mock_producer = MagicMock()
     mock_get_producer.return_value = mock_producer
-    send_to_dlq({"ride_id": 123}, "test failure")
-    mock_producer.flush.assert_called_once()
+    assert send_to_dlq({"ride_id": 123}, "test failure") is True
+    # Flushed once per batch, before the commit (flush_dlq)
+    mock_producer.flush.assert_not_called()
     mock_logger.warning.assert_called_with("Event sent to DLQ: test failure")
@@ -7,7 +7,7 @@ from django.db import DatabaseError
 from apps.rides.models import Ride
 from apps.drivers.models import Driver
 from django.contrib.auth import get_user_model
-from consumers.ride_events import main, process_ride_event, match_and_assign_driver, send_to_dlq
+from consumers.ride_events import handle_event, main, process_ride_event, match_and_assign_driver, send_to_dlq
 
 User = get_user_model()
 
@@ -41,20 +41,23 @@ class TestRideEventsFinal:
     @patch('consumers.ride_events.KafkaConsumer')
     @patch('consumers.ride_events.process_ride_event')
     def test_main_loop_and_consumer_init(self, mock_process, mock_consumer_class):
+        import threading
+        stop = threading.Event()
         mock_consumer = MagicMock()
         mock_consumer_class.return_value = mock_consumer
-        message = MagicMock()
+        message = MagicMock(offset=7)
         message.value = {"event": "COMPLETED", "ride_id": 1}
-        mock_consumer.__iter__.return_value = [message]
-        
-        with patch('time.sleep', side_effect=[None, Exception("Stop loop")]):
-            try:
-                main()
-            except Exception as e:
-                if "Stop loop" not in str(e): raise
-        
+        mock_consumer.poll.side_effect = lambda **kw: stop.set() or {MagicMock(): [message]}
+        mock_consumer.highwater.return_value = None
+
+        with patch('consumers.ride_events._stop', stop), \
+             patch('consumers.ride_events.signal.signal'):
+            main()
+
         mock_consumer_class.assert_called_once()
         mock_process.assert_called_once_with(message.value)
+        mock_consumer.commit.assert_called_once_with()
+        mock_consumer.seek.assert_not_called()
 
     @patch('consumers.ride_events.update_ride_status')
     def test_process_ride_completed(self, mock_update, setup_data):
@@ -81,61 +84,33 @@ class TestRideEventsFinal:
         process_ride_event(event)
         mock_update.assert_called()
 
-    @patch('consumers.ride_events.KafkaConsumer')
-    @patch('consumers.ride_events.send_to_dlq')
-    @patch('time.sleep', return_value=None)
-    def test_malformed_json_to_dlq(self, mock_sleep, mock_dlq, mock_consumer_class):
-        mock_consumer = MagicMock()
-        mock_consumer_class.return_value = mock_consumer
-        message = MagicMock()
-        message.value = {"_error": "MALFORMED", "raw": "bad-data"}
-        mock_consumer.__iter__.return_value = [message]
-        
-        with patch('consumers.ride_events.NoBrokersAvailable', side_effect=[None, Exception("Stop")]):
-             try:
-                 main()
-             except Exception:
-                 pass
-        mock_dlq.assert_called_with(message.value, "Malformed JSON")
+    @patch('consumers.ride_events.send_to_dlq', return_value=True)
+    def test_malformed_json_to_dlq(self, mock_dlq):
+        event = {"_error": "MALFORMED", "raw": "bad-data"}
+        assert handle_event(event) is True
+        mock_dlq.assert_called_with(event, "Malformed JSON")
 
-    @patch('consumers.ride_events.KafkaConsumer')
     @patch('consumers.ride_events.process_ride_event')
     @patch('consumers.ride_events.send_to_dlq')
     @patch('time.sleep', return_value=None)
-    def test_database_unavailable_retry(self, mock_sleep, mock_dlq, mock_process, mock_consumer_class, setup_data):
-        mock_consumer = MagicMock()
-        mock_consumer_class.return_value = mock_consumer
-        message = MagicMock()
-        message.value = {"event": "COMPLETED", "ride_id": setup_data[2].id}
-        mock_consumer.__iter__.return_value = [message]
+    def test_database_unavailable_retry(self, mock_sleep, mock_dlq, mock_process, setup_data):
+        event = {"event": "COMPLETED", "ride_id": setup_data[2].id}
         mock_process.side_effect = DatabaseError("DB Down")
-        
-        with patch('consumers.ride_events.NoBrokersAvailable', side_effect=[None, Exception("Stop loop")]):
-            try:
-                main()
-            except Exception:
-                pass
+
+        handle_event(event)
         mock_dlq.assert_called()
+        assert event["_retries"] == 1
 
-    @patch('consumers.ride_events.KafkaConsumer')
     @patch('consumers.ride_events.process_ride_event')
     @patch('consumers.ride_events.send_to_dlq')
     @patch('apps.notifications.services.alerts.send_critical_alert')
     @patch('time.sleep', return_value=None)
-    def test_max_retries_exceeded_dlq_alert(self, mock_sleep, mock_alert, mock_dlq, mock_process, mock_consumer_class, setup_data):
-        mock_consumer = MagicMock()
-        mock_consumer_class.return_value = mock_consumer
-        message = MagicMock()
-        message.value = {"event": "COMPLETED", "ride_id": setup_data[2].id, "_retries": 3}
-        mock_consumer.__iter__.return_value = [message]
+    def test_max_retries_exceeded_dlq_alert(self, mock_sleep, mock_alert, mock_dlq, mock_process, setup_data):
+        event = {"event": "COMPLETED", "ride_id": setup_data[2].id, "_retries": 3}
         mock_process.side_effect = Exception("Permanent failure")
-        
-        with patch('consumers.ride_events.NoBrokersAvailable', side_effect=[None, Exception("Stop loop")]):
-             try:
-                 main()
-             except Exception:
-                 pass
-        mock_dlq.assert_called_with(message.value, "Max retries exceeded: Permanent failure")
+
+        handle_event(event)
+        mock_dlq.assert_called_with(event, "Max retries exceeded: Permanent failure")
         mock_alert.assert_called_once()
 
     def test_unknown_event_type_handled(self, setup_data):
@@ -148,13 +123,12 @@ class TestRideEventsFinal:
     @patch('consumers.ride_events.KafkaConsumer')
     def test_kafka_conn_retry(self, mock_consumer_class):
          from kafka.errors import NoBrokersAvailable
+         from consumers.ride_events import _create_consumer
          mock_consumer_class.side_effect = [NoBrokersAvailable(), MagicMock()]
-         with patch('time.sleep', side_effect=[None, Exception("Stop loop")]):
-             try:
-                 main()
-             except Exception:
-                 pass
+         with patch('time.sleep') as mock_sleep:
+             _create_consumer()
          assert mock_consumer_class.call_count == 2
+         mock_sleep.assert_called_once_with(5)
 
     @patch('consumers.ride_events.update_ride_status')
     def test_process_ride_searching(self, mock_update, setup_data):
@@ -0,0 +1,85 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from apps.drivers.redis import (
+    queue_driver_last_point,
+    queue_driver_location,
+    read_ping_state,
+)
+from apps.rides.models import Ride
+from apps.tracking.consumers.driver_location import DriverLocationConsumer
+
+NOW = 1_700_000_000
+
+
+class TestPipelineHelpers:
+    @pytest.mark.asyncio
+    async def test_read_ping_state_is_one_round_trip(self):
+        client = MagicMock()
+        pipe = client.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[{"lat": "13.0"}, {"lat": "13.1", "lng": "80.2"}])
+
+        meta, last_point = await read_ping_state(client, 7, with_last_point=True)
+
+        assert meta == {"lat": "13.0"}
+        assert last_point == (13.1, 80.2)
+        assert pipe.hgetall.call_count == 2
+        pipe.execute.assert_awaited_once()
+
+    def test_spoofed_ping_only_counts(self):
+        pipe = MagicMock()
+        # ~11 km in 30 seconds
+        meta = {"lat": "13.0000", "lng": "80.0", "last_seen": str(NOW - 30)}
+
+        assert queue_driver_location(pipe, 7, 13.1, 80.0, meta, NOW) is False
+
+        pipe.hincrby.assert_called_once_with("driver:7:fraud", "spoof_count", 1)
+        pipe.execute_command.assert_not_called()
+
+    def test_valid_ping_queues_position(self):
+        pipe = MagicMock()
+
+        assert queue_driver_location(pipe, 7, 13.0, 80.0, {}, NOW) is True
+
+        pipe.hset.assert_any_call(
+            "driver:7:meta", mapping={"lat": 13.0, "lng": 80.0, "last_seen": NOW}
+        )
+        pipe.hset.assert_any_call("drivers:positions:dirty", "7", f"13.0,80.0,{NOW}")
+        pipe.execute_command.assert_called_once_with("GEOADD", "drivers:geo", 80.0, 13.0, "7")
+        pipe.setex.assert_called_once()
+
+
+@pytest.mark.asyncio
+class TestOngoingRidePing:
+    async def test_progress_shares_the_write_pipeline(self):
+        consumer = DriverLocationConsumer()
+        consumer.driver = MagicMock(id=7)
+        consumer.last_seq = 1
+        consumer.last_ping_ts = None
+        consumer.prev_point = None
+        consumer.route_hint = None
+        consumer.redis = MagicMock()
+        pipe = consumer.redis.pipeline.return_value
+        pipe.execute = AsyncMock()
+        ride = MagicMock(id=3, status=Ride.Status.ONGOING, planned_route_polyline="")
+
+        with patch(
+            "apps.tracking.consumers.driver_location.read_ping_state",
+            return_value=({}, (13.0, 80.0)),
+        ) as mock_read, patch(
+            "apps.tracking.services.LocationProcessor.calculate_eta", return_value=4
+        ):
+            eta = await consumer._persist_location(13.001, 80.0, ride)
+
+        assert eta == 4
+        assert mock_read.call_args.kwargs == {"with_last_point": True}
+        pipe.incrbyfloat.assert_called_once()
+        pipe.rpush.assert_called_once_with("ride:3:path", "13.001,80.0")
+        pipe.execute.assert_awaited_once()
+
+
+def test_queue_driver_last_point():
+    pipe = MagicMock()
+    queue_driver_last_point(pipe, 7, "13.1", "80.2")
+    pipe.hset.assert_called_once_with("driver:7:last_point", mapping={"lat": 13.1, "lng": 80.2})
@@ -2,6 +2,7 @@ import json
 import time
 from unittest.mock import MagicMock, patch, AsyncMock, ANY
 import pytest
+from apps.admin_dashboard.tiles import tile_group_for
 from apps.tracking.consumers.driver_location import DriverLocationConsumer
 
 @pytest.fixture
@@ -28,11 +29,20 @@ async def test_is_valid_sequence(consumer):
 
 @pytest.mark.asyncio
 async def test_persist_location(consumer):
-    with patch("apps.tracking.consumers.driver_location.update_driver_location") as mock_update:
-        with patch.object(consumer, "_update_driver_db", new_callable=AsyncMock) as mock_db:
-            await consumer._persist_location(12.97, 77.59)
-            # update_driver_location is called via database_sync_to_async
-            pass
+    consumer.redis = MagicMock()
+    pipe = consumer.redis.pipeline.return_value
+    pipe.execute = AsyncMock()
+    with patch("apps.tracking.consumers.driver_location.read_ping_state", return_value=({}, None)) as mock_read:
+        eta = await consumer._persist_location(12.97, 77.59)
+
+    assert eta is None
+    mock_read.assert_awaited_once_with(consumer.redis, 1, with_last_point=False)
+    # Heartbeat + velocity meta + GEO + TTL all ride one write pipeline
+    pipe.set.assert_called_once_with("driver:1:last_seen", ANY, ex=300)
+    pipe.execute_command.assert_called_once_with("GEOADD", "drivers:geo", 77.59, 12.97, "1")
+    pipe.execute.assert_awaited_once()
+    # Postgres is written behind: the position is only marked dirty
+    pipe.hset.assert_any_call("drivers:positions:dirty", "1", ANY)
 
 @pytest.mark.asyncio
 async def test_build_broadcast_data(consumer):
@@ -51,10 +61,11 @@ async def test_build_broadcast_data(consumer):
 
 @pytest.mark.asyncio
 async def test_throttled_admin_broadcast(consumer):
-    data = {"test": "data"}
-    # First call
+    data = {"driver_id": 1, "lat": 13.01, "lng": 80.26}
+    # First call goes to the ping's map tile
     await consumer._throttled_admin_broadcast(data)
     consumer.channel_layer.group_send.assert_called_once()
+    assert consumer.channel_layer.group_send.call_args[0][0] == tile_group_for(13.01, 80.26)
     
     # Second call immediate - should be throttled
     consumer.channel_layer.group_send.reset_mock()
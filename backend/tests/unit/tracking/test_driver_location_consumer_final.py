@@ -7,15 +7,16 @@ from channels.db import database_sync_to_async
 from config.asgi import application
 from apps.drivers.models import Driver
 from apps.rides.models import Ride
+from apps.tracking.route_index import Snap
 from rest_framework_simplejwt.tokens import AccessToken
 
 @pytest.fixture(autouse=True)
 def mock_tracking_services():
     with patch("apps.tracking.services.LocationProcessor.get_snapped_coords", new_callable=AsyncMock) as mock_snap, \
-         patch("apps.tracking.consumers.driver_location.decode_route") as mock_decode:
+         patch("apps.tracking.consumers.driver_location.get_route_index") as mock_route:
         mock_snap.return_value = (12.0, 77.0)
-        mock_decode.return_value = [(12.0, 77.0)]
-        yield mock_snap, mock_decode
+        mock_route.return_value.snap.return_value = Snap((12.0, 77.0), 0.0, 0, 0.0)
+        yield mock_snap, mock_route
 
 @pytest.mark.asyncio
 @pytest.mark.django_db(transaction=True)
@@ -110,9 +111,10 @@ class TestDriverLocationConsumerFinal:
             current_time[0] += 1.0
             return current_time[0]
 
-        with patch("apps.tracking.consumers.driver_location.snap_to_route", return_value=((10.0, 70.0), 1000.0)), \
+        with patch("apps.tracking.consumers.driver_location.get_route_index") as mock_route, \
              patch("apps.tracking.consumers.driver_location.is_deviated", return_value=True), \
              patch("apps.tracking.consumers.driver_location.time.time", side_effect=mock_time):
+            mock_route.return_value.snap.return_value = Snap((10.0, 70.0), 1000.0, 0, 0.0)
             
             await communicator.send_json_to({"type": "location", "lat": 12.0, "lng": 77.0, "seq": 20})
             await communicator.receive_json_from()
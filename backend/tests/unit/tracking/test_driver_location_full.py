@@ -4,6 +4,7 @@ from unittest.mock import patch, MagicMock
 from channels.db import database_sync_to_async
 from channels.testing import WebsocketCommunicator
 from apps.tracking.consumers.driver_location import DriverLocationConsumer
+from apps.tracking.route_index import Snap
 from django.contrib.auth import get_user_model
 from apps.drivers.models import Driver
 
@@ -66,10 +67,7 @@ class TestDriverLocationConsumerFull:
 
         await communicator.disconnect()
 
-    @patch("apps.tracking.consumers.driver_location.update_driver_location")
-    @patch("apps.tracking.consumers.driver_location.get_driver_last_point")
-    @patch("apps.tracking.consumers.driver_location.set_driver_last_point")
-    async def test_ping_returns_pong(self, mock_set_last, mock_get_last, mock_update):
+    async def test_ping_returns_pong(self):
         """Trigger lines 95-97: ping message returns pong immediately."""
         user = await create_user("dlf_ping_driver_v2")
         await create_driver(user)
@@ -87,7 +85,7 @@ class TestDriverLocationConsumerFull:
 
         await communicator.disconnect()
 
-    @patch("apps.tracking.consumers.driver_location.update_driver_location")
+    @patch("apps.tracking.consumers.driver_location.queue_driver_location")
     @patch("apps.tracking.services.LocationProcessor.get_snapped_coords")
     async def test_sequence_deduplication_drops_old_seq(self, mock_snapped, mock_update):
         """Trigger lines 99-100: stale sequence number is silently dropped."""
@@ -119,13 +117,12 @@ class TestDriverLocationConsumerFull:
 
         await communicator.disconnect()
 
-    @patch("apps.tracking.consumers.driver_location.update_driver_location")
-    @patch("apps.tracking.consumers.driver_location.get_driver_last_point")
-    @patch("apps.tracking.consumers.driver_location.set_driver_last_point")
+    @patch("apps.tracking.consumers.driver_location.queue_driver_location")
+    @patch("apps.tracking.consumers.driver_location.read_ping_state")
     @patch("apps.tracking.services.LocationProcessor.get_snapped_coords")
-    async def test_location_sync_response(self, mock_snapped, mock_set, mock_get, mock_update):
+    async def test_location_sync_response(self, mock_snapped, mock_read, mock_queue):
         """Trigger lines 110-117: valid location update returns location_sync."""
-        mock_get.return_value = (13.0, 80.0)
+        mock_read.return_value = ({}, (13.0, 80.0))
         mock_snapped.return_value = (13.1, 80.1)
 
         user = await create_user("dlf_loc_driver_v2")
@@ -146,7 +143,7 @@ class TestDriverLocationConsumerFull:
 
         await communicator.disconnect()
 
-    @patch("apps.tracking.consumers.driver_location.update_driver_location")
+    @patch("apps.tracking.consumers.driver_location.queue_driver_location")
     @patch("apps.tracking.services.LocationProcessor.get_snapped_coords")
     @patch("apps.tracking.services.LocationProcessor.filter_noisy_ping")
     async def test_noisy_ping_skipped(self, mock_noisy, mock_snapped, mock_update):
@@ -164,7 +161,7 @@ class TestDriverLocationConsumerFull:
         mock_update.assert_called()
         await communicator.disconnect()
 
-    @patch("apps.tracking.consumers.driver_location.update_driver_location")
+    @patch("apps.tracking.consumers.driver_location.queue_driver_location")
     @patch("apps.tracking.services.LocationProcessor.get_snapped_coords")
     async def test_route_deviation_alert(self, mock_snapped, mock_update):
         """Trigger lines 131-150, 168-182: route deviation logic."""
@@ -188,9 +185,9 @@ class TestDriverLocationConsumerFull:
         await communicator.connect()
 
         # Re-mock to return high deviation
-        with patch("apps.tracking.consumers.driver_location.snap_to_route", return_value=((13.1, 80.1), 500.0)), \
-             patch("apps.tracking.consumers.driver_location.is_deviated", return_value=True), \
-             patch("apps.tracking.consumers.driver_location.decode_route", return_value=[]):
+        with patch("apps.tracking.consumers.driver_location.get_route_index") as mock_route, \
+             patch("apps.tracking.consumers.driver_location.is_deviated", return_value=True):
+            mock_route.return_value.snap.return_value = Snap((13.1, 80.1), 500.0, 0, 0.0)
             await communicator.send_json_to({"type": "location_update", "seq": 1, "lat": 13.1, "lng": 80.1})
             await communicator.receive_json_from() # location_sync
 
@@ -0,0 +1,66 @@
+import random
+
+import polyline
+import pytest
+
+from apps.tracking.route_index import RouteIndex, get_route_index
+
+ROUTE = [(13.0827, 80.2707), (13.0900, 80.2707), (13.0900, 80.2800)]
+
+
+class TestRouteIndex:
+    def test_cumulative_distances(self):
+        route = RouteIndex(ROUTE)
+        assert route.cumulative[0] == 0.0
+        assert route.cumulative[1] == pytest.approx(812, rel=0.01)
+        assert route.length_m == pytest.approx(812 + 1008, rel=0.01)
+
+    def test_snap_matches_linear_scan(self):
+        rng = random.Random(11)
+        points = [
+            (13.0 + rng.uniform(-0.05, 0.05), 80.2 + rng.uniform(-0.05, 0.05))
+            for _ in range(40)
+        ]
+        route = RouteIndex(points)
+
+        for _ in range(50):
+            lat = 13.0 + rng.uniform(-0.1, 0.1)
+            lng = 80.2 + rng.uniform(-0.1, 0.1)
+            px, py = route._project(lat, lng)
+            expected = min(
+                route._segment_dist(seg, px, py)[0] for seg in range(len(points) - 1)
+            )
+            assert route.snap(lat, lng).distance_m == pytest.approx(expected)
+
+    def test_snap_reports_progress(self):
+        route = RouteIndex(ROUTE)
+        match = route.snap(13.0900, 80.2750)
+        assert match.segment == 1
+        assert match.distance_m < 1.0
+        assert match.along_m == pytest.approx(812 + 465, rel=0.02)
+
+    def test_hint_keeps_progress_on_doubled_back_route(self):
+        # Out along the street and straight back: both legs are equally close
+        out_and_back = [(13.08, 80.27), (13.09, 80.27), (13.08, 80.27)]
+        route = RouteIndex(out_and_back)
+
+        match = route.snap(13.085, 80.27, hint=1, threshold_m=50)
+
+        assert match.segment == 1
+        assert match.along_m > route.cumulative[1]
+
+    def test_hint_miss_falls_back_to_grid(self):
+        route = RouteIndex(ROUTE)
+        # Hint on the first leg, driver already near the end of the second
+        match = route.snap(13.0900, 80.2795, hint=0, threshold_m=50)
+        assert match.segment == 1
+        assert match.distance_m < 1.0
+
+    def test_degenerate_routes(self):
+        assert RouteIndex([]).snap(13.0, 80.0).distance_m == 0.0
+        single = RouteIndex([(13.0, 80.0)]).snap(13.001, 80.0)
+        assert single.distance_m == pytest.approx(111, rel=0.01)
+
+    def test_index_is_shared_per_polyline(self):
+        encoded = polyline.encode(ROUTE)
+        assert get_route_index(encoded) is get_route_index(encoded)
@@ -1,6 +1,7 @@
 import React, { useEffect, useRef, useState } from "react";
 import { View, Text, StyleSheet, TouchableOpacity, Animated, Alert } from "react-native";
 import { api } from "../services/api";
+import { onRidesEvent } from "../services/socket";
 
 const AUTO_ASSIGN_THRESHOLD = 3; // matches backend
 
@@ -21,6 +22,7 @@ export default function RideOfferScreen({ route, navigation }: any) {
     // ── Countdown ─────────────────────────────────────────────────
     const [secondsLeft, setSecondsLeft] = useState(isAutoAssigned ? 5 : offerTimeout);
     const timerRef = useRef<any>(null);
+    const acceptingRef = useRef(false);
 
     // Animated progress bar (normal offer only)
     const progress = useRef(new Animated.Value(1)).current;
@@ -44,6 +46,19 @@ export default function RideOfferScreen({ route, navigation }: any) {
         return () => { if (timerRef.current) clearInterval(timerRef.current); };
     }, []);
 
+    // Offers sent to several drivers at once: close when another driver wins
+    // or the ride is withdrawn (status moves on without us)
+    useEffect(() => {
+        if (isAutoAssigned) return;
+        return onRidesEvent("ride_status_update", (msg) => {
+            if (Number(msg.ride_id) !== Number(rideId) || msg.status === "OFFERED") return;
+            if (acceptingRef.current) return;  // our own accept's outcome decides
+            if (timerRef.current) clearInterval(timerRef.current);
+            Alert.alert("Offer Closed", "This ride is no longer available.");
+            navigation.goBack();
+        });
+    }, [rideId]);
+
     // Observer to handle timeouts gracefully without breaking React's render purity
     useEffect(() => {
         if (secondsLeft <= 0) {
@@ -80,12 +95,14 @@ export default function RideOfferScreen({ route, navigation }: any) {
     // ── Handlers ──────────────────────────────────────────────────
     async function handleAccept() {
         if (timerRef.current) clearInterval(timerRef.current);
+        acceptingRef.current = true;
         try {
             await api.post(`rides/${rideId}/accept/`);
             navigation.replace("RideTracking", { rideId });
         } catch (err: any) {
             const msg = err?.response?.data?.error || "Failed to accept ride";
             Alert.alert("Action Failed", msg);
+            if (err?.response?.status === 409) navigation.goBack();
         }
     }
 